@@ -1,9 +1,13 @@
+import asyncio
+import contextlib
+import functools
+import itertools
 import json
 import os
 import shutil
 import sys
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import yaml
 from fastapi import (
@@ -21,16 +25,33 @@ from pydantic import BaseModel
 
 # 将 backend 根目录加入路径以导入 core 和 drivers
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from app.database import MetricsSampleRepository, TestRunRepository
+from app.database import (
+    CampaignRepository,
+    CheckpointRepository,
+    InstrumentLatencyRepository,
+    MetricsSampleRepository,
+    ScpiMetricsRepository,
+    TestRunRepository,
+)
 from app.log_manager import manager
 from app.report_generator import ReportGenerator
-from app.state import state
+from app.state import Lane, state
+from core.campaign import CampaignItem, CampaignRunner
 from core.config_loader import ConfigLoader
+from core.estimator import LatencyTable, ScenarioEstimator
+from core.matrix import ScenarioMatrix, count_items, has_matrix, matrix_items
+from core.plan import scenario_compiler
+from core.resources import LeaseCancelled, bench_resources
 from core.sequencer import TestSequencer
+from drivers.scpi_metrics import BUCKET_BOUNDS_MS, scpi_metrics
+from drivers.visa_pool import session_pool
 from manual_library.scan_local_library import scan_and_update_catalog
 
 router = APIRouter()
 
+# 停止接口等待射频关闭的最长时间，超时后强制取消执行任务
+STOP_WAIT_S = 10.0
+
 # --- Data Models ---
 class HealthResponse(BaseModel):
     status: str
@@ -43,6 +64,22 @@ class InstrumentStatus(BaseModel):
     connected: bool
     simulation: bool
     driver_info: Optional[Dict[str, Any]] = None
+    init_elapsed_s: Optional[float] = None  # 最近一次连接耗时
+    init_error: Optional[str] = None
+    lease_holder: Optional[str] = None  # 持有该仪表租约的运行
+
+class InstrumentInitResultModel(BaseModel):
+    key: str
+    name: str
+    address: str
+    success: bool
+    elapsed_s: float
+    error: Optional[str] = None
+
+class InstrumentStartupReport(BaseModel):
+    total_elapsed_s: Optional[float] = None  # 并发初始化的实际耗时
+    serial_elapsed_s: float  # 各仪表耗时之和 (串行连接时的预期耗时)
+    instruments: List[InstrumentInitResultModel]
 
 class ManualEntry(BaseModel):
     title: str
@@ -65,6 +102,47 @@ class TestControlResponse(BaseModel):
     message: str
     running: bool
     run_id: Optional[int] = None
+    lane: Optional[str] = None
+    rf_off_latency_ms: Optional[float] = None  # 停止请求到射频全部关闭的耗时
+
+class LaneStatus(BaseModel):
+    name: str
+    running: bool
+    run_id: Optional[int] = None
+    campaign_id: Optional[int] = None
+    instruments: List[str]  # 该测试台配置的仪表
+    dut: Optional[str] = None  # DUT device_id
+    queued: bool = False  # 正在排队等待仪表租约
+
+class LeaseInfo(BaseModel):
+    holder: str
+    resources: List[str]
+    priority: int
+    granted: bool
+    waited_s: float
+
+class ResourceStatus(BaseModel):
+    leases: List[LeaseInfo]
+    queue: List[LeaseInfo]
+
+class VisaSessionInfo(BaseModel):
+    resource_name: str
+    holders: List[str]  # 当前持有该会话的驱动
+    uses: int
+    age_s: float
+    idle_s: Optional[float] = None  # 无人持有时的闲置时长
+
+class VisaPoolStatus(BaseModel):
+    opened: int
+    reused: int
+    closed: int
+    evicted: int
+    leaked: int
+    open: int
+    idle: int
+    idle_timeout_s: float
+    maintaining: bool
+    sessions: List[VisaSessionInfo]
 
 # --- History Data Models ---
 class TestRunInfo(BaseModel):
@@ -76,6 +154,8 @@ class TestRunInfo(BaseModel):
     start_time: Optional[str]
     end_time: Optional[str]
     result_summary: Optional[str]
+    campaign_id: Optional[int] = None
+    lane: Optional[str] = None
 
 class MetricsSample(BaseModel):
     elapsed_time: float
@@ -87,6 +167,36 @@ class TestRunDetail(BaseModel):
     run_info: TestRunInfo
     metrics: List[MetricsSample]
     statistics: Dict[str, Any]
+    results: Dict[str, Any] = {}  # 结构化结果，如灵敏度搜索测量点
+
+# --- Campaign Data Models ---
+class CampaignStartRequest(BaseModel):
+    scenarios: List[str]  # 按执行顺序排列的场景文件名 (含 matrix 的场景按参数矩阵展开)
+    name: Optional[str] = None
+    stop_on_failure: bool = False
+    matrix_order: str = "optimized"  # optimized / declared
+    priority: int = 0  # 与其他测试台竞争仪表时的优先级 (大者优先)
+
+class CampaignControlResponse(BaseModel):
+    message: str
+    running: bool
+    campaign_id: Optional[int] = None
+    lane: Optional[str] = None
+    rf_off_latency_ms: Optional[float] = None
+
+class CampaignDetail(BaseModel):
+    id: int
+    name: str
+    status: str
+    start_time: Optional[str]
+    end_time: Optional[str]
+    result_summary: Optional[str]
+    scenario_files: List[str]
+    current_run_id: Optional[int] = None
+    lane: Optional[str] = None
+    total_items: Optional[int] = None  # 展开后的测试点总数 (运行中)
+    session_elapsed_s: Optional[float] = None  # 批次开始时连接+复位的耗时 (仅执行一次)
+    runs: List[TestRunInfo]
 
 # --- API Endpoints ---
 
@@ -94,54 +204,132 @@ class TestRunDetail(BaseModel):
 async def health_check():
     return {"status": "ok", "version": "0.1.0"}
 
+# --- Lanes ---
+
+def _lane_configs() -> Dict[str, Dict[str, Any]]:
+    """加载 config.yaml 并按测试台拆分"""
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    lanes = ConfigLoader(os.path.join(base_dir, "config.yaml")).load_lanes()
+    state.set_lane_names(list(lanes))
+    return lanes
+
+
+def _resolve_lane(lane: Optional[str]) -> Tuple[Lane, Dict[str, Any]]:
+    """返回测试台状态及其有效配置；未指定时使用默认测试台"""
+    lanes = _lane_configs()
+    name = lane or state.default_lane
+    if name not in lanes:
+        raise HTTPException(status_code=404, detail=f"Lane not found: {name}")
+    return state.lane(name), lanes[name]
+
+
+@router.get("/lanes", response_model=List[LaneStatus])
+async def list_lanes():
+    """列出所有测试台及其运行状态"""
+    return [LaneStatus(
+        name=name,
+        running=state.lane(name).is_running,
+        run_id=state.lane(name).current_run_id,
+        campaign_id=state.lane(name).current_campaign_id,
+        instruments=list((cfg.get('instruments') or {}).keys()),
+        dut=(cfg.get('dut') or {}).get('device_id'),
+        queued=bool(state.lane(name).lease and not state.lane(name).lease.granted)
+    ) for name, cfg in _lane_configs().items()]
+
+@router.get("/resources", response_model=ResourceStatus)
+async def get_resources():
+    """当前的仪表租约与排队中的请求"""
+    return state.resources.to_dict()
+
+def _leased_instrument(address: str):
+    """返回持有该地址租约的运行，及其会话中对应的 (仪表键, 仪表对象)"""
+    lease = state.resources.holder_of(address)
+    if lease is None or lease.session is None:
+        return lease, None, None
+    for key, inst in getattr(lease.session, 'instruments', {}).items():
+        if getattr(inst, 'resource_name', None) == address:
+            return lease, key, inst
+    return lease, None, None
+
 @router.get("/instruments/status", response_model=List[InstrumentStatus])
-async def get_instruments_status():
+async def get_instruments_status(lane: Optional[str] = None):
     """
     获取所有仪表的连接状态。
-    优先使用当前正在运行的全局 Sequencer 实例，否则创建临时实例检查。
+    已被租出的仪表从持有者的会话读取，不另开连接；空闲的仪表短暂租用后用临时实例检查。
     """
-    config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "config.yaml")
-
-    # 决定使用哪个 sequencer 实例
-    if state.sequencer:
-        sequencer = state.sequencer
-        # 如果正在运行，大概率已经连接好了
-        config = sequencer.config
-    else:
-        loader = ConfigLoader(config_path)
-        config = loader.load()
-        # 临时初始化一个 Sequencer 来检查状态
-        sequencer = TestSequencer(config, simulation_mode=True)
-        sequencer.initialize_instruments()
+    _, lane_config = _resolve_lane(lane)
+    inst_config = lane_config.get('instruments', {})
 
-    results = []
+    served = {key: _leased_instrument(info.get('address')) for key, info in inst_config.items()}
+    idle = {key: info for key, info in inst_config.items() if served[key][0] is None}
 
-    inst_config = config.get('instruments', {})
-    for cfg_key, info in inst_config.items():
-        driver_info = None
-        connected = False
+    probe = None
+    probe_lease = None
+    if idle:
+        probe_lease = state.resources.try_acquire("status", bench_resources({"instruments": idle}))
+    if probe_lease:
+        probe = TestSequencer({"instruments": idle}, simulation_mode=True)
+        await probe.initialize_instruments_async()
 
-        # Sequencer.instruments 的键与 config.yaml 中的键保持一致
-        if cfg_key in sequencer.instruments:
-            inst_obj = sequencer.instruments[cfg_key]
-            # 尝试获取驱动信息
-            if hasattr(inst_obj, "get_driver_info"):
+    try:
+        results = []
+        for cfg_key, info in inst_config.items():
+            lease, session_key, inst_obj = served[cfg_key]
+            session = lease.session if lease else None
+            if probe and cfg_key in idle:
+                session, session_key, inst_obj = probe, cfg_key, probe.instruments.get(cfg_key)
+            init_result = None
+            if session is not None:
+                init_result = next((r for r in getattr(session, 'init_report', []) if r.key == session_key), None)
+
+            driver_info = None
+            connected = False
+            if inst_obj is not None and hasattr(inst_obj, "get_driver_info"):
                 try:
                     driver_info = inst_obj.get_driver_info()
                     connected = True
                 except Exception:
                     pass
 
-        results.append(InstrumentStatus(
-            id=cfg_key,
-            name=info.get('name', cfg_key.upper()),
-            address=info.get('address', 'Unknown'),
-            connected=connected,
-            simulation=True, # 暂时硬编码，未来应从 config 读取
-            driver_info=driver_info
-        ))
-
-    return results
+            results.append(InstrumentStatus(
+                id=cfg_key,
+                name=info.get('name', cfg_key.upper()),
+                address=info.get('address', 'Unknown'),
+                connected=connected,
+                simulation=True, # 暂时硬编码，未来应从 config 读取
+                driver_info=driver_info,
+                init_elapsed_s=init_result.elapsed_s if init_result else None,
+                init_error=init_result.error if init_result else None,
+                lease_holder=lease.holder if lease else None
+            ))
+        return results
+    finally:
+        if probe:
+            await probe.disconnect_all()
+        if probe_lease:
+            state.resources.release(probe_lease)
+
+@router.get("/instruments/sessions", response_model=VisaPoolStatus)
+async def get_visa_sessions():
+    """进程内共享的 VISA 会话池: 打开/复用/淘汰/泄漏计数与当前会话"""
+    session_pool.maintain()
+    return session_pool.stats()
+
+@router.get("/instruments/startup", response_model=InstrumentStartupReport)
+async def get_instruments_startup(lane: Optional[str] = None):
+    """
+    获取当前 Sequencer 最近一次仪表并发初始化的耗时报告。
+    """
+    bench, _ = _resolve_lane(lane)
+    if not bench.sequencer:
+        return InstrumentStartupReport(serial_elapsed_s=0.0, instruments=[])
+
+    report = bench.sequencer.init_report
+    return InstrumentStartupReport(
+        total_elapsed_s=bench.sequencer.init_elapsed_s,
+        serial_elapsed_s=round(sum(r.elapsed_s for r in report), 3),
+        instruments=[InstrumentInitResultModel(**r.to_dict()) for r in report]
+    )
 
 @router.get("/manuals", response_model=CatalogResponse)
 async def get_manuals_catalog():
@@ -232,11 +420,11 @@ async def upload_manual(
 
 # --- Test Control & WebSocket ---
 
-def create_metrics_callback_with_db(run_id: int):
+def create_metrics_callback_with_db(run_id: int, lane: Optional[str] = None):
     """创建一个同时推送 WebSocket 和写入数据库的 metrics 回调"""
     def callback(metrics_data: Dict[str, Any]):
-        # 推送到 WebSocket
-        manager.sync_broadcast_metrics(metrics_data)
+        # 推送到 WebSocket (按测试台区分)
+        manager.sync_broadcast_metrics(metrics_data, lane)
         # 写入数据库
         try:
             MetricsSampleRepository.insert(
@@ -253,8 +441,103 @@ def create_metrics_callback_with_db(run_id: int):
             print(f"[DB] Failed to save metrics: {e}")
     return callback
 
+def create_checkpoint_callback(run_id: int):
+    """创建将测量进度写入 run_checkpoints 的回调"""
+    def callback(checkpoint: Dict[str, Any]):
+        try:
+            CheckpointRepository.save(
+                run_id=run_id,
+                strategy=checkpoint.get('strategy', 'unknown'),
+                point_index=checkpoint.get('point_index', 0),
+                state=json.dumps(checkpoint, ensure_ascii=False)
+            )
+        except Exception as e:
+            print(f"[DB] Failed to save checkpoint: {e}")
+    return callback
+
+
+def _save_latencies(lane: Lane):
+    """累加本次运行实测的仪表命令耗时，供时长预估使用"""
+    if not lane.sequencer:
+        return
+    try:
+        InstrumentLatencyRepository.record(lane.name, lane.sequencer.latency.drain())
+    except Exception as e:
+        print(f"Error saving instrument latencies: {e}")
+
+
+def _mark_scpi_metrics(lane: Lane):
+    """记录运行开始时的 SCPI 统计快照"""
+    lane.scpi_mark = scpi_metrics.mark()
+
+
+def _save_scpi_metrics(lane: Lane, run_id: Optional[int]):
+    """保存本次运行期间该测试台仪表的 SCPI 命令统计"""
+    mark, lane.scpi_mark = lane.scpi_mark, None
+    if run_id is None or mark is None or not lane.sequencer:
+        return
+    try:
+        ScpiMetricsRepository.record(run_id, scpi_metrics.since(mark, bench_resources(lane.sequencer.config)))
+    except Exception as e:
+        print(f"Error saving SCPI metrics: {e}")
+
+
+def _lane_logger(lane: Lane):
+    """按测试台广播日志的回调"""
+    return functools.partial(manager.sync_broadcast, lane=lane.name)
+
+
+@contextlib.asynccontextmanager
+async def _bench_lease(lane: Lane, priority: int = 0):
+    """运行期间持有该测试台全部仪表的租约；仪表被其他测试台占用时排队等待"""
+    lease = state.resources.request(lane.name, bench_resources(lane.sequencer.config), priority,
+                                    session=lane.sequencer)
+    lane.lease = lease
+    try:
+        if not lease.granted:
+            manager.sync_broadcast(f"等待仪表租约 (占用方: {', '.join(state.resources.blockers(lease))})...",
+                                   lane.name)
+            await state.resources.wait(lease)
+            manager.sync_broadcast(f"已获得仪表租约 (等待 {lease.waited_s:.1f}s)", lane.name)
+        yield lease
+    finally:
+        state.resources.release(lease)
+        lane.lease = None
+
+
+def _cancel_queued_lease(lane: Lane):
+    """停止仍在排队等待租约的运行"""
+    if lane.lease and not lane.lease.granted:
+        state.resources.release(lane.lease)
+
+
+async def _run_tracked(lane: Lane, coro) -> Any:
+    """在可跟踪的任务中执行测试/批次，停止时可以直接取消"""
+    lane.task = asyncio.create_task(coro)
+    try:
+        return await lane.task
+    finally:
+        lane.task = None
+
 
-async def run_sequencer_task():
+async def _await_rf_off(lane: Lane, sequencer: TestSequencer) -> Optional[float]:
+    """
+    等待停止后的射频关闭，返回停止到射频关闭的耗时 (ms)。
+    超过 STOP_WAIT_S 仍未完成时直接取消执行任务，收尾协议随之运行。
+    """
+    if lane.task is None or lane.task.done():
+        return None
+    try:
+        await asyncio.wait_for(sequencer.rf_off_event.wait(), STOP_WAIT_S)
+    except asyncio.TimeoutError:
+        if lane.task and not lane.task.done():
+            manager.sync_broadcast(f"停止超时 (>{STOP_WAIT_S}s)，强制取消测试任务", lane.name)
+            lane.task.cancel()
+        return None
+    return (sequencer.shutdown_report or {}).get('stop_to_rf_off_ms')
+
+
+async def run_sequencer_task(lane: Lane, priority: int = 0):
     """
     后台运行 Sequencer 任务的包装器，用于处理完成后的状态重置
     """
@@ -262,24 +545,35 @@ async def run_sequencer_task():
     result_summary = None
 
     try:
-        if state.sequencer:
-            await state.sequencer.run()
+        if lane.sequencer:
+            async with _bench_lease(lane, priority):
+                _mark_scpi_metrics(lane)
+                await _run_tracked(lane, lane.sequencer.run())
             result_summary = "测试正常完成"
+    except (LeaseCancelled, asyncio.CancelledError):
+        final_status = "stopped"
     except Exception as e:
         final_status = "failed"
         result_summary = f"测试异常: {str(e)}"
-        manager.sync_broadcast(f"测试发生错误: {e}")
+        manager.sync_broadcast(f"测试发生错误: {e}", lane.name)
     finally:
         # 更新数据库状态
-        if state.current_run_id:
-            if not state.is_running:
+        if lane.current_run_id:
+            if not lane.is_running:
                 final_status = "stopped"
                 result_summary = "用户手动停止"
-            TestRunRepository.update_status(state.current_run_id, final_status, result_summary)
-            state.current_run_id = None
-
-        state.is_running = False
-        manager.sync_broadcast("测试任务已结束")
+            if lane.sequencer and lane.sequencer.results:
+                TestRunRepository.save_result_data(
+                    lane.current_run_id, json.dumps(lane.sequencer.results, ensure_ascii=False))
+            TestRunRepository.update_status(lane.current_run_id, final_status, result_summary)
+            if final_status == "completed":
+                CheckpointRepository.delete(lane.current_run_id)
+            _save_scpi_metrics(lane, lane.current_run_id)
+            lane.current_run_id = None
+
+        _save_latencies(lane)
+        lane.is_running = False
+        manager.sync_broadcast("测试任务已结束", lane.name)
 
 class ScenarioInfo(BaseModel):
     filename: str
@@ -316,15 +610,80 @@ async def list_scenarios():
 
     return results
 
+class PlanIssueModel(BaseModel):
+    index: Optional[int] = None
+    target: Optional[str] = None
+    action: Optional[str] = None
+    severity: str
+    message: str
+
+class CompiledEventModel(BaseModel):
+    index: int
+    time: float
+    target: str
+    action: str
+    params: Dict[str, Any]
+    comment: str = ""
+
+class CompiledPlanResponse(BaseModel):
+    scenario_id: str
+    name: str
+    test_type: str
+    total_duration: Optional[float] = None
+    source_hash: Optional[str] = None
+    ok: bool
+    events: List[CompiledEventModel]
+    errors: List[PlanIssueModel]
+    warnings: List[PlanIssueModel]
+
+@router.post("/scenarios/{filename}/compile", response_model=CompiledPlanResponse)
+async def compile_scenario(filename: str):
+    """
+    编译场景文件并报告错误 (不连接任何仪表)。
+    校验时间轴事件的目标仪表、动作与参数，结果按文件哈希缓存。
+    """
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    scenario_path = os.path.join(base_dir, "scenarios", os.path.basename(filename))
+    if not os.path.exists(scenario_path):
+        raise HTTPException(status_code=404, detail=f"Scenario not found: {filename}")
+    return scenario_compiler.compile_file(scenario_path).to_dict()
+
+class MatrixAxisModel(BaseModel):
+    name: str
+    values: List[Any]
+    path: Optional[str] = None
+    cost_s: float
+
+class MatrixPreviewResponse(BaseModel):
+    points: int
+    order: str
+    axes: List[MatrixAxisModel]  # 由外到内的嵌套顺序
+    reconfiguration_cost_s: float
+    declared_order_cost_s: float  # 按书写顺序展开时的重配置耗时，用于对比
+    preview: List[Dict[str, Any]]
+
+@router.get("/scenarios/{filename}/matrix", response_model=MatrixPreviewResponse)
+async def preview_matrix(filename: str, preview: int = 10):
+    """预览参数矩阵场景的展开顺序与预计重配置耗时 (不生成全部场景)"""
+    scenario = _load_scenario(filename)
+    if not has_matrix(scenario):
+        raise HTTPException(status_code=400, detail=f"Scenario has no matrix: {filename}")
+    try:
+        matrix = ScenarioMatrix(scenario)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**matrix.to_dict(preview),
+            "declared_order_cost_s": ScenarioMatrix(scenario, "declared").reconfiguration_cost()}
+
 @router.post("/test/start", response_model=TestControlResponse)
-async def start_test(background_tasks: BackgroundTasks, filename: Optional[str] = None):
-    if state.is_running:
-        return {"message": "Test is already running", "running": True, "run_id": state.current_run_id}
+async def start_test(background_tasks: BackgroundTasks, filename: Optional[str] = None,
+                     lane: Optional[str] = None, priority: int = 0):
+    bench, base_config = _resolve_lane(lane)
+    if bench.is_running:
+        return {"message": "Test is already running", "running": True, "run_id": bench.current_run_id,
+                "lane": bench.name}
 
     base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    config_path = os.path.join(base_dir, "config.yaml")
-    loader = ConfigLoader(config_path)
-    base_config = loader.load()
 
     # 如果指定了场景文件，加载它
     target_scenario = None
@@ -337,49 +696,388 @@ async def start_test(background_tasks: BackgroundTasks, filename: Optional[str]
         if os.path.exists(scenario_path):
             with open(scenario_path, 'r', encoding='utf-8') as f:
                 target_scenario = yaml.safe_load(f)
-                meta = target_scenario.get('metadata', {})
-                scenario_id = meta.get('id', filename)
-                scenario_name = meta.get('name', filename)
-                test_type = target_scenario.get('config', {}).get('type', 'unknown')
+            if target_scenario and has_matrix(target_scenario):
+                raise HTTPException(status_code=400,
+                                    detail="Matrix scenarios expand to multiple runs; start them via /campaign/start")
+            meta = target_scenario.get('metadata', {})
+            scenario_id = meta.get('id', filename)
+            scenario_name = meta.get('name', filename)
+            test_type = target_scenario.get('config', {}).get('type', 'unknown')
 
     # 创建数据库记录
     run_id = TestRunRepository.create(
         scenario_id=scenario_id,
         scenario_name=scenario_name,
         test_type=test_type,
-        config_snapshot=json.dumps(target_scenario) if target_scenario else None
+        config_snapshot=json.dumps(target_scenario) if target_scenario else None,
+        lane=bench.name
     )
-    state.current_run_id = run_id
+    bench.current_run_id = run_id
 
-    # 初始化全局 Sequencer，使用带数据库写入的 metrics 回调
-    state.sequencer = TestSequencer(
+    # 初始化该测试台的 Sequencer，使用带数据库写入的 metrics 回调
+    bench.sequencer = TestSequencer(
         base_config,
         simulation_mode=True,
-        log_callback=manager.sync_broadcast,
-        metrics_callback=create_metrics_callback_with_db(run_id)
+        log_callback=_lane_logger(bench),
+        metrics_callback=create_metrics_callback_with_db(run_id, bench.name),
+        checkpoint_callback=create_checkpoint_callback(run_id)
     )
-    state.is_running = True
+    bench.campaign = None
+    bench.is_running = True
 
     # 如果有特定场景，将它传递给 Sequencer
     if target_scenario:
-        state.sequencer.current_scenario = target_scenario
+        bench.sequencer.current_scenario = target_scenario
+
+    background_tasks.add_task(run_sequencer_task, bench, priority)
+
+    return {"message": f"Test started ({filename if filename else 'Default'})", "running": True, "run_id": run_id,
+            "lane": bench.name}
+
+@router.post("/test/{run_id}/resume", response_model=TestControlResponse)
+async def resume_test(run_id: int, background_tasks: BackgroundTasks):
+    """
+    从最近的检查点继续一个 failed / stopped 的运行。
+    复用原 run_id，新的指标追加到原有指标之后；在原测试台上执行。
+    """
+    run = TestRunRepository.get_by_id(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Test run not found")
+    if run['status'] not in ('failed', 'stopped'):
+        raise HTTPException(status_code=400, detail=f"Only failed or stopped runs can be resumed (status: {run['status']})")
+    checkpoint = CheckpointRepository.get(run_id)
+    if not checkpoint:
+        raise HTTPException(status_code=400, detail="No checkpoint recorded for this run")
+
+    bench, base_config = _resolve_lane(run.get('lane'))
+    if bench.is_running:
+        return {"message": "Test is already running", "running": True, "run_id": bench.current_run_id,
+                "lane": bench.name}
 
-    background_tasks.add_task(run_sequencer_task)
+    TestRunRepository.update_status(run_id, "running")
+    bench.current_run_id = run_id
+
+    bench.sequencer = TestSequencer(
+        base_config,
+        simulation_mode=True,
+        log_callback=_lane_logger(bench),
+        metrics_callback=create_metrics_callback_with_db(run_id, bench.name),
+        checkpoint_callback=create_checkpoint_callback(run_id)
+    )
+    bench.sequencer.current_scenario = json.loads(run['config_snapshot']) if run.get('config_snapshot') else None
+    bench.sequencer.resume_state = json.loads(checkpoint['state'])
+    bench.campaign = None
+    bench.is_running = True
 
-    return {"message": f"Test started ({filename if filename else 'Default'})", "running": True, "run_id": run_id}
+    background_tasks.add_task(run_sequencer_task, bench)
+
+    return {"message": f"Test resumed from point {checkpoint['point_index']}", "running": True, "run_id": run_id,
+            "lane": bench.name}
 
 @router.post("/test/stop", response_model=TestControlResponse)
-async def stop_test():
-    if state.sequencer and state.is_running:
-        state.sequencer.stop()
-        state.is_running = False # 标记为停止，虽然 task 可能还在收尾
-        return {"message": "Stop signal sent", "running": False}
-    return {"message": "No test running", "running": False}
+async def stop_test(lane: Optional[str] = None):
+    bench, _ = _resolve_lane(lane)
+    if bench.campaign and bench.is_running and bench.current_campaign_id:
+        # 批次运行中: 停止整个批次
+        bench.campaign.stop()
+        bench.is_running = False
+        _cancel_queued_lease(bench)
+        latency = await _await_rf_off(bench, bench.campaign.sequencer)
+        return {"message": "Stop signal sent", "running": False, "lane": bench.name, "rf_off_latency_ms": latency}
+    if bench.sequencer and bench.is_running:
+        bench.sequencer.stop()
+        bench.is_running = False # 标记为停止，虽然 task 可能还在收尾
+        _cancel_queued_lease(bench)
+        latency = await _await_rf_off(bench, bench.sequencer)
+        return {"message": "Stop signal sent", "running": False, "lane": bench.name, "rf_off_latency_ms": latency}
+    return {"message": "No test running", "running": False, "lane": bench.name}
+
+# --- Campaign ---
+
+def _load_scenario(filename: str) -> Dict[str, Any]:
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    scenario_path = os.path.join(base_dir, "scenarios", os.path.basename(filename))
+    if not os.path.exists(scenario_path):
+        raise HTTPException(status_code=404, detail=f"Scenario not found: {filename}")
+    with open(scenario_path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+def _start_campaign_item(lane: Lane, item: CampaignItem):
+    """批次中的场景开始: 创建独立的 test_runs 记录，并将指标写入该记录"""
+    item.run_id = TestRunRepository.create(
+        scenario_id=item.scenario_id,
+        scenario_name=item.scenario_name,
+        test_type=item.test_type,
+        config_snapshot=json.dumps(item.scenario),
+        campaign_id=lane.current_campaign_id,
+        lane=lane.name
+    )
+    lane.current_run_id = item.run_id
+    _mark_scpi_metrics(lane)
+    if lane.sequencer:
+        lane.sequencer.metrics_callback = create_metrics_callback_with_db(item.run_id, lane.name)
+        lane.sequencer.checkpoint_callback = create_checkpoint_callback(item.run_id)
+    manager.sync_broadcast(f"批次场景开始: {item.filename} (run_id={item.run_id})", lane.name)
+
+
+def _finish_campaign_item(lane: Lane, item: CampaignItem):
+    """批次中的场景结束: 保存结构化结果并更新状态"""
+    if item.run_id is None:
+        return
+    if item.results:
+        TestRunRepository.save_result_data(item.run_id, json.dumps(item.results, ensure_ascii=False))
+    summary = {
+        "completed": "测试正常完成",
+        "stopped": "用户手动停止",
+    }.get(item.status, f"测试异常: {item.error}")
+    TestRunRepository.update_status(item.run_id, item.status, summary)
+    if item.status == "completed":
+        CheckpointRepository.delete(item.run_id)
+    _save_scpi_metrics(lane, item.run_id)
+    lane.current_run_id = None
+
+
+async def run_campaign_task(lane: Lane, priority: int = 0):
+    """后台运行批次任务，结束后更新批次状态"""
+    runner = lane.campaign
+    final_status = "failed"
+    result_summary = None
+    try:
+        if runner:
+            async with _bench_lease(lane, priority):
+                final_status = await _run_tracked(lane, runner.run())
+            result_summary = runner.summary()
+    except asyncio.CancelledError:
+        final_status = "stopped"
+        result_summary = runner.summary() if runner else None
+    except LeaseCancelled:
+        final_status = "stopped"
+        result_summary = "排队期间被停止"
+    except Exception as e:
+        result_summary = f"批次异常: {str(e)}"
+        manager.sync_broadcast(f"批次发生错误: {e}", lane.name)
+    finally:
+        if lane.current_campaign_id:
+            CampaignRepository.update_status(lane.current_campaign_id, final_status, result_summary)
+        lane.current_campaign_id = None
+        lane.current_run_id = None
+        _save_latencies(lane)
+        lane.is_running = False
+        manager.sync_broadcast("批次任务已结束", lane.name)
+
+@router.post("/campaign/start", response_model=CampaignControlResponse)
+async def start_campaign(request: CampaignStartRequest, background_tasks: BackgroundTasks,
+                         lane: Optional[str] = None):
+    """
+    启动测试批次: 按顺序执行多个场景，仪表与 DUT 只连接 (复位) 一次，
+    每个场景记录为独立的 test_runs 行。
+    """
+    bench, base_config = _resolve_lane(lane)
+    if bench.is_running:
+        return {"message": "Test is already running", "running": True,
+                "campaign_id": bench.current_campaign_id, "lane": bench.name}
+    if not request.scenarios:
+        raise HTTPException(status_code=400, detail="Campaign requires at least one scenario")
+
+    scenarios = [(f, _load_scenario(f)) for f in request.scenarios]
+    if any(has_matrix(s) for _, s in scenarios):
+        # 参数矩阵按需展开，不一次性生成全部场景
+        try:
+            total = count_items([s for _, s in scenarios])
+            for _, s in scenarios:
+                if has_matrix(s):
+                    ScenarioMatrix(s, request.matrix_order)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        items = itertools.chain.from_iterable(matrix_items(f, s, request.matrix_order) for f, s in scenarios)
+    else:
+        items = [CampaignItem(filename=f, scenario=s) for f, s in scenarios]
+        total = len(items)
+
+    name = request.name or f"Campaign ({total} scenarios)"
+    campaign_id = CampaignRepository.create(name, json.dumps(request.scenarios))
+    bench.current_campaign_id = campaign_id
+
+    bench.sequencer = TestSequencer(
+        base_config,
+        simulation_mode=True,
+        log_callback=_lane_logger(bench)
+    )
+    bench.campaign = CampaignRunner(
+        bench.sequencer, items,
+        on_item_start=functools.partial(_start_campaign_item, bench),
+        on_item_end=functools.partial(_finish_campaign_item, bench),
+        stop_on_failure=request.stop_on_failure,
+        total=total
+    )
+    bench.is_running = True
+
+    background_tasks.add_task(run_campaign_task, bench, request.priority)
+
+    return {"message": f"Campaign started ({total} scenarios)", "running": True,
+            "campaign_id": campaign_id, "lane": bench.name}
+
+@router.post("/campaign/stop", response_model=CampaignControlResponse)
+async def stop_campaign(lane: Optional[str] = None):
+    """停止当前场景并跳过批次中剩余的场景"""
+    bench, _ = _resolve_lane(lane)
+    if bench.campaign and bench.is_running and bench.current_campaign_id:
+        campaign_id = bench.current_campaign_id
+        bench.campaign.stop()
+        _cancel_queued_lease(bench)
+        latency = await _await_rf_off(bench, bench.campaign.sequencer)
+        return {"message": "Stop signal sent", "running": False, "campaign_id": campaign_id, "lane": bench.name,
+                "rf_off_latency_ms": latency}
+    return {"message": "No campaign running", "running": False, "lane": bench.name}
+
+@router.get("/campaign/{campaign_id}", response_model=CampaignDetail)
+async def get_campaign(campaign_id: int):
+    """获取批次状态及其包含的测试记录"""
+    campaign = CampaignRepository.get_by_id(campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+
+    bench = next((b for b in state.lanes.values() if b.current_campaign_id == campaign_id), None)
+    active = bench.campaign if bench else None
+    runs = TestRunRepository.list_by_campaign(campaign_id)
+    return CampaignDetail(
+        id=campaign['id'],
+        name=campaign['name'],
+        status=campaign['status'],
+        start_time=campaign['start_time'],
+        end_time=campaign['end_time'],
+        result_summary=campaign['result_summary'],
+        scenario_files=json.loads(campaign['scenario_files']) if campaign.get('scenario_files') else [],
+        current_run_id=bench.current_run_id if bench else None,
+        lane=bench.name if bench else None,
+        total_items=active.total if active else None,
+        session_elapsed_s=active.session_elapsed_s if active else None,
+        runs=[TestRunInfo(
+            id=r['id'],
+            scenario_id=r['scenario_id'],
+            scenario_name=r['scenario_name'],
+            test_type=r['test_type'],
+            status=r['status'],
+            start_time=r['start_time'],
+            end_time=r['end_time'],
+            result_summary=r['result_summary'],
+            campaign_id=r.get('campaign_id'),
+            lane=r.get('lane')
+        ) for r in runs]
+    )
+
+# --- Duration Estimation ---
+
+class PhaseEstimateModel(BaseModel):
+    name: str
+    duration_s: float
+    detail: Dict[str, Any] = {}
+
+class ScenarioEstimateResponse(BaseModel):
+    scenario_id: str
+    name: str
+    test_type: str
+    points: int  # 参数矩阵展开后的测试点数
+    total_s: float
+    phases: List[PhaseEstimateModel]
+    filename: Optional[str] = None
+
+class CampaignEstimateResponse(BaseModel):
+    total_s: float
+    session: PhaseEstimateModel  # 批次只建立一次会话
+    items: List[ScenarioEstimateResponse]
+    latency_sources: Dict[str, int]  # 命令耗时来源计数: lane / pooled / default
+
+class InstrumentLatencyInfo(BaseModel):
+    lane: str
+    instrument: str
+    command: str
+    samples: int
+    mean_ms: float
+    min_ms: Optional[float] = None
+    max_ms: Optional[float] = None
+    updated_at: Optional[str] = None
+
+def _estimator(lane: Optional[str]) -> ScenarioEstimator:
+    """按测试台的仪表配置与实测命令耗时创建预估器"""
+    bench, config = _resolve_lane(lane)
+    table = LatencyTable(InstrumentLatencyRepository.list(bench.name), InstrumentLatencyRepository.list())
+    return ScenarioEstimator(table, instruments=(config.get('instruments') or {}).keys())
+
+@router.get("/scenarios/{filename}/estimate", response_model=ScenarioEstimateResponse)
+async def estimate_scenario(filename: str, lane: Optional[str] = None):
+    """
+    预估单次运行该场景的墙钟时间 (含会话建立)，按阶段给出明细。
+    命令耗时来自该测试台历史运行的实测值。
+    """
+    scenario = _load_scenario(filename)
+    estimator = _estimator(lane)
+    try:
+        estimate = estimator.estimate(scenario)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    estimate.phases.insert(0, estimator.estimate_session())
+    return {**estimate.to_dict(), "filename": filename}
+
+@router.post("/campaign/estimate", response_model=CampaignEstimateResponse)
+async def estimate_campaign(request: CampaignStartRequest, lane: Optional[str] = None):
+    """预估批次总时长，用于判断是否能放进测试台的预约时段"""
+    scenarios = [(f, _load_scenario(f)) for f in request.scenarios]
+    try:
+        return _estimator(lane).estimate_campaign(scenarios)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/instruments/latency", response_model=List[InstrumentLatencyInfo])
+async def list_instrument_latency(lane: Optional[str] = None):
+    """历史运行中实测的仪表命令耗时"""
+    return InstrumentLatencyRepository.list(lane)
+
+class ScpiCommandMetrics(BaseModel):
+    instrument: str
+    resource_name: str
+    command: str  # 命令助记符
+    count: int
+    total_ms: float
+    mean_ms: float
+    min_ms: Optional[float] = None
+    max_ms: Optional[float] = None
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    histogram: List[int]  # 各耗时桶的调用次数，桶上界见 bucket_bounds_ms
+    bytes_out: int
+    bytes_in: int
+    errors: int
+    timeouts: int
+
+class InstrumentMetricsResponse(BaseModel):
+    run_id: Optional[int] = None  # 为空时是进程启动以来的累计值
+    bucket_bounds_ms: List[float]
+    commands: List[ScpiCommandMetrics]
+
+@router.get("/metrics/instruments", response_model=InstrumentMetricsResponse)
+async def get_instrument_metrics(instrument: Optional[str] = None, run_id: Optional[int] = None,
+                                 limit: int = 100):
+    """
+    按仪表与命令助记符统计的 SCPI 耗时直方图、字节数、错误与超时，按总耗时降序。
+    指定 run_id 时返回该运行保存的统计，否则返回当前进程的累计值；instrument 可为仪表名称或地址。
+    """
+    if run_id is not None:
+        if not TestRunRepository.get_by_id(run_id):
+            raise HTTPException(status_code=404, detail="Test run not found")
+        rows = ScpiMetricsRepository.get_by_run_id(run_id)
+        if instrument is not None:
+            rows = [r for r in rows if instrument in (r['instrument'], r['resource_name'])]
+    else:
+        rows = scpi_metrics.snapshot(instrument)
+    return {"run_id": run_id, "bucket_bounds_ms": list(BUCKET_BOUNDS_MS), "commands": rows[:max(limit, 0)]}
 
 @router.websocket("/ws/logs")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, lane: Optional[str] = None):
+    """日志与指标流；指定 lane 时只推送该测试台的消息"""
     await websocket.accept()
-    queue = await manager.connect()
+    queue = await manager.connect(lane)
     try:
         while True:
             data = await queue.get()
@@ -401,7 +1099,9 @@ async def list_test_history(limit: int = 50, offset: int = 0):
         status=r['status'],
         start_time=r['start_time'],
         end_time=r['end_time'],
-        result_summary=r['result_summary']
+        result_summary=r['result_summary'],
+        campaign_id=r.get('campaign_id'),
+        lane=r.get('lane')
     ) for r in runs]
 
 @router.get("/history/{run_id}", response_model=TestRunDetail)
@@ -423,7 +1123,9 @@ async def get_test_run_detail(run_id: int):
             status=run['status'],
             start_time=run['start_time'],
             end_time=run['end_time'],
-            result_summary=run['result_summary']
+            result_summary=run['result_summary'],
+            campaign_id=run.get('campaign_id'),
+            lane=run.get('lane')
         ),
         metrics=[MetricsSample(
             elapsed_time=m['elapsed_time'],
@@ -431,7 +1133,8 @@ async def get_test_run_detail(run_id: int):
             bler=m['bler'],
             power_dbm=m['power_dbm']
         ) for m in metrics],
-        statistics=statistics
+        statistics=statistics,
+        results=json.loads(run['result_data']) if run.get('result_data') else {}
     )
 
 @router.delete("/history/{run_id}")
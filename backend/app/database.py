@@ -1,11 +1,14 @@
 """
 数据库管理模块 - SQLite 持久化测试结果
 """
+import json
 import os
 import sqlite3
 from contextlib import contextmanager
 from typing import Any, Dict, List, Optional
 
+from drivers.scpi_metrics import merge_stats
+
 # 数据库文件路径
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test_results.db")
 
@@ -31,6 +34,13 @@ def get_db():
         conn.close()
 
 
+def _ensure_column(cursor: sqlite3.Cursor, table: str, column: str, definition: str):
+    """为已存在的旧表补充新增列 (CREATE TABLE IF NOT EXISTS 不会修改旧表)"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
 def init_database():
     """初始化数据库表结构"""
     with get_db() as conn:
@@ -66,9 +76,80 @@ def init_database():
             )
         """)
 
+        # 测试批次表 (一个批次包含多个按顺序执行的场景)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS campaigns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                status TEXT DEFAULT 'running',
+                scenario_files TEXT,
+                start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                end_time TIMESTAMP,
+                result_summary TEXT
+            )
+        """)
+
+        # 运行检查点表 (每个运行仅保留最近一次进度)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS run_checkpoints (
+                run_id INTEGER PRIMARY KEY,
+                strategy TEXT NOT NULL,
+                point_index INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (run_id) REFERENCES test_runs(id)
+            )
+        """)
+
+        # 仪表命令实测耗时 (按测试台累计)，用于场景时长预估
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS instrument_latency (
+                lane TEXT NOT NULL,
+                instrument TEXT NOT NULL,
+                command TEXT NOT NULL,
+                samples INTEGER NOT NULL DEFAULT 0,
+                total_ms REAL NOT NULL DEFAULT 0,
+                min_ms REAL,
+                max_ms REAL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (lane, instrument, command)
+            )
+        """)
+
+        # 每次运行的 SCPI 命令统计 (按仪表地址与命令助记符)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scpi_command_metrics (
+                run_id INTEGER NOT NULL,
+                resource_name TEXT NOT NULL,
+                command TEXT NOT NULL,
+                instrument TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                total_ms REAL NOT NULL DEFAULT 0,
+                min_ms REAL,
+                max_ms REAL,
+                p50_ms REAL,
+                p95_ms REAL,
+                histogram TEXT,
+                bytes_out INTEGER NOT NULL DEFAULT 0,
+                bytes_in INTEGER NOT NULL DEFAULT 0,
+                errors INTEGER NOT NULL DEFAULT 0,
+                timeouts INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (run_id, resource_name, command),
+                FOREIGN KEY (run_id) REFERENCES test_runs(id)
+            )
+        """)
+
+        # 结构化结果 (JSON)，如灵敏度搜索的全部测量点
+        _ensure_column(cursor, "test_runs", "result_data", "TEXT")
+        # 所属批次 (单独运行的测试为 NULL)
+        _ensure_column(cursor, "test_runs", "campaign_id", "INTEGER REFERENCES campaigns(id)")
+        # 执行该测试的测试台 (lane)
+        _ensure_column(cursor, "test_runs", "lane", "TEXT")
+
         # 创建索引以加速查询
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_metrics_run_id ON metrics_samples(run_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_test_runs_start_time ON test_runs(start_time)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_test_runs_campaign_id ON test_runs(campaign_id)")
 
 
 class TestRunRepository:
@@ -76,14 +157,16 @@ class TestRunRepository:
 
     @staticmethod
     def create(scenario_id: str, scenario_name: str, test_type: str,
-               config_snapshot: Optional[str] = None) -> int:
+               config_snapshot: Optional[str] = None,
+               campaign_id: Optional[int] = None,
+               lane: Optional[str] = None) -> int:
         """创建新的测试运行记录，返回 run_id"""
         with get_db() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                INSERT INTO test_runs (scenario_id, scenario_name, test_type, config_snapshot)
-                VALUES (?, ?, ?, ?)
-            """, (scenario_id, scenario_name, test_type, config_snapshot))
+                INSERT INTO test_runs (scenario_id, scenario_name, test_type, config_snapshot, campaign_id, lane)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (scenario_id, scenario_name, test_type, config_snapshot, campaign_id, lane))
             return cursor.lastrowid
 
     @staticmethod
@@ -102,6 +185,27 @@ class TestRunRepository:
                     UPDATE test_runs SET status = ? WHERE id = ?
                 """, (status, run_id))
 
+    @staticmethod
+    def mark_interrupted(result_summary: str = "服务重启，运行中断") -> int:
+        """将遗留的 running 记录标记为 failed (进程退出时未能更新状态)，返回受影响的行数"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE test_runs
+                SET status = 'failed', end_time = CURRENT_TIMESTAMP, result_summary = ?
+                WHERE status = 'running'
+            """, (result_summary,))
+            return cursor.rowcount
+
+    @staticmethod
+    def save_result_data(run_id: int, result_data: Optional[str]):
+        """保存结构化结果 (JSON 字符串)"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE test_runs SET result_data = ? WHERE id = ?
+            """, (result_data, run_id))
+
     @staticmethod
     def get_by_id(run_id: int) -> Optional[Dict[str, Any]]:
         """根据 ID 获取测试记录"""
@@ -123,15 +227,182 @@ class TestRunRepository:
             """, (limit, offset))
             return [dict(row) for row in cursor.fetchall()]
 
+    @staticmethod
+    def list_by_campaign(campaign_id: int) -> List[Dict[str, Any]]:
+        """获取批次内的测试记录 (按执行顺序)"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT * FROM test_runs WHERE campaign_id = ? ORDER BY id ASC
+            """, (campaign_id,))
+            return [dict(row) for row in cursor.fetchall()]
+
     @staticmethod
     def delete(run_id: int):
         """删除测试记录及其关联的指标数据"""
         with get_db() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM metrics_samples WHERE run_id = ?", (run_id,))
+            cursor.execute("DELETE FROM run_checkpoints WHERE run_id = ?", (run_id,))
+            cursor.execute("DELETE FROM scpi_command_metrics WHERE run_id = ?", (run_id,))
             cursor.execute("DELETE FROM test_runs WHERE id = ?", (run_id,))
 
 
+class CampaignRepository:
+    """测试批次仓库"""
+
+    @staticmethod
+    def create(name: str, scenario_files: Optional[str] = None) -> int:
+        """创建新的批次记录，返回 campaign_id"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO campaigns (name, scenario_files) VALUES (?, ?)
+            """, (name, scenario_files))
+            return cursor.lastrowid
+
+    @staticmethod
+    def update_status(campaign_id: int, status: str, result_summary: Optional[str] = None):
+        """更新批次状态"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            if status in ('completed', 'failed', 'stopped'):
+                cursor.execute("""
+                    UPDATE campaigns
+                    SET status = ?, end_time = CURRENT_TIMESTAMP, result_summary = ?
+                    WHERE id = ?
+                """, (status, result_summary, campaign_id))
+            else:
+                cursor.execute("""
+                    UPDATE campaigns SET status = ? WHERE id = ?
+                """, (status, campaign_id))
+
+    @staticmethod
+    def get_by_id(campaign_id: int) -> Optional[Dict[str, Any]]:
+        """根据 ID 获取批次记录"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM campaigns WHERE id = ?", (campaign_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+
+class CheckpointRepository:
+    """运行检查点仓库"""
+
+    @staticmethod
+    def save(run_id: int, strategy: str, point_index: int, state: str):
+        """保存 (覆盖) 运行的最新检查点，state 为 JSON 字符串"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT OR REPLACE INTO run_checkpoints (run_id, strategy, point_index, state, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """, (run_id, strategy, point_index, state))
+
+    @staticmethod
+    def get(run_id: int) -> Optional[Dict[str, Any]]:
+        """获取运行的最新检查点"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM run_checkpoints WHERE run_id = ?", (run_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    @staticmethod
+    def delete(run_id: int):
+        """删除运行的检查点"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM run_checkpoints WHERE run_id = ?", (run_id,))
+
+
+class InstrumentLatencyRepository:
+    """仪表命令耗时仓库"""
+
+    @staticmethod
+    def record(lane: str, stats: List[Dict[str, Any]]):
+        """累加一次运行的命令耗时统计 (LatencyRecorder.drain() 的结果)"""
+        if not stats:
+            return
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                INSERT INTO instrument_latency (lane, instrument, command, samples, total_ms, min_ms, max_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (lane, instrument, command) DO UPDATE SET
+                    samples = samples + excluded.samples,
+                    total_ms = total_ms + excluded.total_ms,
+                    min_ms = MIN(min_ms, excluded.min_ms),
+                    max_ms = MAX(max_ms, excluded.max_ms),
+                    updated_at = CURRENT_TIMESTAMP
+            """, [
+                (lane, s['instrument'], s['command'], s['samples'], s['total_ms'], s['min_ms'], s['max_ms'])
+                for s in stats
+            ])
+
+    @staticmethod
+    def list(lane: Optional[str] = None) -> List[Dict[str, Any]]:
+        """获取命令耗时统计 (含平均值 mean_ms)；lane 为空时返回所有测试台"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            query = "SELECT *, total_ms / samples AS mean_ms FROM instrument_latency WHERE samples > 0"
+            if lane is not None:
+                cursor.execute(query + " AND lane = ? ORDER BY instrument, command", (lane,))
+            else:
+                cursor.execute(query + " ORDER BY lane, instrument, command")
+            return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def delete(lane: str):
+        """清除测试台的耗时统计 (如更换仪表后)"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM instrument_latency WHERE lane = ?", (lane,))
+
+
+class ScpiMetricsRepository:
+    """每次运行的 SCPI 命令统计仓库"""
+
+    @staticmethod
+    def record(run_id: int, rows: List[Dict[str, Any]]):
+        """保存一次运行的命令统计 (ScpiMetrics.since() 的结果)；同一运行续跑时与已有统计合并"""
+        if not rows:
+            return
+        with get_db() as conn:
+            cursor = conn.cursor()
+            for r in rows:
+                cursor.execute("""
+                    SELECT * FROM scpi_command_metrics WHERE run_id = ? AND resource_name = ? AND command = ?
+                """, (run_id, r['resource_name'], r['command']))
+                old = cursor.fetchone()
+                if old is not None:
+                    r = merge_stats(dict(old, histogram=json.loads(old['histogram'] or "[]")), r)
+                cursor.execute("""
+                    INSERT OR REPLACE INTO scpi_command_metrics
+                    (run_id, resource_name, command, instrument, count, total_ms, min_ms, max_ms, p50_ms, p95_ms,
+                     histogram, bytes_out, bytes_in, errors, timeouts)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (run_id, r['resource_name'], r['command'], r['instrument'], r['count'], r['total_ms'],
+                      r['min_ms'], r['max_ms'], r['p50_ms'], r['p95_ms'], json.dumps(r['histogram']),
+                      r['bytes_out'], r['bytes_in'], r['errors'], r['timeouts']))
+
+    @staticmethod
+    def get_by_run_id(run_id: int) -> List[Dict[str, Any]]:
+        """获取运行的命令统计 (含平均值 mean_ms)，按总耗时降序"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT *, total_ms / count AS mean_ms FROM scpi_command_metrics
+                WHERE run_id = ? AND count > 0
+                ORDER BY total_ms DESC
+            """, (run_id,))
+            rows = [dict(row) for row in cursor.fetchall()]
+        for row in rows:
+            row['histogram'] = json.loads(row['histogram']) if row['histogram'] else []
+        return rows
+
+
 class MetricsSampleRepository:
     """指标采样数据仓库"""
 
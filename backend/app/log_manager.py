@@ -1,6 +1,6 @@
 import asyncio
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 
 class LogManager:
@@ -8,50 +8,58 @@ class LogManager:
     管理 WebSocket 日志和实时指标广播。
     消息格式:
     - 日志: 纯字符串
-    - 指标: JSON 字符串 {"type": "metrics", "timestamp": ..., "data": {...}}
+    - 指标: JSON 字符串 {"type": "metrics", "lane": ..., "timestamp": ..., "data": {...}}
+    订阅时可指定测试台 (lane)，只接收该测试台的消息；不指定则接收所有测试台的消息。
     """
     def __init__(self):
         self.active_connections: List[asyncio.Queue] = []
+        self._subscriptions: Dict[int, Optional[str]] = {}  # id(queue) -> lane
 
-    async def connect(self) -> asyncio.Queue:
+    async def connect(self, lane: Optional[str] = None) -> asyncio.Queue:
         queue = asyncio.Queue()
         self.active_connections.append(queue)
+        self._subscriptions[id(queue)] = lane
         return queue
 
     def disconnect(self, queue: asyncio.Queue):
         if queue in self.active_connections:
             self.active_connections.remove(queue)
+        self._subscriptions.pop(id(queue), None)
 
-    async def broadcast(self, message: str):
-        for queue in self.active_connections:
-            await queue.put(message)
+    async def broadcast(self, message: str, lane: Optional[str] = None):
+        for queue in list(self.active_connections):
+            subscribed = self._subscriptions.get(id(queue))
+            if subscribed is None or lane is None or subscribed == lane:
+                await queue.put(message)
 
-    def sync_broadcast(self, message: str):
+    def sync_broadcast(self, message: str, lane: Optional[str] = None):
         """
         供同步代码调用的广播方法 (fire-and-forget)。
         """
         try:
             loop = asyncio.get_running_loop()
-            loop.create_task(self.broadcast(message))
+            loop.create_task(self.broadcast(message, lane))
         except RuntimeError as e:
             print(f"[DEBUG] LogManager Failed: No running loop. {e}")
         except Exception as e:
             print(f"[DEBUG] LogManager Failed: {e}")
 
-    def sync_broadcast_metrics(self, metrics_data: Dict[str, Any]):
+    def sync_broadcast_metrics(self, metrics_data: Dict[str, Any], lane: Optional[str] = None):
         """
         广播实时指标数据（JSON 格式），供 Sequencer 采样循环调用。
 
         Args:
             metrics_data: 包含 throughput_mbps, bler 等字段的字典
+            lane: 产生该指标的测试台
         """
         import time
         message = json.dumps({
             "type": "metrics",
+            "lane": lane,
             "timestamp": time.time(),
             "data": metrics_data
         }, ensure_ascii=False)
-        self.sync_broadcast(message)
+        self.sync_broadcast(message, lane)
 
 manager = LogManager()
 
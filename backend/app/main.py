@@ -3,6 +3,8 @@ import os
 import sys
 
 from app.api import channel_models, endpoints
+from app.database import TestRunRepository
+from drivers.visa_pool import session_pool
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -36,6 +38,22 @@ app.mount("/manuals_static", StaticFiles(directory=manual_lib_path), name="manua
 app.include_router(endpoints.router, prefix="/api/v1")
 app.include_router(channel_models.router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def recover_interrupted_runs():
+    # 上次进程退出时仍在运行的测试标记为 failed，以便通过 /test/{run_id}/resume 从检查点继续
+    count = TestRunRepository.mark_interrupted()
+    if count:
+        logging.getLogger("App").warning(f"{count} 个中断的测试运行已标记为 failed，可从检查点恢复")
+
+@app.on_event("startup")
+async def start_visa_pool_maintenance():
+    # 闲置会话在没有新的连接/断开时也按 idle_timeout_s 关闭
+    session_pool.start_maintenance()
+
+@app.on_event("shutdown")
+async def stop_visa_pool_maintenance():
+    session_pool.stop_maintenance()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Channel Verification System API"}
@@ -1,15 +1,91 @@
-from typing import Optional
+import asyncio
+from typing import Dict, List, Optional
 
+from core.campaign import CampaignRunner
+from core.config_loader import DEFAULT_LANE
+from core.resources import BenchResourceManager, Lease
 from core.sequencer import TestSequencer
 
 
+class Lane:
+    """
+    单个测试台 (一组仪表 + DUT) 的运行状态。
+    各测试台拥有独立的 Sequencer，在同一个事件循环上并发运行。
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.sequencer: Optional[TestSequencer] = None
+        self.is_running: bool = False
+        self.current_run_id: Optional[int] = None  # 当前测试运行的数据库 ID
+        self.campaign: Optional[CampaignRunner] = None  # 正在执行的测试批次
+        self.current_campaign_id: Optional[int] = None
+        self.lease: Optional[Lease] = None  # 当前运行的仪表租约 (排队中或已授予)
+        self.task: Optional[asyncio.Task] = None  # 正在执行的测试/批次任务
+        self.scpi_mark: Optional[Dict] = None  # 当前运行开始时的 SCPI 统计快照 (scpi_metrics.mark())
+
+
 class AppState:
     """
     简单的全局状态管理。
+    按测试台 (lane) 保存运行状态；sequencer / is_running 等属性指向默认测试台，保持旧接口可用。
     """
-    sequencer: Optional[TestSequencer] = None
-    is_running: bool = False
-    current_run_id: Optional[int] = None  # 当前测试运行的数据库 ID
+    def __init__(self):
+        self.lanes: Dict[str, Lane] = {}
+        self.default_lane: str = DEFAULT_LANE
+        self.resources = BenchResourceManager()  # 仪表按地址租给各测试台的运行
+
+    def set_lane_names(self, names: List[str]):
+        """登记配置中的测试台，第一个作为默认测试台"""
+        if names:
+            self.default_lane = names[0]
+        for name in names:
+            self.lane(name)
+
+    def lane(self, name: Optional[str] = None) -> Lane:
+        name = name or self.default_lane
+        if name not in self.lanes:
+            self.lanes[name] = Lane(name)
+        return self.lanes[name]
+
+    @property
+    def sequencer(self) -> Optional[TestSequencer]:
+        return self.lane().sequencer
+
+    @sequencer.setter
+    def sequencer(self, value: Optional[TestSequencer]):
+        self.lane().sequencer = value
+
+    @property
+    def is_running(self) -> bool:
+        return self.lane().is_running
+
+    @is_running.setter
+    def is_running(self, value: bool):
+        self.lane().is_running = value
+
+    @property
+    def current_run_id(self) -> Optional[int]:
+        return self.lane().current_run_id
+
+    @current_run_id.setter
+    def current_run_id(self, value: Optional[int]):
+        self.lane().current_run_id = value
+
+    @property
+    def campaign(self) -> Optional[CampaignRunner]:
+        return self.lane().campaign
+
+    @campaign.setter
+    def campaign(self, value: Optional[CampaignRunner]):
+        self.lane().campaign = value
+
+    @property
+    def current_campaign_id(self) -> Optional[int]:
+        return self.lane().current_campaign_id
+
+    @current_campaign_id.setter
+    def current_campaign_id(self, value: Optional[int]):
+        self.lane().current_campaign_id = value
 
 # 全局实例
 state = AppState()
@@ -0,0 +1,106 @@
+"""
+频谱仪 Trace 传输性能对比: ASCII (FORM ASC) vs 二进制块 (FORM REAL,32)
+
+默认使用回环资源 (不连接仪表)，对比两种格式的传输字节数与驱动侧解析耗时；
+指定 --address 时连接真实的 FSW，对比端到端的读取耗时。
+
+用法:
+    python benchmark_trace.py --points 100001 --repeat 20
+    python benchmark_trace.py --address TCPIP0::192.168.1.20::hislip0::INSTR
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from drivers.rohde_schwarz.fsw import FSW_Driver
+from drivers.spectrum_analyzer import SpectrumAnalyzer
+
+
+class LoopbackTrace:
+    """回环资源: query 返回 ASCII Trace，read_bytes 返回同一 Trace 的二进制块，统计读取的字节数"""
+
+    def __init__(self, points: int):
+        trace = (-90.0 + 20.0 * np.random.default_rng(0).random(points)).astype("<f4")
+        self.ascii = ",".join(f"{v:.6E}" for v in trace)
+        payload = trace.tobytes()
+        length = str(len(payload)).encode()
+        self.block = b"#" + str(len(length)).encode() + length + payload + b"\n"
+        self.offset = 0
+        self.bytes_read = 0
+
+    def write(self, command):
+        self.offset = 0
+
+    def query(self, command):
+        self.bytes_read += len(self.ascii) + 1
+        return self.ascii
+
+    def read_bytes(self, count):
+        data = self.block[self.offset:self.offset + count]
+        self.offset += count
+        self.bytes_read += len(data)
+        return data
+
+
+def _time(func, repeat: int):
+    samples = []
+    points = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        points = len(func())
+        samples.append(time.perf_counter() - start)
+    return points, min(samples), sum(samples) / len(samples)
+
+
+def run(driver, repeat: int, loopback=None):
+    print(f"{'格式':<8}{'点数':>10}{'字节/次':>14}{'最快 ms':>12}{'平均 ms':>12}{'百万点/秒':>12}")
+    results = {}
+    for label, func in (("ASCII", driver.get_trace_data_ascii), ("REAL,32", driver.get_trace_data)):
+        func()  # 预热 (同时下发数据格式)
+        if loopback:
+            loopback.bytes_read = 0
+        points, best, mean = _time(func, repeat)
+        per_read = loopback.bytes_read // repeat if loopback else 0
+        rate = points / best / 1e6 if best > 0 else 0.0
+        results[label] = best
+        print(f"{label:<8}{points:>10}{per_read or '-':>14}{best * 1000:>12.2f}{mean * 1000:>12.2f}{rate:>12.2f}")
+    if results.get("REAL,32"):
+        print(f"二进制块相对 ASCII 加速: {results['ASCII'] / results['REAL,32']:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trace 传输性能对比")
+    parser.add_argument("--points", type=int, default=100001, help="回环模式的 Trace 点数")
+    parser.add_argument("--repeat", type=int, default=20, help="每种格式的读取次数")
+    parser.add_argument("--address", help="真实频谱仪的 VISA 地址 (不指定时使用回环资源)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.address:
+        sa = SpectrumAnalyzer(args.address)
+        sa.connect()
+        driver = sa._driver
+        if not hasattr(driver, "get_trace_data_ascii"):
+            sys.exit(f"驱动 {type(driver).__name__} 不支持 Trace 读取对比")
+        try:
+            run(driver, args.repeat)
+        finally:
+            sa.disconnect()
+        return
+
+    driver = FSW_Driver("LOOPBACK::INSTR")
+    driver.logger.setLevel(logging.WARNING)
+    loopback = LoopbackTrace(args.points)
+    driver.instrument = loopback
+    driver._connected = True
+    run(driver, args.repeat, loopback)
+
+
+if __name__ == "__main__":
+    main()
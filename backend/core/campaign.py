@@ -0,0 +1,163 @@
+"""
+测试批次 (Campaign) - 在同一仪表会话上依次执行多个场景
+"""
+import collections
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Union
+
+from core.sequencer import TestSequencer
+
+
+@dataclass
+class CampaignItem:
+    """批次中的单个场景"""
+    filename: str
+    scenario: Dict[str, Any]
+    status: str = "pending"  # pending / running / completed / failed / stopped / skipped
+    run_id: Optional[int] = None
+    error: Optional[str] = None
+    elapsed_s: Optional[float] = None
+    results: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def scenario_id(self) -> str:
+        return self.scenario.get('metadata', {}).get('id', self.filename)
+
+    @property
+    def scenario_name(self) -> str:
+        return self.scenario.get('metadata', {}).get('name', self.filename)
+
+    @property
+    def test_type(self) -> str:
+        return self.scenario.get('config', {}).get('type', 'unknown')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "filename": self.filename,
+            "scenario_id": self.scenario_id,
+            "scenario_name": self.scenario_name,
+            "test_type": self.test_type,
+            "status": self.status,
+            "run_id": self.run_id,
+            "error": self.error,
+            "elapsed_s": self.elapsed_s,
+        }
+
+
+class CampaignRunner:
+    """
+    批次执行引擎。
+
+    仪表与 DUT 只在批次开始时连接一次 (仅此一次 *RST)，各场景之间保持会话，
+    全部场景结束 (或停止) 后统一断开。每个场景开始/结束时调用 on_item_start / on_item_end，
+    由上层为其创建并更新独立的 test_runs 记录。
+
+    items 也可以是迭代器 (如参数矩阵的惰性展开)，此时按需逐个取出场景，
+    只保留最近 history 个条目，total 为预计的条目总数。
+    """
+    def __init__(self, sequencer: TestSequencer, items: Iterable[CampaignItem],
+                 on_item_start: Optional[Callable[[CampaignItem], None]] = None,
+                 on_item_end: Optional[Callable[[CampaignItem], None]] = None,
+                 stop_on_failure: bool = False,
+                 total: Optional[int] = None,
+                 history: int = 100):
+        self.sequencer = sequencer
+        self.streaming = not isinstance(items, (list, tuple))
+        self._source = items
+        self.items: Union[List[CampaignItem], Deque[CampaignItem]] = (
+            collections.deque(maxlen=history) if self.streaming else list(items)
+        )
+        self.total = total if self.streaming else len(self.items)
+        self.on_item_start = on_item_start
+        self.on_item_end = on_item_end
+        self.stop_on_failure = stop_on_failure
+        self.logger = logging.getLogger("Campaign")
+        self.status = "pending"
+        self.session_elapsed_s: Optional[float] = None  # 建立会话 (连接+复位) 的耗时
+        self.counts: Dict[str, int] = {}
+        self._stopped = False
+
+    @property
+    def current(self) -> Optional[CampaignItem]:
+        return next((item for item in self.items if item.status == "running"), None)
+
+    def stop(self):
+        """停止当前场景，并跳过剩余场景"""
+        self._stopped = True
+        self.sequencer.stop()
+
+    def _notify(self, hook: Optional[Callable[[CampaignItem], None]], item: CampaignItem):
+        if hook:
+            try:
+                hook(item)
+            except Exception as e:
+                self.logger.error(f"批次回调执行失败: {e}")
+
+    async def run(self) -> str:
+        """依次执行全部场景，返回批次最终状态 (completed / failed / stopped)"""
+        self.status = "running"
+        started = time.perf_counter()
+        started_items = 0
+        try:
+            # 连接期间被停止或取消时同样执行收尾
+            await self.sequencer.open_session()
+            self.session_elapsed_s = round(time.perf_counter() - started, 3)
+
+            for item in (self._source if self.streaming else self.items):
+                if self._stopped:
+                    if self.streaming:
+                        break
+                    item.status = "skipped"
+                    self._count(item.status)
+                    continue
+
+                if self.streaming:
+                    self.items.append(item)
+                started_items += 1
+                item.status = "running"
+                self._notify(self.on_item_start, item)
+                t0 = time.perf_counter()
+                try:
+                    await self.sequencer.execute_scenario(item.scenario)
+                    item.status = "stopped" if self._stopped else "completed"
+                except Exception as e:
+                    item.status = "failed"
+                    item.error = str(e)
+                    self.logger.error(f"场景 {item.filename} 执行失败: {e}")
+                item.elapsed_s = round(time.perf_counter() - t0, 3)
+                item.results = dict(self.sequencer.results)
+                self._count(item.status)
+                self._notify(self.on_item_end, item)
+
+                if item.status == "failed" and self.stop_on_failure:
+                    self._stopped = True
+        finally:
+            await self.sequencer.shutdown()
+
+        if self.streaming and self._stopped and self.total is not None and self.total > started_items:
+            self._count("skipped", self.total - started_items)
+        if self._stopped and (self.counts.get("stopped") or self.counts.get("skipped")):
+            self.status = "stopped"
+        elif self.counts.get("failed"):
+            self.status = "failed"
+        else:
+            self.status = "completed"
+        return self.status
+
+    def _count(self, status: str, n: int = 1):
+        self.counts[status] = self.counts.get(status, 0) + n
+
+    def summary(self) -> str:
+        return ", ".join(f"{k}: {v}" for k, v in self.counts.items())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "session_elapsed_s": self.session_elapsed_s,
+            "total": self.total,
+            "counts": dict(self.counts),
+            "shutdown": self.sequencer.shutdown_report,
+            "items": [item.to_dict() for item in self.items],
+        }
@@ -4,6 +4,27 @@ from typing import Any, Dict
 
 import yaml
 
+DEFAULT_LANE = "default"
+
+
+def resolve_lanes(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    将配置拆分为各测试台 (lane) 的有效配置。
+
+    未定义 lanes 时只有一个名为 default 的测试台，使用整个配置；
+    定义了 lanes 时，每个 lane 以顶层配置为基础，覆盖其自身的 instruments / dut 等键:
+
+        lanes:
+          rack_a:
+            instruments: {...}
+            dut: {device_id: "R5CT..."}
+    """
+    lanes = config.get('lanes') or {}
+    base = {k: v for k, v in config.items() if k != 'lanes'}
+    if not lanes:
+        return {DEFAULT_LANE: base}
+    return {str(name): {**base, **(lane_cfg or {})} for name, lane_cfg in lanes.items()}
+
 
 class ConfigLoader:
     """
@@ -30,3 +51,7 @@ class ConfigLoader:
         except Exception as e:
             self.logger.error(f"加载配置失败: {e}")
             raise
+
+    def load_lanes(self) -> Dict[str, Dict[str, Any]]:
+        """加载配置并按测试台拆分，返回 {lane 名: 有效配置}"""
+        return resolve_lanes(self.load())
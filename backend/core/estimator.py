@@ -0,0 +1,259 @@
+"""
+场景时长预估 - 按历史实测的仪表命令耗时推算场景/批次的墙钟时间
+
+预估方式与 Sequencer 的执行逻辑一一对应:
+    dynamic_scenario: 按编译后的时间轴推进，事件耗时超过下一触发时刻时顺延
+    sensitivity:      以假定门限 (expected_dbm，缺省为搜索区间中点) 干跑搜索，得到测量点数
+    blocking:         对每个频偏干跑扫描 (含热启动)，得到各频偏的测量点数
+命令耗时优先使用该测试台的实测平均值，其次是所有测试台的平均值，最后是默认值。
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.matrix import ScenarioMatrix, has_matrix
+from core.plan import ScenarioCompiler
+from core.search import (
+    SensitivitySearch,
+    create_blocking_sweep,
+    create_sensitivity_search,
+    sensitivity_search_config,
+)
+from core.sequencer import MAIN_LINK_SETUP_S, PROBE_SETTLE_S
+from core.settling import create_settling_detector
+
+# 没有实测数据时的命令耗时 (秒)
+DEFAULT_LATENCY_S = 0.05
+DEFAULT_COMMAND_LATENCY_S = {
+    "connect": 3.0,
+    "load_channel_model": 5.0,
+    "load_waveform": 2.0,
+    "settle": PROBE_SETTLE_S,  # 读数稳定等待 (含期间的读数)
+}
+
+
+class LatencyTable:
+    """(仪表, 命令) -> 平均耗时 (秒)，记录每次查询使用的数据来源"""
+    def __init__(self, lane_rows: Iterable[Dict[str, Any]] = (), all_rows: Iterable[Dict[str, Any]] = ()):
+        self._lane = {(r['instrument'], r['command']): r['mean_ms'] / 1000.0 for r in lane_rows}
+        pooled: Dict[Tuple[str, str], List[float]] = {}
+        for r in all_rows:
+            stat = pooled.setdefault((r['instrument'], r['command']), [0, 0.0])
+            stat[0] += r['samples']
+            stat[1] += r['total_ms']
+        self._pooled = {k: total / n / 1000.0 for k, (n, total) in pooled.items() if n}
+        self.sources: Dict[str, int] = {"lane": 0, "pooled": 0, "default": 0}
+
+    def get(self, instrument: str, command: str) -> float:
+        key = (instrument, command)
+        if key in self._lane:
+            self.sources["lane"] += 1
+            return self._lane[key]
+        if key in self._pooled:
+            self.sources["pooled"] += 1
+            return self._pooled[key]
+        self.sources["default"] += 1
+        return DEFAULT_COMMAND_LATENCY_S.get(command, DEFAULT_LATENCY_S)
+
+
+@dataclass
+class PhaseEstimate:
+    """单个阶段的预估"""
+    name: str
+    duration_s: float
+    detail: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "duration_s": round(self.duration_s, 3), "detail": self.detail}
+
+
+@dataclass
+class ScenarioEstimate:
+    """场景预估结果"""
+    scenario_id: str
+    name: str
+    test_type: str
+    phases: List[PhaseEstimate]
+    points: int = 1  # 参数矩阵展开后的测试点数
+
+    @property
+    def total_s(self) -> float:
+        return sum(p.duration_s for p in self.phases)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "scenario_id": self.scenario_id,
+            "name": self.name,
+            "test_type": self.test_type,
+            "points": self.points,
+            "total_s": round(self.total_s, 3),
+            "phases": [p.to_dict() for p in self.phases],
+        }
+
+
+def _dry_run(search: SensitivitySearch, threshold: float, pass_above: bool) -> int:
+    """以确定的门限驱动搜索直至结束，返回测量点数"""
+    probes = 0
+    while True:
+        power = search.next_power()
+        if power is None:
+            return probes
+        passed = power >= threshold if pass_above else power <= threshold
+        search.report(power, 0.0 if passed else 1.0)
+        probes += 1
+
+
+class ScenarioEstimator:
+    """
+    场景时长预估器。
+
+    instruments 为该测试台配置的仪表键；Sequencer 跳过未配置仪表的命令，预估同样跳过。
+    为空时假定全部仪表均已配置。
+    """
+    def __init__(self, latencies: Optional[LatencyTable] = None, instruments: Optional[Iterable[str]] = None,
+                 compiler: Optional[ScenarioCompiler] = None):
+        self.latencies = latencies or LatencyTable()
+        self.instruments = set(instruments) if instruments is not None else None
+        self.compiler = compiler or ScenarioCompiler()
+
+    def _has(self, key: str) -> bool:
+        return self.instruments is None or key in self.instruments
+
+    def _cost(self, instrument: str, command: str, times: int = 1) -> float:
+        if not self._has(instrument):
+            return 0.0
+        return self.latencies.get(instrument, command) * times
+
+    # --- 会话 ---
+
+    def estimate_session(self) -> PhaseEstimate:
+        """连接阶段: 各仪表并发连接，耗时取决于最慢的一台"""
+        keys = sorted(self.instruments) if self.instruments is not None else []
+        per_instrument = {key: round(self._cost(key, "connect"), 3) for key in keys}
+        return PhaseEstimate("session", max(per_instrument.values(), default=0.0), {"connect_s": per_instrument})
+
+    # --- 场景 ---
+
+    def estimate(self, scenario: Dict[str, Any]) -> ScenarioEstimate:
+        """预估单个场景；参数矩阵场景按全部测试点累加，各阶段合并"""
+        if has_matrix(scenario):
+            return self._estimate_matrix(scenario)
+        meta = scenario.get('metadata', {}) or {}
+        cfg = scenario.get('config', {}) or {}
+        test_type = cfg.get('type', 'unknown')
+        if test_type == 'dynamic_scenario':
+            phases = self._estimate_timeline(scenario)
+        elif test_type == 'sensitivity':
+            phases = self._estimate_sensitivity(cfg)
+        elif test_type == 'blocking':
+            phases = self._estimate_blocking(cfg)
+        else:
+            raise ValueError(f"未知的测试类型: {test_type}")
+        return ScenarioEstimate(meta.get('id', 'unknown'), meta.get('name', cfg.get('name', '未命名场景')),
+                                test_type, phases)
+
+    def _estimate_matrix(self, scenario: Dict[str, Any]) -> ScenarioEstimate:
+        matrix = ScenarioMatrix(scenario)
+        merged: Dict[str, PhaseEstimate] = {}
+        test_type = 'unknown'
+        for _, rendered in matrix.scenarios():
+            estimate = self.estimate(rendered)
+            test_type = estimate.test_type
+            for phase in estimate.phases:
+                total = merged.setdefault(phase.name, PhaseEstimate(phase.name, 0.0, {"points": 0}))
+                total.duration_s += phase.duration_s
+                total.detail["points"] += 1
+        meta = scenario.get('metadata', {}) or {}
+        return ScenarioEstimate(meta.get('id', 'unknown'), meta.get('name', '未命名场景'), test_type,
+                                list(merged.values()), points=len(matrix))
+
+    def _estimate_timeline(self, scenario: Dict[str, Any]) -> List[PhaseEstimate]:
+        plan = self.compiler.compile(scenario)
+        if not plan.ok:
+            raise ValueError(f"场景编译失败: {plan.errors[0].message}")
+        parallel = (scenario.get('config', {}) or {}).get('dispatch', 'sequential') == 'parallel'
+        total_duration = plan.total_duration or 0.0
+
+        cursor = 0.0
+        io_s = 0.0
+        late_events = 0
+        for t, group in plan.groups():
+            if t > total_duration:
+                continue
+            by_target: Dict[str, float] = {}
+            for event in group:
+                cost = self._cost(event.target, event.action)
+                by_target[event.target] = by_target.get(event.target, 0.0) + cost
+                io_s += cost
+                if event.ramp is not None:
+                    # 斜坡在后台下发，不推迟后续事件，只计入 I/O 耗时
+                    io_s += cost * (event.ramp.planned_updates - 1)
+            start = max(t, cursor)
+            if start > t:
+                late_events += len(group)
+            cursor = start + (max(by_target.values(), default=0.0) if parallel else sum(by_target.values()))
+
+        overrun = max(0.0, cursor - total_duration)
+        return [
+            PhaseEstimate("timeline", total_duration, {"events": len(plan.events), "io_s": round(io_s, 3)}),
+            PhaseEstimate("overrun", overrun, {"late_events": late_events}),
+        ]
+
+    def _probe_cost(self, cfg: Dict[str, Any]) -> float:
+        """单个搜索测量点: 设置功率 + 稳定等待 (实测平均，不超过配置的上限，其间的读数即为测量)"""
+        max_wait = create_settling_detector(cfg, PROBE_SETTLE_S).max_wait_s
+        return self._cost("vsg", "set_power") + min(self.latencies.get("settling", "settle"), max_wait)
+
+    def _estimate_sensitivity(self, cfg: Dict[str, Any]) -> List[PhaseEstimate]:
+        search_cfg = cfg.get('search', {}) or {}
+        search = create_sensitivity_search(sensitivity_search_config(search_cfg))
+        threshold = search_cfg.get('expected_dbm')
+        if threshold is None:
+            threshold = (search.start_power + search.end_power) / 2.0
+        probes = _dry_run(search, float(threshold), pass_above=True)
+        per_probe = self._probe_cost(search_cfg)
+        return [PhaseEstimate("search", probes * per_probe, {
+            "mode": search.mode, "probes": probes, "per_probe_s": round(per_probe, 3),
+            "assumed_threshold_dbm": float(threshold)
+        })]
+
+    def _estimate_blocking(self, cfg: Dict[str, Any]) -> List[PhaseEstimate]:
+        interferer = cfg.get('interferer', {}) or {}
+        sweep = create_blocking_sweep(interferer, float(cfg.get('limit', {}).get('max_bler', 0.05)))
+        threshold = interferer.get('expected_threshold_dbm')
+        if threshold is None:
+            threshold = (sweep.start_power + sweep.end_power) / 2.0
+
+        per_probe = self._probe_cost(interferer)
+        per_offset = self._cost("vsg", "set_frequency") + self._cost("vsg", "enable_output", times=2)
+        probes: Dict[str, int] = {}
+        for offset in sweep.ordered_offsets():
+            search = sweep.create_search(offset)
+            probes[str(offset)] = _dry_run(search, float(threshold), pass_above=False)
+            sweep.record(offset, search)
+
+        total_probes = sum(probes.values())
+        phases = []
+        if self._has("integrated_tester"):
+            phases.append(PhaseEstimate("link_setup", MAIN_LINK_SETUP_S))
+        phases.append(PhaseEstimate("sweep", len(probes) * per_offset + total_probes * per_probe, {
+            "mode": sweep.mode, "offsets": len(probes), "probes": total_probes, "probes_per_offset": probes,
+            "per_probe_s": round(per_probe, 3), "assumed_threshold_dbm": float(threshold)
+        }))
+        return phases
+
+    # --- 批次 ---
+
+    def estimate_campaign(self, scenarios: Iterable[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """预估批次: 一次会话建立 + 各场景 (参数矩阵按全部测试点)"""
+        session = self.estimate_session()
+        items = []
+        for filename, scenario in scenarios:
+            estimate = self.estimate(scenario).to_dict()
+            estimate["filename"] = filename
+            items.append(estimate)
+        return {
+            "total_s": round(session.duration_s + sum(i["total_s"] for i in items), 3),
+            "session": session.to_dict(),
+            "items": items,
+            "latency_sources": dict(self.latencies.sources),
+        }
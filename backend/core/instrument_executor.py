@@ -0,0 +1,224 @@
+"""
+仪表 I/O 执行器 - 每台仪表一个专属串行工作线程
+"""
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from drivers.base_instrument import DEFAULT_OPERATION_TIMEOUT_S, poll_intervals
+
+
+def command_name(func: Callable) -> str:
+    """调用对应的仪表命令名 (functools.partial 取被包装的方法名)"""
+    while isinstance(func, functools.partial):
+        func = func.func
+    return getattr(func, "__name__", type(func).__name__)
+
+
+class LatencyRecorder:
+    """
+    按 (仪表, 命令) 统计实际执行耗时。
+    由各仪表的 I/O 工作线程写入，drain() 取出累计统计后清零，供持久化到数据库。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], List[float]] = {}  # [次数, 总耗时, 最小, 最大] (毫秒)
+
+    def record(self, instrument: str, command: str, elapsed_s: float):
+        ms = elapsed_s * 1000.0
+        with self._lock:
+            stat = self._stats.get((instrument, command))
+            if stat is None:
+                self._stats[(instrument, command)] = [1, ms, ms, ms]
+            else:
+                stat[0] += 1
+                stat[1] += ms
+                stat[2] = min(stat[2], ms)
+                stat[3] = max(stat[3], ms)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"instrument": inst, "command": cmd, "samples": int(n), "total_ms": round(total, 3),
+                 "min_ms": round(lo, 3), "max_ms": round(hi, 3)}
+                for (inst, cmd), (n, total, lo, hi) in self._stats.items()
+            ]
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """取出并清空累计统计"""
+        rows = self.snapshot()
+        with self._lock:
+            self._stats.clear()
+        return rows
+
+
+class AsyncInstrument:
+    """
+    仪表代理的异步包装器。
+
+    每个实例拥有一个单线程执行器，同一仪表的所有调用在该线程上串行执行，
+    保证 VISA 会话不被并发访问；不同仪表之间、以及与事件循环之间互不阻塞。
+    代理类的任意公开方法都可以直接 await:
+
+        await AsyncInstrument(vsg).set_power(-80)
+
+    指定 recorder 时，每次调用在工作线程上的实际耗时 (不含排队) 按命令名记录。
+
+    仪表使用原生异步传输 (transport: socket) 且传输绑定当前事件循环时，
+    write/query/read_block 以及驱动提供的 <方法>_async 协程直接在事件循环中 await，不经过工作线程。
+
+    耗时操作 (扫描、加载信道模型) 用 operation() 发起: 开始方法返回后立即得到一个 Future，
+    完成由状态字节轮询判断，轮询之间工作线程空闲，同一仪表的其他调用可以穿插执行。
+    """
+    def __init__(self, proxy: Any, name: str = None, recorder: Optional[LatencyRecorder] = None):
+        self.proxy = proxy
+        self.name = name or getattr(proxy, "name", type(proxy).__name__)
+        self.recorder = recorder
+        self.logger = logging.getLogger(f"IO.{self.name}")
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"io-{self.name}"
+        )
+        self._closed = False
+
+    def _timed(self, func: Callable, *args, **kwargs) -> Any:
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.recorder.record(self.name, command_name(func), time.perf_counter() - started)
+
+    def _wrap(self, func: Callable, *args, **kwargs) -> Callable[[], Any]:
+        if self.recorder is None:
+            return functools.partial(func, *args, **kwargs)
+        return functools.partial(self._timed, func, *args, **kwargs)
+
+    def submit(self, func: Callable, *args, **kwargs) -> concurrent.futures.Future:
+        """将同步调用提交到该仪表的工作线程，返回 concurrent.futures.Future"""
+        if self._closed:
+            raise RuntimeError(f"{self.name} 的 I/O 执行器已关闭")
+        return self._executor.submit(self._wrap(func, *args, **kwargs))
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """在工作线程上执行任意同步调用并等待结果"""
+        if self._closed:
+            raise RuntimeError(f"{self.name} 的 I/O 执行器已关闭")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._wrap(func, *args, **kwargs))
+
+    def _driver(self) -> Any:
+        """代理背后的驱动 (没有代理层时为对象本身)"""
+        return getattr(self.proxy, "_driver", None) or self.proxy
+
+    def _native_driver(self) -> Optional[Any]:
+        """驱动的传输绑定当前事件循环时返回驱动，可直接 await 其协程接口"""
+        driver = self._driver()
+        transport = getattr(driver, "transport", None)
+        if transport is not None and transport.in_loop() and not getattr(driver, "simulation_mode", False):
+            return driver
+        return None
+
+    async def _await_native(self, command: str, coro: Any) -> Any:
+        if self.recorder is None:
+            return await coro
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self.recorder.record(self.name, command, time.perf_counter() - started)
+
+    async def call(self, method: str, *args, **kwargs) -> Any:
+        """
+        按名称调用代理方法。原生协程方法直接 await；
+        使用原生异步传输且驱动提供 <方法>_async 时直接 await 该协程；其余同步方法转入工作线程。
+        """
+        func = getattr(self.proxy, method)
+        if asyncio.iscoroutinefunction(func):
+            return await func(*args, **kwargs)
+        native = self._native_driver()
+        if native is not None and asyncio.iscoroutinefunction(getattr(native, f"{method}_async", None)):
+            return await self._await_native(method, getattr(native, f"{method}_async")(*args, **kwargs))
+        return await self.run(func, *args, **kwargs)
+
+    async def write(self, command: str):
+        """发送 SCPI 指令"""
+        native = self._native_driver()
+        if native is not None:
+            return await self._await_native("write", native.write_async(command))
+        return await self.run(self._driver().write, command)
+
+    async def query(self, command: str) -> str:
+        """发送 SCPI 查询并返回响应"""
+        native = self._native_driver()
+        if native is not None:
+            return await self._await_native("query", native.query_async(command))
+        return await self.run(self._driver().query, command)
+
+    async def read_block(self, command: str) -> memoryview:
+        """发送查询并读取 IEEE 488.2 二进制块"""
+        native = self._native_driver()
+        if native is not None:
+            return await self._await_native("read_block", native.read_block_async(command))
+        return await self.run(self._driver().query_block, command)
+
+    async def wait_operation(self, timeout_s: float = DEFAULT_OPERATION_TIMEOUT_S):
+        """
+        等待驱动上进行中的重叠操作完成 (*OPC 置位)。
+        每次轮询是一个短查询，间隔按指数退避；超时抛出 TimeoutError，仪表报告错误时抛出 InstrumentError。
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_s
+        for delay in poll_intervals():
+            native = self._native_driver()
+            if native is not None:
+                done = await self._await_native("operation_complete", native.operation_complete_async())
+            else:
+                done = await self.run(self._driver().operation_complete)
+            if done:
+                return
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TimeoutError(f"{self.name} 操作未在 {timeout_s}s 内完成")
+            await asyncio.sleep(min(delay, remaining))
+
+    def abort_operation(self):
+        """中止驱动上正在工作线程中同步等待的重叠操作 (直接调用，不排在工作线程的队列中)"""
+        abort = getattr(self._driver(), "abort_operation", None)
+        if abort is not None:
+            abort()
+
+    async def operation(self, method: str, *args, timeout_s: float = DEFAULT_OPERATION_TIMEOUT_S,
+                        **kwargs) -> "asyncio.Future[None]":
+        """
+        调用发起重叠操作的代理方法 (如 start_sweep、start_load_channel_model)，
+        方法返回后即返回一个在操作完成时结束的 Future:
+
+            sweep = await vna_io.operation("start_sweep")
+            await other_io.set_power(-80)  # 扫描进行中
+            await sweep
+            data = await vna_io.fetch_s_parameter("S21")
+        """
+        await self.call(method, *args, **kwargs)
+        return asyncio.ensure_future(self.wait_operation(timeout_s))
+
+    def __getattr__(self, item: str):
+        if item.startswith("_"):
+            raise AttributeError(item)
+        attr = getattr(self.proxy, item)
+        if not callable(attr):
+            return attr
+
+        async def method(*args, **kwargs):
+            return await self.call(item, *args, **kwargs)
+
+        method.__name__ = item
+        return method
+
+    def shutdown(self, wait: bool = False):
+        """关闭工作线程。wait=False 时不等待正在执行的调用"""
+        if not self._closed:
+            self._closed = True
+            self._executor.shutdown(wait=wait)
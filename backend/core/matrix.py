@@ -0,0 +1,196 @@
+"""
+参数矩阵展开 - 一个场景模板声明扫描轴，按需 (惰性) 展开为具体的测试点
+
+场景文件中的 matrix 段:
+
+    matrix:
+      axes:
+        - name: channel_model
+          values: ["UMa_NLOS", "RMa_LOS"]
+          cost_s: 8.0          # 该轴取值变化一次的仪表重配置耗时 (估计值)
+        - name: velocity
+          path: config.channel.velocity_kmh   # 可选: 直接写入模板中的该路径
+          values: [30, 120, 350]
+          cost_s: 0.2
+
+模板中任意字符串里的 ${轴名} 会被替换为该点的取值；整个字符串恰为 ${轴名} 时保留原始类型。
+
+展开顺序: 重配置代价高的轴放在外层 (变化次数最少)，内层按反射格雷码 (蛇形) 顺序遍历，
+相邻两个测试点之间只有一个轴的取值发生变化。测试点按序号即时计算，不会一次性生成全部场景。
+"""
+import copy
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from core.campaign import CampaignItem
+
+_PLACEHOLDER = re.compile(r"\$\{(\w+)\}")
+
+
+@dataclass(frozen=True)
+class MatrixAxis:
+    """扫描轴"""
+    name: str
+    values: Tuple[Any, ...]
+    path: Optional[str] = None
+    cost_s: float = 1.0
+
+
+@dataclass(frozen=True)
+class MatrixPoint:
+    """矩阵中的一个测试点"""
+    index: int
+    values: Dict[str, Any]
+
+    @property
+    def label(self) -> str:
+        return ", ".join(f"{k}={v}" for k, v in self.values.items())
+
+
+def _parse_axes(spec: Any) -> List[MatrixAxis]:
+    if not isinstance(spec, dict) or not isinstance(spec.get('axes'), list) or not spec['axes']:
+        raise ValueError("matrix.axes 必须是非空列表")
+    axes = []
+    for raw in spec['axes']:
+        if not isinstance(raw, dict) or not raw.get('name'):
+            raise ValueError(f"扫描轴缺少 name: {raw!r}")
+        values = raw.get('values')
+        if not isinstance(values, list) or not values:
+            raise ValueError(f"扫描轴 {raw['name']} 的 values 必须是非空列表")
+        cost = float(raw.get('cost_s', 1.0))
+        if cost < 0:
+            raise ValueError(f"扫描轴 {raw['name']} 的 cost_s 不能为负: {cost}")
+        axes.append(MatrixAxis(str(raw['name']), tuple(values), raw.get('path'), cost))
+    names = [a.name for a in axes]
+    if len(set(names)) != len(names):
+        raise ValueError(f"扫描轴名称重复: {names}")
+    return axes
+
+
+class ScenarioMatrix:
+    """
+    场景参数矩阵。
+
+    order="optimized" 时按 cost_s 从高到低排列轴并使用蛇形顺序；
+    order="declared" 时按 YAML 书写顺序做普通的笛卡尔积 (最后一个轴变化最快)。
+    """
+    def __init__(self, template: Dict[str, Any], order: str = "optimized"):
+        if order not in ("optimized", "declared"):
+            raise ValueError(f"未知的展开顺序: {order} (可选: optimized / declared)")
+        self.template = {k: v for k, v in template.items() if k != 'matrix'}
+        self.axes = _parse_axes(template.get('matrix'))
+        self.order = order
+        if order == "optimized":
+            # 稳定排序: 代价相同时保持书写顺序
+            self._nest = sorted(self.axes, key=lambda a: -a.cost_s)
+        else:
+            self._nest = list(self.axes)
+        self._size = 1
+        for axis in self.axes:
+            self._size *= len(axis.values)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def point(self, index: int) -> MatrixPoint:
+        """按序号计算测试点 (O(轴数))"""
+        if not 0 <= index < self._size:
+            raise IndexError(f"测试点序号越界: {index}")
+        digits: Dict[str, int] = {}
+        remaining = index
+        stride = self._size
+        outer_steps = 0  # 外层各轴组成的计数器
+        for axis in self._nest:
+            n = len(axis.values)
+            stride //= n
+            digit, remaining = divmod(remaining, stride)
+            # 蛇形: 外层每前进一步，内层遍历方向反转
+            reflected = self.order == "optimized" and outer_steps % 2 == 1
+            digits[axis.name] = n - 1 - digit if reflected else digit
+            outer_steps = outer_steps * n + digit
+        return MatrixPoint(index, {a.name: a.values[digits[a.name]] for a in self.axes})
+
+    def points(self) -> Iterator[MatrixPoint]:
+        for index in range(self._size):
+            yield self.point(index)
+
+    def render(self, point: MatrixPoint) -> Dict[str, Any]:
+        """生成该测试点的具体场景"""
+        scenario = _substitute(copy.deepcopy(self.template), point.values)
+        for axis in self.axes:
+            if axis.path:
+                _set_path(scenario, axis.path, point.values[axis.name])
+        meta = scenario.setdefault('metadata', {})
+        base_id = meta.get('id', 'matrix')
+        meta['id'] = f"{base_id}[{point.index}]"
+        meta['name'] = f"{meta.get('name', base_id)} ({point.label})"
+        meta['matrix_point'] = dict(point.values)
+        return scenario
+
+    def scenarios(self) -> Iterator[Tuple[MatrixPoint, Dict[str, Any]]]:
+        for point in self.points():
+            yield point, self.render(point)
+
+    def reconfiguration_cost(self) -> float:
+        """按当前顺序遍历全部测试点的预计重配置耗时 (秒，含第一个点的初始配置)"""
+        costs = {a.name: a.cost_s for a in self.axes}
+        total = sum(costs.values())
+        previous = None
+        for point in self.points():
+            if previous is not None:
+                total += sum(costs[k] for k, v in point.values.items() if previous[k] != v)
+            previous = point.values
+        return round(total, 3)
+
+    def to_dict(self, preview: int = 10) -> Dict[str, Any]:
+        return {
+            "points": self._size,
+            "order": self.order,
+            "axes": [{"name": a.name, "values": list(a.values), "path": a.path, "cost_s": a.cost_s}
+                     for a in self._nest],
+            "reconfiguration_cost_s": self.reconfiguration_cost(),
+            "preview": [p.values for p in (self.point(i) for i in range(min(preview, self._size)))],
+        }
+
+
+def _substitute(node: Any, values: Dict[str, Any]) -> Any:
+    if isinstance(node, dict):
+        return {k: _substitute(v, values) for k, v in node.items()}
+    if isinstance(node, list):
+        return [_substitute(v, values) for v in node]
+    if isinstance(node, str):
+        whole = _PLACEHOLDER.fullmatch(node)
+        if whole and whole.group(1) in values:
+            return values[whole.group(1)]
+        return _PLACEHOLDER.sub(lambda m: str(values[m.group(1)]) if m.group(1) in values else m.group(0), node)
+    return node
+
+
+def _set_path(scenario: Dict[str, Any], path: str, value: Any):
+    keys = path.split('.')
+    node = scenario
+    for key in keys[:-1]:
+        node = node.setdefault(key, {})
+        if not isinstance(node, dict):
+            raise ValueError(f"路径 {path} 不是字典: {key}")
+    node[keys[-1]] = value
+
+
+def has_matrix(scenario: Dict[str, Any]) -> bool:
+    return bool(scenario.get('matrix'))
+
+
+def matrix_items(filename: str, scenario: Dict[str, Any], order: str = "optimized") -> Iterator[CampaignItem]:
+    """将矩阵场景惰性展开为批次条目；普通场景原样返回一个条目"""
+    if not has_matrix(scenario):
+        yield CampaignItem(filename=filename, scenario=scenario)
+        return
+    matrix = ScenarioMatrix(scenario, order)
+    for point, rendered in matrix.scenarios():
+        yield CampaignItem(filename=f"{filename}#{point.index}", scenario=rendered)
+
+
+def count_items(scenarios: Sequence[Dict[str, Any]]) -> int:
+    """批次展开后的测试点总数"""
+    return sum(len(ScenarioMatrix(s)) if has_matrix(s) else 1 for s in scenarios)
@@ -0,0 +1,426 @@
+"""
+场景编译 - 在接触任何仪表之前校验场景，并生成不可变的执行计划
+
+时间轴事件在编译期完成:
+    1. 目标仪表与动作 (方法) 的解析
+    2. 参数与方法签名的绑定校验 (缺失/多余参数)
+    3. 按类型注解的参数类型转换 (如 "3500e6" -> float)
+    4. 按触发时间排序、同一时刻事件分组
+执行期只需将计划绑定到已连接的仪表，得到预先绑定好的调用。
+"""
+import functools
+import hashlib
+import inspect
+import math
+import threading
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import yaml
+from drivers import INSTRUMENT_PROXIES
+
+from core.ramp import RampSpec, parse_ramp
+from core.search import (
+    create_blocking_sweep,
+    create_sensitivity_search,
+    sensitivity_search_config,
+)
+from core.settling import create_settling_detector
+
+
+@dataclass(frozen=True)
+class PlanIssue:
+    """编译发现的问题"""
+    message: str
+    index: Optional[int] = None  # 时间轴事件序号 (YAML 中的顺序)
+    target: Optional[str] = None
+    action: Optional[str] = None
+    severity: str = "error"  # error / warning
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "index": self.index, "target": self.target, "action": self.action,
+            "severity": self.severity, "message": self.message
+        }
+
+
+@dataclass(frozen=True)
+class CompiledEvent:
+    """编译后的时间轴事件 (参数已校验并转换类型)"""
+    index: int
+    time: float
+    target: str
+    action: str
+    params: Mapping[str, Any]
+    comment: str = ""
+    is_async: bool = False  # 目标方法为原生协程，直接在事件循环上 await
+    ramp: Optional[RampSpec] = None  # 参数斜坡: 从 time 起由主机按速率逐点下发
+
+    def bind(self, proxy: Any) -> Callable[[], Any]:
+        """绑定到仪表对象，返回无参调用"""
+        return functools.partial(getattr(proxy, self.action), **self.params)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "index": self.index, "time": self.time, "target": self.target,
+            "action": self.action, "params": dict(self.params), "comment": self.comment
+        }
+        if self.ramp is not None:
+            data["ramp"] = self.ramp.to_dict()
+        return data
+
+
+@dataclass(frozen=True)
+class CompiledPlan:
+    """不可变的场景执行计划"""
+    scenario_id: str
+    name: str
+    test_type: str
+    total_duration: Optional[float]
+    events: Tuple[CompiledEvent, ...] = ()
+    issues: Tuple[PlanIssue, ...] = ()
+    source_hash: Optional[str] = None
+
+    @property
+    def errors(self) -> List[PlanIssue]:
+        return [i for i in self.issues if i.severity == "error"]
+
+    @property
+    def warnings(self) -> List[PlanIssue]:
+        return [i for i in self.issues if i.severity == "warning"]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def groups(self) -> List[Tuple[float, Tuple[CompiledEvent, ...]]]:
+        """按触发时间分组，组内保持 YAML 书写顺序"""
+        grouped: Dict[float, List[CompiledEvent]] = {}
+        for event in self.events:
+            grouped.setdefault(event.time, []).append(event)
+        return [(t, tuple(events)) for t, events in grouped.items()]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "scenario_id": self.scenario_id,
+            "name": self.name,
+            "test_type": self.test_type,
+            "total_duration": self.total_duration,
+            "source_hash": self.source_hash,
+            "ok": self.ok,
+            "events": [e.to_dict() for e in self.events],
+            "errors": [i.to_dict() for i in self.errors],
+            "warnings": [i.to_dict() for i in self.warnings],
+        }
+
+
+def _coerce(value: Any, annotation: Any) -> Any:
+    """按类型注解转换参数值；无法转换时抛出 ValueError"""
+    if annotation is inspect.Parameter.empty or annotation is Any:
+        return value
+    if annotation is bool:
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.strip().lower() in ("true", "on", "1", "yes"):
+            return True
+        if isinstance(value, str) and value.strip().lower() in ("false", "off", "0", "no"):
+            return False
+        if isinstance(value, (int, float)) and value in (0, 1):
+            return bool(value)
+        raise ValueError(f"无法转换为 bool: {value!r}")
+    if annotation is float:
+        if isinstance(value, bool):
+            raise ValueError(f"无法转换为 float: {value!r}")
+        result = float(value)
+        if math.isnan(result) or math.isinf(result):
+            raise ValueError(f"非有限数值: {value!r}")
+        return result
+    if annotation is int:
+        if isinstance(value, bool):
+            raise ValueError(f"无法转换为 int: {value!r}")
+        result = float(value)
+        if not result.is_integer():
+            raise ValueError(f"不是整数: {value!r}")
+        return int(result)
+    if annotation is str:
+        if isinstance(value, (dict, list)):
+            raise ValueError(f"无法转换为 str: {value!r}")
+        return str(value)
+    if annotation is dict and not isinstance(value, dict):
+        raise ValueError(f"需要字典: {value!r}")
+    if annotation is list and not isinstance(value, list):
+        raise ValueError(f"需要列表: {value!r}")
+    return value
+
+
+class ScenarioCompiler:
+    """
+    场景编译器。
+
+    registry 为 {目标名: 仪表类}，默认使用 drivers.INSTRUMENT_PROXIES 中的代理类。
+    compile_file 按文件内容的 SHA-256 缓存编译结果，文件未改动时直接复用。
+    """
+    def __init__(self, registry: Optional[Dict[str, type]] = None):
+        if registry is None:
+            registry = {key: cls for key, (cls, _) in INSTRUMENT_PROXIES.items()}
+        self.registry = registry
+        self._cache: Dict[str, CompiledPlan] = {}
+        self._lock = threading.Lock()
+
+    # --- 入口 ---
+
+    def compile_file(self, path: str) -> CompiledPlan:
+        """编译场景文件 (按文件哈希缓存)"""
+        with open(path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        with self._lock:
+            cached = self._cache.get(digest)
+        if cached is not None:
+            return cached
+
+        try:
+            scenario = yaml.safe_load(raw.decode('utf-8')) or {}
+        except yaml.YAMLError as e:
+            return CompiledPlan(scenario_id=path, name=path, test_type="unknown", total_duration=None,
+                                issues=(PlanIssue(f"YAML 解析失败: {e}"),), source_hash=digest)
+        plan = self.compile(scenario, source_hash=digest)
+        with self._lock:
+            self._cache[digest] = plan
+        return plan
+
+    def compile(self, scenario: Dict[str, Any], source_hash: Optional[str] = None) -> CompiledPlan:
+        """编译完整场景 (含 metadata / config)；参数矩阵场景编译第一个测试点，并校验每个轴取值"""
+        shape_issues = self._check_shape(scenario)
+        if shape_issues:
+            return CompiledPlan(scenario_id='unknown', name='未命名场景', test_type='unknown', total_duration=None,
+                                issues=tuple(shape_issues), source_hash=source_hash)
+        if scenario.get('matrix'):
+            return self._compile_matrix(scenario, source_hash)
+        meta = scenario.get('metadata', {}) or {}
+        cfg = scenario.get('config', {}) or {}
+        test_type = cfg.get('type', 'unknown')
+        issues: List[PlanIssue] = []
+        events: Tuple[CompiledEvent, ...] = ()
+        total_duration = None
+
+        if test_type == 'dynamic_scenario':
+            total_duration, events, issues = self._compile_timeline(cfg)
+        elif test_type == 'sensitivity':
+            search = cfg.get('search', {}) or {}
+            issues = self._check_constructor(lambda: (
+                create_sensitivity_search(sensitivity_search_config(search)),
+                create_settling_detector(search, 0.0)
+            ), "search")
+        elif test_type == 'blocking':
+            interferer = cfg.get('interferer', {}) or {}
+            issues = self._check_constructor(lambda: (
+                create_blocking_sweep(interferer, float(cfg.get('limit', {}).get('max_bler', 0.05))),
+                create_settling_detector(interferer, 0.0)
+            ), "interferer")
+        else:
+            issues = [PlanIssue(f"未知的测试类型: {test_type}")]
+
+        return CompiledPlan(
+            scenario_id=meta.get('id', 'unknown'),
+            name=meta.get('name', cfg.get('name', '未命名场景')),
+            test_type=test_type,
+            total_duration=total_duration,
+            events=events,
+            issues=tuple(issues),
+            source_hash=source_hash
+        )
+
+    def compile_timeline(self, scenario_config: Dict[str, Any]) -> CompiledPlan:
+        """仅编译动态场景的 config 部分 (Sequencer 执行时使用)"""
+        total_duration, events, issues = self._compile_timeline(scenario_config)
+        return CompiledPlan(
+            scenario_id=scenario_config.get('id', 'inline'),
+            name=scenario_config.get('name', '未命名场景'),
+            test_type='dynamic_scenario',
+            total_duration=total_duration,
+            events=events,
+            issues=tuple(issues)
+        )
+
+    # --- 实现 ---
+
+    def _compile_matrix(self, scenario: Dict[str, Any], source_hash: Optional[str]) -> CompiledPlan:
+        # 延迟导入: core.matrix 依赖 core.campaign -> core.sequencer -> core.plan
+        from core.matrix import MatrixPoint, ScenarioMatrix
+
+        meta = scenario.get('metadata', {}) or {}
+        try:
+            matrix = ScenarioMatrix(scenario)
+        except (TypeError, ValueError) as e:
+            return CompiledPlan(
+                scenario_id=meta.get('id', 'unknown'), name=meta.get('name', '未命名场景'),
+                test_type=(scenario.get('config', {}) or {}).get('type', 'unknown'), total_duration=None,
+                issues=(PlanIssue(f"matrix 配置错误: {e}"),), source_hash=source_hash
+            )
+
+        # 第一个测试点，加上 "每次只改变一个轴" 的测试点，保证每个轴取值至少编译一次
+        first = matrix.point(0)
+        variants = [first.values]
+        for axis in matrix.axes:
+            for value in axis.values:
+                if value != first.values[axis.name]:
+                    variants.append({**first.values, axis.name: value})
+
+        plan = None
+        issues: List[PlanIssue] = []
+        seen = set()
+        for values in variants:
+            compiled = self.compile(matrix.render(MatrixPoint(0, values)))
+            if plan is None:
+                plan = compiled
+            label = ", ".join(f"{k}={v}" for k, v in values.items())
+            for issue in compiled.issues:
+                key = (issue.index, issue.severity, issue.message)
+                if key in seen:
+                    continue
+                seen.add(key)
+                issues.append(PlanIssue(f"[{label}] {issue.message}", issue.index, issue.target,
+                                        issue.action, issue.severity))
+        return CompiledPlan(
+            scenario_id=meta.get('id', plan.scenario_id), name=meta.get('name', plan.name),
+            test_type=plan.test_type, total_duration=plan.total_duration,
+            events=plan.events, issues=tuple(issues), source_hash=source_hash
+        )
+
+    @staticmethod
+    def _check_shape(scenario: Any) -> List[PlanIssue]:
+        """场景顶层及 metadata / config 必须是映射 (YAML 写成列表或标量时在此报告)"""
+        if not isinstance(scenario, dict):
+            return [PlanIssue(f"场景顶层必须是映射，实际为 {type(scenario).__name__}")]
+        return [PlanIssue(f"{section} 必须是映射，实际为 {type(scenario[section]).__name__}")
+                for section in ('metadata', 'config')
+                if scenario.get(section) and not isinstance(scenario[section], dict)]
+
+    @staticmethod
+    def _check_constructor(build: Callable[[], Any], section: str) -> List[PlanIssue]:
+        try:
+            build()
+        except (TypeError, ValueError) as e:
+            return [PlanIssue(f"{section} 配置错误: {e}")]
+        return []
+
+    def _compile_timeline(self, cfg: Dict[str, Any]):
+        issues: List[PlanIssue] = []
+        try:
+            total_duration = float(cfg.get('total_duration', 30))
+        except (TypeError, ValueError):
+            issues.append(PlanIssue(f"total_duration 不是数值: {cfg.get('total_duration')!r}"))
+            total_duration = None
+
+        compiled = []
+        for index, event in enumerate(cfg.get('timeline', []) or []):
+            result = self._compile_event(index, event, total_duration, issues)
+            if result is not None:
+                compiled.append(result)
+
+        # 按触发时间排序；排序稳定，同一时刻保持 YAML 书写顺序
+        compiled.sort(key=lambda e: e.time)
+        return total_duration, tuple(compiled), issues
+
+    def _compile_event(self, index: int, event: Any, total_duration: Optional[float],
+                       issues: List[PlanIssue]) -> Optional[CompiledEvent]:
+        if not isinstance(event, dict):
+            issues.append(PlanIssue(f"事件格式错误: {event!r}", index=index))
+            return None
+
+        target = event.get('target')
+        action = event.get('action')
+
+        def issue(message: str, severity: str = "error"):
+            issues.append(PlanIssue(message, index=index, target=target, action=action, severity=severity))
+
+        try:
+            t = float(event.get('time'))
+        except (TypeError, ValueError):
+            issue(f"time 不是数值: {event.get('time')!r}")
+            return None
+        if t < 0:
+            issue(f"time 不能为负: {t}")
+            return None
+        if total_duration is not None and t > total_duration:
+            issue(f"time={t}s 超出场景时长 {total_duration}s，将不会触发", severity="warning")
+
+        cls = self.registry.get(target)
+        if cls is None:
+            issue(f"未知的目标仪表: {target} (可选: {', '.join(sorted(self.registry))})")
+            return None
+        method = getattr(cls, action, None) if isinstance(action, str) else None
+        if method is None or action.startswith('_') or not callable(method):
+            issue(f"{target} 不支持动作: {action}")
+            return None
+
+        params = event.get('params') or {}
+        if not isinstance(params, dict):
+            issue(f"params 必须是字典: {params!r}")
+            return None
+
+        try:
+            signature = inspect.signature(method)
+        except (TypeError, ValueError):
+            signature = None
+
+        ramp = None
+        if event.get('ramp') is not None:
+            ramp = self._compile_ramp(event['ramp'], params, signature, issue)
+            if ramp is None:
+                return None
+            if total_duration is not None and t + ramp.duration > total_duration:
+                issue(f"斜坡结束于 {t + ramp.duration}s，超出场景时长 {total_duration}s，将被截断",
+                      severity="warning")
+            # 起始值参与参数校验，执行时逐点替换
+            params = {**params, ramp.param: ramp.start_value}
+
+        coerced = dict(params)
+        if signature is not None:
+            try:
+                bound = signature.bind(None, **params)
+            except TypeError as e:
+                accepted = list(signature.parameters)[1:]
+                issue(f"参数不匹配: {e} (接受: {accepted})")
+                return None
+            for name, value in bound.arguments.items():
+                parameter = signature.parameters[name]
+                if name not in params or parameter.kind in (parameter.VAR_KEYWORD, parameter.VAR_POSITIONAL):
+                    continue
+                try:
+                    coerced[name] = _coerce(value, parameter.annotation)
+                except (TypeError, ValueError) as e:
+                    issue(f"参数 {name}: {e}")
+                    return None
+
+        return CompiledEvent(
+            index=index, time=t, target=target, action=action,
+            params=MappingProxyType(coerced), comment=event.get('comment', '') or '',
+            is_async=inspect.iscoroutinefunction(method), ramp=ramp
+        )
+
+    @staticmethod
+    def _compile_ramp(raw: Any, params: Dict[str, Any], signature: Optional[inspect.Signature],
+                      issue: Callable[..., None]) -> Optional[RampSpec]:
+        """校验 ramp 段: 目标参数必须是该动作的数值参数"""
+        parameters = {}
+        if signature is not None:
+            parameters = {name: p for name, p in list(signature.parameters.items())[1:]
+                          if p.kind not in (p.VAR_POSITIONAL, p.VAR_KEYWORD)}
+        try:
+            ramp = parse_ramp(raw, params, list(parameters) if signature is not None else None)
+        except ValueError as e:
+            issue(str(e))
+            return None
+        parameter = parameters.get(ramp.param)
+        annotation = parameter.annotation if parameter is not None else inspect.Parameter.empty
+        if annotation not in (inspect.Parameter.empty, Any, float, int):
+            issue(f"ramp.param 不是数值参数: {ramp.param}")
+            return None
+        return replace(ramp, integer=annotation is int)
+
+
+# 全局编译器 (带文件哈希缓存)
+scenario_compiler = ScenarioCompiler()
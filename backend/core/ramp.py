@@ -0,0 +1,253 @@
+"""
+参数斜坡 - 时间轴事件的某个数值参数在一段时间内连续变化，由主机按限定速率逐点下发
+
+场景文件中的写法:
+
+    - time: 5
+      target: "channel_emulator"
+      action: "set_velocity"
+      ramp:
+        param: kmh            # 变化的参数 (动作只有一个参数时可省略)
+        shape: s_curve        # linear | s_curve | table
+        from: 50              # linear / s_curve: 起止值，from 缺省时取 params 中的值
+        to: 350
+        duration: 10          # 秒
+        rate_hz: 5            # 最大更新速率
+      # table 形状改用 points: [[0, 350], [6, 150], [10, 100]] (相对时间, 取值)，分段线性插值
+
+中间值不预先展开，到达每个更新时刻时现算；仪表跟不上时跳过已过期的更新时刻 (合并)，
+只下发最新时刻的取值，结束时补发终值。
+"""
+import asyncio
+import logging
+import math
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+RAMP_SHAPES = ("linear", "s_curve", "table")
+DEFAULT_RAMP_RATE_HZ = 10.0
+
+
+@dataclass(frozen=True)
+class RampSpec:
+    """已校验的斜坡定义"""
+    param: str
+    shape: str
+    points: Tuple[Tuple[float, float], ...]  # (相对时间, 取值)，时间递增，首点为 0
+    rate_hz: float = DEFAULT_RAMP_RATE_HZ
+    integer: bool = False  # 目标参数为 int 时取整
+
+    @property
+    def duration(self) -> float:
+        return self.points[-1][0]
+
+    @property
+    def start_value(self) -> float:
+        return self.points[0][1]
+
+    @property
+    def end_value(self) -> float:
+        return self.points[-1][1]
+
+    @property
+    def planned_updates(self) -> int:
+        """按最大速率下发的更新次数 (含起点与终点)"""
+        steps = self.duration * self.rate_hz
+        on_grid = abs(steps - round(steps)) < 1e-9
+        return math.floor(steps + 1e-9) + (1 if on_grid else 2)
+
+    def value_at(self, t: float) -> float:
+        """相对时间 t 处的取值 (超出区间时取端点值)"""
+        points = self.points
+        if t <= 0 or len(points) == 1:
+            value = points[0][1]
+        elif t >= self.duration:
+            value = points[-1][1]
+        elif self.shape == "table":
+            value = points[-1][1]
+            for (t0, v0), (t1, v1) in zip(points, points[1:]):
+                if t <= t1:
+                    value = v0 if t1 == t0 else v0 + (v1 - v0) * (t - t0) / (t1 - t0)
+                    break
+        else:
+            x = t / self.duration
+            if self.shape == "s_curve":
+                x = x * x * (3.0 - 2.0 * x)  # smoothstep: 起止处速度为 0
+            value = points[0][1] + (points[-1][1] - points[0][1]) * x
+        return int(round(value)) if self.integer else value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "param": self.param, "shape": self.shape, "duration": self.duration,
+            "rate_hz": self.rate_hz, "points": [list(p) for p in self.points]
+        }
+
+
+def _number(value: Any, what: str) -> float:
+    if isinstance(value, bool):
+        raise ValueError(f"{what} 不是数值: {value!r}")
+    try:
+        result = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{what} 不是数值: {value!r}")
+    if math.isnan(result) or math.isinf(result):
+        raise ValueError(f"{what} 不是有限数值: {value!r}")
+    return result
+
+
+def parse_ramp(raw: Any, params: Dict[str, Any], accepted: Optional[List[str]] = None,
+               integer: bool = False) -> RampSpec:
+    """
+    校验 ramp 段并生成 RampSpec，错误时抛出 ValueError。
+
+    Args:
+        params: 事件的固定参数，from 缺省时从中取起始值
+        accepted: 动作接受的参数名，用于推断/校验 param
+        integer: 目标参数是否为 int
+    """
+    if not isinstance(raw, dict):
+        raise ValueError(f"ramp 必须是字典: {raw!r}")
+    param = raw.get('param')
+    if param is None:
+        candidates = accepted or []
+        if len(candidates) != 1:
+            raise ValueError(f"ramp.param 未指定 (可选: {candidates})")
+        param = candidates[0]
+    if accepted is not None and param not in accepted:
+        raise ValueError(f"ramp.param 不是该动作的参数: {param} (接受: {accepted})")
+
+    shape = raw.get('shape', 'linear')
+    if shape not in RAMP_SHAPES:
+        raise ValueError(f"未知的 ramp.shape: {shape} (可选: {', '.join(RAMP_SHAPES)})")
+
+    rate_hz = _number(raw.get('rate_hz', DEFAULT_RAMP_RATE_HZ), "ramp.rate_hz")
+    if rate_hz <= 0:
+        raise ValueError(f"ramp.rate_hz 必须大于 0: {rate_hz}")
+
+    if shape == "table":
+        table = raw.get('points')
+        if not isinstance(table, list) or len(table) < 2:
+            raise ValueError("ramp.points 至少需要两个 [时间, 取值] 点")
+        points = []
+        for entry in table:
+            if not isinstance(entry, (list, tuple)) or len(entry) != 2:
+                raise ValueError(f"ramp.points 的元素必须是 [时间, 取值]: {entry!r}")
+            points.append((_number(entry[0], "ramp.points 时间"), _number(entry[1], "ramp.points 取值")))
+        if points[0][0] != 0:
+            raise ValueError(f"ramp.points 必须从时间 0 开始: {points[0][0]}")
+        if any(t1 < t0 for (t0, _), (t1, _) in zip(points, points[1:])):
+            raise ValueError("ramp.points 的时间必须递增")
+        if points[-1][0] <= 0:
+            raise ValueError("ramp.points 的总时长必须大于 0")
+    else:
+        start = raw.get('from', params.get(param))
+        if start is None:
+            raise ValueError("ramp.from 未指定")
+        if 'to' not in raw:
+            raise ValueError("ramp.to 未指定")
+        duration = _number(raw.get('duration'), "ramp.duration")
+        if duration <= 0:
+            raise ValueError(f"ramp.duration 必须大于 0: {duration}")
+        points = [(0.0, _number(start, "ramp.from")), (duration, _number(raw['to'], "ramp.to"))]
+
+    return RampSpec(param=str(param), shape=shape, points=tuple(points), rate_hz=rate_hz, integer=integer)
+
+
+class ParameterRamp:
+    """
+    斜坡执行器。
+
+    更新时刻按绝对截止时间 start + k/rate_hz 计算；一次下发超过了后续更新时刻时，
+    直接跳到下一个未过期的时刻，被跳过的时刻计入 coalesced。取值与上次下发相同时不重复下发。
+    """
+    def __init__(self, spec: RampSpec, send: Callable[[float], Awaitable[Any]], label: str = ""):
+        self.spec = spec
+        self.send = send
+        self.label = label
+        self.logger = logging.getLogger("Ramp")
+        self.sent = 0
+        self.coalesced = 0
+        self.unchanged = 0
+        self.errors = 0
+        self.completed = False
+        self.last_value: Optional[float] = None
+        self._durations: List[float] = []
+        self._span: List[float] = []  # 首次与最近一次下发的相对时刻
+        self._stop_event = asyncio.Event()
+
+    def stop(self):
+        """中止斜坡 (在 run() 开始前调用同样有效)"""
+        self._stop_event.set()
+
+    async def _sleep_until(self, loop: asyncio.AbstractEventLoop, deadline: float) -> bool:
+        delay = deadline - loop.time()
+        if delay <= 0:
+            return not self._stop_event.is_set()
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+            return False
+        except asyncio.TimeoutError:
+            return True
+
+    async def _update(self, loop: asyncio.AbstractEventLoop, start: float, value: float):
+        if self.last_value is not None and value == self.last_value:
+            self.unchanged += 1
+            return
+        sent_at = loop.time()
+        try:
+            await self.send(value)
+            self.last_value = value
+            self.sent += 1
+        except Exception as e:
+            self.errors += 1
+            self.logger.warning(f"斜坡 {self.label} 下发 {self.spec.param}={value} 失败: {e}")
+        self._durations.append(loop.time() - sent_at)
+        self._span = [self._span[0] if self._span else sent_at - start, sent_at - start]
+
+    async def run(self, start: Optional[float] = None):
+        """执行斜坡直到终点或 stop()"""
+        loop = asyncio.get_running_loop()
+        start = loop.time() if start is None else start
+        interval = 1.0 / self.spec.rate_hz
+        duration = self.spec.duration
+        last_k = math.floor(duration / interval + 1e-9)
+        k = 0
+
+        while k <= last_k:
+            if not await self._sleep_until(loop, start + k * interval):
+                return
+            # 取该更新时刻的值；过期时刻已被跳过，因此总是接近当前应有的值
+            await self._update(loop, start, self.spec.value_at(k * interval))
+
+            next_k = k + 1
+            overdue = math.floor((loop.time() - start) / interval) + 1
+            if overdue > next_k:
+                self.coalesced += min(overdue, last_k + 1) - min(next_k, last_k + 1)
+                next_k = overdue
+            k = next_k
+
+        # 终值不在更新网格上时补发
+        if await self._sleep_until(loop, start + duration):
+            if self.last_value != self.spec.end_value:
+                await self._update(loop, start, self.spec.value_at(duration))
+            self.completed = True
+
+    def stats(self) -> Dict[str, Any]:
+        """斜坡统计: 请求/实际速率、合并次数、单次下发耗时"""
+        durations = self._durations or [0.0]
+        span = self._span[1] - self._span[0] if self._span else 0.0
+        return {
+            "label": self.label,
+            **self.spec.to_dict(),
+            "completed": self.completed,
+            "planned_updates": self.spec.planned_updates,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "unchanged": self.unchanged,
+            "errors": self.errors,
+            "last_value": self.last_value,
+            "requested_rate_hz": self.spec.rate_hz,
+            "achieved_rate_hz": round((self.sent - 1) / span, 3) if self.sent > 1 and span > 0 else 0.0,
+            "mean_update_ms": round(sum(durations) / len(durations) * 1000.0, 3),
+            "max_update_ms": round(max(durations) * 1000.0, 3),
+        }
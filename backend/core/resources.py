@@ -0,0 +1,152 @@
+"""
+测试台资源管理 - 按 VISA 地址把仪表租给运行，竞争的请求按优先级排队
+
+仪表只属于当前持有租约的运行 (通常是某个测试台的 Sequencer)。两个测试台配置了同一台仪表时，
+后到的运行排队等待；状态/诊断查询通过租约找到持有者的会话直接读取，不再另开 VISA 会话。
+
+排队规则: 优先级高者先得，同优先级先到先得。排在前面但暂时拿不到资源的请求会预留其资源，
+后面的请求只有在与之不冲突时才能插队，因此需要多台仪表的请求不会被小请求饿死。
+"""
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+
+class LeaseCancelled(Exception):
+    """排队中的租约被取消 (例如用户在等待期间停止了测试)"""
+
+
+@dataclass(eq=False)
+class Lease:
+    """一次资源租约 (排队中或已授予)"""
+    holder: str
+    resources: FrozenSet[str]
+    priority: int = 0
+    session: Any = None  # 持有者的仪表会话，状态查询从这里读取
+    seq: int = 0
+    requested_at: float = field(default_factory=time.perf_counter)
+    granted_at: Optional[float] = None
+    _future: Optional[asyncio.Future] = field(default=None, repr=False)
+
+    @property
+    def granted(self) -> bool:
+        return self.granted_at is not None
+
+    @property
+    def waited_s(self) -> float:
+        end = self.granted_at if self.granted_at is not None else time.perf_counter()
+        return round(end - self.requested_at, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "holder": self.holder,
+            "resources": sorted(self.resources),
+            "priority": self.priority,
+            "granted": self.granted,
+            "waited_s": self.waited_s,
+        }
+
+
+def bench_resources(config: Dict[str, Any]) -> List[str]:
+    """测试台配置占用的资源: 各仪表的 VISA 地址，以及 DUT (dut:<device_id>)"""
+    resources = {cfg['address'] for cfg in (config.get('instruments') or {}).values()
+                 if isinstance(cfg, dict) and cfg.get('address')}
+    device_id = (config.get('dut') or {}).get('device_id')
+    if device_id:
+        resources.add(f"dut:{device_id}")
+    return sorted(resources)
+
+
+class BenchResourceManager:
+    """
+    仪表租约管理器。
+
+    只在事件循环线程中使用；request/release 为同步方法，wait/acquire 为协程。
+    """
+    def __init__(self):
+        self._owners: Dict[str, Lease] = {}
+        self._queue: List[Lease] = []
+        self._seq = itertools.count()
+
+    def request(self, holder: str, resources: Iterable[str], priority: int = 0, session: Any = None) -> Lease:
+        """登记租约请求；资源空闲且没有更靠前的请求在等待时立即授予"""
+        lease = Lease(holder=holder, resources=frozenset(resources), priority=priority,
+                      session=session, seq=next(self._seq))
+        self._queue.append(lease)
+        self._queue.sort(key=lambda item: (-item.priority, item.seq))
+        self._grant()
+        return lease
+
+    async def wait(self, lease: Lease, timeout: Optional[float] = None) -> Lease:
+        """等待租约被授予；超时后撤销请求并抛出 asyncio.TimeoutError"""
+        if lease.granted:
+            return lease
+        if lease._future is None:
+            lease._future = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(lease._future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self.release(lease)
+            raise
+        return lease
+
+    async def acquire(self, holder: str, resources: Iterable[str], priority: int = 0,
+                      session: Any = None, timeout: Optional[float] = None) -> Lease:
+        return await self.wait(self.request(holder, resources, priority, session), timeout)
+
+    def try_acquire(self, holder: str, resources: Iterable[str], priority: int = 0,
+                    session: Any = None) -> Optional[Lease]:
+        """不排队: 能立即授予时返回租约，否则返回 None"""
+        lease = self.request(holder, resources, priority, session)
+        if lease.granted:
+            return lease
+        self._queue.remove(lease)
+        return None
+
+    def release(self, lease: Lease):
+        """归还已授予的租约，或撤销排队中的请求 (等待方收到 LeaseCancelled)"""
+        if lease in self._queue:
+            self._queue.remove(lease)
+            if lease._future is not None and not lease._future.done():
+                lease._future.set_exception(LeaseCancelled(f"{lease.holder} 的租约请求已取消"))
+        for resource in lease.resources:
+            if self._owners.get(resource) is lease:
+                del self._owners[resource]
+        self._grant()
+
+    def _grant(self):
+        reserved: set = set()
+        for lease in list(self._queue):
+            if any(r in self._owners or r in reserved for r in lease.resources):
+                reserved |= lease.resources
+                continue
+            self._queue.remove(lease)
+            lease.granted_at = time.perf_counter()
+            for resource in lease.resources:
+                self._owners[resource] = lease
+            if lease._future is not None and not lease._future.done():
+                lease._future.set_result(lease)
+
+    def holder_of(self, resource: str) -> Optional[Lease]:
+        return self._owners.get(resource)
+
+    def blockers(self, lease: Lease) -> List[str]:
+        """占用该请求所需资源的持有者"""
+        return sorted({self._owners[r].holder for r in lease.resources if r in self._owners})
+
+    def leases(self) -> List[Lease]:
+        seen: Dict[int, Lease] = {}
+        for lease in self._owners.values():
+            seen.setdefault(id(lease), lease)
+        return sorted(seen.values(), key=lambda item: item.seq)
+
+    def queued(self) -> List[Lease]:
+        return list(self._queue)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "leases": [lease.to_dict() for lease in self.leases()],
+            "queue": [lease.to_dict() for lease in self._queue],
+        }
@@ -0,0 +1,131 @@
+"""
+指标采样器 - 独立于事件调度的周期性多目标采集任务
+"""
+import asyncio
+import logging
+import math
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+@dataclass
+class SampleSource:
+    """单个采样目标: read() 返回 {指标名: 值}"""
+    name: str
+    read: Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class MetricSampler:
+    """
+    周期性指标采样器。
+
+    采样时刻按绝对截止时间 start + k·interval 计算 (抖动补偿，不累积漂移)；
+    各目标并发读取，读取耗时记为 acquisition_latency_ms。
+    若一次采集超过了后续一个或多个采样时刻，则直接跳到下一个未过期的时刻
+    (skip-on-overrun)，被跳过的时刻计入 skipped，不会积压补采。
+    """
+    def __init__(self, interval: float, sources: List[SampleSource],
+                 callback: Callable[[Dict[str, Any]], None]):
+        if interval <= 0:
+            raise ValueError(f"采样周期必须大于 0: {interval}")
+        self.interval = float(interval)
+        self.sources = sources
+        self.callback = callback
+        self.logger = logging.getLogger("Sampler")
+        self.samples = 0
+        self.skipped = 0
+        self.errors = 0
+        self._latencies: List[float] = []
+        self._jitters: List[float] = []
+        self._span: List[float] = []  # 首个与最近一个采样的相对时刻
+        self._stop_event: Optional[asyncio.Event] = None
+
+    def stop(self):
+        """中止采样，立即唤醒等待中的 run()"""
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    async def _sleep_until(self, loop: asyncio.AbstractEventLoop, deadline: float) -> bool:
+        """睡眠到绝对截止时间；返回 False 表示被 stop() 唤醒"""
+        delay = deadline - loop.time()
+        if delay <= 0:
+            return not self._stop_event.is_set()
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+            return False
+        except asyncio.TimeoutError:
+            return True
+
+    async def _acquire(self) -> Dict[str, Any]:
+        values: Dict[str, Any] = {}
+        readings = await asyncio.gather(*(s.read() for s in self.sources), return_exceptions=True)
+        for source, reading in zip(self.sources, readings):
+            if isinstance(reading, BaseException):
+                self.errors += 1
+                self.logger.warning(f"采样目标 {source.name} 读取失败: {reading}")
+                continue
+            values.update(reading)
+        return values
+
+    async def run(self, duration: float, start: Optional[float] = None):
+        """采样直到 duration 秒 (相对起点，含端点) 或 stop()"""
+        loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        start = loop.time() if start is None else start
+        end = start + duration
+        last_k = math.floor(duration / self.interval + 1e-9)
+        k = 0
+
+        while not self._stop_event.is_set():
+            deadline = start + k * self.interval
+            if deadline > end + 1e-9:
+                break
+            if not await self._sleep_until(loop, deadline):
+                break
+
+            acquire_start = loop.time()
+            values = await self._acquire()
+            acquired = loop.time()
+
+            latency_ms = (acquired - acquire_start) * 1000.0
+            jitter_ms = (acquire_start - deadline) * 1000.0
+            self._latencies.append(latency_ms)
+            self._jitters.append(jitter_ms)
+            self._span = [self._span[0] if self._span else acquire_start - start, acquire_start - start]
+            self.samples += 1
+
+            sample = {
+                **values,
+                "elapsed_time": round(acquire_start - start, 3),
+                "sample_index": k,
+                "acquisition_latency_ms": round(latency_ms, 3),
+                "jitter_ms": round(jitter_ms, 3),
+            }
+            try:
+                self.callback(sample)
+            except Exception as e:
+                self.logger.error(f"采样回调执行失败: {e}")
+
+            # 跳过已经过期的采样时刻
+            next_k = k + 1
+            overdue = math.floor((loop.time() - start) / self.interval) + 1
+            if overdue > next_k:
+                self.skipped += min(overdue, last_k + 1) - min(next_k, last_k + 1)
+                next_k = overdue
+            k = next_k
+
+    def stats(self) -> Dict[str, Any]:
+        """采样统计: 实际速率、跳过次数、采集延迟与触发抖动"""
+        latencies = self._latencies or [0.0]
+        jitters = self._jitters or [0.0]
+        span = self._span[1] - self._span[0] if self._span else 0.0
+        return {
+            "interval_s": self.interval,
+            "samples": self.samples,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "achieved_rate_hz": round((self.samples - 1) / span, 3) if span > 0 else 0.0,
+            "mean_latency_ms": round(sum(latencies) / len(latencies), 3),
+            "max_latency_ms": round(max(latencies), 3),
+            "max_jitter_ms": round(max(jitters), 3),
+        }
@@ -0,0 +1,210 @@
+"""
+时间轴调度器 - 基于绝对单调时钟截止时间 (Deadline) 的事件调度
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+TimelineCallback = Callable[[], Optional[Awaitable[Any]]]
+
+
+@dataclass(order=True)
+class ScheduledItem:
+    """堆中的调度项，按 (截止时间, 入队序号) 排序"""
+    deadline: float
+    seq: int
+    kind: str = field(compare=False)
+    label: str = field(compare=False)
+    callback: TimelineCallback = field(compare=False)
+    offset: float = field(compare=False, default=0.0)
+    interval: Optional[float] = field(compare=False, default=None)
+    until: Optional[float] = field(compare=False, default=None)
+    occurrence: int = field(compare=False, default=0)
+
+
+@dataclass
+class FireRecord:
+    """单次触发记录: 计划触发时间与实际触发时间 (相对场景 T=0, 秒)"""
+    kind: str
+    label: str
+    planned_time: float
+    actual_time: float
+
+    @property
+    def jitter_ms(self) -> float:
+        return (self.actual_time - self.planned_time) * 1000.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "label": self.label,
+            "planned_time": round(self.planned_time, 6),
+            "actual_time": round(self.actual_time, 6),
+            "jitter_ms": round(self.jitter_ms, 3)
+        }
+
+
+class TimelineScheduler:
+    """
+    截止时间驱动的调度器。
+
+    所有事件与周期任务以「场景起点 + 偏移」的绝对单调时间放入最小堆，
+    通过 loop.call_at 精确唤醒，而不是固定 Tick 轮询。
+    周期任务的下一次截止时间由起点和序号直接计算，误差不会累积。
+    """
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._loop = loop
+        self._heap: List[ScheduledItem] = []
+        self._counter = itertools.count()
+        self._start: Optional[float] = None
+        self._stopped = False
+        self._wakeup: Optional[asyncio.Future] = None
+        self.records: List[FireRecord] = []
+        self.logger = logging.getLogger("Scheduler")
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        return self._loop
+
+    @property
+    def start_time(self) -> Optional[float]:
+        return self._start
+
+    def elapsed(self) -> float:
+        """返回相对场景起点的已流逝时间 (秒)"""
+        if self._start is None:
+            return 0.0
+        return self.loop.time() - self._start
+
+    def schedule_at(self, offset: float, callback: TimelineCallback,
+                    kind: str = "event", label: str = ""):
+        """在场景相对时间 offset (秒) 处调度一次回调"""
+        self._push(ScheduledItem(
+            deadline=float(offset), seq=next(self._counter), kind=kind,
+            label=label, callback=callback, offset=float(offset)
+        ))
+
+    def schedule_periodic(self, interval: float, callback: TimelineCallback,
+                          start: Optional[float] = None, until: Optional[float] = None,
+                          kind: str = "periodic", label: str = ""):
+        """
+        调度周期回调。
+
+        Args:
+            interval: 周期 (秒)
+            start: 首次触发的相对时间，默认为一个周期之后
+            until: 最后一次允许触发的相对时间 (含)，None 表示跟随 run 的时长
+        """
+        if interval <= 0:
+            raise ValueError(f"周期必须大于 0: {interval}")
+        first = float(interval if start is None else start)
+        self._push(ScheduledItem(
+            deadline=first, seq=next(self._counter), kind=kind, label=label,
+            callback=callback, offset=first, interval=float(interval), until=until
+        ))
+
+    def _push(self, item: ScheduledItem):
+        # 运行前以相对偏移入堆，运行后统一换算为绝对时间
+        if self._start is not None:
+            item.deadline = self._start + item.offset
+        heapq.heappush(self._heap, item)
+        self._notify()
+
+    def _notify(self):
+        if self._wakeup is not None and not self._wakeup.done():
+            self._wakeup.set_result(False)
+
+    def stop(self):
+        """中止调度，立即唤醒等待中的 run()"""
+        self._stopped = True
+        self._notify()
+
+    async def _sleep_until(self, deadline: float) -> bool:
+        """
+        通过 loop.call_at 精确睡眠到绝对截止时间。
+        返回 False 表示被 stop() 或新的更早截止时间提前唤醒。
+        """
+        if deadline <= self.loop.time():
+            return True
+        self._wakeup = self.loop.create_future()
+        waiter = self._wakeup
+        handle = self.loop.call_at(deadline, lambda: waiter.done() or waiter.set_result(True))
+        try:
+            return await waiter
+        finally:
+            handle.cancel()
+            self._wakeup = None
+
+    async def run(self, duration: float, start: Optional[float] = None):
+        """
+        执行调度直到 duration 秒 (相对起点) 或 stop()。
+
+        截止时间等于 duration 的一次性事件仍会被触发。
+        """
+        self._stopped = False
+        self._start = self.loop.time() if start is None else start
+        for item in self._heap:
+            item.deadline = self._start + item.offset
+        heapq.heapify(self._heap)
+        end = self._start + duration
+
+        while not self._stopped:
+            if not self._heap or self._heap[0].deadline > end + 1e-9:
+                # 没有剩余项目，等待场景时长结束 (可被 stop 打断)
+                if not await self._sleep_until(end) and not self._stopped:
+                    continue
+                break
+
+            head = self._heap[0]
+            if not await self._sleep_until(head.deadline):
+                # 被提前唤醒 (stop 或插入了更早的项目)，重新评估堆顶
+                continue
+            if self._stopped:
+                break
+
+            item = heapq.heappop(self._heap)
+            actual = self.loop.time()
+            self.records.append(FireRecord(
+                kind=item.kind, label=item.label,
+                planned_time=item.deadline - self._start,
+                actual_time=actual - self._start
+            ))
+
+            if item.interval is not None:
+                self._reschedule(item, end)
+
+            result = item.callback()
+            if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+                await result
+
+    def _reschedule(self, item: ScheduledItem, end: float):
+        limit = end if item.until is None else min(end, self._start + item.until)
+        item.occurrence += 1
+        # 以相对时间比较并留容差: 恰好落在结束时刻的触发点不因浮点舍入被丢弃
+        offset = item.offset + item.occurrence * item.interval
+        next_deadline = self._start + offset
+        if offset <= limit - self._start + 1e-9:
+            heapq.heappush(self._heap, ScheduledItem(
+                deadline=next_deadline, seq=next(self._counter), kind=item.kind,
+                label=item.label, callback=item.callback, offset=item.offset,
+                interval=item.interval, until=item.until, occurrence=item.occurrence
+            ))
+
+    def jitter_stats(self, kind: Optional[str] = None) -> Dict[str, Any]:
+        """统计触发抖动 (实际 - 计划, 毫秒)"""
+        jitters = [r.jitter_ms for r in self.records if kind is None or r.kind == kind]
+        if not jitters:
+            return {"count": 0, "max_ms": 0.0, "mean_ms": 0.0, "p99_ms": 0.0}
+        ordered = sorted(jitters)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return {
+            "count": len(jitters),
+            "max_ms": round(ordered[-1], 3),
+            "mean_ms": round(sum(jitters) / len(jitters), 3),
+            "p99_ms": round(p99, 3)
+        }
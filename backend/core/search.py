@@ -0,0 +1,430 @@
+"""
+灵敏度搜索引擎 - 以最少的测量次数定位目标 BLER 的功率交叉点
+
+所有引擎采用 ask/tell 接口:
+    power = search.next_power()   # None 表示搜索结束
+    search.report(power, bler)    # 回报该功率点的测量结果
+每个测量点都会记录为 ProbePoint，便于追溯。
+阻塞测试复用同一套网格引擎 (BlockingSweep)，功率方向相反: 干扰功率越高 BLER 越高。
+"""
+import math
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+SEARCH_MODES = ("linear", "coarse_to_fine", "bisection", "confidence")
+BLOCKING_MODES = ("linear", "bisection")
+
+
+@dataclass
+class ProbePoint:
+    """单次测量点"""
+    index: int          # 测量序号
+    power_dbm: float
+    bler: float
+    passed: bool        # 本次读数是否满足 BLER <= 目标
+    phase: str          # 搜索阶段 (start / end / coarse / fine / linear / seed / gallop)
+    decided: bool = True  # 置信模式下，未形成结论的重复测量为 False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class SearchResult:
+    """搜索结果"""
+    mode: str
+    target_bler: float
+    sensitivity_dbm: Optional[float]   # 满足目标 BLER 的最低功率
+    first_fail_dbm: Optional[float]    # 紧邻其下的首个失败功率
+    resolution_db: float
+    converged: bool
+    probes: List[ProbePoint] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["measurements"] = len(self.probes)
+        return data
+
+
+class SensitivitySearch:
+    """
+    网格化的功率搜索基类。
+
+    功率网格: start_power, start_power - resolution, ..., end_power (索引 0..N)。
+    BLER 随功率降低单调上升，因此只需维护「最低已通过索引」与「最高已失败索引」。
+    coarse_steps 决定未找到失败点之前每次跨越的网格数:
+    1 为逐点扫描，N 为直接探测端点后二分。
+    """
+    mode = "base"
+
+    def __init__(self, start_power: float, end_power: float, target_bler: float,
+                 resolution_db: float, coarse_steps: Optional[int] = None):
+        if resolution_db <= 0:
+            raise ValueError(f"搜索分辨率必须大于 0: {resolution_db}")
+        self.start_power = float(start_power)
+        self.end_power = float(end_power)
+        self.target_bler = float(target_bler)
+        self.resolution_db = float(resolution_db)
+        span = abs(self.start_power - self.end_power)
+        self._n = max(1, math.ceil(span / self.resolution_db - 1e-9))
+        self._direction = -1.0 if self.end_power <= self.start_power else 1.0
+        self._coarse_steps = max(1, min(coarse_steps or self._n, self._n))
+        self._pass_idx: Optional[int] = None
+        self._fail_idx: Optional[int] = None
+        self._pending: Optional[int] = 0
+        self.probes: List[ProbePoint] = []
+
+    # --- 网格 ---
+
+    def _power(self, idx: int) -> float:
+        if idx >= self._n:
+            return self.end_power
+        return round(self.start_power + self._direction * idx * self.resolution_db, 6)
+
+    def _phase(self, idx: int) -> str:
+        if self._pass_idx is None and self._fail_idx is None:
+            return "start"
+        if self._fail_idx is None:
+            return "end" if idx == self._n and self._coarse_steps == self._n else "coarse"
+        return "fine"
+
+    # --- ask / tell ---
+
+    @property
+    def done(self) -> bool:
+        return self._pending is None
+
+    def next_power(self) -> Optional[float]:
+        """返回下一个待测功率，搜索结束时返回 None"""
+        if self._pending is None:
+            return None
+        return self._power(self._pending)
+
+    def report(self, power: float, bler: float) -> ProbePoint:
+        """回报当前待测点的测量结果，推进搜索状态"""
+        if self._pending is None:
+            raise RuntimeError("搜索已结束，不再接受测量结果")
+        idx = self._pending
+        passed = bler <= self.target_bler
+        decision = self._decide(passed, bler)
+        probe = ProbePoint(
+            index=len(self.probes), power_dbm=float(power), bler=float(bler),
+            passed=passed, phase=self._phase(idx), decided=decision is not None
+        )
+        self.probes.append(probe)
+        if decision is not None:
+            if decision:
+                self._pass_idx = idx
+            else:
+                self._fail_idx = idx
+            self._pending = self._choose_next()
+        return probe
+
+    def replay(self, readings: List[List[float]]) -> int:
+        """
+        按顺序回放已完成的测量 [(power, bler), ...]，用于从检查点恢复。
+        引擎是确定性的，回放后状态与中断前一致；遇到与当前待测功率不符的读数即停止。
+        返回成功回放的测量点数。
+        """
+        count = 0
+        for power, bler in readings:
+            if self._pending is None or abs(self._power(self._pending) - float(power)) > 1e-6:
+                break
+            self.report(power, bler)
+            count += 1
+        return count
+
+    def _decide(self, passed: bool, bler: float) -> Optional[bool]:
+        """根据读数给出通过/失败结论；返回 None 表示需要在同一点继续测量"""
+        return passed
+
+    def _choose_next(self) -> Optional[int]:
+        if self._fail_idx is not None and self._pass_idx is None:
+            # 起始功率即失败，灵敏度高于搜索范围
+            return None
+        if self._fail_idx is None:
+            if self._pass_idx >= self._n:
+                # 终止功率仍通过，灵敏度低于搜索范围
+                return None
+            return min(self._pass_idx + self._coarse_steps, self._n)
+        if self._fail_idx - self._pass_idx <= 1:
+            return None
+        return (self._pass_idx + self._fail_idx) // 2
+
+    def result(self) -> SearchResult:
+        return SearchResult(
+            mode=self.mode,
+            target_bler=self.target_bler,
+            sensitivity_dbm=None if self._pass_idx is None else self._power(self._pass_idx),
+            first_fail_dbm=None if self._fail_idx is None else self._power(self._fail_idx),
+            resolution_db=self.resolution_db,
+            converged=self.done and self._pass_idx is not None and self._fail_idx is not None,
+            probes=list(self.probes)
+        )
+
+
+class LinearSearch(SensitivitySearch):
+    """固定步进逐点扫描 (原始行为)，遇到首个失败点即停止"""
+    mode = "linear"
+
+    def __init__(self, start_power: float, end_power: float, target_bler: float, step_db: float):
+        super().__init__(start_power, end_power, target_bler, step_db, coarse_steps=1)
+
+    def _phase(self, idx: int) -> str:
+        return "linear"
+
+
+class BisectionSearch(SensitivitySearch):
+    """先确认两端，再在网格上二分，测量次数约为 2 + log2(N)"""
+    mode = "bisection"
+
+    def __init__(self, start_power: float, end_power: float, target_bler: float, resolution_db: float):
+        super().__init__(start_power, end_power, target_bler, resolution_db)
+
+
+class CoarseToFineSearch(SensitivitySearch):
+    """粗步进下探直到首个失败点，再在最后一个粗区间内二分细化"""
+    mode = "coarse_to_fine"
+
+    def __init__(self, start_power: float, end_power: float, target_bler: float,
+                 resolution_db: float, coarse_step_db: float):
+        steps = max(1, round(coarse_step_db / resolution_db))
+        super().__init__(start_power, end_power, target_bler, resolution_db, coarse_steps=steps)
+
+
+class ConfidenceSearch(BisectionSearch):
+    """
+    置信区间约束的二分搜索。
+
+    同一功率点重复测量，直到 BLER 均值的置信区间 (均值 ± z·标准误) 完全位于目标值一侧，
+    或达到 max_samples 后按均值判定。适用于 BLER 读数抖动较大的情况。
+    """
+    mode = "confidence"
+
+    def __init__(self, start_power: float, end_power: float, target_bler: float,
+                 resolution_db: float, min_samples: int = 2, max_samples: int = 5,
+                 z: float = 1.96):
+        super().__init__(start_power, end_power, target_bler, resolution_db)
+        self.min_samples = max(1, int(min_samples))
+        self.max_samples = max(self.min_samples, int(max_samples))
+        self.z = float(z)
+        self._samples: List[float] = []
+
+    def _decide(self, passed: bool, bler: float) -> Optional[bool]:
+        self._samples.append(float(bler))
+        n = len(self._samples)
+        if n < self.min_samples:
+            return None
+        mean = sum(self._samples) / n
+        var = sum((x - mean) ** 2 for x in self._samples) / (n - 1) if n > 1 else 0.0
+        half_width = self.z * math.sqrt(var / n)
+        if mean + half_width <= self.target_bler:
+            decision = True
+        elif mean - half_width > self.target_bler:
+            decision = False
+        elif n >= self.max_samples:
+            decision = mean <= self.target_bler
+        else:
+            return None
+        self._samples = []
+        return decision
+
+
+class WarmStartSearch(SensitivitySearch):
+    """
+    带初始猜测的二分搜索。
+
+    首个测量点取 seed_power (通常为相邻条件下已测得的门限)，随后以 window_db 为初始步长
+    向未确认的一侧倍增外扩 (galloping)，直到夹住交叉点，再在区间内二分。
+    猜测准确时约 3 次测量即可收敛；猜测偏差大时退化为 O(log N)。
+    未给出 seed_power 时等价于 BisectionSearch。
+    """
+    mode = "bisection"
+
+    def __init__(self, start_power: float, end_power: float, target_bler: float,
+                 resolution_db: float, seed_power: Optional[float] = None,
+                 window_db: Optional[float] = None):
+        super().__init__(start_power, end_power, target_bler, resolution_db)
+        self.seed_power = None if seed_power is None else float(seed_power)
+        if self.seed_power is None:
+            self._gallop = self._n
+        else:
+            offset = (self.seed_power - self.start_power) * self._direction
+            self._pending = max(0, min(round(offset / self.resolution_db), self._n))
+            self._gallop = max(1, round((window_db or 2 * self.resolution_db) / self.resolution_db))
+
+    def _phase(self, idx: int) -> str:
+        if self._pass_idx is None and self._fail_idx is None:
+            return "start" if self.seed_power is None else "seed"
+        if self._pass_idx is None or self._fail_idx is None:
+            return "end" if self.seed_power is None else "gallop"
+        return "fine"
+
+    def _choose_next(self) -> Optional[int]:
+        if self._pass_idx is not None and self._fail_idx is not None:
+            if self._fail_idx - self._pass_idx <= 1:
+                return None
+            return (self._pass_idx + self._fail_idx) // 2
+        step = self._gallop
+        self._gallop *= 2
+        if self._pass_idx is None:
+            # 仅有失败点: 向起始功率一侧外扩
+            return None if self._fail_idx <= 0 else max(self._fail_idx - step, 0)
+        return None if self._pass_idx >= self._n else min(self._pass_idx + step, self._n)
+
+
+class BlockingSweep:
+    """
+    多频偏阻塞门限扫描。
+
+    每个频偏在干扰功率网格 start_power -> end_power 上定位失效点
+    (干扰功率越高 BLER 越高)。bisection 模式下以「|频偏| 最接近的已测频偏」的门限
+    作为新频偏的初始猜测；order_offsets 为 True 时按 |频偏| 排序，使相邻测量条件尽量接近。
+    """
+
+    def __init__(self, offsets: List[float], start_power: float, end_power: float,
+                 limit_bler: float, mode: str = "linear", step_db: float = 2.0,
+                 resolution_db: Optional[float] = None, seed_window_db: Optional[float] = None,
+                 order_offsets: bool = False):
+        if mode not in BLOCKING_MODES:
+            raise ValueError(f"未知的阻塞搜索模式: {mode} (可选: {', '.join(BLOCKING_MODES)})")
+        self.offsets = [float(o) for o in offsets]
+        self.start_power = float(start_power)
+        self.end_power = float(end_power)
+        self.limit_bler = float(limit_bler)
+        self.mode = mode
+        self.step_db = float(step_db)
+        self.resolution_db = float(resolution_db or step_db)
+        self.seed_window_db = None if seed_window_db is None else float(seed_window_db)
+        self.order_offsets = bool(order_offsets)
+        self.thresholds: List[Dict[str, Any]] = []
+
+    def ordered_offsets(self) -> List[float]:
+        """返回测量顺序"""
+        if self.order_offsets:
+            return sorted(self.offsets, key=lambda o: (abs(o), o))
+        return list(self.offsets)
+
+    def _seed_for(self, offset: float):
+        """从已测频偏中选取初始猜测，返回 (seed_power, 来源频偏)"""
+        measured = [t for t in self.thresholds if t["threshold_dbm"] is not None]
+        if not measured:
+            return None, None
+        nearest = min(measured, key=lambda t: (abs(abs(t["offset_mhz"]) - abs(offset)),
+                                               abs(t["offset_mhz"] - offset)))
+        return nearest["threshold_dbm"], nearest["offset_mhz"]
+
+    def create_search(self, offset: float) -> SensitivitySearch:
+        """为指定频偏创建搜索引擎"""
+        if self.mode == "linear":
+            return LinearSearch(self.start_power, self.end_power, self.limit_bler, self.step_db)
+        seed, _ = self._seed_for(offset)
+        return WarmStartSearch(self.start_power, self.end_power, self.limit_bler,
+                               self.resolution_db, seed_power=seed,
+                               window_db=self.seed_window_db)
+
+    def record(self, offset: float, search: SensitivitySearch) -> Dict[str, Any]:
+        """记录某频偏的搜索结果并返回门限表条目"""
+        result = search.result()
+        seed, source = (None, None) if self.mode == "linear" else self._seed_for(offset)
+        entry = {
+            "offset_mhz": float(offset),
+            "threshold_dbm": result.sensitivity_dbm,   # 仍满足 BLER 限值的最高干扰功率
+            "first_fail_dbm": result.first_fail_dbm,
+            "converged": result.converged,
+            "measurements": len(result.probes),
+            "seed_dbm": seed,
+            "seeded_from_mhz": source,
+            "probes": [p.to_dict() for p in result.probes]
+        }
+        self.thresholds.append(entry)
+        return entry
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "limit_bler": self.limit_bler,
+            "resolution_db": self.resolution_db if self.mode != "linear" else self.step_db,
+            "measurements": sum(t["measurements"] for t in self.thresholds),
+            "thresholds": sorted(self.thresholds, key=lambda t: t["offset_mhz"])
+        }
+
+
+def create_blocking_sweep(interferer: Dict[str, Any], limit_bler: float) -> BlockingSweep:
+    """
+    根据场景的 interferer 配置创建阻塞扫描。
+
+    Args:
+        interferer: 包含 freq_offsets_mhz, start_power_dbm, end_power_dbm, step_db,
+                    mode, resolution_db, seed_window_db, order_offsets 的字典
+        limit_bler: BLER 限值
+    """
+    def value(key: str, default: Any) -> Any:
+        v = interferer.get(key)
+        return default if v is None else v
+
+    return BlockingSweep(
+        offsets=value('freq_offsets_mhz', []),
+        start_power=float(value('start_power_dbm', -60.0)),
+        end_power=float(value('end_power_dbm', -30.0)),
+        limit_bler=limit_bler,
+        mode=value('mode', 'linear'),
+        step_db=float(value('step_db', 2.0)),
+        resolution_db=interferer.get('resolution_db'),
+        seed_window_db=interferer.get('seed_window_db'),
+        order_offsets=value('order_offsets', False)
+    )
+
+
+def sensitivity_search_config(search_cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """将场景文件的 config.search 段转换为 create_sensitivity_search 的参数"""
+    return {
+        "mode": search_cfg.get('mode'),
+        "start_power": search_cfg.get('start_power_dbm'),
+        "end_power": search_cfg.get('end_power_dbm'),
+        "step": search_cfg.get('step_db'),
+        "resolution_db": search_cfg.get('resolution_db'),
+        "coarse_step_db": search_cfg.get('coarse_step_db'),
+        "min_samples": search_cfg.get('min_samples', 2),
+        "max_samples": search_cfg.get('max_samples', 5),
+        "confidence_z": search_cfg.get('confidence_z'),
+        "target_bler": search_cfg.get('target_bler'),
+        "settling_time_s": search_cfg.get('settling_time_s'),
+        "settling": search_cfg.get('settling')
+    }
+
+
+def create_sensitivity_search(cfg: Dict[str, Any]) -> SensitivitySearch:
+    """
+    根据配置创建搜索引擎。
+
+    Args:
+        cfg: 包含 mode, start_power, end_power, target_bler, step / resolution_db,
+             coarse_step_db, min_samples, max_samples, confidence_z 的字典
+    """
+    def value(key: str, default: Any) -> Any:
+        v = cfg.get(key)
+        return default if v is None else v
+
+    mode = value('mode', 'bisection')
+    start = float(value('start_power', -70.0))
+    end = float(value('end_power', -110.0))
+    target = float(value('target_bler', 0.05))
+    step = float(value('step', 1.0))
+    resolution = float(value('resolution_db', step))
+
+    if mode == 'linear':
+        return LinearSearch(start, end, target, step)
+    if mode == 'bisection':
+        return BisectionSearch(start, end, target, resolution)
+    if mode == 'coarse_to_fine':
+        coarse = float(value('coarse_step_db', max(4 * resolution, step)))
+        return CoarseToFineSearch(start, end, target, resolution, coarse)
+    if mode == 'confidence':
+        return ConfidenceSearch(
+            start, end, target, resolution,
+            min_samples=value('min_samples', 2),
+            max_samples=value('max_samples', 5),
+            z=value('confidence_z', 1.96)
+        )
+    raise ValueError(f"未知的搜索模式: {mode} (可选: {', '.join(SEARCH_MODES)})")
@@ -1,16 +1,73 @@
 import asyncio
+import concurrent.futures
+import functools
 import logging
+import time
 import traceback
+from dataclasses import asdict, dataclass
 from datetime import datetime
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
-from drivers.channel_emulator import ChannelEmulator
-from drivers.integrated_tester import IntegratedTester
-from drivers.spectrum_analyzer import SpectrumAnalyzer
-from drivers.vna import VNA
-from drivers.vsg import VSG
+from drivers import INSTRUMENT_PROXIES
 from dut.android_controller import AndroidController
 
+from core.instrument_executor import AsyncInstrument, LatencyRecorder
+from core.plan import CompiledEvent, CompiledPlan, ScenarioCompiler
+from core.ramp import ParameterRamp
+from core.sampler import MetricSampler, SampleSource
+from core.scheduler import TimelineScheduler
+from core.search import (
+    create_blocking_sweep,
+    create_sensitivity_search,
+    sensitivity_search_config,
+)
+from core.settling import SettlingDetector, create_settling_detector
+
+# 单台仪表连接 (含 *RST/*OPC?) 的默认超时
+DEFAULT_CONNECT_TIMEOUT_S = 30.0
+# 每个搜索测量点设置功率后的稳定等待上限 (未配置 settling_time_s 时)
+PROBE_SETTLE_S = 0.5
+# 阻塞测试建立主连接的等待
+MAIN_LINK_SETUP_S = 1.0
+# 收尾时关闭射频输出的动作 (仪表键 -> (方法, 参数))
+RF_OFF_ACTIONS: Dict[str, Tuple[str, Dict[str, Any]]] = {
+    "vsg": ("enable_output", {"enable": False}),
+    "channel_emulator": ("rf_off", {}),
+}
+# 单台仪表关闭射频的超时
+RF_OFF_TIMEOUT_S = 5.0
+# 收尾时等待单台仪表断开的上限 (其 I/O 线程上仍有调用在执行时)
+DISCONNECT_TIMEOUT_S = 5.0
+# 停止请求到射频全部关闭的默认上限 (config.safety.max_stop_latency_s)
+STOP_LATENCY_BOUND_S = 2.0
+
+
+@dataclass
+class InstrumentInitResult:
+    """单台仪表的初始化结果"""
+    key: str
+    name: str
+    address: str
+    success: bool
+    elapsed_s: float
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class _PendingConnect:
+    key: str
+    name: str
+    address: str
+    inst: Any
+    io: AsyncInstrument
+    future: concurrent.futures.Future
+    started: float
+    deadline: float
+    timeout_s: float
+
 
 class TestSequencer:
     """
@@ -19,7 +76,8 @@ class TestSequencer:
     """
     def __init__(self, config: Dict[str, Any], simulation_mode: bool = False,
                  log_callback: Optional[Callable[[str], None]] = None,
-                 metrics_callback: Optional[Callable[[Dict[str, Any]], None]] = None):
+                 metrics_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 checkpoint_callback: Optional[Callable[[Dict[str, Any]], None]] = None):
         self.config = config
         self.simulation_mode = simulation_mode
         self.logger = logging.getLogger("Sequencer")
@@ -27,12 +85,28 @@ class TestSequencer:
         self.dut = None
         self.log_callback = log_callback
         self.metrics_callback = metrics_callback  # 新增: 实时指标推送回调
+        self.checkpoint_callback = checkpoint_callback  # 每个测量点完成后保存进度
+        self.resume_state: Optional[Dict[str, Any]] = None  # 从检查点恢复时的进度
 
         self._running = False
         self._start_time: Optional[float] = None
         self._elapsed_time = 0.0
         self.current_scenario: Optional[Dict[str, Any]] = None
         self.metrics_history = []
+        self.timeline_records: List[Dict[str, Any]] = []  # 时间轴事件计划/实际触发时间
+        self._scheduler: Optional[TimelineScheduler] = None
+        self.io: Dict[str, AsyncInstrument] = {}  # 每台仪表的专属 I/O 工作线程
+        self.event_results: List[Dict[str, Any]] = []  # 时间轴事件执行结果 (含完成延迟)
+        self._ramps: List[ParameterRamp] = []  # 正在执行的参数斜坡
+        self._ramp_tasks: List[asyncio.Task] = []
+        self.init_report: List[InstrumentInitResult] = []  # 仪表初始化结果 (成功/失败/耗时)
+        self.init_elapsed_s: Optional[float] = None
+        self.results: Dict[str, Any] = {}  # 随测试运行保存的结构化结果
+        self.latency = LatencyRecorder()  # 各仪表命令的实际耗时，用于时长预估
+        self._task: Optional[asyncio.Task] = None  # 正在执行的场景任务，stop() 时取消
+        self._stop_requested_at: Optional[float] = None
+        self.rf_off_event = asyncio.Event()  # 收尾时射频全部关闭后置位
+        self.shutdown_report: Optional[Dict[str, Any]] = None  # 最近一次收尾的射频关闭结果与停止延迟
 
     def _log(self, message: str, level: str = "INFO"):
         timestamp = datetime.now().strftime("%H:%M:%S")
@@ -51,19 +125,34 @@ class TestSequencer:
             except Exception as e:
                 self.logger.error(f"日志回调执行失败: {e}")
 
-    def initialize_instruments(self):
+    def _checkpoint(self, strategy: str, point_index: int, progress: Dict[str, Any]):
+        """保存当前测量进度 (策略、测量点序号、搜索状态)"""
+        if not self.checkpoint_callback:
+            return
+        try:
+            self.checkpoint_callback({
+                "strategy": strategy,
+                "point_index": point_index,
+                "elapsed_time": round(self._elapsed_time, 3),
+                **progress
+            })
+        except Exception as e:
+            self.logger.error(f"检查点保存失败: {e}")
+
+    def _take_resume_state(self, strategy: str) -> Optional[Dict[str, Any]]:
+        """取出与当前策略匹配的恢复进度 (只使用一次)"""
+        state, self.resume_state = self.resume_state, None
+        if state and state.get('strategy') != strategy:
+            self._log(f"检查点策略 ({state.get('strategy')}) 与当前测试 ({strategy}) 不符，从头开始", level="WARNING")
+            return None
+        return state
+
+    def _start_connects(self) -> List[_PendingConnect]:
+        """为每台已配置且尚未连接的仪表创建代理，并在其专属 I/O 线程上并发发起连接"""
         inst_config = self.config.get('instruments', {})
-        self._log("正在初始化仪器连接...")
-
-        factory_map = {
-            'vna': (VNA, "VNA"),
-            'vsg': (VSG, "VSG"),
-            'channel_emulator': (ChannelEmulator, "ChanEm"),
-            'integrated_tester': (IntegratedTester, "Tester"),
-            'spectrum_analyzer': (SpectrumAnalyzer, "SpecAn")
-        }
+        pending = []
 
-        for key, (cls, default_name) in factory_map.items():
+        for key, (cls, default_name) in INSTRUMENT_PROXIES.items():
             if key in inst_config:
                 # 避免重复初始化
                 if key in self.instruments:
@@ -72,18 +161,109 @@ class TestSequencer:
                 cfg = inst_config[key]
                 name = cfg.get('name', default_name)
                 address = cfg['address']
+                timeout_s = float(cfg.get('connect_timeout_s', DEFAULT_CONNECT_TIMEOUT_S))
 
+                self._log(f"正在连接 {name} ({address})...")
+                # transport / port: 按仪表选择 PyVISA (默认) 或原生 asyncio 套接字
+                options = {opt: cfg[opt] for opt in ('transport', 'port') if cfg.get(opt) is not None}
                 try:
-                    self._log(f"正在连接 {name} ({address})...")
-                    inst = cls(address, name=name, simulation_mode=self.simulation_mode)
-                    inst.connect()
-                    self.instruments[key] = inst
-                    self._log(f"✅ {name} 连接成功")
-                except Exception as e:
-                    err_msg = f"❌ {name} 连接失败: {e}"
-                    self._log(err_msg, level="ERROR")
-                    print(f"!!! Exception during {name} init !!!")
-                    traceback.print_exc()
+                    inst = cls(address, name=name, simulation_mode=self.simulation_mode, **options)
+                except ValueError as e:
+                    self._log(f"❌ {name} 配置错误: {e}", level="ERROR")
+                    self.init_report.append(InstrumentInitResult(
+                        key=key, name=name, address=address, success=False, elapsed_s=0.0, error=str(e)))
+                    continue
+                io = AsyncInstrument(inst, name=key, recorder=self.latency)
+                started = time.perf_counter()
+                pending.append(_PendingConnect(
+                    key=key, name=name, address=address, inst=inst, io=io,
+                    future=io.submit(inst.connect), started=started,
+                    deadline=started + timeout_s, timeout_s=timeout_s
+                ))
+        return pending
+
+    def _finish_connect(self, p: _PendingConnect, error: Optional[BaseException]) -> InstrumentInitResult:
+        """登记单台仪表的连接结果"""
+        if isinstance(error, (concurrent.futures.TimeoutError, asyncio.TimeoutError)):
+            message = f"连接超时 (>{p.timeout_s}s)"
+            elapsed = p.timeout_s
+        else:
+            message = str(error) if error else None
+            elapsed = time.perf_counter() - p.started
+
+        if error is None:
+            self.instruments[p.key] = p.inst
+            self.io[p.key] = p.io
+            self._log(f"✅ {p.name} 连接成功 ({elapsed:.2f}s)")
+        else:
+            p.io.shutdown()
+            self._log(f"❌ {p.name} 连接失败: {message}", level="ERROR")
+            if not isinstance(error, (concurrent.futures.TimeoutError, asyncio.TimeoutError)):
+                self.logger.debug("".join(traceback.format_exception(error)))
+
+        result = InstrumentInitResult(
+            key=p.key, name=p.name, address=p.address,
+            success=error is None, elapsed_s=round(elapsed, 3), error=message
+        )
+        self.init_report.append(result)
+        return result
+
+    def _summarize_init(self, results: List[InstrumentInitResult], started: float):
+        if not results:
+            return
+        wall = time.perf_counter() - started
+        serial = sum(r.elapsed_s for r in results)
+        ok = sum(1 for r in results if r.success)
+        self.init_elapsed_s = round(wall, 3)
+        self._log(f"仪器初始化完成: {ok}/{len(results)} 成功, 耗时 {wall:.2f}s (串行累计 {serial:.2f}s)")
+
+    def initialize_instruments(self) -> List[InstrumentInitResult]:
+        """
+        并发连接所有已配置的仪表。
+        每台仪表在自己的 I/O 线程上执行 connect (IDN/OPT/*RST/*OPC?)，
+        总耗时取决于最慢的一台；超过 connect_timeout_s 的仪表记为失败。
+        """
+        self._log("正在初始化仪器连接...")
+        started = time.perf_counter()
+        results = []
+        for p in self._start_connects():
+            try:
+                p.future.result(timeout=max(0.0, p.deadline - time.perf_counter()))
+                error = None
+            except Exception as e:
+                error = e
+            results.append(self._finish_connect(p, error))
+        self._summarize_init(results, started)
+        return results
+
+    async def initialize_instruments_async(self) -> List[InstrumentInitResult]:
+        """initialize_instruments 的协程版本，等待连接期间不阻塞事件循环"""
+        self._log("正在初始化仪器连接...")
+        started = time.perf_counter()
+
+        async def wait_one(p: _PendingConnect) -> InstrumentInitResult:
+            try:
+                await asyncio.wait_for(asyncio.wrap_future(p.future),
+                                       timeout=max(0.0, p.deadline - time.perf_counter()))
+                error = None
+            except Exception as e:
+                error = e
+            return self._finish_connect(p, error)
+
+        results = list(await asyncio.gather(*(wait_one(p) for p in self._start_connects())))
+        self._summarize_init(results, started)
+        return results
+
+    def _io(self, key: str) -> AsyncInstrument:
+        """获取仪表的异步包装 (按需创建，仪表对象被替换时重建)"""
+        inst = self.instruments[key]
+        wrapper = self.io.get(key)
+        if wrapper is None or wrapper.proxy is not inst:
+            if wrapper is not None:
+                wrapper.shutdown()
+            wrapper = AsyncInstrument(inst, name=key, recorder=self.latency)
+            self.io[key] = wrapper
+        return wrapper
 
     def initialize_dut(self):
         dut_conf = self.config.get('dut', {})
@@ -102,6 +282,8 @@ class TestSequencer:
         """
         阻塞干扰测试 (Blocking Test)。
         逻辑: 在主信号建立后，开启 VSG 干扰源，扫描不同频偏和功率。
+        interferer.mode 为 linear (逐点爬坡) 或 bisection (以已测频偏的门限热启动二分)，
+        各频偏的门限表记录在 results['blocking']['thresholds'] 中。
         """
         self._log(">>> 开始阻塞干扰测试 (Blocking) <<<")
         self._running = True
@@ -117,237 +299,517 @@ class TestSequencer:
             limit_bler = 0.05
 
         # 1. 建立主连接
-        if 'integrated_tester' in self.instruments:
-            try:
-                center_freq = float(main_sig.get('freq_hz', 3500e6))
-                self._log(f"建立主连接: {center_freq/1e6} MHz")
-            except ValueError:
-                self._log(f"频率参数错误: {main_sig.get('freq_hz')}", level="ERROR")
-                return
+        try:
+            center_freq = float(main_sig.get('freq_hz', 3500e6))
+        except ValueError:
+            self._log(f"频率参数错误: {main_sig.get('freq_hz')}", level="ERROR")
+            return
 
+        if 'integrated_tester' in self.instruments:
+            self._log(f"建立主连接: {center_freq/1e6} MHz")
             # self.instruments['integrated_tester'].start_call()
-            await asyncio.sleep(1)
+            await asyncio.sleep(MAIN_LINK_SETUP_S)
         else:
             self._log("未找到综测仪 (integrated_tester)，跳过建立连接", level="WARNING")
 
         # 2. 干扰扫描循环
-        start_p = interferer.get('start_power_dbm', -60)
-        end_p = interferer.get('end_power_dbm', -30)
-        step = interferer.get('step_db', 2)
-        offsets = interferer.get('freq_offsets_mhz', [])
+        try:
+            sweep = create_blocking_sweep(interferer, limit_bler)
+        except ValueError as e:
+            self._log(f"阻塞扫描配置错误: {e}", level="ERROR")
+            self._running = False
+            return
 
-        self._log(f"扫描频偏: {offsets}")
+        offsets = sweep.ordered_offsets()
+        self._log(f"扫描频偏: {offsets} (模式: {sweep.mode})")
+        detector = create_settling_detector(interferer, PROBE_SETTLE_S)
+
+        resume = self._take_resume_state('blocking')
+        if resume:
+            sweep.thresholds = list(resume.get('completed', []))
+            self._start_time = asyncio.get_event_loop().time() - float(resume.get('elapsed_time', 0.0))
+            self._log(f"从检查点恢复: 已完成 {len(sweep.thresholds)} 个频偏")
+        finished = {t['offset_mhz'] for t in sweep.thresholds}
+        point_index = sum(t['measurements'] for t in sweep.thresholds)
 
         for offset in offsets:
             if not self._running: break
+            if float(offset) in finished:
+                continue
 
             # 计算干扰频率 (复用已转换的 center_freq，确保类型安全)
             interferer_freq = center_freq + (float(offset) * 1e6)
             self._log(f"=== 测试干扰频偏: {offset} MHz (Freq: {interferer_freq/1e6} MHz) ===")
 
             if 'vsg' in self.instruments:
-                self.instruments['vsg'].set_frequency(interferer_freq)
-                self.instruments['vsg'].enable_output(True)
-
-            # 功率爬坡
-            current_p = start_p
-            while current_p <= end_p and self._running:
+                await self._io('vsg').set_frequency(interferer_freq)
+                await self._io('vsg').enable_output(True)
+
+            search = sweep.create_search(offset)
+            readings: List[List[float]] = []
+            if resume and resume.get('offset') == float(offset):
+                replayed = search.replay(resume.get('readings', []))
+                readings = [list(r) for r in resume['readings'][:replayed]]
+                self._log(f"频偏 {offset} MHz: 已回放 {replayed} 个测量点")
+
+            while self._running:
+                current_p = search.next_power()
+                if current_p is None:
+                    break
                 self._log(f"-> 干扰功率: {current_p} dBm")
                 if 'vsg' in self.instruments:
-                    self.instruments['vsg'].set_power(current_p)
-
-                await asyncio.sleep(0.5) # 测量等待
+                    await self._io('vsg').set_power(current_p)
 
-                # 模拟 BLER 和吞吐量: 功率越高，BLER 越高，吞吐量越低
-                sim_bler = 0.0
-                sim_throughput = 200.0  # 基准吞吐量 Mbps
-                if self.simulation_mode:
-                    if current_p > -40:
-                        sim_bler = (current_p + 40) * 0.05
-                        sim_throughput = max(0, 200 - (current_p + 40) * 10)
+                # 读数收敛即测量，settling_time_s 为等待上限
+                reading = await self._settle(detector, functools.partial(self._measure_blocking, current_p, offset))
+                probe = search.report(current_p, reading['bler'])
+                readings.append([current_p, reading['bler']])
 
                 # 推送实时指标到前端
                 if self.metrics_callback:
                     self._elapsed_time = asyncio.get_event_loop().time() - (self._start_time or asyncio.get_event_loop().time())
                     self.metrics_callback({
-                        "throughput_mbps": round(sim_throughput, 2),
-                        "bler": round(sim_bler, 4),
+                        "throughput_mbps": round(reading['throughput_mbps'], 2),
+                        "bler": round(reading['bler'], 4),
                         "interferer_power_dbm": current_p,
                         "freq_offset_mhz": offset,
+                        "probe_index": probe.index,
+                        "search_phase": probe.phase,
                         "elapsed_time": round(self._elapsed_time, 2)
                     })
 
-                if sim_bler > limit_bler:
-                    self._log(f"!!! 阻塞失效点: {current_p} dBm (BLER {sim_bler*100:.1f}%) !!!", level="WARNING")
-                    break
-
-                current_p += step
+                point_index += 1
+                self._elapsed_time = asyncio.get_event_loop().time() - (self._start_time or asyncio.get_event_loop().time())
+                self._checkpoint('blocking', point_index, {
+                    "completed": sweep.thresholds, "offset": float(offset), "readings": readings
+                })
 
             if 'vsg' in self.instruments:
-                self.instruments['vsg'].enable_output(False)
+                await self._io('vsg').enable_output(False)
 
+            if not search.done:
+                # 中途停止: 保留检查点中的部分测量，不写入门限表
+                break
+            entry = sweep.record(offset, search)
+            if entry['first_fail_dbm'] is not None:
+                self._log(f"!!! 阻塞失效点: {entry['first_fail_dbm']} dBm "
+                          f"(门限 {entry['threshold_dbm']} dBm, {entry['measurements']} 次测量) !!!", level="WARNING")
+            else:
+                self._log(f"频偏 {offset} MHz 在扫描范围内未失效 ({entry['measurements']} 次测量)")
+
+        self.results['blocking'] = sweep.to_dict()
+        self.results['blocking']['settling'] = detector.stats()
         self._running = False
 
+    async def _settle(self, detector: SettlingDetector,
+                      read: Callable[[], Any]) -> Dict[str, float]:
+        """等待读数稳定，返回最后一次读数作为测量结果；实际等待时间计入命令耗时统计"""
+        settle = await detector.wait(read)
+        self.latency.record("settling", "settle", settle.elapsed_s)
+        if not settle.settled:
+            self._log(f"   读数未在 {detector.max_wait_s}s 内稳定，使用最后一次读数", level="WARNING")
+        return settle.reading or {"bler": 0.0, "throughput_mbps": 0.0}
+
+    async def _measure_blocking(self, interferer_dbm: float, offset_mhz: float) -> Dict[str, float]:
+        """
+        在当前干扰功率下读取 BLER 与吞吐量。
+        模拟模式下失效拐点随 |频偏| 增大而升高 (远端干扰更易被滤除)。
+        """
+        if self.simulation_mode:
+            knee = -40.0 + 0.5 * (abs(offset_mhz) - 15.0)
+            if interferer_dbm <= knee:
+                return {"bler": 0.0, "throughput_mbps": 200.0}
+            return {"bler": (interferer_dbm - knee) * 0.05,
+                    "throughput_mbps": max(0, 200 - (interferer_dbm - knee) * 10)}
+        if 'integrated_tester' in self.instruments:
+            tester = self._io('integrated_tester')
+            return {"bler": await tester.get_bler(), "throughput_mbps": await tester.get_throughput()}
+        return {"bler": 0.0, "throughput_mbps": 0.0}
+
+    async def _measure_link(self, power_dbm: float) -> Dict[str, float]:
+        """
+        在当前下行功率下读取 BLER 与吞吐量。
+        模拟模式下使用简化的链路模型；真实模式下从综测仪读取。
+        """
+        import random
+        if self.simulation_mode:
+            bler = 0.0 if power_dbm > -100 else 0.1 * (-100 - power_dbm)
+            # 模拟吞吐量: 基准 200Mbps，随功率下降而降低
+            throughput = max(0, 200 - abs(power_dbm + 70) * 2 + random.uniform(-5, 5))
+            return {"bler": bler, "throughput_mbps": throughput}
+        if 'integrated_tester' in self.instruments:
+            tester = self._io('integrated_tester')
+            return {"bler": await tester.get_bler(), "throughput_mbps": await tester.get_throughput()}
+        return {"bler": 0.0, "throughput_mbps": 0.0}
+
     async def run_sensitivity_test(self, test_case: Dict[str, Any]):
         """
         灵敏度搜索测试 (闭环反馈控制)。
+        搜索策略由 test_case['mode'] 选择 (linear / coarse_to_fine / bisection / confidence)，
+        每个测量点记录在 results['sensitivity']['probes'] 中。
         """
-        import random
-        start_power = test_case.get('start_power', -70.0)
-        end_power = test_case.get('end_power', -110.0)
-        step = test_case.get('step', 1.0)
-        target_bler = test_case.get('target_bler', 0.05)
+        search = create_sensitivity_search(test_case)
+        target_bler = search.target_bler
+        detector = create_settling_detector(test_case, PROBE_SETTLE_S)
 
-        self._log(f">>> 开始灵敏度测试 (目标 BLER: {target_bler*100}%) <<<")
+        self._log(f">>> 开始灵敏度测试 (模式: {search.mode}, 目标 BLER: {target_bler*100}%) <<<")
         self._running = True
 
-        current_power = start_power
-        sensitivity_point = None
+        loop = asyncio.get_running_loop()
+        self._start_time = loop.time()
+        readings: List[List[float]] = []
+        resume = self._take_resume_state('sensitivity')
+        if resume:
+            replayed = search.replay(resume.get('readings', []))
+            readings = [list(r) for r in resume['readings'][:replayed]]
+            # 已用时间从检查点续计
+            self._start_time -= float(resume.get('elapsed_time', 0.0))
+            self._log(f"从检查点恢复: 已回放 {replayed} 个测量点")
+        self._elapsed_time = loop.time() - self._start_time
+
+        while self._running:
+            current_power = search.next_power()
+            if current_power is None:
+                break
 
-        while current_power >= end_power and self._running:
             self._log(f"-> 设置下行功率: {current_power} dBm")
             if 'vsg' in self.instruments:
-                self.instruments['vsg'].set_power(current_power)
+                await self._io('vsg').set_power(current_power)
 
-            await asyncio.sleep(0.5)
-
-            # 模拟 BLER 和吞吐量
-            if self.simulation_mode:
-                current_bler = 0.0 if current_power > -100 else 0.1 * ((-100 - current_power))
-                # 模拟吞吐量: 基准 200Mbps，随功率下降而降低
-                sim_throughput = max(0, 200 - abs(current_power + 70) * 2 + random.uniform(-5, 5))
-            else:
-                current_bler = 0.0
-                sim_throughput = 0.0
+            reading = await self._settle(detector, functools.partial(self._measure_link, current_power))
+            probe = search.report(current_power, reading['bler'])
+            readings.append([current_power, reading['bler']])
+            self._elapsed_time = loop.time() - self._start_time
+            self._checkpoint('sensitivity', len(readings), {"readings": readings})
 
             # 推送实时指标
             if self.metrics_callback:
                 self.metrics_callback({
-                    "throughput_mbps": round(sim_throughput, 2),
-                    "bler": round(current_bler, 4),
+                    "throughput_mbps": round(reading['throughput_mbps'], 2),
+                    "bler": round(reading['bler'], 4),
                     "power_dbm": current_power,
-                    "elapsed_time": self._elapsed_time
+                    "elapsed_time": round(self._elapsed_time, 2),
+                    "probe_index": probe.index,
+                    "search_phase": probe.phase
                 })
 
-            self._log(f"   当前 BLER: {current_bler*100:.2f}%")
-
-            if current_bler > target_bler:
-                sensitivity_point = current_power
-                self._log(f"!!! 发现灵敏度点: {current_power} dBm !!!", level="WARNING")
-                break
+            self._log(f"   当前 BLER: {reading['bler']*100:.2f}% ({'通过' if probe.passed else '失败'})")
 
-            current_power -= step
+        result = search.result()
+        self.results['sensitivity'] = result.to_dict()
+        self.results['sensitivity']['settling'] = detector.stats()
+        if result.sensitivity_dbm is not None and result.converged:
+            self._log(f"!!! 灵敏度点: {result.sensitivity_dbm} dBm "
+                      f"(首个失败点 {result.first_fail_dbm} dBm, 共 {len(result.probes)} 次测量) !!!",
+                      level="WARNING")
+        elif result.sensitivity_dbm is None and result.first_fail_dbm is not None:
+            self._log(f"起始功率 {result.first_fail_dbm} dBm 已不满足目标 BLER", level="WARNING")
+        elif result.sensitivity_dbm is not None and result.first_fail_dbm is None and search.done:
+            self._log(f"终止功率 {result.sensitivity_dbm} dBm 仍满足目标 BLER，灵敏度低于搜索范围")
 
         self._running = False
 
     async def run_dynamic_scenario(self, scenario_config: Dict[str, Any]):
-        """执行基于时间轴的动态场景"""
-        import random
+        """
+        执行基于时间轴的动态场景。
+        事件按绝对截止时间放入 TimelineScheduler，精确唤醒触发；
+        指标由独立的 MetricSampler 任务按 metrics.interval 轮询 metrics.targets，不阻塞事件下发。
+        """
         name = scenario_config.get('name', '未命名场景')
-        total_duration = scenario_config.get('total_duration', 30)
-        timeline = scenario_config.get('timeline', [])
-        metrics_interval = scenario_config.get('metrics', {}).get('interval', 0.5)
-
-        # 按时间排序事件
-        events = sorted(timeline, key=lambda x: x['time'])
+        metrics_cfg = scenario_config.get('metrics', {})
+        metrics_interval = metrics_cfg.get('interval', 0.5)
+
+        # 先编译: 动作/参数错误在触碰仪表之前全部报告
+        plan = self.compile_plan(scenario_config)
+        for issue in plan.warnings:
+            self._log(f"场景检查警告 (事件 #{issue.index}): {issue.message}", level="WARNING")
+        if not plan.ok:
+            for issue in plan.errors:
+                self._log(f"场景编译错误 (事件 #{issue.index}): {issue.message}", level="ERROR")
+            self._running = False
+            raise ValueError(f"场景编译失败: {len(plan.errors)} 个错误")
+        total_duration = plan.total_duration
 
         self._log(f">>> 开始场景: {name} (预计耗时 {total_duration}s) <<<")
-        self._start_time = asyncio.get_event_loop().time()
         self._running = True
+        scheduler = TimelineScheduler()
+        self._scheduler = scheduler
+
+        # 同一时刻的事件归为一组，组内按 YAML 书写顺序排列；调用在此预先绑定到已连接的仪表
+        dispatch_mode = scenario_config.get('dispatch', 'sequential')
+        parallel = dispatch_mode == 'parallel'
+        self.event_results = []
+        self._ramps = []
+        self._ramp_tasks = []
+        bound = {e.index: e.bind(self.instruments[e.target]) for e in plan.events if e.target in self.instruments}
+        for t, batch in plan.groups():
+            label = ", ".join(f"{e.target}.{e.action}" for e in batch)
+            scheduler.schedule_at(
+                t, functools.partial(self._dispatch_event_group, batch, t, parallel, bound),
+                kind="event", label=label
+            )
+
+        sampler = None
+        sampler_task = None
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        if self.metrics_callback and metrics_interval:
+            sources = self._metric_sources(metrics_cfg.get('targets', ['integrated_tester']))
+            self._log(f"指标采样: 每 {metrics_interval}s, 目标 {[src.name for src in sources]}")
+            sampler = MetricSampler(metrics_interval, sources, self._emit_sample)
+            sampler_task = asyncio.create_task(sampler.run(total_duration, start=start))
 
-        event_idx = 0
-        last_metrics_time = 0.0
+        try:
+            await scheduler.run(total_duration, start=start)
+        finally:
+            await self._finish_ramps()
+            self._scheduler = None
+            self._elapsed_time = scheduler.elapsed()
+            if sampler:
+                sampler.stop()
+                await sampler_task
+                self.results['sampling'] = sampler.stats()
+                self._log(f"指标采样: {sampler.samples} 个样本, 跳过 {sampler.skipped} 个, "
+                          f"实际速率 {self.results['sampling']['achieved_rate_hz']} Hz, "
+                          f"最大采集延迟 {self.results['sampling']['max_latency_ms']:.1f} ms")
+            self.timeline_records = [r.to_dict() for r in scheduler.records]
+            stats = scheduler.jitter_stats(kind="event")
+            self.results['timeline'] = {"records": self.timeline_records, "jitter": stats}
+            self._log(f"时间轴事件抖动: {stats['count']} 个触发点, "
+                      f"平均 {stats['mean_ms']:.3f} ms, 最大 {stats['max_ms']:.3f} ms")
+            self.results['events'] = list(self.event_results)
+            latencies = [r['completion_latency_ms'] for r in self.event_results if 'completion_latency_ms' in r]
+            if latencies:
+                self._log(f"事件完成延迟 ({dispatch_mode}): 最大 {max(latencies):.1f} ms")
 
-        while self._elapsed_time < total_duration and self._running:
-            # 更新已流逝时间
-            self._elapsed_time = asyncio.get_event_loop().time() - self._start_time
+        self._log(">>> 场景执行流结束 <<<")
+        self._running = False
 
-            # 检查是否有待触发的事件
-            while event_idx < len(events) and events[event_idx]['time'] <= self._elapsed_time:
-                event = events[event_idx]
-                await self._execute_event(event)
-                event_idx += 1
+    def _start_ramp(self, event: CompiledEvent, planned_time: Optional[float]):
+        """在后台启动参数斜坡；中间值由 ParameterRamp 按更新时刻现算、按速率下发"""
+        method = getattr(self.instruments[event.target], event.action)
+        io = self._io(event.target)
+        fixed = dict(event.params)
+        param = event.ramp.param
+
+        async def send(value: float):
+            call = functools.partial(method, **{**fixed, param: value})
+            if event.is_async:
+                await call()
+            else:
+                await io.run(call)
+
+        start = None
+        if planned_time is not None and self._scheduler and self._scheduler.start_time is not None:
+            # 以计划时刻为斜坡起点，派发迟到时曲线不整体后移
+            start = self._scheduler.start_time + planned_time
+        ramp = ParameterRamp(event.ramp, send, label=f"{event.target}.{event.action}.{param}")
+        self._ramps.append(ramp)
+        self._ramp_tasks.append(asyncio.create_task(ramp.run(start=start)))
+        self._log(f"启动斜坡: [{event.target}] {event.action} {param} {event.ramp.start_value} -> "
+                  f"{event.ramp.end_value} ({event.ramp.shape}, {event.ramp.duration}s, "
+                  f"最高 {event.ramp.rate_hz} Hz)")
+
+    async def _finish_ramps(self):
+        """场景结束: 中止未完成的斜坡并汇总每个斜坡的实际更新速率"""
+        for ramp in self._ramps:
+            ramp.stop()
+        if self._ramp_tasks:
+            await asyncio.gather(*self._ramp_tasks, return_exceptions=True)
+        if not self._ramps:
+            return
+        self.results['ramps'] = [ramp.stats() for ramp in self._ramps]
+        for stats in self.results['ramps']:
+            self._log(f"斜坡 {stats['label']}: 下发 {stats['sent']}/{stats['planned_updates']} 次, "
+                      f"合并 {stats['coalesced']} 次, 实际速率 {stats['achieved_rate_hz']} Hz"
+                      f"{'' if stats['completed'] else ' (未完成)'}")
+        self._ramps = []
+        self._ramp_tasks = []
+
+    def _metric_sources(self, targets: List[str]) -> List[SampleSource]:
+        """
+        将 metrics.targets 转换为采样源。
+        integrated_tester: 吞吐量/BLER/RSRP/SINR (在综测仪 I/O 线程上一次读完)；
+        dut: Modem 状态 (RSRP/RSRQ/SINR/CQI)，字段加 dut_ 前缀。
+        """
+        sources = []
+        for target in targets:
+            if target == 'integrated_tester' and target in self.instruments:
+                tester = self.instruments[target]
+                io = self._io(target)
+
+                def read_tester(tester=tester) -> Dict[str, Any]:
+                    return {
+                        "throughput_mbps": round(tester.get_throughput(), 2),
+                        "bler": round(tester.get_bler(), 4),
+                        "rsrp_dbm": round(tester.get_rsrp(), 2),
+                        "sinr_db": round(tester.get_sinr(), 2),
+                    }
 
-            # 定期采样并推送指标
-            if self.metrics_callback and (self._elapsed_time - last_metrics_time) >= metrics_interval:
-                # 模拟指标数据
-                sim_throughput = 180 + random.uniform(-20, 20)
-                sim_bler = 0.01 + random.uniform(0, 0.02)
-                self.metrics_callback({
-                    "throughput_mbps": round(sim_throughput, 2),
-                    "bler": round(sim_bler, 4),
-                    "elapsed_time": round(self._elapsed_time, 2)
-                })
-                last_metrics_time = self._elapsed_time
+                sources.append(SampleSource(target, functools.partial(io.run, read_tester)))
+            elif target == 'dut' and self.dut is not None:
+                io = self.io.get('dut')
+                if io is None or io.proxy is not self.dut:
+                    io = AsyncInstrument(self.dut, name='dut')
+                    self.io['dut'] = io
 
-            await asyncio.sleep(0.1)  # Tick 精度 100ms
+                async def read_dut(io=io) -> Dict[str, Any]:
+                    status = await io.get_modem_status()
+                    return {f"dut_{k}": v for k, v in status.to_dict().items()
+                            if k in ('rsrp', 'rsrq', 'sinr', 'cqi')}
 
-        self._log(">>> 场景执行流结束 <<<")
-        self._running = False
+                sources.append(SampleSource(target, read_dut))
+            else:
+                self._log(f"采样目标不可用: {target}", level="WARNING")
+        return sources
+
+    def _emit_sample(self, sample: Dict[str, Any]):
+        self._elapsed_time = sample['elapsed_time']
+        if self.metrics_callback:
+            self.metrics_callback(sample)
+
+    def compile_plan(self, scenario_config: Dict[str, Any]) -> CompiledPlan:
+        """按已连接仪表 (未连接的按代理类) 编译动态场景的时间轴"""
+        registry = {key: cls for key, (cls, _) in INSTRUMENT_PROXIES.items()}
+        registry.update({key: type(inst) for key, inst in self.instruments.items()})
+        return ScenarioCompiler(registry).compile_timeline(scenario_config)
+
+    async def _dispatch_event_group(self, group: Sequence[CompiledEvent], planned_time: float,
+                                    parallel: bool = False,
+                                    bound: Optional[Dict[int, Callable[[], Any]]] = None):
+        """
+        执行同一时刻的一组事件。
+        并行模式下不同仪表的事件同时下发，同一仪表的事件仍按顺序执行。
+        """
+        bound = bound or {}
+        if not parallel or len(group) == 1:
+            for event in group:
+                await self._execute_event(event, planned_time, bound.get(event.index))
+            return
 
-    async def _execute_event(self, event: Dict[str, Any]):
-        """执行单个时间轴事件"""
-        target = event.get('target')
-        action = event.get('action')
-        params = event.get('params', {})
-        comment = event.get('comment', '')
+        by_target: Dict[str, List[CompiledEvent]] = {}
+        for event in group:
+            by_target.setdefault(event.target, []).append(event)
 
-        self._log(f"执行事件: [{target}] {action} {params} {f'# {comment}' if comment else ''}")
+        async def run_lane(lane_events: List[CompiledEvent]):
+            for event in lane_events:
+                await self._execute_event(event, planned_time, bound.get(event.index))
 
-        if target in self.instruments:
-            inst = self.instruments[target]
+        await asyncio.gather(*(run_lane(lane_events) for lane_events in by_target.values()))
+
+    async def _execute_event(self, event: CompiledEvent, planned_time: Optional[float] = None,
+                             call: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+        """
+        执行单个已编译的时间轴事件，返回包含完成延迟的执行结果。
+        同步驱动调用在目标仪表的专属 I/O 线程上执行，不阻塞事件循环。
+
+        Args:
+            planned_time: 事件计划触发时间 (场景相对秒)，用于计算完成延迟
+            call: 预先绑定的调用；为空时按目标仪表现场绑定
+        """
+        target = event.target
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        self._log(f"执行事件: [{target}] {event.action} {dict(event.params)} "
+                  f"{f'# {event.comment}' if event.comment else ''}")
+
+        ok = False
+        if target in self.instruments and event.ramp is not None:
+            self._start_ramp(event, planned_time)
+            ok = True
+        elif target in self.instruments:
             try:
-                func = getattr(inst, action)
-                if asyncio.iscoroutinefunction(func):
-                    await func(**params)
+                call = call or event.bind(self.instruments[target])
+                if event.is_async:
+                    await call()
                 else:
-                    func(**params)
+                    await self._io(target).run(call)
+                ok = True
             except Exception as e:
                 self._log(f"事件执行失败: {e}", level="ERROR")
         else:
             self._log(f"未找到目标仪表: {target}", level="WARNING")
 
-    # --- Main Entry ---
+        completed = loop.time()
+        result = {
+            "time": planned_time if planned_time is not None else event.time,
+            "target": target,
+            "action": event.action,
+            "ok": ok,
+            "duration_ms": round((completed - started) * 1000.0, 3),
+        }
+        if planned_time is not None and self._scheduler and self._scheduler.start_time is not None:
+            # 完成延迟: 从计划触发时刻到事件执行完成
+            result["completion_latency_ms"] = round(
+                (completed - self._scheduler.start_time - planned_time) * 1000.0, 3)
+        self.event_results.append(result)
+        return result
 
-    async def run(self):
-        """入口函数：根据 current_scenario 分发任务"""
-        self._log(f"Config Keys: {list(self.config.keys())}")
-        # self._log(f"Scenario Keys: {list(self.current_scenario.keys()) if self.current_scenario else 'None'}")
+    # --- Main Entry ---
 
-        # 确保运行标志已开启
+    async def open_session(self):
+        """
+        建立仪表与 DUT 会话。已连接的仪表与 DUT 会被跳过 (不重复连接、不重复 *RST)，
+        因此同一 Sequencer 可在一个会话内连续执行多个场景。
+        """
         self._running = True
+        self._stop_requested_at = None
+        self.rf_off_event.clear()
+        await self.initialize_instruments_async()
+        if self.dut is None:
+            self.initialize_dut()
+
+    def _reset_scenario_state(self):
+        """清除上一场景的结果，仪表会话保持不变"""
+        self.results = {}
+        self.metrics_history = []
+        self.timeline_records = []
+        self.event_results = []
+        self._start_time = None
+        self._elapsed_time = 0.0
 
-        self.initialize_instruments()
-        self.initialize_dut()
-
-        if self.current_scenario:
-            cfg = self.current_scenario.get('config', {})
+    async def execute_scenario(self, scenario: Optional[Dict[str, Any]] = None):
+        """
+        在已建立的会话上执行单个场景；scenario 为空时执行默认灵敏度测试。
+        场景在独立任务中运行，stop() 取消该任务，正在等待的仪表命令/稳定等待立即返回。
+        """
+        self._reset_scenario_state()
+        if self._stop_requested_at is not None:
+            self._log("已收到停止信号，跳过场景")
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._execute_scenario(scenario))
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            # 只吞掉 stop() 发起的取消；外部取消继续向上传递
+            if self._stop_requested_at is None or not self._task.cancelled():
+                raise
+            self._log("场景已中止")
+        finally:
+            self._task = None
+            self._running = False
+
+    async def _execute_scenario(self, scenario: Optional[Dict[str, Any]]):
+        if scenario:
+            cfg = scenario.get('config', {})
             test_type = cfg.get('type')
-            self._log(f"加载场景文件: {self.current_scenario.get('metadata', {}).get('name', 'Unknown')}")
+            self._log(f"加载场景文件: {scenario.get('metadata', {}).get('name', 'Unknown')}")
 
-            try:
-                if test_type == 'sensitivity':
-                    # 适配灵敏度参数
-                    search_cfg = cfg.get('search', {})
-                    adapt_cfg = {
-                        "start_power": search_cfg.get('start_power_dbm'),
-                        "end_power": search_cfg.get('end_power_dbm'),
-                        "step": search_cfg.get('step_db'),
-                        "target_bler": search_cfg.get('target_bler')
-                    }
-                    await self.run_sensitivity_test(adapt_cfg)
+            if test_type == 'sensitivity':
+                # 适配灵敏度参数
+                await self.run_sensitivity_test(sensitivity_search_config(cfg.get('search', {})))
 
-                elif test_type == 'blocking':
-                    await self._run_blocking_test(cfg)
+            elif test_type == 'blocking':
+                await self._run_blocking_test(cfg)
 
-                elif test_type == 'dynamic_scenario':
-                    # 动态场景通常需要整个 config 部分（包含 timeline）
-                    await self.run_dynamic_scenario(cfg)
+            elif test_type == 'dynamic_scenario':
+                # 动态场景通常需要整个 config 部分（包含 timeline）
+                await self.run_dynamic_scenario(cfg)
 
-                else:
-                    self._log(f"未知的测试类型: {test_type}", level="ERROR")
-            finally:
-                self.cleanup()
+            else:
+                self._log(f"未知的测试类型: {test_type}", level="ERROR")
             return
 
         # Default: 灵敏度测试 Demo
@@ -357,15 +819,123 @@ class TestSequencer:
             "start_power": -90, "end_power": -110, "step": 2, "target_bler": 0.05
         }
         await self.run_sensitivity_test(default_case)
-        self.cleanup()
+
+    async def run(self):
+        """入口函数：建立会话，根据 current_scenario 分发任务，结束后断开连接"""
+        self._log(f"Config Keys: {list(self.config.keys())}")
+        # self._log(f"Scenario Keys: {list(self.current_scenario.keys()) if self.current_scenario else 'None'}")
+
+        try:
+            # 连接期间被停止或取消时同样执行收尾，释放已建立的会话与 I/O 线程
+            await self.open_session()
+            await self.execute_scenario(self.current_scenario)
+        finally:
+            await self.shutdown()
 
     def stop(self):
         self._log("收到停止信号，正在中止...")
         self._running = False
+        if self._stop_requested_at is None:
+            self._stop_requested_at = time.perf_counter()
+        if self._scheduler:
+            self._scheduler.stop()
+        for ramp in self._ramps:
+            ramp.stop()
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    async def shutdown(self):
+        """收尾协议: 先关闭所有射频输出 (无论测试如何结束)，再断开全部连接"""
+        try:
+            await self.rf_off()
+        finally:
+            await self.disconnect_all()
+
+    async def rf_off(self) -> Dict[str, Any]:
+        """
+        在各仪表的 I/O 线程上并发关闭射频输出。
+        若此前收到过停止信号，记录停止到射频全部关闭的延迟并与 safety.max_stop_latency_s 比较。
+        """
+        async def off(key: str, action: str, kwargs: Dict[str, Any]) -> Optional[str]:
+            method = getattr(self.instruments[key], action, None)
+            if method is None:
+                return None
+            io = self._io(key)
+            # 正在等待长操作 (如加载信道模型) 完成的调用会占住 I/O 线程，先中止等待，关闭射频不排在其后
+            io.abort_operation()
+            try:
+                await asyncio.wait_for(io.run(functools.partial(method, **kwargs)), RF_OFF_TIMEOUT_S)
+                return None
+            except asyncio.TimeoutError:
+                return f"超时 (>{RF_OFF_TIMEOUT_S}s)"
+            except Exception as e:
+                return str(e) or type(e).__name__
+
+        targets = [(key, *RF_OFF_ACTIONS[key]) for key in self.instruments if key in RF_OFF_ACTIONS]
+        if targets:
+            self._log("正在关闭射频输出...")
+        outcomes = await asyncio.gather(*(off(*t) for t in targets))
+        done = time.perf_counter()
+
+        errors = {t[0]: error for t, error in zip(targets, outcomes) if error}
+        for key, error in errors.items():
+            self._log(f"❌ {key} 射频关闭失败: {error}", level="ERROR")
+        report: Dict[str, Any] = {"instruments": [t[0] for t in targets], "errors": errors}
+
+        if self._stop_requested_at is not None:
+            latency = done - self._stop_requested_at
+            bound = float((self.config.get('safety') or {}).get('max_stop_latency_s', STOP_LATENCY_BOUND_S))
+            report.update({
+                "stop_to_rf_off_ms": round(latency * 1000.0, 3),
+                "bound_ms": round(bound * 1000.0, 3),
+                "within_bound": latency <= bound and not errors,
+            })
+            self.latency.record("safety", "stop_to_rf_off", latency)
+            level = "INFO" if report["within_bound"] else "ERROR"
+            self._log(f"停止到射频关闭: {latency * 1000.0:.1f} ms (上限 {bound * 1000.0:.0f} ms)", level=level)
+
+        self.shutdown_report = report
+        self.results['shutdown'] = report
+        self.rf_off_event.set()
+        return report
+
+    async def disconnect_all(self):
+        """
+        在各仪表自己的 I/O 线程上断开连接，保证断开不与仍在执行的调用并发使用会话。
+        超过 DISCONNECT_TIMEOUT_S 仍未轮到时不再等待，断开在该调用结束后执行。
+        """
+        self._log("正在断开所有仪器连接...")
+
+        async def close(key: str, inst: Any):
+            future = self._io(key).submit(inst.disconnect)
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), DISCONNECT_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                self._log(f"{key} 仍有调用在执行，断开将在其结束后完成", level="WARNING")
+            except Exception as e:
+                self._log(f"断开 {key} 时出错: {e}", level="WARNING")
+
+        await asyncio.gather(*(close(key, inst) for key, inst in self.instruments.items()))
+        self._close_io()
 
     def cleanup(self):
+        """同步收尾 (无事件循环时): 断开同样提交到各仪表的 I/O 线程执行"""
         self._log("正在断开所有仪器连接...")
-        for name, inst in self.instruments.items():
-            try: inst.disconnect()
-            except: pass
+        for key, inst in self.instruments.items():
+            wrapper = self.io.get(key)
+            try:
+                if wrapper is not None and wrapper.proxy is inst:
+                    wrapper.submit(inst.disconnect).result(DISCONNECT_TIMEOUT_S)
+                else:
+                    inst.disconnect()
+            except concurrent.futures.TimeoutError:
+                self._log(f"{key} 仍有调用在执行，断开将在其结束后完成", level="WARNING")
+            except Exception:
+                pass
+        self._close_io()
+
+    def _close_io(self):
+        for wrapper in self.io.values():
+            wrapper.shutdown()
+        self.io.clear()
         self._log("=== 测试序列关闭 ===")
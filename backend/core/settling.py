@@ -0,0 +1,116 @@
+"""
+稳定检测 - 功率步进后按读数收敛判断链路已稳定，取代固定等待
+"""
+import asyncio
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+@dataclass
+class SettleResult:
+    """单次稳定等待的结果"""
+    settled: bool  # False 表示达到等待上限仍未收敛
+    elapsed_s: float
+    samples: int
+    reading: Optional[Dict[str, float]]  # 最后一次读数，可直接作为测量结果
+
+
+class SettlingDetector:
+    """
+    读数收敛检测器。
+
+    每 interval_s 读取一次指标，最近 window 个 metric 读数的极差不超过
+    abs_tol + rel_tol·|均值| 时视为稳定；max_wait_s (场景的 settling_time_s) 为等待上限，
+    超时后使用最后一次读数继续。max_wait_s 为 0 时只读一次，不等待。
+    """
+    def __init__(self, max_wait_s: float, metric: str = "bler", window: int = 3,
+                 abs_tol: float = 0.005, rel_tol: float = 0.02, interval_s: float = 0.05,
+                 min_wait_s: float = 0.0):
+        if max_wait_s < 0:
+            raise ValueError(f"稳定等待上限不能为负: {max_wait_s}")
+        if window < 1:
+            raise ValueError(f"稳定窗口至少为 1: {window}")
+        if interval_s <= 0:
+            raise ValueError(f"采样间隔必须大于 0: {interval_s}")
+        self.max_wait_s = float(max_wait_s)
+        self.metric = metric
+        self.window = int(window)
+        self.abs_tol = float(abs_tol)
+        self.rel_tol = float(rel_tol)
+        self.interval_s = float(interval_s)
+        self.min_wait_s = float(min_wait_s)
+        self._elapsed: List[float] = []
+        self.timeouts = 0
+
+    def _stable(self, values: deque) -> bool:
+        if len(values) < self.window or any(math.isnan(v) for v in values):
+            return False
+        mean = sum(values) / len(values)
+        return max(values) - min(values) <= self.abs_tol + self.rel_tol * abs(mean)
+
+    async def wait(self, read: Callable[[], Awaitable[Dict[str, Any]]]) -> SettleResult:
+        """反复读取直到稳定或超时"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + self.max_wait_s
+        values: deque = deque(maxlen=self.window)
+        reading: Optional[Dict[str, Any]] = None
+        samples = 0
+
+        while True:
+            reading = await read()
+            samples += 1
+            value = reading.get(self.metric) if reading else None
+            values.append(float(value) if value is not None else math.nan)
+            elapsed = loop.time() - start
+
+            if self.max_wait_s == 0 or (elapsed >= self.min_wait_s and self._stable(values)):
+                settled = True
+                break
+            if loop.time() >= deadline:
+                settled = False
+                self.timeouts += 1
+                break
+            # 下一次读取按绝对时刻对齐，且不超过等待上限
+            await asyncio.sleep(max(0.0, min(start + samples * self.interval_s, deadline) - loop.time()))
+
+        elapsed = loop.time() - start
+        self._elapsed.append(elapsed)
+        return SettleResult(settled, round(elapsed, 4), samples, reading)
+
+    def stats(self) -> Dict[str, Any]:
+        """稳定等待统计"""
+        elapsed = self._elapsed or [0.0]
+        return {
+            "metric": self.metric,
+            "max_wait_s": self.max_wait_s,
+            "steps": len(self._elapsed),
+            "timeouts": self.timeouts,
+            "mean_ms": round(sum(elapsed) / len(elapsed) * 1000.0, 3),
+            "max_ms": round(max(elapsed) * 1000.0, 3),
+            "total_s": round(sum(self._elapsed), 3),
+        }
+
+
+def create_settling_detector(cfg: Dict[str, Any], default_max_s: float) -> SettlingDetector:
+    """
+    根据场景配置创建检测器。
+
+    Args:
+        cfg: 包含 settling_time_s (等待上限) 与可选 settling 段
+             (metric, window, abs_tol, rel_tol, interval_s, min_wait_s) 的字典
+        default_max_s: 未配置 settling_time_s 时的等待上限
+    """
+    options = cfg.get('settling') or {}
+    max_wait = cfg.get('settling_time_s')
+    return SettlingDetector(
+        max_wait_s=float(default_max_s if max_wait is None else max_wait),
+        metric=options.get('metric', 'bler'),
+        window=int(options.get('window', 3)),
+        abs_tol=float(options.get('abs_tol', 0.005)),
+        rel_tol=float(options.get('rel_tol', 0.02)),
+        interval_s=float(options.get('interval_s', 0.05)),
+        min_wait_s=float(options.get('min_wait_s', 0.0)),
+    )
@@ -7,7 +7,17 @@ from .spectrum_analyzer import SpectrumAnalyzer as SpectrumAnalyzer
 from .vna import VNA as VNA
 from .vsg import VSG as VSG
 
+# 配置键 -> (代理类, 默认名称)，与 config.yaml 中 instruments 的键保持一致
+INSTRUMENT_PROXIES = {
+    "vna": (VNA, "VNA"),
+    "vsg": (VSG, "VSG"),
+    "channel_emulator": (ChannelEmulator, "ChanEm"),
+    "integrated_tester": (IntegratedTester, "Tester"),
+    "spectrum_analyzer": (SpectrumAnalyzer, "SpecAn"),
+}
+
 __all__ = [
+    "INSTRUMENT_PROXIES",
     "BaseInstrument",
     "ChannelEmulator",
     "IntegratedTester",
@@ -0,0 +1,251 @@
+"""
+原生 asyncio SCPI 传输 - 通过 TCP 原始套接字 (默认端口 5025) 与仪表通信，不经过 PyVISA
+
+在 config.yaml 中按仪表选择:
+
+    instruments:
+      vsg:
+        address: "TCPIP0::192.168.1.101::inst0::INSTR"   # 或 "TCPIP0::192.168.1.101::5025::SOCKET"
+        transport: socket     # visa (默认) | socket
+        port: 5025            # 可选，地址中未指明端口时使用
+
+传输绑定到打开它的事件循环。协程接口 (write/query/read_block) 在该事件循环中直接 await，
+不经过线程；驱动的同步方法在 I/O 工作线程中调用时，通过 run_sync 把操作投递到该事件循环执行。
+没有运行中的事件循环时 (命令行工具)，传输使用自己的后台事件循环线程。
+同一连接上的操作由 asyncio.Lock 串行，查询的写入与读取不会被其他协程插入。
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+DEFAULT_SOCKET_PORT = 5025
+DEFAULT_IO_TIMEOUT_S = 5.0
+TRANSPORTS = ("visa", "socket")
+
+
+def parse_socket_address(address: str, port: Optional[int] = None) -> Tuple[str, int]:
+    """
+    从地址中取出 (主机, 端口)。
+
+    支持 "TCPIP0::<host>::<port>::SOCKET"、其他 "TCPIP0::<host>::..." 形式的 VISA 地址
+    (端口取 port 或默认 5025) 以及 "<host>:<port>"。
+    """
+    if "::" in address:
+        parts = address.split("::")
+        if not parts[0].upper().startswith("TCPIP") or len(parts) < 2:
+            raise ValueError(f"套接字传输只支持 TCPIP 地址: {address}")
+        host = parts[1]
+        if parts[-1].upper() == "SOCKET" and len(parts) >= 4:
+            return host, int(parts[2])
+        return host, int(port or DEFAULT_SOCKET_PORT)
+    host, sep, tail = address.rpartition(":")
+    if sep and tail.isdigit():
+        return host, int(tail)
+    return address, int(port or DEFAULT_SOCKET_PORT)
+
+
+class _LoopThread:
+    """没有运行中的事件循环时使用的后台事件循环"""
+    _instance: Optional["_LoopThread"] = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=self.loop.run_forever, name="scpi-socket-loop", daemon=True)
+        thread.start()
+
+    @classmethod
+    def get(cls) -> asyncio.AbstractEventLoop:
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance.loop
+
+
+class ScpiSocketTransport:
+    """
+    SCPI 原始套接字连接。
+
+    open()/close() 按使用者计数，探测连接与驱动可共享同一个传输；最后一个使用者关闭时断开。
+    I/O 超时后连接状态未知，连接会被断开，之后的操作抛出 ConnectionError 直到重新 open()。
+
+    Args:
+        loop: 绑定的事件循环；为 None 时取创建时正在运行的事件循环，都没有则使用后台事件循环
+    """
+    def __init__(self, host: str, port: int = DEFAULT_SOCKET_PORT, timeout_s: float = DEFAULT_IO_TIMEOUT_S,
+                 termination: str = "\n", loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.host = host
+        self.port = int(port)
+        self.timeout_s = float(timeout_s)
+        self.termination = termination
+        self.loop = loop
+        if self.loop is None:
+            try:
+                self.loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.loop = None
+        self.logger = logging.getLogger(f"Socket.{host}:{port}")
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()  # 首次使用时绑定事件循环
+        self._users = 0
+        self.counters: Dict[str, int] = {"writes": 0, "queries": 0, "blocks": 0, "bytes_out": 0, "bytes_in": 0,
+                                         "timeouts": 0}
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        if self.loop is None:
+            self.loop = _LoopThread.get()
+        return self.loop
+
+    def in_loop(self) -> bool:
+        """当前是否在传输绑定的事件循环中 (可以直接 await)"""
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def run_sync(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """在绑定的事件循环中执行协程并阻塞等待结果 (供 I/O 工作线程中的同步驱动方法使用)"""
+        loop = self._event_loop()
+        if self.in_loop():
+            raise RuntimeError(f"{self.address}: 不能在事件循环线程中同步调用，请使用协程接口")
+        return asyncio.run_coroutine_threadsafe(factory(), loop).result()
+
+    async def _with_timeout(self, awaitable: Awaitable[Any]) -> Any:
+        try:
+            return await asyncio.wait_for(awaitable, self.timeout_s)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            self._drop()
+            raise TimeoutError(f"{self.address}: I/O 超时 (>{self.timeout_s}s)")
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            self._drop()
+            raise ConnectionError(f"{self.address}: 连接中断: {e}")
+
+    def _drop(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+
+    async def open(self):
+        """建立连接 (已连接时只增加使用者计数)"""
+        async with self._lock:
+            if self._writer is None:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout_s)
+                self.logger.info(f"已连接 {self.address}")
+            self._users += 1
+
+    async def close(self):
+        """减少使用者计数，最后一个使用者关闭时断开"""
+        self._users = max(0, self._users - 1)
+        if self._users or self._writer is None:
+            return
+        writer = self._writer
+        self._drop()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+        self.logger.info(f"已断开 {self.address}")
+
+    def close_soon(self):
+        """同步上下文中的 close(): 在事件循环线程中排入任务，其他线程中等待完成"""
+        if self.in_loop():
+            self.loop.create_task(self.close())
+        elif self.loop is not None:
+            self.run_sync(self.close)
+
+    def _check(self):
+        if self._writer is None:
+            raise ConnectionError(f"{self.address} 未连接。")
+
+    async def _send(self, command: str):
+        data = (command + self.termination).encode("ascii")
+        self._writer.write(data)
+        await self._with_timeout(self._writer.drain())
+        self.counters["bytes_out"] += len(data)
+
+    async def write(self, command: str):
+        """发送一条指令"""
+        async with self._lock:
+            self._check()
+            await self._send(command)
+            self.counters["writes"] += 1
+
+    async def query(self, command: str) -> str:
+        """发送查询并读取一行响应"""
+        async with self._lock:
+            self._check()
+            await self._send(command)
+            line = await self._with_timeout(self._reader.readuntil(self.termination.encode("ascii")))
+            self.counters["queries"] += 1
+            self.counters["bytes_in"] += len(line)
+            return line.decode("ascii", errors="replace").strip()
+
+    async def read_block(self, command: str) -> bytes:
+        """发送查询并读取 IEEE 488.2 二进制块，返回数据部分"""
+        async with self._lock:
+            self._check()
+            await self._send(command)
+            head = await self._with_timeout(self._reader.readexactly(2))
+            if head[:1] != b"#" or not head[1:2].isdigit():
+                # 残留的响应会破坏后续读取
+                self._drop()
+                raise ValueError(f"{self.address}: 不是二进制块: {head!r}")
+            digits = int(head[1:2])
+            if digits == 0:
+                data = (await self._with_timeout(self._reader.readuntil(b"\n")))[:-1]
+            else:
+                length = int(await self._with_timeout(self._reader.readexactly(digits)))
+                data = (await self._with_timeout(self._reader.readexactly(length + 1)))[:length]
+            self.counters["blocks"] += 1
+            self.counters["bytes_in"] += len(data) + 2 + digits
+            return data
+
+    def stats(self) -> Dict[str, Any]:
+        return {"transport": "socket", "address": self.address, "open": self.is_open, **self.counters}
+
+
+class SyncSocketResource:
+    """
+    以 PyVISA 资源的同步接口 (write/query/close) 包装传输，
+    供驱动的同步方法在 I/O 工作线程中使用；每次调用投递到传输绑定的事件循环执行。
+    """
+    def __init__(self, transport: ScpiSocketTransport):
+        self.transport = transport
+
+    def write(self, message: str):
+        self.transport.run_sync(lambda: self.transport.write(message))
+
+    def query(self, command: str) -> str:
+        return self.transport.run_sync(lambda: self.transport.query(command))
+
+    def read_block(self, command: str) -> bytes:
+        return self.transport.run_sync(lambda: self.transport.read_block(command))
+
+    def close(self):
+        self.transport.close_soon()
+
+
+def create_transport(address: str, transport: Optional[str] = None, port: Optional[int] = None,
+                     timeout_s: Optional[float] = None) -> Optional[ScpiSocketTransport]:
+    """按配置创建传输；visa (默认) 返回 None，由 BaseInstrument 使用 PyVISA 会话池"""
+    kind = (transport or "visa").lower()
+    if kind not in TRANSPORTS:
+        raise ValueError(f"未知的传输类型: {transport} (可选: {', '.join(TRANSPORTS)})")
+    if kind == "visa":
+        return None
+    host, resolved_port = parse_socket_address(address, port)
+    return ScpiSocketTransport(host, resolved_port,
+                               timeout_s=DEFAULT_IO_TIMEOUT_S if timeout_s is None else timeout_s)
@@ -1,27 +1,109 @@
+import contextlib
 import logging
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import pyvisa
 
+from .async_transport import ScpiSocketTransport, SyncSocketResource
+from .scpi_metrics import scpi_metrics
+from .visa_pool import session_pool
+
+# IEEE 488.2 标准事件状态寄存器 (*ESR?) 位
+ESR_OPC = 0x01  # 操作完成
+ESR_ERRORS = 0x3C  # 查询错误 / 设备相关错误 / 执行错误 / 命令错误
+# 状态字节 (*STB?) 中的 ESB 位: *ESE 使能的事件发生后置位
+STB_ESB = 0x20
+
+# 操作完成轮询: 初始间隔、退避上限与默认超时
+OPERATION_POLL_S = 0.005
+OPERATION_MAX_POLL_S = 0.25
+DEFAULT_OPERATION_TIMEOUT_S = 60.0
+
+
+def poll_intervals(initial_s: float = OPERATION_POLL_S, max_s: float = OPERATION_MAX_POLL_S) -> Iterator[float]:
+    """指数退避的轮询间隔: 短操作很快被发现，长操作不会持续占用会话"""
+    delay = initial_s
+    while True:
+        yield delay
+        delay = min(delay * 2, max_s)
+
+
+def _block_size(length: int) -> int:
+    """定长二进制块在线路上的字节数 (#<n><长度><数据><换行>)"""
+    return 2 + len(str(length)) + length + 1
+
+
+class OperationAborted(Exception):
+    """wait_operation() 被 abort_operation() 中止 (仪表上的操作可能仍在进行)"""
+
+
+class InstrumentError(Exception):
+    """仪表错误队列 (SYST:ERR?) 中报告的错误"""
+    def __init__(self, name: str, errors: List[str]):
+        super().__init__(f"{name} 报告错误: {'; '.join(errors)}")
+        self.errors = errors
+
 
 class BaseInstrument:
     """
     通过 PyVISA 管理的所有仪器的抽象基类。
+
+    transport 为 ScpiSocketTransport 时改用原生 asyncio 套接字: 同步方法在 I/O 工作线程中照常使用，
+    write_async / query_async / read_block_async 可在事件循环中直接 await，不经过线程。
+
+    影子状态 (shadow state): 记录每个 "头部 参数" 形式设置指令最近一次写入的参数，
+    setter 通过 write_setting() 写入时，若参数与影子状态相同则跳过这次 VISA 往返。
+    *RST / *RCL / 预置 / 加载模型等会改变大量设置的指令，以及连接、断开、写入失败，都会清空影子状态。
+
+    批量写入 (batch): 在 with self.batch(): 内的写入先排队，退出时以 ";" 拼接成尽量少的消息发出，
+    每条消息不超过 MAX_MESSAGE_LENGTH；期间的查询会先发出已排队的指令。
+
+    重叠操作 (operation): begin_operation() 发出耗时指令 (扫描、加载模型、复位) 并追加 *OPC，
+    不等待其完成；完成与否由 operation_complete() 读取状态字节判断，每次只占用会话一个短查询，
+    等待期间同一会话可以继续其他 I/O。wait_operation() 以指数退避轮询直到完成。
+
+    每次实际 I/O 的耗时、字节数与错误按命令助记符记录到 scpi_metrics。
     """
+    # 写入后使全部影子状态失效的指令前缀 (大写)；子类可扩展
+    SHADOW_RESET_COMMANDS: Tuple[str, ...] = ("*RST", "*RCL", "SYST:PRES", "SYSTEM:PRESET")
+    # 单条 SCPI 消息的最大长度 (字符)；子类按仪表输入缓冲区调整
+    MAX_MESSAGE_LENGTH = 1024
+    # 读取错误队列的最大次数，防止仪表持续报错时死循环
+    MAX_ERROR_READS = 32
+    # 连接时等待 *RST 完成的超时
+    RESET_TIMEOUT_S = 30.0
+
     def __init__(self, resource_name: str, name: str = "未知仪器", simulation_mode: bool = False, reset_on_connect: bool = True):
         self.resource_name = resource_name
         self.name = name
         self.simulation_mode = simulation_mode
         self.reset_on_connect = reset_on_connect
-        self.rm = pyvisa.ResourceManager() if not simulation_mode else None
         self.instrument = None
+        self.transport: Optional[ScpiSocketTransport] = None  # 为 None 时使用 PyVISA 会话池
         self.logger = logging.getLogger(f"仪器.{name}")
         self._connected = False
         self._idn = "Unknown"
+        self._opt = ""
+        self.shadow_enabled = True
+        self._shadow: Dict[str, str] = {}  # 指令头部 -> 最近写入的参数
+        self.shadow_hits = 0  # 被跳过的冗余写入
+        self.shadow_misses = 0  # 实际发出的设置写入
+        self._batch: List[str] = []
+        self._batch_depth = 0
+        self.batched_commands = 0  # 经批量发出的指令数
+        self.batch_messages = 0  # 批量发出的消息数
+        self._abort = threading.Event()  # 中止 wait_operation() 的等待
+        self._serial_poll = True  # 会话是否支持串行轮询 (read_stb)
 
     def connect(self):
         """
         连接到仪器并执行标准初始化流程 (IDN -> OPT -> RST -> CLS)。
         """
+        # 重新连接后仪表状态未知
+        self.invalidate_shadow()
+        self._serial_poll = True
         if self.simulation_mode:
             self._connected = True
             self.logger.info(f"[模拟] 已连接到 {self.name}，地址: {self.resource_name}")
@@ -34,7 +116,12 @@ class BaseInstrument:
             return
 
         try:
-            self.instrument = self.rm.open_resource(self.resource_name)
+            if self.transport is not None:
+                self.transport.run_sync(self.transport.open)
+                self.instrument = SyncSocketResource(self.transport)
+            else:
+                # 同一地址的会话在进程内共享 (探测连接、专用驱动、后续运行复用同一会话)
+                self.instrument = session_pool.acquire(self.resource_name, self)
             self._connected = True
             self.logger.info(f"已连接到 {self.name}，地址: {self.resource_name}")
 
@@ -44,22 +131,26 @@ class BaseInstrument:
 
             # 2. 选件查询 (OPT)
             try:
-                opts = self.query("*OPT?")
-                self.logger.info(f"已安装选件 (OPT): {opts}")
+                self._opt = self.query("*OPT?")
+                self.logger.info(f"已安装选件 (OPT): {self._opt}")
             except Exception:
                 self.logger.warning("查询选件 (*OPT?) 失败或不支持")
 
             # 3. 复位与清理 (RST/CLS)
             if self.reset_on_connect:
                 self.logger.info("执行复位 (*RST)...")
-                self.write("*RST")
-                self.query("*OPC?") # 等待复位完成
+                self.begin_operation("*RST")
+                self.wait_operation(self.RESET_TIMEOUT_S)  # 等待复位完成
 
                 self.write("*CLS")
                 self.logger.info("错误队列已清除 (*CLS)")
 
         except Exception as e:
             self.logger.error(f"连接 {self.name} 失败: {e}")
+            if self.instrument is not None:
+                # 会话状态不可信，不放回池中复用
+                self._release_session(close=True)
+            self._connected = False
             raise
 
     def get_driver_info(self) -> dict:
@@ -70,59 +161,448 @@ class BaseInstrument:
             "driver_class": self.__class__.__name__,
             "driver_module": self.__class__.__module__,
             "resource_name": self.resource_name,
-            "idn": getattr(self, "_idn", "Unknown")
+            "idn": getattr(self, "_idn", "Unknown"),
+            "opt": self._opt,
+            "shadow": self.shadow_stats(),
+            "batch": {"commands": self.batched_commands, "messages": self.batch_messages}
         }
 
     def disconnect(self):
         """
-        断开与仪器的连接。
+        断开与仪器的连接 (会话归还给会话池，闲置超时后才真正关闭)。
         """
+        self.invalidate_shadow()
         if self.instrument:
             try:
-                self.instrument.close()
+                self._release_session()
                 self._connected = False
                 self.logger.info(f"已断开与 {self.name} 的连接")
             except Exception as e:
                 self.logger.error(f"断开 {self.name} 连接时出错: {e}")
 
+    def _release_session(self, close: bool = False):
+        if self.transport is not None:
+            self.transport.close_soon()
+        else:
+            session_pool.release(self.resource_name, self, close=close)
+        self.instrument = None
+
     def write(self, command: str):
         """
-        向仪器写入 SCPI 指令。
+        向仪器写入 SCPI 指令 (批量写入期间只排队)。
         """
+        if self._batch_depth:
+            self._batch.append(command.strip())
+            self._update_shadow(command)
+            return
+
         if self.simulation_mode:
             self.logger.debug(f"[模拟] 写入 {self.name}: {command}")
+            self._update_shadow(command)
             return
 
         if not self._connected or not self.instrument:
             raise ConnectionError(f"{self.name} 未连接。")
+        started = time.perf_counter()
         try:
             self.instrument.write(command)
             self.logger.debug(f"写入 {self.name}: {command}")
         except Exception as e:
+            self._record_io(command, started, len(command) + 1, error=e)
+            # 写入是否生效未知
+            self.invalidate_shadow()
             self.logger.error(f"写入 {self.name} 时出错: {e}")
             raise
+        self._record_io(command, started, len(command) + 1)
+        self._update_shadow(command)
+
+    def _record_io(self, command: str, started: float, bytes_out: int, bytes_in: int = 0,
+                   error: Optional[BaseException] = None):
+        scpi_metrics.record(self.name, self.resource_name, command, time.perf_counter() - started,
+                            bytes_out, bytes_in, error)
+
+    @contextlib.contextmanager
+    def batch(self, check_errors: bool = False) -> Iterator["BaseInstrument"]:
+        """
+        批量写入上下文，可嵌套 (由最外层发出)。
+
+        Args:
+            check_errors: 发出后读取一次错误队列，有错误时抛出 InstrumentError
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 or check_errors:
+                self.flush()
+        if check_errors:
+            errors = self.read_errors()
+            if errors:
+                raise InstrumentError(self.name, errors)
+
+    def flush(self):
+        """发出已排队的批量指令"""
+        if not self._batch:
+            return
+        commands, self._batch = self._batch, []
+        messages = self._pack(commands)
+        self.batched_commands += len(commands)
+        self.batch_messages += len(messages)
+
+        if self.simulation_mode:
+            for message in messages:
+                self.logger.debug(f"[模拟] 批量写入 {self.name}: {message}")
+            return
+        if not self._connected or not self.instrument:
+            self.invalidate_shadow()
+            raise ConnectionError(f"{self.name} 未连接。")
+        try:
+            for message in messages:
+                started = time.perf_counter()
+                try:
+                    self.instrument.write(message)
+                except Exception as e:
+                    self._record_io(message, started, len(message) + 1, error=e)
+                    raise
+                self._record_io(message, started, len(message) + 1)
+                self.logger.debug(f"批量写入 {self.name}: {message}")
+        except Exception as e:
+            self.invalidate_shadow()
+            self.logger.error(f"批量写入 {self.name} 时出错: {e}")
+            raise
+
+    def _pack(self, commands: List[str]) -> List[str]:
+        """以 ";" 拼接指令；非公共指令加前导 ":" 从根路径解析"""
+        messages: List[str] = []
+        current = ""
+        for command in commands:
+            if not current:
+                current = command
+                continue
+            part = command if command.startswith(("*", ":")) else f":{command}"
+            if len(current) + 1 + len(part) > self.MAX_MESSAGE_LENGTH:
+                messages.append(current)
+                current = command
+            else:
+                current = f"{current};{part}"
+        if current:
+            messages.append(current)
+        return messages
+
+    def read_errors(self) -> List[str]:
+        """读空错误队列，返回其中的错误 (不含 "0,No error")"""
+        if self.simulation_mode:
+            return []
+        errors = []
+        for _ in range(self.MAX_ERROR_READS):
+            reply = self.query("SYST:ERR?")
+            if self._is_no_error(reply):
+                break
+            errors.append(reply)
+        return errors
+
+    @staticmethod
+    def _is_no_error(reply: str) -> bool:
+        code = reply.split(",", 1)[0].strip()
+        return code.lstrip("+-").isdigit() and int(code) == 0
+
+    def begin_operation(self, command: str):
+        """
+        发出重叠指令并立即返回，不等待其完成。
+
+        先读一次 *ESR? 清除此前遗留的事件位 (读取即清零)，再以一条消息发出 "*ESE 61;<指令>;*OPC":
+        指令完成 (或出错) 时标准事件状态寄存器置位，状态字节的 ESB 位随之置位，由 operation_complete() 读取。
+        不发 *CLS，此前指令留在错误队列 (SYST:ERR?) 中的错误保留给调用方读取。
+        """
+        self._abort.clear()
+        if not self.simulation_mode:
+            stale = int(float(self.query("*ESR?")))
+            if stale & ESR_ERRORS:
+                self.logger.warning(f"{self.name} 此前的指令报告了错误 (*ESR? = {stale})，错误保留在错误队列中")
+        with self.batch():
+            self.write(f"*ESE {ESR_OPC | ESR_ERRORS}")
+            self.write(command)
+            self.write("*OPC")
+
+    def read_status_byte(self) -> int:
+        """
+        读取状态字节。会话支持时使用串行轮询 read_stb；
+        不支持串行轮询的会话 (如 VISA ::SOCKET 资源) 调用失败后改用 *STB?，之后不再尝试。
+        """
+        if self.simulation_mode:
+            return STB_ESB
+        self.flush()
+        if not self._connected or not self.instrument:
+            raise ConnectionError(f"{self.name} 未连接。")
+        read_stb = getattr(self.instrument, "read_stb", None) if self._serial_poll else None
+        if read_stb is not None:
+            started = time.perf_counter()
+            try:
+                stb = int(read_stb())
+            except Exception as e:
+                self._record_io("*STB?", started, 0, error=e)
+                self._serial_poll = False
+                self.logger.info(f"{self.name} 不支持串行轮询 ({e})，改用 *STB? 查询状态字节")
+            else:
+                self._record_io("*STB?", started, 0)
+                return stb
+        return int(float(self.query("*STB?")))
+
+    def operation_complete(self) -> bool:
+        """
+        轮询一次 begin_operation() 发出的操作是否完成。
+        事件状态寄存器报告错误时读出错误队列并抛出 InstrumentError。
+        """
+        if self.simulation_mode:
+            return True
+        if not self.read_status_byte() & STB_ESB:
+            return False
+        return self._check_event_status(int(float(self.query("*ESR?"))))
+
+    def _check_event_status(self, esr: int) -> bool:
+        if esr & ESR_ERRORS:
+            errors = self.read_errors() or [f"*ESR? = {esr}"]
+            raise InstrumentError(self.name, errors)
+        return bool(esr & ESR_OPC)
+
+    def wait_operation(self, timeout_s: float = DEFAULT_OPERATION_TIMEOUT_S):
+        """
+        轮询直到 begin_operation() 发出的操作完成 (轮询间隔指数退避)。
+        超时抛出 TimeoutError；abort_operation() 中止等待时抛出 OperationAborted。
+        """
+        deadline = time.monotonic() + timeout_s
+        for delay in poll_intervals():
+            if self.operation_complete():
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{self.name} 操作未在 {timeout_s}s 内完成")
+            if self._abort.wait(min(delay, remaining)):
+                raise OperationAborted(f"{self.name} 的操作等待已中止")
+
+    def abort_operation(self):
+        """
+        让 I/O 线程中正在 wait_operation() 的调用在当前轮询间隔内返回，会话随即可用于其他指令
+        (如停止时关闭射频)。可从任意线程调用，下一次 begin_operation() 时复位。
+        """
+        self._abort.set()
+
+    def write_setting(self, command: str) -> bool:
+        """
+        写入设置指令 ("头部 参数")，参数与影子状态相同时跳过。
+        返回 True 表示指令已发出。射频输出开关不走此方法: 面板、联锁或其他会话可能已改动输出状态，
+        关闭射频必须每次都发出。
+        """
+        key = self._shadow_key(command)
+        if self.shadow_enabled and key is not None and self._shadow.get(key[0]) == key[1]:
+            self.shadow_hits += 1
+            self.logger.debug(f"跳过冗余写入 {self.name}: {command}")
+            return False
+        self.shadow_misses += 1
+        self.write(command)
+        return True
+
+    def invalidate_shadow(self):
+        """清空影子状态，之后的设置写入都会发出"""
+        self._shadow.clear()
+
+    def shadow_stats(self) -> dict:
+        """影子状态命中统计"""
+        total = self.shadow_hits + self.shadow_misses
+        return {
+            "enabled": self.shadow_enabled,
+            "hits": self.shadow_hits,
+            "misses": self.shadow_misses,
+            "hit_rate": round(self.shadow_hits / total, 3) if total else 0.0,
+            "tracked": len(self._shadow)
+        }
+
+    @staticmethod
+    def _shadow_key(command: str) -> Optional[Tuple[str, str]]:
+        """拆分为 (大写头部, 参数)；无参数的指令和查询不跟踪"""
+        header, _, args = command.strip().partition(" ")
+        args = args.strip()
+        if not args or header.endswith("?") or header.startswith("*"):
+            return None
+        return header.upper(), args
+
+    def _update_shadow(self, command: str):
+        upper = command.strip().upper()
+        if upper.startswith(self.SHADOW_RESET_COMMANDS):
+            self.invalidate_shadow()
+            return
+        key = self._shadow_key(command)
+        if key is not None:
+            self._shadow[key[0]] = key[1]
 
     def query(self, command: str) -> str:
         """
-        写入指令并读取响应。
+        写入指令并读取响应 (先发出已排队的批量指令)。
         """
+        self.flush()
         if self.simulation_mode:
             self.logger.debug(f"[模拟] 查询 {self.name}: {command} -> SIM_DATA")
             return "SIM_DATA"
 
         if not self._connected or not self.instrument:
             raise ConnectionError(f"{self.name} 未连接。")
+        started = time.perf_counter()
         try:
             response = self.instrument.query(command)
-            self.logger.debug(f"查询 {self.name}: {command} -> {response.strip()}")
-            return response.strip()
         except Exception as e:
+            self._record_io(command, started, len(command) + 1, error=e)
+            self.logger.error(f"查询 {self.name} 时出错: {e}")
+            raise
+        self._record_io(command, started, len(command) + 1, len(response))
+        self.logger.debug(f"查询 {self.name}: {command} -> {response.strip()}")
+        return response.strip()
+
+    def query_block(self, command: str) -> memoryview:
+        """
+        查询 IEEE 488.2 二进制块 (#<n><长度><数据>) 并返回数据部分 (不复制)。
+        先读块头得到长度，再按长度读取，数据中的换行字节不会截断读取；
+        块后的换行只在仪表发出时读取 (只以 EOI 结束的仪表没有)。
+        """
+        self.flush()
+        if self.simulation_mode:
+            self.logger.debug(f"[模拟] 二进制查询 {self.name}: {command}")
+            return memoryview(b"")
+
+        if not self._connected or not self.instrument:
+            raise ConnectionError(f"{self.name} 未连接。")
+        started = time.perf_counter()
+        if self.transport is not None:
+            try:
+                data = self.instrument.read_block(command)
+            except Exception as e:
+                self._record_io(command, started, len(command) + 1, error=e)
+                raise
+            self._record_io(command, started, len(command) + 1, _block_size(len(data)))
+            return memoryview(data)
+        try:
+            self.instrument.write(command)
+            head = bytes(self.instrument.read_bytes(2))
+            if head[:1] != b"#" or not head[1:2].isdigit():
+                raise ValueError(f"不是二进制块: {head!r}")
+            digits = int(head[1:2])
+            if digits == 0:
+                # 不定长块: 数据直到结束符
+                data = self.instrument.read_raw()
+                # 只去掉一个结束符，数据末尾的 0x0A 字节保留
+                payload = memoryview(data)[:len(data) - 1 if data.endswith(b"\n") else len(data)]
+            else:
+                length = int(bytes(self.instrument.read_bytes(digits)))
+                payload = memoryview(self.instrument.read_bytes(length))
+                if getattr(self.instrument, "last_status", None) == \
+                        pyvisa.constants.StatusCode.success_max_count_read:
+                    # 读满长度时尚未收到 END: 仪表还发了结束符
+                    self.instrument.read_bytes(1)
+            self.logger.debug(f"二进制查询 {self.name}: {command} -> {len(payload)} 字节")
+        except Exception as e:
+            self._record_io(command, started, len(command) + 1, error=e)
+            self.logger.error(f"二进制查询 {self.name} 时出错: {e}")
+            raise
+        self._record_io(command, started, len(command) + 1, _block_size(len(payload)))
+        return payload
+
+    # --- 原生异步 I/O (transport: socket) ---
+
+    def _native(self) -> ScpiSocketTransport:
+        if self.transport is None:
+            raise TypeError(f"{self.name} 未使用原生异步传输 (transport: socket)")
+        if not self._connected:
+            raise ConnectionError(f"{self.name} 未连接。")
+        return self.transport
+
+    async def write_async(self, command: str):
+        """write() 的协程版本，在传输绑定的事件循环中直接执行"""
+        if self.simulation_mode:
+            self.logger.debug(f"[模拟] 写入 {self.name}: {command}")
+            self._update_shadow(command)
+            return
+        transport = self._native()
+        started = time.perf_counter()
+        try:
+            await transport.write(command)
+            self.logger.debug(f"写入 {self.name}: {command}")
+        except Exception as e:
+            self._record_io(command, started, len(command) + 1, error=e)
+            self.invalidate_shadow()
+            self.logger.error(f"写入 {self.name} 时出错: {e}")
+            raise
+        self._record_io(command, started, len(command) + 1)
+        self._update_shadow(command)
+
+    async def write_setting_async(self, command: str) -> bool:
+        """write_setting() 的协程版本"""
+        key = self._shadow_key(command)
+        if self.shadow_enabled and key is not None and self._shadow.get(key[0]) == key[1]:
+            self.shadow_hits += 1
+            return False
+        self.shadow_misses += 1
+        await self.write_async(command)
+        return True
+
+    async def query_async(self, command: str) -> str:
+        """query() 的协程版本"""
+        if self.simulation_mode:
+            return "SIM_DATA"
+        transport = self._native()
+        started = time.perf_counter()
+        try:
+            response = await transport.query(command)
+        except Exception as e:
+            self._record_io(command, started, len(command) + 1, error=e)
             self.logger.error(f"查询 {self.name} 时出错: {e}")
             raise
+        self._record_io(command, started, len(command) + 1, len(response) + 1)
+        self.logger.debug(f"查询 {self.name}: {command} -> {response}")
+        return response
+
+    async def operation_complete_async(self) -> bool:
+        """operation_complete() 的协程版本"""
+        if self.simulation_mode:
+            return True
+        if not int(float(await self.query_async("*STB?"))) & STB_ESB:
+            return False
+        esr = int(float(await self.query_async("*ESR?")))
+        if esr & ESR_ERRORS:
+            errors = []
+            for _ in range(self.MAX_ERROR_READS):
+                reply = await self.query_async("SYST:ERR?")
+                if self._is_no_error(reply):
+                    break
+                errors.append(reply)
+            raise InstrumentError(self.name, errors or [f"*ESR? = {esr}"])
+        return bool(esr & ESR_OPC)
+
+    async def read_block_async(self, command: str) -> memoryview:
+        """query_block() 的协程版本"""
+        if self.simulation_mode:
+            return memoryview(b"")
+        transport = self._native()
+        started = time.perf_counter()
+        try:
+            data = await transport.read_block(command)
+        except Exception as e:
+            self._record_io(command, started, len(command) + 1, error=e)
+            self.logger.error(f"二进制查询 {self.name} 时出错: {e}")
+            raise
+        self._record_io(command, started, len(command) + 1, _block_size(len(data)))
+        return memoryview(data)
 
     def reset(self):
         """
         重置仪器到已知状态。
         """
-        self.write("*RST")
-        self.write("*CLS")
+        with self.batch():
+            self.write("*RST")
+            self.write("*CLS")
+
+    def preset(self):
+        """
+        系统预置 (SYST:PRES)，影子状态随之失效。
+        """
+        self.write("SYST:PRES")
+        self.invalidate_shadow()
@@ -1,6 +1,7 @@
 import logging
+from typing import Optional
 
-from .base_instrument import BaseInstrument
+from .async_transport import create_transport
 from .common.generic_ce import GenericChannelEmulator
 from .factory import DriverFactory
 
@@ -9,10 +10,13 @@ class ChannelEmulator:
     """
     信道模拟器代理类 (Proxy)。
     """
-    def __init__(self, resource_name: str, name: str = "ChanEm_Proxy", simulation_mode: bool = False):
+    def __init__(self, resource_name: str, name: str = "ChanEm_Proxy", simulation_mode: bool = False,
+                 transport: Optional[str] = None, port: Optional[int] = None):
         self.resource_name = resource_name
         self.name = name
         self.simulation_mode = simulation_mode
+        # transport: socket 时使用原生 asyncio 套接字 (在事件循环中创建时绑定该事件循环)
+        self.transport = create_transport(resource_name, transport, port) if not simulation_mode else None
         self.logger = logging.getLogger(f"Proxy.{name}")
         self._driver: GenericChannelEmulator = None
 
@@ -21,19 +25,13 @@ class ChannelEmulator:
             # 模拟 Keysight PROPSIM F64
             fake_idn = "Keysight,PROPSIM F64,Simulated,v10.2"
             self.logger.info(f"[模拟] 识别到 IDN: {fake_idn}")
-            self._driver = DriverFactory.create_chan_em_driver(self.resource_name, fake_idn, True)
-            self._driver.connect()
+            self._driver = DriverFactory.connect_driver("channel_emulator", self.resource_name, True, simulated_idn=fake_idn)
             return
 
         try:
-            temp_inst = BaseInstrument(self.resource_name, "Temp_Probe")
-            temp_inst.connect()
-            idn = temp_inst.query("*IDN?")
-            temp_inst.disconnect()
-
-            self.logger.info(f"设备 IDN: {idn}")
-            self._driver = DriverFactory.create_chan_em_driver(self.resource_name, idn, self.simulation_mode)
-            self._driver.connect()
+            # 身份缓存命中时直接加载专用驱动，未命中时先以不复位的探测连接读取 IDN；仪表只复位一次
+            self._driver = DriverFactory.connect_driver("channel_emulator", self.resource_name, self.simulation_mode,
+                                                        transport=self.transport)
         except Exception as e:
             self.logger.error(f"初始化驱动失败: {e}")
             raise
@@ -48,6 +46,12 @@ class ChannelEmulator:
     def load_channel_model(self, model: str):
         self._check(); self._driver.load_channel_model(model)
 
+    def start_load_channel_model(self, model: str):
+        self._check(); self._driver.start_load_channel_model(model)
+
+    def operation_complete(self) -> bool:
+        self._check(); return self._driver.operation_complete()
+
     def set_input_power(self, power_dbm: float):
         self._check(); self._driver.set_input_power(power_dbm)
 
@@ -5,6 +5,10 @@ class GenericChannelEmulator(BaseInstrument):
     """
     通用信道模拟器驱动 (Generic SCPI Channel Emulator).
     """
+    # 加载信道模型/场景文件会改写路损、速度等设置
+    SHADOW_RESET_COMMANDS = BaseInstrument.SHADOW_RESET_COMMANDS + (
+        "MEM:LOAD", "CALCULATE:FILTER:FILE", "CALC:FILT:FILE", "SYS:FILE:LOAD"
+    )
 
     def __init__(self, resource_name: str, name: str = "Generic_CE", simulation_mode: bool = False):
         super().__init__(resource_name, name, simulation_mode)
@@ -15,25 +19,35 @@ class GenericChannelEmulator(BaseInstrument):
         """
         self.logger.warning("通用驱动未实现 set_velocity")
 
-    def load_channel_model(self, model: str):
+    # 加载信道模型的默认超时
+    MODEL_LOAD_TIMEOUT_S = 120.0
+
+    def start_load_channel_model(self, model: str):
         """
-        [标准接口] 加载信道模型文件。
+        [标准接口] 开始加载信道模型文件并立即返回，完成由 operation_complete() / wait_operation() 判断。
         """
         self.logger.warning("通用驱动使用标准 MEM:LOAD 指令，可能不适用。")
-        self.write(f"MEM:LOAD:MODEL '{model}'")
+        self.begin_operation(f"MEM:LOAD:MODEL '{model}'")
+
+    def load_channel_model(self, model: str):
+        """
+        [标准接口] 加载信道模型文件并等待完成。
+        """
+        self.start_load_channel_model(model)
+        self.wait_operation(self.MODEL_LOAD_TIMEOUT_S)
 
     def set_input_power(self, power_dbm: float):
         """
         [标准接口] 设置输入端口期望功率电平。
         """
-        self.write(f"INP:POW {power_dbm}")
+        self.write_setting(f"INP:POW {power_dbm}")
         self.logger.info(f"设置输入功率: {power_dbm} dBm")
 
     def set_output_power(self, power_dbm: float):
         """
         [标准接口] 设置输出端口功率（或增益）。
         """
-        self.write(f"OUTP:POW {power_dbm}")
+        self.write_setting(f"OUTP:POW {power_dbm}")
         self.logger.info(f"设置输出功率: {power_dbm} dBm")
 
     def rf_on(self):
@@ -63,7 +77,7 @@ class GenericChannelEmulator(BaseInstrument):
         TODO: 核对手册确认 SCPI 语法 (当前为占位符)
         """
         # 占位符指令，实际语法需查阅设备手册
-        self.write(f"CHAN:LOSS {db}")
+        self.write_setting(f"CHAN:LOSS {db}")
         self.logger.info(f"设置路径损耗: {db} dB")
 
     def set_distance(self, km: float):
@@ -73,7 +87,7 @@ class GenericChannelEmulator(BaseInstrument):
 
         TODO: 核对手册确认 SCPI 语法 (当前为占位符)
         """
-        self.write(f"CHAN:DIST {km}")
+        self.write_setting(f"CHAN:DIST {km}")
         self.logger.info(f"设置模拟距离: {km} km")
 
     def set_fading_profile(self, profile: str, duration_ms: int = 0):
@@ -1,3 +1,5 @@
+import numpy as np
+
 from drivers.base_instrument import BaseInstrument
 
 
@@ -39,7 +41,7 @@ class GenericSA(BaseInstrument):
             self.logger.error(f"无法解析峰值: {val}")
             return -999.0
 
-    def get_trace_data(self) -> list:
+    def get_trace_data(self) -> np.ndarray:
         """[标准接口] 获取 Trace 1 数据"""
         self.logger.warning("通用驱动不支持读取 Trace 数据，请使用专用驱动。")
-        return []
+        return np.empty(0, dtype=np.float32)
@@ -11,9 +11,10 @@ class GenericVNA(BaseInstrument):
 
     def set_frequency_sweep(self, start_freq: float, stop_freq: float, points: int):
         """[标准接口] 配置频率扫描"""
-        self.write(f"SENSE:FREQ:START {start_freq}")
-        self.write(f"SENSE:FREQ:STOP {stop_freq}")
-        self.write(f"SENSE:SWEEP:POINTS {points}")
+        with self.batch():
+            self.write(f"SENSE:FREQ:START {start_freq}")
+            self.write(f"SENSE:FREQ:STOP {stop_freq}")
+            self.write(f"SENSE:SWEEP:POINTS {points}")
         self.logger.info(f"设置扫描: {start_freq}-{stop_freq} Hz, {points} pts")
 
     def set_power(self, power_dbm: float):
@@ -25,8 +26,17 @@ class GenericVNA(BaseInstrument):
         """[标准接口] 复位仪器状态"""
         self.write("SYST:PRESET")
 
+    def start_sweep(self):
+        """[标准接口] 触发单次扫描并立即返回，完成由 operation_complete() / wait_operation() 判断"""
+        self.begin_operation("INIT:IMM")
+
+    def fetch_s_parameter(self, parameter: str = "S21") -> str:
+        """[标准接口] 读取已完成扫描的数据"""
+        return self.query("CALC:DATA? FDATA")
+
     def measure_s_parameter(self, parameter: str = "S21") -> str:
         """[标准接口] 测量 S 参数并返回数据"""
         self.logger.warning("通用驱动仅触发扫描，不保证数据格式正确。")
-        self.write("INIT:IMM; *WAI")
-        return self.query("CALC:DATA? FDATA")
+        self.start_sweep()
+        self.wait_operation()
+        return self.fetch_s_parameter(parameter)
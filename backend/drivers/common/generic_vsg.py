@@ -14,14 +14,14 @@ class GenericVSG(BaseInstrument):
         """
         [标准接口] 设置射频频率 (Standard SCPI: FREQ).
         """
-        self.write(f"FREQ {hz}")
+        self.write_setting(f"FREQ {hz}")
         self.logger.info(f"设置频率: {hz} Hz")
 
     def set_power(self, dbm: float):
         """
         [标准接口] 设置射频功率 (Standard SCPI: POW).
         """
-        self.write(f"POW {dbm}")
+        self.write_setting(f"POW {dbm}")
         self.logger.info(f"设置功率: {dbm} dBm")
 
     def enable_output(self, enable: bool):
@@ -32,6 +32,21 @@ class GenericVSG(BaseInstrument):
         self.write(f"OUTP {state}")
         self.logger.info(f"射频输出: {state}")
 
+    # --- 原生异步版本 (transport: socket 时由 AsyncInstrument 直接 await) ---
+
+    async def set_frequency_async(self, hz: float):
+        await self.write_setting_async(f"FREQ {hz}")
+        self.logger.info(f"设置频率: {hz} Hz")
+
+    async def set_power_async(self, dbm: float):
+        await self.write_setting_async(f"POW {dbm}")
+        self.logger.info(f"设置功率: {dbm} dBm")
+
+    async def enable_output_async(self, enable: bool):
+        state = "ON" if enable else "OFF"
+        await self.write_async(f"OUTP {state}")
+        self.logger.info(f"射频输出: {state}")
+
     def load_waveform(self, waveform_name: str):
         """
         [标准接口] 加载波形文件。
@@ -1,5 +1,8 @@
 import logging
-from typing import Any, Type
+from typing import Any, Dict, Optional, Tuple, Type
+
+from .async_transport import ScpiSocketTransport
+from .base_instrument import BaseInstrument
 
 # Channel Emulator
 from .common.generic_ce import GenericChannelEmulator
@@ -15,6 +18,7 @@ from .common.generic_vna import GenericVNA
 
 # VSG
 from .common.generic_vsg import GenericVSG
+from .identity_cache import IdentityCache, InstrumentIdentity, identity_cache
 from .keysight.propsim import PROPSIM_Driver
 from .rohde_schwarz.cmw500 import CMW500_Driver
 from .rohde_schwarz.fsw import FSW_Driver
@@ -33,6 +37,15 @@ CE_REGISTRY = {
     "F64": PROPSIM_Driver
 }
 
+# 仪表类别 (config.yaml 中 instruments 的键) -> (注册表, 通用驱动)
+KIND_REGISTRY: Dict[str, Tuple[dict, Type]] = {
+    "vsg": (VSG_REGISTRY, GenericVSG),
+    "spectrum_analyzer": (SA_REGISTRY, GenericSA),
+    "vna": (VNA_REGISTRY, GenericVNA),
+    "integrated_tester": (TESTER_REGISTRY, GenericTester),
+    "channel_emulator": (CE_REGISTRY, GenericChannelEmulator),
+}
+
 class DriverFactory:
     """
     驱动工厂，负责根据仪表 IDN 自动创建对应的驱动实例。
@@ -41,15 +54,95 @@ class DriverFactory:
         self.logger = logging.getLogger("DriverFactory")
 
     @staticmethod
-    def _create_driver(resource_name: str, idn_string: str, registry: dict, default_class: Type, simulation_mode: bool) -> Any:
+    def _select(idn_string: str, registry: dict, default_class: Type) -> Tuple[str, Type]:
+        """按 IDN 选择驱动，返回 (驱动实例名称, 驱动类)"""
         logger = logging.getLogger("DriverFactory")
         for keyword, driver_class in registry.items():
             if keyword in idn_string:
                 logger.info(f"识别到仪表 ({keyword})，加载驱动: {driver_class.__name__}")
-                return driver_class(resource_name, name=keyword, simulation_mode=simulation_mode)
+                return keyword, driver_class
 
         logger.warning(f"未识别的仪表 IDN ('{idn_string}')，加载通用驱动: {default_class.__name__}")
-        return default_class(resource_name, name="Generic", simulation_mode=simulation_mode)
+        return "Generic", default_class
+
+    @staticmethod
+    def _create_driver(resource_name: str, idn_string: str, registry: dict, default_class: Type, simulation_mode: bool) -> Any:
+        name, driver_class = DriverFactory._select(idn_string, registry, default_class)
+        return driver_class(resource_name, name=name, simulation_mode=simulation_mode)
+
+    @staticmethod
+    def _cached_class(kind: str, class_name: str) -> Optional[Type]:
+        registry, default_class = KIND_REGISTRY[kind]
+        for driver_class in (*registry.values(), default_class):
+            if driver_class.__name__ == class_name:
+                return driver_class
+        return None
+
+    @staticmethod
+    def _instantiate(driver_class: Type, resource_name: str, name: str,
+                     transport: Optional[ScpiSocketTransport]) -> Any:
+        driver = driver_class(resource_name, name=name, simulation_mode=False)
+        driver.transport = transport
+        return driver
+
+    @staticmethod
+    def connect_driver(kind: str, resource_name: str, simulation_mode: bool = False,
+                       simulated_idn: str = "", cache: Optional[IdentityCache] = None,
+                       transport: Optional[ScpiSocketTransport] = None) -> Any:
+        """
+        识别仪表、创建并连接对应的驱动。
+
+        热启动 (身份缓存命中) 时直接实例化缓存的驱动类，连接时读到的 IDN 用于校验；
+        冷启动时先以不复位的探测连接读取 IDN。两种情况下仪表都只复位一次
+        (热启动校验不一致且驱动类改变时除外)。模拟模式使用 simulated_idn，不读写缓存。
+        transport 为套接字传输时，探测连接与驱动共用该连接。
+        """
+        logger = logging.getLogger("DriverFactory")
+        registry, default_class = KIND_REGISTRY[kind]
+        if simulation_mode:
+            driver = DriverFactory._create_driver(resource_name, simulated_idn, registry, default_class, True)
+            driver.connect()
+            return driver
+
+        cache = cache if cache is not None else identity_cache
+        cached = cache.get(resource_name, kind)
+        driver_class = DriverFactory._cached_class(kind, cached.driver_class) if cached else None
+        if driver_class is not None:
+            logger.info(f"身份缓存命中 {resource_name}: {cached.idn}，直接加载驱动: {driver_class.__name__}")
+            driver = DriverFactory._instantiate(driver_class, resource_name, cached.driver_name, transport)
+            try:
+                driver.connect()
+            except Exception:
+                cache.forget(resource_name)
+                raise
+            if driver._idn != cached.idn:
+                logger.warning(f"{resource_name} 的 IDN 与缓存不一致 ('{cached.idn}' -> '{driver._idn}')，重新选择驱动")
+                cache.forget(resource_name, mismatch=True)
+                name, driver_class = DriverFactory._select(driver._idn, registry, default_class)
+                if type(driver) is not driver_class:
+                    replaced = driver
+                    driver = DriverFactory._instantiate(driver_class, resource_name, name, transport)
+                    try:
+                        driver.connect()
+                    finally:
+                        replaced.disconnect()
+        else:
+            # 冷启动: 探测连接只读取身份，不复位；驱动连接后才释放探测连接，两者共用同一会话
+            probe = BaseInstrument(resource_name, "Temp_Probe", reset_on_connect=False)
+            probe.transport = transport
+            probe.connect()
+            try:
+                logger.info(f"设备 IDN: {probe._idn}")
+                name, driver_class = DriverFactory._select(probe._idn, registry, default_class)
+                driver = DriverFactory._instantiate(driver_class, resource_name, name, transport)
+                driver.connect()
+            finally:
+                probe.disconnect()
+
+        cache.store(InstrumentIdentity(
+            resource_name=resource_name, kind=kind, idn=driver._idn, opt=driver._opt,
+            driver_class=type(driver).__name__, driver_name=driver.name))
+        return driver
 
     @staticmethod
     def create_vsg_driver(resource_name: str, idn_string: str, simulation_mode: bool = False) -> GenericVSG:
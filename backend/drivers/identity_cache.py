@@ -0,0 +1,107 @@
+"""
+仪表身份缓存 - 按 VISA 地址持久化 IDN、OPT 与选定的驱动类
+
+冷启动时代理先用不复位的探测连接读取 IDN，再由工厂选择驱动；结果写入缓存。
+热启动时直接实例化缓存中的驱动类，驱动连接时读到的 IDN 即用于校验，
+与缓存不一致 (换了仪表或升级了固件) 时重新选择驱动并更新缓存。
+"""
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  "instrument_identity.json")
+
+
+@dataclass
+class InstrumentIdentity:
+    """一个地址上的仪表身份"""
+    resource_name: str
+    kind: str  # 仪表类别 (vsg / spectrum_analyzer / ...)
+    idn: str
+    opt: str
+    driver_class: str
+    driver_name: str  # 驱动实例名称 (识别到的关键字或 Generic)
+    updated_at: float = 0.0
+
+
+class IdentityCache:
+    """
+    JSON 文件持久化的身份缓存；每次写入后立即落盘。
+
+    Args:
+        path: 缓存文件路径，为 None 时只保存在内存中
+    """
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH):
+        self.path = path
+        self.logger = logging.getLogger("IdentityCache")
+        self._lock = threading.Lock()
+        self._entries: Dict[str, InstrumentIdentity] = {}
+        self.hits = 0
+        self.misses = 0
+        self.mismatches = 0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                raw = json.load(f) or {}
+            self._entries = {address: InstrumentIdentity(**entry) for address, entry in raw.items()}
+        except (OSError, ValueError, TypeError) as e:
+            self.logger.warning(f"身份缓存 {self.path} 无法读取，忽略: {e}")
+            self._entries = {}
+
+    def _save(self):
+        if not self.path:
+            return
+        data = {address: asdict(entry) for address, entry in self._entries.items()}
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            self.logger.warning(f"身份缓存 {self.path} 写入失败: {e}")
+
+    def get(self, resource_name: str, kind: str) -> Optional[InstrumentIdentity]:
+        """取得该地址的缓存身份；类别不符时视为未命中"""
+        with self._lock:
+            entry = self._entries.get(resource_name)
+            if entry is None or entry.kind != kind:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry
+
+    def store(self, identity: InstrumentIdentity):
+        identity.updated_at = time.time()
+        with self._lock:
+            self._entries[identity.resource_name] = identity
+            self._save()
+
+    def forget(self, resource_name: str, mismatch: bool = False):
+        """删除缓存项 (连接失败或 IDN 校验不一致时)"""
+        with self._lock:
+            if mismatch:
+                self.mismatches += 1
+            if self._entries.pop(resource_name, None) is not None:
+                self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "mismatches": self.mismatches}
+
+
+# 进程内共享的身份缓存
+identity_cache = IdentityCache()
@@ -1,6 +1,7 @@
 import logging
+from typing import Optional
 
-from .base_instrument import BaseInstrument
+from .async_transport import create_transport
 from .common.generic_tester import GenericTester
 from .factory import DriverFactory
 
@@ -9,10 +10,13 @@ class IntegratedTester:
     """
     综测仪代理类 (Proxy)。
     """
-    def __init__(self, resource_name: str, name: str = "Tester_Proxy", simulation_mode: bool = False):
+    def __init__(self, resource_name: str, name: str = "Tester_Proxy", simulation_mode: bool = False,
+                 transport: Optional[str] = None, port: Optional[int] = None):
         self.resource_name = resource_name
         self.name = name
         self.simulation_mode = simulation_mode
+        # transport: socket 时使用原生 asyncio 套接字 (在事件循环中创建时绑定该事件循环)
+        self.transport = create_transport(resource_name, transport, port) if not simulation_mode else None
         self.logger = logging.getLogger(f"Proxy.{name}")
         self._driver: GenericTester = None
 
@@ -20,19 +24,13 @@ class IntegratedTester:
         if self.simulation_mode:
             fake_idn = "Rohde&Schwarz,CMW,Simulated,1.0"
             self.logger.info(f"[模拟] 识别到 IDN: {fake_idn}")
-            self._driver = DriverFactory.create_tester_driver(self.resource_name, fake_idn, True)
-            self._driver.connect()
+            self._driver = DriverFactory.connect_driver("integrated_tester", self.resource_name, True, simulated_idn=fake_idn)
             return
 
         try:
-            temp_inst = BaseInstrument(self.resource_name, "Temp_Probe")
-            temp_inst.connect()
-            idn = temp_inst.query("*IDN?")
-            temp_inst.disconnect()
-
-            self.logger.info(f"设备 IDN: {idn}")
-            self._driver = DriverFactory.create_tester_driver(self.resource_name, idn, self.simulation_mode)
-            self._driver.connect()
+            # 身份缓存命中时直接加载专用驱动，未命中时先以不复位的探测连接读取 IDN；仪表只复位一次
+            self._driver = DriverFactory.connect_driver("integrated_tester", self.resource_name, self.simulation_mode,
+                                                        transport=self.transport)
         except Exception as e:
             self.logger.error(f"初始化驱动失败: {e}")
             raise
@@ -1,3 +1,4 @@
+from drivers.base_instrument import InstrumentError
 from drivers.common.generic_ce import GenericChannelEmulator
 
 
@@ -10,13 +11,24 @@ class PROPSIM_Driver(GenericChannelEmulator):
     def __init__(self, resource_name: str, name: str = "Keysight_PROPSIM", simulation_mode: bool = False):
         super().__init__(resource_name, name, simulation_mode)
 
-    def load_channel_model(self, model: str):
+    def start_load_channel_model(self, model: str):
         """
-        加载仿真模型。
+        开始加载仿真模型，不等待加载完成。
         """
         self.logger.info(f"PROPSIM 加载模型: {model}")
         # 根据 PROPSIM ATE 语法，参数间空格，字符串通常不带引号
-        self.write(f"CALCulate:FILTer:FILE {model}")
+        self.begin_operation(f"CALCulate:FILTer:FILE {model}")
+
+    def load_channel_model(self, model: str):
+        """
+        加载仿真模型并等待完成。
+        """
+        self.start_load_channel_model(model)
+        try:
+            self.wait_operation(self.MODEL_LOAD_TIMEOUT_S)
+        except InstrumentError as e:
+            self.logger.error(f"PROPSIM 加载模型报错: {e}")
+            return
 
         # 检查错误
         err = self.query("SYSTem:ERRor?")
@@ -31,7 +43,7 @@ class PROPSIM_Driver(GenericChannelEmulator):
         """
         self.logger.info(f"PROPSIM 设置速度: {kmh} km/h")
         # 对通道 1 设置速度
-        self.write(f"DIAGnostic:SIMUlation:MOBilespeed:MANual:CH 1,{kmh}")
+        self.write_setting(f"DIAGnostic:SIMUlation:MOBilespeed:MANual:CH 1,{kmh}")
 
     def rf_on(self):
         """
@@ -60,7 +72,7 @@ class PROPSIM_Driver(GenericChannelEmulator):
         # 增益设置 (负值表示衰减)
         # DIAG:SIMU:GAIN:CH <channel>,<gain_dB>
         attenuation = -abs(db)  # 路损为负增益
-        self.write(f"DIAG:SIMU:GAIN:CH 1,{attenuation}")
+        self.write_setting(f"DIAG:SIMU:GAIN:CH 1,{attenuation}")
         self.logger.info(f"PROPSIM 设置路径损耗: {db} dB (通道 1)")
 
     def set_distance(self, km: float):
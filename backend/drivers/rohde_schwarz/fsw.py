@@ -1,3 +1,5 @@
+import numpy as np
+
 from drivers.common.generic_sa import GenericSA
 
 
@@ -9,20 +11,35 @@ class FSW_Driver(GenericSA):
     def __init__(self, resource_name: str, name: str = "RS_FSW", simulation_mode: bool = False):
         super().__init__(resource_name, name, simulation_mode)
 
-    def get_trace_data(self) -> list:
+    def get_trace_data(self) -> np.ndarray:
         """
         [重写] 读取 Trace 1 的幅度数据 (dBm)。
+        以 REAL,32 二进制块传输，直接按小端 float32 解释为数组 (只读，不复制)。
+        """
+        try:
+            # 数据格式只在变化时下发 (影子状态)，两条设置合并为一条消息
+            with self.batch():
+                self.write_setting("FORM REAL,32")
+                self.write_setting("FORM:BORD SWAP")
+            block = self.query_block("TRAC:DATA? TRACE1")
+            points = np.frombuffer(block, dtype="<f4")
+            self.logger.info(f"成功读取 Trace 1，共 {len(points)} 个点")
+            return points
+        except Exception as e:
+            self.logger.error(f"读取 Trace 失败: {e}")
+            return np.empty(0, dtype=np.float32)
+
+    def get_trace_data_ascii(self) -> list:
+        """
+        [扩展] 以 ASCII 格式读取 Trace 1 (逗号分隔)，用于兼容旧固件与性能对比。
         """
-        # R&S 格式: TRACe:DATA? TRACE1 -> 返回逗号分隔的 ASCII 字符串
         try:
-            # 确保数据格式为 ASCII
-            self.write("FORM:DATA ASC")
+            self.write_setting("FORM ASC")
             raw_data = self.query("TRAC:DATA? TRACE1")
 
             if not raw_data:
                 return []
 
-            # 解析数据
             points = [float(x) for x in raw_data.split(',')]
             self.logger.info(f"成功读取 Trace 1，共 {len(points)} 个点")
             return points
@@ -9,21 +9,38 @@ class ZNA_Driver(GenericVNA):
     def __init__(self, resource_name: str, name: str = "RS_ZNA", simulation_mode: bool = False):
         super().__init__(resource_name, name, simulation_mode)
 
-    def measure_s_parameter(self, parameter: str = "S21") -> str:
+    def configure_trace(self, parameter: str = "S21"):
         """
-        [重写] 完整配置 Trace 并测量。
+        定义并显示测量 Trace，数据格式设为 Magnitude dB。
         """
         trace_name = f"Trc_{parameter}"
-        # 1. 定义 Trace: CALC1:PAR:DEF 'Trc_S21', 'S21'
-        self.write(f"CALC1:PAR:DEF '{trace_name}', '{parameter}'")
-        # 2. 显示 Trace: DISP:WIND1:TRAC1:FEED 'Trc_S21'
-        self.write(f"DISP:WIND1:TRAC1:FEED '{trace_name}'")
+        # 配置指令合并为一条消息
+        with self.batch():
+            # 1. 定义 Trace: CALC1:PAR:DEF 'Trc_S21', 'S21'
+            self.write(f"CALC1:PAR:DEF '{trace_name}', '{parameter}'")
+            # 2. 显示 Trace: DISP:WIND1:TRAC1:FEED 'Trc_S21'
+            self.write(f"DISP:WIND1:TRAC1:FEED '{trace_name}'")
+            # 3. 格式化数据 (Real, Imag 或 Magnitude depending on format)，默认设为 Magnitude dB
+            self.write("CALC1:FORM MLOG")
 
-        # 3. 触发并等待
-        self.write("INIT1:IMM; *WAI")
+    def start_sweep(self):
+        """
+        [重写] 触发通道 1 单次扫描并立即返回。
+        """
+        self.begin_operation("INIT1:IMM")
 
-        # 4. 读取格式化数据 (Real, Imag 或 Magnitude depending on format)
-        # 默认设为 Magnitude dB
-        self.write("CALC1:FORM MLOG")
-        data = self.query("CALC1:DATA? FDAT")
-        return data
+    def fetch_s_parameter(self, parameter: str = "S21") -> str:
+        """
+        [重写] 读取通道 1 的格式化数据。
+        """
+        return self.query("CALC1:DATA? FDAT")
+
+    def measure_s_parameter(self, parameter: str = "S21") -> str:
+        """
+        [重写] 完整配置 Trace 并测量。
+        """
+        self.configure_trace(parameter)
+        # 4. 触发并等待扫描完成 (轮询状态字节，不阻塞会话)
+        self.start_sweep()
+        self.wait_operation()
+        return self.fetch_s_parameter(parameter)
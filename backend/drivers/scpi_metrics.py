@@ -0,0 +1,202 @@
+"""
+SCPI 命令级性能统计 - 按 (仪表地址, 命令助记符) 记录耗时直方图、字节数、错误与超时
+
+BaseInstrument 的每次实际 I/O (写入、查询、二进制块、状态字节) 都记录到进程内共享的 scpi_metrics，
+模拟模式与影子状态跳过的写入不产生 I/O，也不记录。每条记录只有一次加锁与若干次加法，始终开启。
+
+助记符取指令头部并去掉数字后缀 ("CALC1:DATA? FDAT" -> "CALC:DATA?")，同类指令跨通道合并统计；
+批量发出的消息按其中第一条非公共指令归类 ("*ESE 61;:INIT1:IMM;*OPC" -> "INIT:IMM")。
+
+统计是累计值；mark() 取得当前快照，since(mark) 给出此后的增量，用于按运行保存。
+"""
+import bisect
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pyvisa
+
+# 直方图桶上界 (毫秒)，最后一个桶收纳更慢的调用
+BUCKET_BOUNDS_MS: Tuple[float, ...] = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0,
+                                       1000.0, 2500.0, 5000.0, 10000.0)
+
+_SUFFIX = re.compile(r"(?<=[A-Za-z])\d+")
+
+
+def command_mnemonic(command: str) -> str:
+    """SCPI 消息的命令助记符 (大写、去数字后缀，查询保留 "?")"""
+    parts = [p.strip().lstrip(":") for p in command.split(";")]
+    parts = [p for p in parts if p]
+    if not parts:
+        return ""
+    head = next((p for p in parts if not p.startswith("*")), parts[0])
+    header = head.split(None, 1)[0].upper()
+    return header if header.startswith("*") else _SUFFIX.sub("", header)
+
+
+def is_timeout(error: BaseException) -> bool:
+    """I/O 超时 (套接字传输的 TimeoutError 或 VISA 的 VI_ERROR_TMO)"""
+    return isinstance(error, TimeoutError) or \
+        getattr(error, "error_code", None) == pyvisa.constants.StatusCode.error_timeout
+
+
+class CommandStats:
+    """一个 (仪表, 助记符) 的累计统计"""
+    __slots__ = ("instrument", "count", "total_ms", "min_ms", "max_ms", "buckets", "bytes_out", "bytes_in",
+                 "errors", "timeouts")
+
+    def __init__(self, instrument: str):
+        self.instrument = instrument
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms: Optional[float] = None
+        self.max_ms: Optional[float] = None
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def add(self, ms: float, bytes_out: int, bytes_in: int, error: Optional[BaseException]):
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+        self.max_ms = ms if self.max_ms is None else max(self.max_ms, ms)
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.bytes_out += bytes_out
+        self.bytes_in += bytes_in
+        if error is not None:
+            self.errors += 1
+            if is_timeout(error):
+                self.timeouts += 1
+
+    def copy(self) -> "CommandStats":
+        other = CommandStats(self.instrument)
+        for slot in self.__slots__:
+            value = getattr(self, slot)
+            setattr(other, slot, list(value) if slot == "buckets" else value)
+        return other
+
+    def minus(self, base: "CommandStats") -> "CommandStats":
+        """相对 base 的增量 (min/max 无法相减，取累计值)"""
+        delta = self.copy()
+        delta.count -= base.count
+        delta.total_ms -= base.total_ms
+        delta.buckets = [a - b for a, b in zip(self.buckets, base.buckets)]
+        delta.bytes_out -= base.bytes_out
+        delta.bytes_in -= base.bytes_in
+        delta.errors -= base.errors
+        delta.timeouts -= base.timeouts
+        return delta
+
+    def merge(self, other: "CommandStats"):
+        """累加另一份统计"""
+        self.count += other.count
+        self.total_ms += other.total_ms
+        for attr, pick in (("min_ms", min), ("max_ms", max)):
+            values = [v for v in (getattr(self, attr), getattr(other, attr)) if v is not None]
+            setattr(self, attr, pick(values) if values else None)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.bytes_out += other.bytes_out
+        self.bytes_in += other.bytes_in
+        self.errors += other.errors
+        self.timeouts += other.timeouts
+
+    @classmethod
+    def from_dict(cls, row: Dict[str, Any]) -> "CommandStats":
+        stats = cls(row["instrument"])
+        for key in ("count", "total_ms", "min_ms", "max_ms", "bytes_out", "bytes_in", "errors", "timeouts"):
+            setattr(stats, key, row[key])
+        histogram = list(row.get("histogram") or [])
+        stats.buckets = histogram if len(histogram) == len(stats.buckets) else stats.buckets
+        return stats
+
+    def percentile(self, q: float) -> Optional[float]:
+        """由直方图估计分位数 (取所在桶的上界，最后一个桶取最大值)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                bound = BUCKET_BOUNDS_MS[i] if i < len(BUCKET_BOUNDS_MS) else self.max_ms
+                return round(min(bound, self.max_ms), 3)
+        return round(self.max_ms, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "instrument": self.instrument,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "min_ms": round(self.min_ms, 3) if self.min_ms is not None else None,
+            "max_ms": round(self.max_ms, 3) if self.max_ms is not None else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "histogram": list(self.buckets),
+            "bytes_out": self.bytes_out,
+            "bytes_in": self.bytes_in,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+        }
+
+
+def merge_stats(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """合并同一 (仪表地址, 助记符) 的两条统计行 (to_dict 格式)"""
+    merged = CommandStats.from_dict(a)
+    merged.merge(CommandStats.from_dict(b))
+    merged.instrument = b["instrument"]
+    return {"resource_name": b["resource_name"], "command": b["command"], **merged.to_dict()}
+
+
+class ScpiMetrics:
+    """按 (仪表地址, 命令助记符) 汇总的 SCPI 统计，由各仪表的 I/O 线程与事件循环写入"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], CommandStats] = {}
+
+    def record(self, instrument: str, resource_name: str, command: str, elapsed_s: float,
+               bytes_out: int = 0, bytes_in: int = 0, error: Optional[BaseException] = None):
+        key = (resource_name, command_mnemonic(command))
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = CommandStats(instrument)
+            stats.instrument = instrument
+            stats.add(elapsed_s * 1000.0, bytes_out, bytes_in, error)
+
+    def mark(self) -> Dict[Tuple[str, str], CommandStats]:
+        """当前累计值的快照"""
+        with self._lock:
+            return {key: stats.copy() for key, stats in self._stats.items()}
+
+    def since(self, mark: Dict[Tuple[str, str], CommandStats],
+              resources: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """mark 之后的增量 (只含有新调用的命令)；resources 限定仪表地址"""
+        wanted = set(resources) if resources is not None else None
+        rows = []
+        for (resource, command), stats in self.mark().items():
+            if wanted is not None and resource not in wanted:
+                continue
+            base = mark.get((resource, command))
+            delta = stats.minus(base) if base is not None else stats
+            if delta.count:
+                rows.append({"resource_name": resource, "command": command, **delta.to_dict()})
+        return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+    def snapshot(self, instrument: Optional[str] = None) -> List[Dict[str, Any]]:
+        """累计统计，按总耗时降序；instrument 可为仪表名称或地址"""
+        rows = self.since({})
+        if instrument is not None:
+            rows = [r for r in rows if instrument in (r["instrument"], r["resource_name"])]
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+# 进程内共享的 SCPI 统计
+scpi_metrics = ScpiMetrics()
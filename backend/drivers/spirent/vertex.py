@@ -1,3 +1,4 @@
+from drivers.base_instrument import InstrumentError
 from drivers.common.generic_ce import GenericChannelEmulator
 
 
@@ -10,19 +11,29 @@ class Vertex_Driver(GenericChannelEmulator):
     def __init__(self, resource_name: str, name: str = "Spirent_Vertex", simulation_mode: bool = False):
         super().__init__(resource_name, name, simulation_mode)
 
-    def load_channel_model(self, model: str):
+    def start_load_channel_model(self, model: str):
         """
-        加载场景文件 (.scn)。
+        开始加载场景文件 (.scn)，不等待加载完成。
         """
         if not model.endswith(".scn"):
             model += ".scn"
 
         self.logger.info(f"Vertex 加载场景: {model}")
         # 根据 RPI 规范加载
-        self.write(f"SYS:FILE:LOAD '{model}'")
+        self.begin_operation(f"SYS:FILE:LOAD '{model}'")
+
+    def load_channel_model(self, model: str):
+        """
+        加载场景文件 (.scn) 并等待完成。
+        """
+        self.start_load_channel_model(model)
+        try:
+            self.wait_operation(self.MODEL_LOAD_TIMEOUT_S)
+        except InstrumentError as e:
+            self.logger.error(f"Vertex 加载场景失败: {e}")
+            return
 
         # 验证加载结果
-        res = self.query("*OPC?")
         err = self.query(":ERR?")
         if "0," not in err and "No Error" not in err:
             self.logger.error(f"Vertex 加载场景失败: {err}")
@@ -37,7 +48,7 @@ class Vertex_Driver(GenericChannelEmulator):
         """
         self.logger.info(f"Vertex 设置速度: {kmh} km/h (Target: CH1/Path1)")
         # 假设当前模型处于 GCM 模式，或者 Vertex 能智能识别
-        self.write(f"CHM1:GCM:PATH1:MSVelocity {kmh}")
+        self.write_setting(f"CHM1:GCM:PATH1:MSVelocity {kmh}")
 
     def rf_on(self):
         """
@@ -59,9 +70,9 @@ class Vertex_Driver(GenericChannelEmulator):
         Note: 需要设置 LOSSMode 为 SET_LOSS 模式才生效
         """
         # 先确保 LossMode 设为 SET_LOSS
-        self.write("SYS:CONn:LOSSMode SET_LOSS")
+        self.write_setting("SYS:CONn:LOSSMode SET_LOSS")
         # 设置 Port A1 的损耗 (假设主链路使用 A1)
-        self.write(f"SYS:PORT:A1:LOSS {db}")
+        self.write_setting(f"SYS:PORT:A1:LOSS {db}")
         self.logger.info(f"Vertex 设置路径损耗: {db} dB (Port A1)")
 
     def set_distance(self, km: float):
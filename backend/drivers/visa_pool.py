@@ -0,0 +1,233 @@
+"""
+VISA 会话池 - 进程内共享一个 ResourceManager，按资源地址复用已打开的会话
+
+驱动连接时从池中取会话，断开时归还而不是关闭；同一地址的探测连接、专用驱动、
+后续的 TestSequencer 实例与健康检查都复用同一个会话，省去重复的 open/close。
+归还后闲置超过 idle_timeout_s 的会话会被关闭；持有者被回收却未归还的会话记为泄漏并回收。
+取/还会话时顺带检查；start_maintenance() 启动的后台线程在没有新的取/还时也定期检查。
+
+同一会话可以同时被多个持有者引用，调用方需保证对同一台仪表的 I/O 串行
+(Sequencer 中每台仪表只有一个 I/O 线程)。
+"""
+import atexit
+import logging
+import threading
+import time
+import traceback
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import pyvisa
+
+# 归还后会话保持打开的时间
+DEFAULT_IDLE_TIMEOUT_S = 300.0
+# 后台维护线程的检查间隔
+DEFAULT_MAINTAIN_INTERVAL_S = 30.0
+
+_rm: Optional[pyvisa.ResourceManager] = None
+_rm_lock = threading.Lock()
+
+
+def get_resource_manager() -> pyvisa.ResourceManager:
+    """进程内唯一的 ResourceManager (首次使用时创建)"""
+    global _rm
+    with _rm_lock:
+        if _rm is None:
+            _rm = pyvisa.ResourceManager()
+        return _rm
+
+
+@dataclass
+class _Holder:
+    ref: weakref.ref
+    name: str
+    acquired_at: float
+    site: str  # 取会话的调用位置，泄漏时用于定位
+
+
+@dataclass
+class PooledSession:
+    """池中的一个已打开会话"""
+    resource_name: str
+    resource: Any
+    opened_at: float
+    holders: Dict[int, _Holder] = field(default_factory=dict)
+    idle_since: Optional[float] = None
+    uses: int = 0
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            "resource_name": self.resource_name,
+            "holders": sorted(h.name for h in self.holders.values()),
+            "uses": self.uses,
+            "age_s": round(now - self.opened_at, 3),
+            "idle_s": round(now - self.idle_since, 3) if self.idle_since is not None else None,
+        }
+
+
+def _call_site() -> str:
+    frames = traceback.extract_stack(limit=6)[:-3]
+    return " <- ".join(f"{f.name} ({f.filename.rsplit('/', 1)[-1]}:{f.lineno})" for f in reversed(frames))
+
+
+class VisaSessionPool:
+    """
+    按资源地址复用 VISA 会话。
+
+    Args:
+        open_resource: 打开会话的函数，默认使用共享 ResourceManager 的 open_resource
+        idle_timeout_s: 会话无人持有后保持打开的时间
+    """
+    def __init__(self, open_resource: Optional[Callable[[str], Any]] = None,
+                 idle_timeout_s: float = DEFAULT_IDLE_TIMEOUT_S):
+        self._open = open_resource or (lambda name: get_resource_manager().open_resource(name))
+        self.idle_timeout_s = float(idle_timeout_s)
+        self.logger = logging.getLogger("VisaPool")
+        self._sessions: Dict[str, PooledSession] = {}
+        self._lock = threading.Lock()
+        self._address_locks: Dict[str, threading.Lock] = {}
+        self.counters = {"opened": 0, "reused": 0, "closed": 0, "evicted": 0, "leaked": 0}
+        self._maintainer: Optional[threading.Thread] = None
+        self._maintainer_stop = threading.Event()
+
+    def _address_lock(self, resource_name: str) -> threading.Lock:
+        with self._lock:
+            return self._address_locks.setdefault(resource_name, threading.Lock())
+
+    def acquire(self, resource_name: str, owner: Any) -> Any:
+        """取得该地址的会话 (已打开则复用)；同一持有者重复获取不会重复计数"""
+        self.maintain()
+        key = id(owner)
+        # 打开会话可能耗时数秒，只锁该地址，不阻塞其他仪表的并发连接
+        with self._address_lock(resource_name):
+            with self._lock:
+                session = self._sessions.get(resource_name)
+            if session is None:
+                resource = self._open(resource_name)
+                session = PooledSession(resource_name, resource, opened_at=time.monotonic())
+                self.counters["opened"] += 1
+                self.logger.info(f"打开 VISA 会话: {resource_name}")
+            elif key not in session.holders:
+                self.counters["reused"] += 1
+                self.logger.debug(f"复用 VISA 会话: {resource_name}")
+            with self._lock:
+                self._sessions[resource_name] = session
+                if key not in session.holders:
+                    session.holders[key] = _Holder(weakref.ref(owner), getattr(owner, 'name', type(owner).__name__),
+                                                   time.monotonic(), _call_site())
+                    session.uses += 1
+                session.idle_since = None
+            return session.resource
+
+    def release(self, resource_name: str, owner: Any, close: bool = False):
+        """
+        归还会话。没有其他持有者时进入闲置 (close=True 时立即关闭，用于会话状态可疑的情况)。
+        """
+        with self._lock:
+            session = self._sessions.get(resource_name)
+            if session is None:
+                return
+            session.holders.pop(id(owner), None)
+            if session.holders:
+                return
+            if close:
+                del self._sessions[resource_name]
+            else:
+                session.idle_since = time.monotonic()
+        if close:
+            self._close(session, "关闭")
+        self.maintain()
+
+    def _close(self, session: PooledSession, reason: str):
+        try:
+            session.resource.close()
+        except Exception as e:
+            self.logger.warning(f"关闭 VISA 会话 {session.resource_name} 时出错: {e}")
+        self.counters["closed"] += 1
+        self.logger.info(f"{reason} VISA 会话: {session.resource_name}")
+
+    def check_leaks(self) -> List[Dict[str, Any]]:
+        """找出持有者已被回收却未归还的会话引用，记录并回收"""
+        leaks = []
+        with self._lock:
+            for session in self._sessions.values():
+                for key, holder in list(session.holders.items()):
+                    if holder.ref() is None:
+                        del session.holders[key]
+                        leaks.append({"resource_name": session.resource_name, "holder": holder.name,
+                                      "site": holder.site})
+                        if not session.holders:
+                            session.idle_since = time.monotonic()
+        for leak in leaks:
+            self.counters["leaked"] += 1
+            self.logger.warning(f"VISA 会话泄漏: {leak['resource_name']} 由 {leak['holder']} 取得后未归还 "
+                                f"({leak['site']})")
+        return leaks
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """关闭闲置超时的会话，返回关闭的数量"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [s for s in self._sessions.values()
+                       if not s.holders and s.idle_since is not None and now - s.idle_since >= self.idle_timeout_s]
+            for session in expired:
+                del self._sessions[session.resource_name]
+        for session in expired:
+            self.counters["evicted"] += 1
+            self._close(session, "闲置超时，关闭")
+        return len(expired)
+
+    def maintain(self):
+        """泄漏检查 + 闲置淘汰 (在取/还会话时顺带执行，也由后台维护线程定期执行)"""
+        self.check_leaks()
+        self.evict_idle()
+
+    def start_maintenance(self, interval_s: float = DEFAULT_MAINTAIN_INTERVAL_S):
+        """启动后台维护线程，每 interval_s 秒执行一次 maintain() (已启动则忽略)"""
+        if self._maintainer is not None and self._maintainer.is_alive():
+            return
+        self._maintainer_stop.clear()
+
+        def loop():
+            while not self._maintainer_stop.wait(interval_s):
+                try:
+                    self.maintain()
+                except Exception as e:
+                    self.logger.error(f"VISA 会话池维护失败: {e}")
+
+        self._maintainer = threading.Thread(target=loop, name="visa-pool-maintain", daemon=True)
+        self._maintainer.start()
+
+    def stop_maintenance(self):
+        """停止后台维护线程"""
+        self._maintainer_stop.set()
+        if self._maintainer is not None:
+            self._maintainer.join(timeout=5.0)
+            self._maintainer = None
+
+    def close_all(self):
+        """关闭全部会话 (进程退出时)"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            self._close(session, "关闭")
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            sessions = [s.to_dict(now) for s in self._sessions.values()]
+        return {
+            **self.counters,
+            "maintaining": self._maintainer is not None and self._maintainer.is_alive(),
+            "open": len(sessions),
+            "idle": sum(1 for s in sessions if s["idle_s"] is not None),
+            "idle_timeout_s": self.idle_timeout_s,
+            "sessions": sessions,
+        }
+
+
+# 进程内共享的会话池
+session_pool = VisaSessionPool()
+atexit.register(session_pool.close_all)
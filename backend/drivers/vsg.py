@@ -1,6 +1,7 @@
 import logging
+from typing import Optional
 
-from .base_instrument import BaseInstrument
+from .async_transport import create_transport
 from .common.generic_vsg import GenericVSG
 from .factory import DriverFactory
 
@@ -12,10 +13,13 @@ class VSG:
     根据设备 IDN 自动加载 GenericVSG 或 RS_SMW200A 等专用驱动。
     """
 
-    def __init__(self, resource_name: str, name: str = "VSG_Proxy", simulation_mode: bool = False):
+    def __init__(self, resource_name: str, name: str = "VSG_Proxy", simulation_mode: bool = False,
+                 transport: Optional[str] = None, port: Optional[int] = None):
         self.resource_name = resource_name
         self.name = name
         self.simulation_mode = simulation_mode
+        # transport: socket 时使用原生 asyncio 套接字 (在事件循环中创建时绑定该事件循环)
+        self.transport = create_transport(resource_name, transport, port) if not simulation_mode else None
         self.logger = logging.getLogger(f"Proxy.{name}")
         self._driver: GenericVSG = None # 实际的驱动实例
 
@@ -28,24 +32,13 @@ class VSG:
             # 或者默认使用通用驱动
             fake_idn = "Rohde&Schwarz,SMW200A,Simulated,1.0"
             self.logger.info(f"[模拟] 识别到 IDN: {fake_idn}")
-            self._driver = DriverFactory.create_vsg_driver(self.resource_name, fake_idn, True)
-            self._driver.connect()
+            self._driver = DriverFactory.connect_driver("vsg", self.resource_name, True, simulated_idn=fake_idn)
             return
 
         try:
-            # 1. 使用基础类建立临时连接以查询 IDN
-            temp_inst = BaseInstrument(self.resource_name, "Temp_Probe")
-            temp_inst.connect()
-            idn = temp_inst.query("*IDN?")
-            temp_inst.disconnect() # 释放连接，交给专用驱动去连
-
-            self.logger.info(f"设备 IDN: {idn}")
-
-            # 2. 使用工厂创建真正的驱动
-            self._driver = DriverFactory.create_vsg_driver(self.resource_name, idn, self.simulation_mode)
-
-            # 3. 连接真正的驱动
-            self._driver.connect()
+            # 身份缓存命中时直接加载专用驱动，未命中时先以不复位的探测连接读取 IDN；仪表只复位一次
+            self._driver = DriverFactory.connect_driver("vsg", self.resource_name, self.simulation_mode,
+                                                        transport=self.transport)
 
         except Exception as e:
             self.logger.error(f"初始化驱动失败: {e}")
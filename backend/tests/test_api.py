@@ -9,12 +9,20 @@ import pytest
 # 添加项目路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from app import database
 from app.main import app
 from fastapi.testclient import TestClient
 
 client = TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def isolated_database(tmp_path, monkeypatch):
+    """每个测试使用临时数据库，不改动 backend/test_results.db"""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "test_results.db"))
+    database.init_database()
+
+
 class TestHealthEndpoint:
     """健康检查端点测试"""
 
@@ -39,6 +47,83 @@ class TestInstrumentsEndpoint:
         data = response.json()
         assert isinstance(data, list)
 
+    def test_status_served_from_lease_holder(self, monkeypatch):
+        """测试已租出的仪表从持有者的会话读取，不创建新连接"""
+        from app.api import endpoints
+        from app.state import state
+
+        config = endpoints._lane_configs()[state.default_lane]
+        instruments = config.get("instruments", {})
+        if not instruments:
+            pytest.skip("config.yaml 未配置仪表")
+
+        class FakeInstrument:
+            def __init__(self, address):
+                self.resource_name = address
+
+            def get_driver_info(self):
+                return {"driver_class": "Fake"}
+
+        class FakeSession:
+            init_report = []
+
+            def __init__(self):
+                self.instruments = {k: FakeInstrument(v["address"]) for k, v in instruments.items()}
+
+        def no_new_sessions(*args, **kwargs):
+            raise AssertionError("不应创建新的仪表会话")
+
+        lease = state.resources.request("holder_run", [v["address"] for v in instruments.values()],
+                                        session=FakeSession())
+        monkeypatch.setattr(endpoints, "TestSequencer", no_new_sessions)
+        try:
+            response = client.get("/api/v1/instruments/status")
+        finally:
+            state.resources.release(lease)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert all(item["lease_holder"] == "holder_run" and item["connected"] for item in data)
+        assert data[0]["driver_info"] == {"driver_class": "Fake"}
+
+    def test_get_resources(self):
+        """测试获取仪表租约与排队状态"""
+        response = client.get("/api/v1/resources")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["leases"] == []
+        assert data["queue"] == []
+
+    def test_visa_sessions(self):
+        """测试 VISA 会话池状态"""
+        response = client.get("/api/v1/instruments/sessions")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert {"opened", "reused", "evicted", "leaked", "sessions"} <= set(data)
+
+    def test_instrument_metrics(self):
+        """测试 SCPI 命令统计 (进程累计值与不存在的运行)"""
+        response = client.get("/api/v1/metrics/instruments")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["run_id"] is None
+        assert len(data["bucket_bounds_ms"]) > 0
+        assert isinstance(data["commands"], list)
+
+        assert client.get("/api/v1/metrics/instruments", params={"run_id": 99999999}).status_code == 404
+
+    def test_get_instruments_startup(self):
+        """测试获取仪表初始化耗时报告"""
+        response = client.get("/api/v1/instruments/startup")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert "instruments" in data
+        assert "serial_elapsed_s" in data
+
 
 class TestScenariosEndpoint:
     """场景端点测试"""
@@ -56,6 +141,81 @@ class TestScenariosEndpoint:
             assert "filename" in data[0]
             assert "name" in data[0]
 
+    def test_compile_scenario(self):
+        """测试编译场景文件"""
+        response = client.post("/api/v1/scenarios/dynamic_high_speed_train.yaml/compile")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["ok"] is True
+        assert data["errors"] == []
+        times = [e["time"] for e in data["events"]]
+        assert times == sorted(times)
+
+    def test_preview_matrix(self):
+        """测试参数矩阵预览"""
+        response = client.get("/api/v1/scenarios/matrix_mobility_sweep.yaml/matrix", params={"preview": 3})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["points"] == 48
+        assert data["axes"][0]["name"] == "channel_model"
+        assert len(data["preview"]) == 3
+        assert data["reconfiguration_cost_s"] < data["declared_order_cost_s"]
+
+    def test_matrix_requires_campaign(self):
+        """测试参数矩阵场景不能作为单次测试启动"""
+        response = client.post("/api/v1/test/start", params={"filename": "matrix_mobility_sweep.yaml"})
+
+        assert response.status_code == 400
+
+    def test_start_records_scenario(self, monkeypatch):
+        """测试启动指定场景时运行记录保存场景的 ID 与测试类型"""
+        import app.api.endpoints as endpoints
+        from app.database import TestRunRepository
+        from app.state import state
+
+        async def no_run(lane, priority=0):
+            return None
+
+        monkeypatch.setattr(endpoints, "run_sequencer_task", no_run)
+        response = client.post("/api/v1/test/start", params={"filename": "3gpp_7_6_blocking_cw.yaml"})
+        data = response.json()
+        bench = state.lane(data["lane"])
+        bench.is_running = False
+        bench.current_run_id = None
+
+        assert response.status_code == 200
+        run = TestRunRepository.get_by_id(data["run_id"])
+        assert run["scenario_id"] == "3GPP_7_6_BLOCKING"
+        assert run["test_type"] == "blocking"
+        TestRunRepository.delete(data["run_id"])
+
+    def test_estimate_scenario(self):
+        """测试场景时长预估"""
+        response = client.get("/api/v1/scenarios/3gpp_7_6_blocking_cw.yaml/estimate")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["phases"][0]["name"] == "session"
+        assert data["total_s"] == sum(p["duration_s"] for p in data["phases"])
+
+    def test_estimate_campaign(self):
+        """测试批次时长预估"""
+        response = client.post("/api/v1/campaign/estimate",
+                               json={"scenarios": ["demo.yaml", "matrix_mobility_sweep.yaml"]})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [i["points"] for i in data["items"]] == [1, 48]
+        assert data["total_s"] > data["items"][1]["total_s"]
+
+    def test_compile_nonexistent_scenario(self):
+        """测试编译不存在的场景文件"""
+        response = client.post("/api/v1/scenarios/nonexistent.yaml/compile")
+
+        assert response.status_code == 404
+
 
 class TestHistoryEndpoint:
     """历史记录端点测试"""
@@ -124,6 +284,58 @@ class TestTestControlEndpoint:
         assert data["running"] is False
 
 
+class TestLanesEndpoint:
+    """测试台端点测试"""
+
+    def test_list_lanes(self):
+        """测试列出测试台"""
+        response = client.get("/api/v1/lanes")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) >= 1
+        assert all("name" in lane and "running" in lane for lane in data)
+
+    def test_unknown_lane(self):
+        """测试指定不存在的测试台"""
+        response = client.post("/api/v1/test/stop", params={"lane": "no_such_lane"})
+
+        assert response.status_code == 404
+
+
+class TestResumeEndpoint:
+    """断点续测端点测试"""
+
+    def test_resume_nonexistent_run(self):
+        """测试恢复不存在的运行"""
+        response = client.post("/api/v1/test/999999/resume")
+
+        assert response.status_code == 404
+
+
+class TestCampaignEndpoint:
+    """测试批次端点测试"""
+
+    def test_start_with_missing_scenario(self):
+        """测试批次包含不存在的场景文件"""
+        response = client.post("/api/v1/campaign/start", json={"scenarios": ["nonexistent.yaml"]})
+
+        assert response.status_code == 404
+
+    def test_get_nonexistent_campaign(self):
+        """测试获取不存在的批次"""
+        response = client.get("/api/v1/campaign/999999")
+
+        assert response.status_code == 404
+
+    def test_stop_without_running(self):
+        """测试未运行时停止批次"""
+        response = client.post("/api/v1/campaign/stop")
+
+        assert response.status_code == 200
+        assert response.json()["running"] is False
+
+
 class TestReportEndpoint:
     """报告端点测试"""
 
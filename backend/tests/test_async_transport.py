@@ -0,0 +1,228 @@
+"""
+原生 asyncio SCPI 套接字传输单元测试 (使用本地 TCP 替身服务器)
+"""
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.instrument_executor import AsyncInstrument, LatencyRecorder
+from core.sequencer import TestSequencer
+from drivers.async_transport import (
+    ScpiSocketTransport,
+    create_transport,
+    parse_socket_address,
+)
+from drivers.identity_cache import IdentityCache
+from drivers.spectrum_analyzer import SpectrumAnalyzer
+from drivers.vsg import VSG
+
+TRACE = np.array([-80.5, -10.0, 10.0, -120.25], dtype="<f4")  # 含 0x0A 字节
+
+
+class ScpiStandIn:
+    """在本地端口上应答 SCPI 的替身仪表，记录收到的指令"""
+
+    def __init__(self, idn="Rohde&Schwarz,SMW200A,101234,4.70"):
+        self.idn = idn
+        self.commands = []
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    @property
+    def address(self):
+        return f"TCPIP0::127.0.0.1::{self.port}::SOCKET"
+
+    def _reply(self, command):
+        header = command.split(" ", 1)[0].upper()
+        if header == "TRAC:DATA?":
+            payload = TRACE.tobytes()
+            length = str(len(payload)).encode()
+            return b"#" + str(len(length)).encode() + length + payload
+        if header == "HANG?":
+            return None
+        replies = {"*IDN?": self.idn, "*OPT?": "K1", "*OPC?": "1", "*STB?": "32", "*ESR?": "1",
+                   "SYST:ERR?": "0,No error"}
+        return replies.get(header, "0").encode()
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                replies = []
+                for part in line.decode().strip().split(";"):
+                    command = part.strip().lstrip(":")
+                    self.commands.append(command)
+                    if command.split(" ", 1)[0].endswith("?"):
+                        replies.append(self._reply(command))
+                if replies and all(r is not None for r in replies):
+                    writer.write(b";".join(replies) + b"\n")
+                    await writer.drain()
+        finally:
+            writer.close()
+
+
+@pytest.fixture
+async def stand_in():
+    server = await ScpiStandIn().start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture
+def no_identity_file(monkeypatch):
+    monkeypatch.setattr("drivers.factory.identity_cache", IdentityCache(path=None))
+
+
+class TestAddress:
+    """地址解析与传输选择测试"""
+
+    def test_parse(self):
+        """测试从各类地址中取出主机与端口"""
+        assert parse_socket_address("TCPIP0::10.0.0.5::5025::SOCKET") == ("10.0.0.5", 5025)
+        assert parse_socket_address("TCPIP0::10.0.0.5::inst0::INSTR") == ("10.0.0.5", 5025)
+        assert parse_socket_address("TCPIP0::10.0.0.5::hislip0::INSTR", port=6000) == ("10.0.0.5", 6000)
+        assert parse_socket_address("10.0.0.5:5555") == ("10.0.0.5", 5555)
+
+    def test_create_transport(self):
+        """测试默认使用 VISA，未知传输报错"""
+        assert create_transport("TCPIP0::10.0.0.5::inst0::INSTR") is None
+        assert isinstance(create_transport("TCPIP0::10.0.0.5::inst0::INSTR", "socket"), ScpiSocketTransport)
+        with pytest.raises(ValueError):
+            create_transport("TCPIP0::10.0.0.5::inst0::INSTR", "hislip")
+        with pytest.raises(ValueError):
+            create_transport("GPIB0::20::INSTR", "socket")
+
+
+class TestScpiSocketTransport:
+    """套接字传输测试"""
+
+    @pytest.mark.asyncio
+    async def test_write_query_block(self, stand_in):
+        """测试写入、查询与二进制块读取"""
+        transport = ScpiSocketTransport("127.0.0.1", stand_in.port)
+        await transport.open()
+
+        await transport.write("FREQ 1000000")
+        assert await transport.query("*IDN?") == stand_in.idn
+        data = await transport.read_block("TRAC:DATA? TRACE1")
+        await transport.close()
+
+        np.testing.assert_array_equal(np.frombuffer(data, dtype="<f4"), TRACE)
+        assert stand_in.commands[0] == "FREQ 1000000"
+        assert transport.counters["queries"] == 1
+        assert transport.counters["blocks"] == 1
+        assert not transport.is_open
+
+    @pytest.mark.asyncio
+    async def test_concurrent_queries_serialized(self, stand_in):
+        """测试并发查询不会交错读取响应"""
+        transport = ScpiSocketTransport("127.0.0.1", stand_in.port)
+        await transport.open()
+
+        replies = await asyncio.gather(*(transport.query(q) for q in ["*IDN?", "*OPC?"] * 10))
+        await transport.close()
+
+        assert replies == [stand_in.idn, "1"] * 10
+
+    @pytest.mark.asyncio
+    async def test_timeout_drops_connection(self, stand_in):
+        """测试超时后断开连接，之后的操作报错"""
+        transport = ScpiSocketTransport("127.0.0.1", stand_in.port, timeout_s=0.1)
+        await transport.open()
+
+        with pytest.raises(TimeoutError):
+            await transport.query("HANG?")
+        with pytest.raises(ConnectionError):
+            await transport.query("*IDN?")
+        assert transport.counters["timeouts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_shared_open(self, stand_in):
+        """测试按使用者计数，最后一个使用者关闭时才断开"""
+        transport = ScpiSocketTransport("127.0.0.1", stand_in.port)
+        await transport.open()
+        await transport.open()
+
+        await transport.close()
+        assert transport.is_open
+        await transport.close()
+        assert not transport.is_open
+
+
+class TestSocketDrivers:
+    """驱动经套接字传输工作测试"""
+
+    @pytest.mark.asyncio
+    async def test_vsg_native_and_threaded(self, stand_in, no_identity_file):
+        """测试同步方法经工作线程、协程方法在事件循环中直接执行，共用一个连接"""
+        vsg = VSG(stand_in.address, transport="socket")
+        recorder = LatencyRecorder()
+        io = AsyncInstrument(vsg, name="vsg", recorder=recorder)
+        try:
+            await io.run(vsg.connect)
+            await io.run(vsg.set_frequency, 3.5e9)  # 工作线程中的同步方法
+            io.shutdown(wait=True)
+
+            # 工作线程已关闭，以下调用只能在事件循环中直接完成
+            await io.set_power(-80)
+            assert await io.query("*IDN?") == stand_in.idn
+        finally:
+            vsg.disconnect()
+            io.shutdown()
+            await asyncio.sleep(0)
+
+        assert stand_in.commands.count("*RST") == 1
+        assert "POW -80" in stand_in.commands
+        assert "FREQ 3500000000.0" in stand_in.commands
+        commands = {row["command"] for row in recorder.snapshot()}
+        assert {"set_power", "query"} <= commands
+
+    @pytest.mark.asyncio
+    async def test_trace_over_socket(self, stand_in, no_identity_file):
+        """测试频谱仪经套接字读取二进制 Trace"""
+        stand_in.idn = "Rohde&Schwarz,FSW-26,101234,4.70"
+        sa = SpectrumAnalyzer(stand_in.address, transport="socket")
+        io = AsyncInstrument(sa, name="spectrum_analyzer")
+        try:
+            await io.run(sa.connect)
+            trace = await io.run(sa.get_trace_data)
+            block = await io.read_block("TRAC:DATA? TRACE1")
+        finally:
+            sa.disconnect()
+            io.shutdown()
+            await asyncio.sleep(0)
+
+        np.testing.assert_array_equal(trace, TRACE)
+        assert bytes(block) == TRACE.tobytes()
+
+    @pytest.mark.asyncio
+    async def test_sequencer_rejects_unknown_transport(self):
+        """测试配置了未知传输的仪表记为初始化失败"""
+        sequencer = TestSequencer({"instruments": {
+            "vsg": {"address": "TCPIP0::127.0.0.1::inst0::INSTR", "transport": "hislip"}}})
+
+        await sequencer.initialize_instruments_async()
+
+        assert "vsg" not in sequencer.instruments
+        assert "未知的传输类型" in sequencer.init_report[0].error
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
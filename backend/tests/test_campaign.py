@@ -0,0 +1,154 @@
+"""
+测试批次执行引擎单元测试
+"""
+import os
+import sys
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.campaign import CampaignItem, CampaignRunner
+from core.sequencer import TestSequencer
+
+
+class CountingProxy:
+    """统计连接/断开次数的假代理"""
+
+    connects = 0
+    disconnects = 0
+
+    def __init__(self, address, name="X", simulation_mode=False):
+        self.name = name
+        self.power = None
+
+    def connect(self):
+        CountingProxy.connects += 1
+
+    def disconnect(self):
+        CountingProxy.disconnects += 1
+
+    def set_power(self, power):
+        self.power = power
+
+
+def dynamic_scenario(name: str, power: float, test_type: str = "dynamic_scenario"):
+    return {
+        "metadata": {"id": name, "name": name},
+        "config": {
+            "type": test_type,
+            "total_duration": 0.2,
+            "timeline": [
+                {"time": 0, "target": "vsg", "action": "set_power", "params": {"power": power}}
+            ],
+            "metrics": {"interval": 0.1}
+        }
+    }
+
+
+@pytest.fixture
+def sequencer(monkeypatch):
+    CountingProxy.connects = 0
+    CountingProxy.disconnects = 0
+    monkeypatch.setattr("core.sequencer.INSTRUMENT_PROXIES", {"vsg": (CountingProxy, "VSG")})
+    return TestSequencer({"instruments": {"vsg": {"address": "a"}}}, simulation_mode=True)
+
+
+class TestCampaignRunner:
+    """批次执行测试"""
+
+    @pytest.mark.asyncio
+    async def test_session_opened_once(self, sequencer):
+        """测试多个场景共享同一仪表会话，只连接一次"""
+        started, finished = [], []
+        items = [CampaignItem(f"s{i}.yaml", dynamic_scenario(f"S{i}", -50 - i)) for i in range(3)]
+        runner = CampaignRunner(sequencer, items,
+                                on_item_start=lambda item: started.append(item.filename),
+                                on_item_end=lambda item: finished.append((item.filename, item.status)))
+
+        status = await runner.run()
+
+        assert status == "completed"
+        assert CountingProxy.connects == 1
+        assert CountingProxy.disconnects == 1
+        assert started == ["s0.yaml", "s1.yaml", "s2.yaml"]
+        assert [s for _, s in finished] == ["completed"] * 3
+        assert sequencer.instruments["vsg"].power == -52
+
+    @pytest.mark.asyncio
+    async def test_results_are_per_scenario(self, sequencer):
+        """测试上一场景的结果不会带入下一场景"""
+        items = [CampaignItem(f"s{i}.yaml", dynamic_scenario(f"S{i}", -50)) for i in range(2)]
+        runner = CampaignRunner(
+            sequencer, items,
+            on_item_end=lambda item: sequencer.results.update({"sensitivity": {"stale": True}})
+        )
+
+        await runner.run()
+
+        assert all("sensitivity" not in item.results for item in items)
+        assert [len(item.results["timeline"]["records"]) for item in items] == [1, 1]
+        assert items[0].results["timeline"] is not items[1].results["timeline"]
+        assert len(sequencer.event_results) == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_skips_remaining(self, sequencer):
+        """测试停止后跳过剩余场景"""
+        items = [CampaignItem(f"s{i}.yaml", dynamic_scenario(f"S{i}", -50)) for i in range(3)]
+        runner = CampaignRunner(sequencer, items, on_item_end=lambda item: runner.stop())
+
+        status = await runner.run()
+
+        assert status == "stopped"
+        assert [item.status for item in items] == ["completed", "skipped", "skipped"]
+        assert CountingProxy.disconnects == 1
+
+    @pytest.mark.asyncio
+    async def test_failure_recorded(self, sequencer, monkeypatch):
+        """测试场景异常记为失败，后续场景继续执行"""
+        original = sequencer.execute_scenario
+
+        async def flaky(scenario):
+            if scenario["metadata"]["id"] == "BAD":
+                raise RuntimeError("boom")
+            await original(scenario)
+
+        monkeypatch.setattr(sequencer, "execute_scenario", flaky)
+        items = [CampaignItem("bad.yaml", dynamic_scenario("BAD", -50)),
+                 CampaignItem("ok.yaml", dynamic_scenario("OK", -50))]
+
+        status = await CampaignRunner(sequencer, items).run()
+
+        assert status == "failed"
+        assert items[0].status == "failed" and items[0].error == "boom"
+        assert items[1].status == "completed"
+
+    @pytest.mark.asyncio
+    async def test_cancel_during_connect_shuts_down(self, sequencer, monkeypatch):
+        """测试建立会话期间被取消仍断开已连接的仪表"""
+        import asyncio
+
+        async def hang():
+            await asyncio.sleep(30)
+
+        monkeypatch.setattr(sequencer, "initialize_dut", lambda: None)
+        original = sequencer.initialize_instruments_async
+
+        async def connect_then_hang():
+            await original()
+            await hang()
+
+        monkeypatch.setattr(sequencer, "initialize_instruments_async", connect_then_hang)
+        task = asyncio.create_task(CampaignRunner(sequencer, [CampaignItem("s.yaml", dynamic_scenario("S", -50))]).run())
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert CountingProxy.connects == 1
+        assert CountingProxy.disconnects == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -9,14 +9,26 @@ import pytest
 # 添加项目路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from app import database
 from app.database import (
+    CampaignRepository,
+    CheckpointRepository,
+    InstrumentLatencyRepository,
     MetricsSampleRepository,
+    ScpiMetricsRepository,
     TestRunRepository,
     get_connection,
     init_database,
 )
 
 
+@pytest.fixture(autouse=True)
+def isolated_database(tmp_path, monkeypatch):
+    """每个测试使用临时数据库，不改动 backend/test_results.db"""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "test_results.db"))
+    init_database()
+
+
 class TestDatabase:
     """数据库基础功能测试"""
 
@@ -32,6 +44,7 @@ class TestDatabase:
 
         assert 'test_runs' in tables
         assert 'metrics_samples' in tables
+        assert 'campaigns' in tables
         conn.close()
 
 
@@ -78,6 +91,22 @@ class TestTestRunRepository:
         # 清理
         TestRunRepository.delete(run_id)
 
+    def test_save_result_data(self):
+        """测试保存结构化结果"""
+        run_id = TestRunRepository.create(
+            scenario_id="test_result_data",
+            scenario_name="结果测试",
+            test_type="sensitivity"
+        )
+
+        TestRunRepository.save_result_data(run_id, '{"sensitivity": {"sensitivity_dbm": -100.5}}')
+
+        run = TestRunRepository.get_by_id(run_id)
+        assert '"sensitivity_dbm": -100.5' in run['result_data']
+
+        # 清理
+        TestRunRepository.delete(run_id)
+
     def test_list_recent(self):
         """测试获取最近记录列表"""
         # 创建多条记录
@@ -111,6 +140,68 @@ class TestTestRunRepository:
         run = TestRunRepository.get_by_id(run_id)
         assert run is None
 
+    def test_run_records_lane(self):
+        """测试记录执行测试的测试台"""
+        run_id = TestRunRepository.create("lane_test", "测试台记录", "sensitivity", lane="rack_b")
+
+        assert TestRunRepository.get_by_id(run_id)['lane'] == "rack_b"
+
+        TestRunRepository.delete(run_id)
+
+
+class TestCampaignRepository:
+    """测试批次仓库测试"""
+
+    def test_campaign_runs(self):
+        """测试批次与其测试记录的关联"""
+        campaign_id = CampaignRepository.create("夜间回归", '["a.yaml", "b.yaml"]')
+        run_ids = [
+            TestRunRepository.create(f"campaign_{i}", f"批次场景{i}", "sensitivity",
+                                     campaign_id=campaign_id)
+            for i in range(2)
+        ]
+
+        runs = TestRunRepository.list_by_campaign(campaign_id)
+        assert [r['id'] for r in runs] == run_ids
+        assert all(r['campaign_id'] == campaign_id for r in runs)
+
+        CampaignRepository.update_status(campaign_id, "completed", "completed: 2")
+        campaign = CampaignRepository.get_by_id(campaign_id)
+        assert campaign['status'] == "completed"
+        assert campaign['end_time'] is not None
+
+        # 清理
+        for run_id in run_ids:
+            TestRunRepository.delete(run_id)
+
+
+class TestCheckpointRepository:
+    """运行检查点仓库测试"""
+
+    def test_save_overwrites_latest(self):
+        """测试每个运行只保留最新检查点，删除运行时一并删除"""
+        run_id = TestRunRepository.create("test_checkpoint", "检查点测试", "sensitivity")
+
+        CheckpointRepository.save(run_id, "sensitivity", 1, '{"readings": [[-90, 0.0]]}')
+        CheckpointRepository.save(run_id, "sensitivity", 2, '{"readings": [[-90, 0.0], [-110, 1.0]]}')
+
+        checkpoint = CheckpointRepository.get(run_id)
+        assert checkpoint['point_index'] == 2
+        assert checkpoint['strategy'] == "sensitivity"
+
+        TestRunRepository.delete(run_id)
+        assert CheckpointRepository.get(run_id) is None
+
+    def test_mark_interrupted(self):
+        """测试遗留的 running 记录被标记为 failed"""
+        run_id = TestRunRepository.create("test_interrupted", "中断测试", "blocking")
+
+        assert TestRunRepository.mark_interrupted() >= 1
+        assert TestRunRepository.get_by_id(run_id)['status'] == "failed"
+
+        # 清理
+        TestRunRepository.delete(run_id)
+
 
 class TestMetricsSampleRepository:
     """指标采样仓库测试"""
@@ -174,5 +265,62 @@ class TestMetricsSampleRepository:
         assert stats['min_throughput'] == 100.0
 
 
+
+class TestInstrumentLatencyRepository:
+    """仪表命令耗时仓库测试"""
+
+    def test_record_accumulates(self):
+        """测试多次运行的耗时统计累加"""
+        lane = "latency_test_lane"
+        InstrumentLatencyRepository.delete(lane)
+        InstrumentLatencyRepository.record(lane, [
+            {"instrument": "vsg", "command": "set_power", "samples": 2, "total_ms": 20.0, "min_ms": 8.0, "max_ms": 12.0}
+        ])
+        InstrumentLatencyRepository.record(lane, [
+            {"instrument": "vsg", "command": "set_power", "samples": 2, "total_ms": 40.0, "min_ms": 15.0, "max_ms": 25.0}
+        ])
+
+        rows = InstrumentLatencyRepository.list(lane)
+        assert len(rows) == 1
+        assert rows[0]["samples"] == 4
+        assert rows[0]["mean_ms"] == 15.0
+        assert rows[0]["min_ms"] == 8.0 and rows[0]["max_ms"] == 25.0
+
+        InstrumentLatencyRepository.delete(lane)
+        assert InstrumentLatencyRepository.list(lane) == []
+
+
+class TestScpiMetricsRepository:
+    """SCPI 命令统计仓库测试"""
+
+    @staticmethod
+    def _row(count, total_ms, histogram):
+        return {"resource_name": "TCPIP0::10.0.0.1::inst0::INSTR", "command": "FREQ", "instrument": "RS_SMW200A",
+                "count": count, "total_ms": total_ms, "mean_ms": total_ms / count, "min_ms": 1.0,
+                "max_ms": total_ms, "p50_ms": 1.0, "p95_ms": 1.0, "histogram": histogram,
+                "bytes_out": 10 * count, "bytes_in": 0, "errors": 0, "timeouts": 0}
+
+    def test_record_per_run_and_merge(self):
+        """测试按运行保存，同一运行续跑时合并直方图与计数"""
+        init_database()
+        run_id = TestRunRepository.create("scpi_test", "SCPI 统计测试", "blocking")
+        buckets = [0] * 17
+        first, second = list(buckets), list(buckets)
+        first[3], second[16] = 2, 1
+
+        ScpiMetricsRepository.record(run_id, [self._row(2, 2.0, first)])
+        ScpiMetricsRepository.record(run_id, [self._row(1, 20000.0, second)])
+
+        rows = ScpiMetricsRepository.get_by_run_id(run_id)
+        assert len(rows) == 1
+        assert rows[0]["count"] == 3
+        assert rows[0]["bytes_out"] == 30
+        assert rows[0]["histogram"][3] == 2 and rows[0]["histogram"][16] == 1
+        assert rows[0]["max_ms"] == 20000.0
+
+        TestRunRepository.delete(run_id)
+        assert ScpiMetricsRepository.get_by_run_id(run_id) == []
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
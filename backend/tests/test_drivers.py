@@ -3,16 +3,30 @@
 """
 import os
 import sys
+import time
 
+import numpy as np
 import pytest
+import pyvisa
 
 # 添加项目路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from drivers.base_instrument import BaseInstrument
+from drivers.base_instrument import BaseInstrument, InstrumentError
 from drivers.channel_emulator import ChannelEmulator
+from drivers.common.generic_ce import GenericChannelEmulator
+from drivers.common.generic_vna import GenericVNA
+from drivers.common.generic_vsg import GenericVSG
+from drivers.factory import DriverFactory
+from drivers.identity_cache import IdentityCache, InstrumentIdentity
 from drivers.integrated_tester import IntegratedTester
+from drivers.keysight.propsim import PROPSIM_Driver
+from drivers.rohde_schwarz.fsw import FSW_Driver
+from drivers.rohde_schwarz.smw200a import SMW200A_Driver
+from drivers.rohde_schwarz.zna import ZNA_Driver
+from drivers.scpi_metrics import ScpiMetrics, command_mnemonic
 from drivers.spectrum_analyzer import SpectrumAnalyzer
+from drivers.visa_pool import VisaSessionPool
 from drivers.vna import VNA
 from drivers.vsg import VSG
 
@@ -88,6 +102,627 @@ class TestBaseInstrument:
         assert result == "SIM_DATA"
 
 
+# 已完成全部操作的仪表对状态查询的应答 (ESB 置位 / OPC 置位)
+STATUS_REPLIES = {"*STB?": "32", "*ESR?": "1"}
+
+
+class FakeResource:
+    """记录实际发出的 SCPI 指令"""
+
+    def __init__(self):
+        self.writes = []
+        self.fail = False
+        self.closed = False
+
+    def write(self, command):
+        if self.fail:
+            raise TimeoutError("VI_ERROR_TMO")
+        self.writes.append(command)
+
+    def query(self, command):
+        return STATUS_REPLIES.get(command, "0,No error")
+
+    def close(self):
+        self.closed = True
+
+
+def wired(driver_class):
+    """创建驱动并接入 FakeResource (绕过 VISA)"""
+    driver = driver_class("TCPIP0::127.0.0.1::inst0::INSTR", simulation_mode=True)
+    driver.simulation_mode = False
+    driver.instrument = FakeResource()
+    driver._connected = True
+    return driver
+
+
+class TestShadowState:
+    """影子状态缓存测试"""
+
+    def test_redundant_setting_skipped(self):
+        """测试重复设置相同参数只发出一次"""
+        vsg = wired(GenericVSG)
+
+        for _ in range(3):
+            vsg.set_frequency(3500e6)
+            vsg.enable_output(True)
+            vsg.enable_output(False)
+
+        assert vsg.instrument.writes == ["FREQ 3500000000.0", "OUTP ON", "OUTP OFF", "OUTP ON", "OUTP OFF",
+                                         "OUTP ON", "OUTP OFF"]
+        assert vsg.shadow_hits == 2
+        assert vsg.shadow_misses == 1
+
+    def test_rf_off_always_sent(self):
+        """测试射频开关不经影子状态，面板或联锁改动后关闭射频仍会发出"""
+        vsg = wired(GenericVSG)
+        ce = wired(GenericChannelEmulator)
+
+        for _ in range(2):
+            vsg.enable_output(False)
+            ce.rf_off()
+
+        assert vsg.instrument.writes == ["OUTP OFF", "OUTP OFF"]
+        assert ce.instrument.writes == ["OUTP:STAT OFF", "OUTP:STAT OFF"]
+        assert vsg.shadow_hits == ce.shadow_hits == 0
+
+    def test_reset_and_preset_invalidate(self):
+        """测试 *RST 与 preset() 之后重新发出设置"""
+        vsg = wired(GenericVSG)
+
+        vsg.set_power(-80)
+        vsg.reset()
+        vsg.set_power(-80)
+        vsg.preset()
+        vsg.set_power(-80)
+
+        assert vsg.instrument.writes.count("POW -80") == 3
+
+    def test_reconnect_invalidates(self):
+        """测试重新连接后影子状态清空"""
+        vsg = GenericVSG("TCPIP0::127.0.0.1::inst0::INSTR", simulation_mode=True)
+        vsg.connect()
+        vsg.set_power(-80)
+        assert vsg.shadow_stats()["tracked"] == 1
+
+        vsg.connect()
+
+        assert vsg.shadow_stats()["tracked"] == 0
+        assert vsg.write_setting("POW -80") is True
+
+    def test_failed_write_invalidates(self):
+        """测试写入失败后不再信任影子状态"""
+        vsg = wired(GenericVSG)
+        vsg.set_power(-80)
+
+        vsg.instrument.fail = True
+        with pytest.raises(TimeoutError):
+            vsg.set_frequency(1e9)
+        vsg.instrument.fail = False
+        vsg.set_power(-80)
+
+        assert vsg.instrument.writes == ["POW -80", "POW -80"]
+
+    def test_plain_write_updates_shadow(self):
+        """测试其他方法写入同一指令头部后，setter 不会误跳过"""
+        ce = wired(PROPSIM_Driver)
+
+        ce.set_path_loss(10)
+        ce.set_fading_profile("deep_fade")
+        ce.set_path_loss(10)
+        ce.set_path_loss(10)
+
+        assert ce.instrument.writes == ["DIAG:SIMU:GAIN:CH 1,-10", "DIAG:SIMU:GAIN:CH 1,-30",
+                                        "DIAG:SIMU:GAIN:CH 1,-10"]
+
+    def test_model_load_invalidates(self):
+        """测试加载信道模型后重新发出设置"""
+        ce = wired(PROPSIM_Driver)
+
+        ce.set_velocity(350)
+        ce.load_channel_model("HST.smu")
+        ce.set_velocity(350)
+
+        assert ce.instrument.writes.count("DIAGnostic:SIMUlation:MOBilespeed:MANual:CH 1,350") == 2
+
+    def test_disabled(self):
+        """测试关闭影子状态后每次都发出"""
+        vsg = wired(GenericVSG)
+        vsg.shadow_enabled = False
+
+        vsg.set_power(-80)
+        vsg.set_power(-80)
+
+        assert len(vsg.instrument.writes) == 2
+        assert vsg.get_driver_info()["shadow"]["hits"] == 0
+
+
+class TestBatch:
+    """批量写入测试"""
+
+    def test_sweep_single_message(self):
+        """测试扫描配置合并为一条消息，非公共指令从根路径解析"""
+        vna = wired(GenericVNA)
+
+        vna.set_frequency_sweep(1e9, 2e9, 201)
+
+        assert vna.instrument.writes == [
+            "SENSE:FREQ:START 1000000000.0;:SENSE:FREQ:STOP 2000000000.0;:SENSE:SWEEP:POINTS 201"]
+        assert vna.get_driver_info()["batch"] == {"commands": 3, "messages": 1}
+
+    def test_query_flushes_first(self):
+        """测试批量期间的查询先发出已排队的指令"""
+        vsg = wired(GenericVSG)
+
+        with vsg.batch():
+            vsg.write("FREQ 1000000")
+            vsg.write("OUTP ON")
+            vsg.query("SYST:ERR?")
+            vsg.write("POW -10")
+
+        assert vsg.instrument.writes == ["FREQ 1000000;:OUTP ON", "POW -10"]
+
+    def test_split_by_max_length(self):
+        """测试超过最大长度时拆分为多条消息"""
+        vsg = wired(GenericVSG)
+        vsg.MAX_MESSAGE_LENGTH = 20
+
+        with vsg.batch():
+            vsg.write("FREQ 1000000")
+            vsg.write("*CLS")
+            vsg.write("POW -10")
+
+        assert vsg.instrument.writes == ["FREQ 1000000;*CLS", "POW -10"]
+
+    def test_nested_and_shadow(self):
+        """测试嵌套批量由最外层发出，冗余设置仍被跳过"""
+        vsg = wired(GenericVSG)
+
+        with vsg.batch():
+            vsg.set_power(-80)
+            with vsg.batch():
+                vsg.set_power(-80)
+                vsg.enable_output(True)
+            assert vsg.instrument.writes == []
+
+        assert vsg.instrument.writes == ["POW -80;:OUTP ON"]
+
+    def test_check_errors(self):
+        """测试批量结束时读取错误队列"""
+        vsg = wired(GenericVSG)
+        replies = iter(['-113,"Undefined header"', "0,No error"])
+        vsg.instrument.query = lambda command: next(replies)
+
+        with pytest.raises(InstrumentError) as excinfo:
+            with vsg.batch(check_errors=True):
+                vsg.write("FOO 1")
+
+        assert excinfo.value.errors == ['-113,"Undefined header"']
+
+    def test_failed_flush_invalidates(self):
+        """测试批量发出失败后影子状态清空"""
+        vsg = wired(GenericVSG)
+        vsg.instrument.fail = True
+
+        with pytest.raises(TimeoutError):
+            with vsg.batch():
+                vsg.set_power(-80)
+
+        assert vsg.shadow_stats()["tracked"] == 0
+
+
+class TestVisaSessionPool:
+    """VISA 会话池测试"""
+
+    ADDRESS = "TCPIP0::127.0.0.1::inst0::INSTR"
+
+    @staticmethod
+    def pool(**kwargs):
+        opened = []
+
+        def open_resource(name):
+            opened.append(FakeResource())
+            return opened[-1]
+
+        return VisaSessionPool(open_resource=open_resource, **kwargs), opened
+
+    def test_probe_and_driver_share_session(self, monkeypatch):
+        """测试探测连接与专用驱动复用同一会话，断开后会话保持打开"""
+        import drivers.base_instrument as base
+        pool, opened = self.pool()
+        monkeypatch.setattr(base, "session_pool", pool)
+
+        probe = BaseInstrument(self.ADDRESS, "Temp_Probe", reset_on_connect=False)
+        probe.connect()
+        probe.disconnect()
+        driver = GenericVSG(self.ADDRESS)
+        driver.connect()
+
+        assert len(opened) == 1
+        assert driver.instrument is opened[0]
+        assert pool.stats()["reused"] == 1
+
+        driver.disconnect()
+        assert opened[0].closed is False
+        assert pool.stats()["idle"] == 1
+
+    def test_shared_holders(self):
+        """测试多个持有者共享会话，全部归还后才进入闲置"""
+        pool, opened = self.pool()
+        a, b = BaseInstrument(self.ADDRESS), BaseInstrument(self.ADDRESS)
+
+        assert pool.acquire(self.ADDRESS, a) is pool.acquire(self.ADDRESS, b)
+        pool.acquire(self.ADDRESS, a)
+        pool.release(self.ADDRESS, a)
+        assert pool.stats()["sessions"][0]["holders"] == ["未知仪器"]
+        assert pool.stats()["idle"] == 0
+
+        pool.release(self.ADDRESS, b)
+        assert pool.stats()["idle"] == 1
+        assert len(opened) == 1
+
+    def test_idle_eviction(self):
+        """测试闲置超时的会话被关闭，下次获取重新打开"""
+        pool, opened = self.pool(idle_timeout_s=0.0)
+        owner = BaseInstrument(self.ADDRESS)
+
+        pool.acquire(self.ADDRESS, owner)
+        pool.release(self.ADDRESS, owner)
+        pool.acquire(self.ADDRESS, owner)
+
+        assert opened[0].closed is True
+        assert len(opened) == 2
+        assert pool.stats()["evicted"] == 1
+
+    def test_background_eviction(self):
+        """测试后台维护线程在没有新的取/还会话时关闭闲置超时的会话"""
+        pool, opened = self.pool(idle_timeout_s=0.05)
+        owner = BaseInstrument(self.ADDRESS)
+        pool.acquire(self.ADDRESS, owner)
+        pool.release(self.ADDRESS, owner)
+        assert opened[0].closed is False
+
+        pool.start_maintenance(interval_s=0.01)
+        try:
+            deadline = time.monotonic() + 2.0
+            while not opened[0].closed and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert pool.stats()["maintaining"] is True
+        finally:
+            pool.stop_maintenance()
+
+        assert opened[0].closed is True
+        assert pool.stats()["evicted"] == 1
+        assert pool.stats()["maintaining"] is False
+
+    def test_release_close(self):
+        """测试连接失败时会话被关闭而不是放回池中"""
+        pool, opened = self.pool()
+        owner = BaseInstrument(self.ADDRESS)
+
+        pool.acquire(self.ADDRESS, owner)
+        pool.release(self.ADDRESS, owner, close=True)
+
+        assert opened[0].closed is True
+        assert pool.stats()["open"] == 0
+
+    def test_leak_detected(self):
+        """测试持有者被回收却未归还时记为泄漏并回收会话"""
+        pool, opened = self.pool()
+        owner = BaseInstrument(self.ADDRESS, "Leaky")
+        pool.acquire(self.ADDRESS, owner)
+        del owner
+
+        leaks = pool.check_leaks()
+
+        assert [leak["holder"] for leak in leaks] == ["Leaky"]
+        assert pool.stats()["leaked"] == 1
+        assert pool.stats()["idle"] == 1
+
+    def test_close_all(self):
+        """测试关闭全部会话"""
+        pool, opened = self.pool()
+        owner = BaseInstrument(self.ADDRESS)
+        pool.acquire(self.ADDRESS, owner)
+        pool.acquire("TCPIP0::127.0.0.2::inst0::INSTR", owner)
+
+        pool.close_all()
+
+        assert all(r.closed for r in opened)
+        assert pool.stats()["open"] == 0
+
+
+class IdentifiedResource(FakeResource):
+    """应答 *IDN? / *OPT? 并记录查询的 FakeResource"""
+
+    def __init__(self, idn):
+        super().__init__()
+        self.idn = idn
+        self.queries = []
+
+    def query(self, command):
+        self.queries.append(command)
+        return {"*IDN?": self.idn, "*OPT?": "K1,K2", **STATUS_REPLIES}.get(command, "0,No error")
+
+
+class BlockResource(FakeResource):
+    """以 IEEE 488.2 定长块应答二进制查询；terminator 为空时模拟只以 EOI 结束的仪表"""
+
+    def __init__(self, payload, ascii="", raw=None, terminator=b"\n"):
+        super().__init__()
+        header = str(len(payload)).encode()
+        self.raw = raw if raw is not None else b"#" + str(len(header)).encode() + header + payload + terminator
+        self.ascii = ascii
+        self.offset = 0
+
+    def write(self, command):
+        super().write(command)
+        self.offset = 0
+
+    def read_bytes(self, count):
+        if self.offset + count > len(self.raw):
+            raise TimeoutError("VI_ERROR_TMO")  # 读过 END 后等待到超时
+        data = self.raw[self.offset:self.offset + count]
+        self.offset += count
+        return data
+
+    def read_raw(self):
+        data = self.raw[self.offset:]
+        self.offset = len(self.raw)
+        return data
+
+    @property
+    def last_status(self):
+        # 读到消息末尾时为 END (VI_SUCCESS)，否则为 VI_SUCCESS_MAX_CNT
+        if self.offset < len(self.raw):
+            return pyvisa.constants.StatusCode.success_max_count_read
+        return pyvisa.constants.StatusCode.success
+
+    def query(self, command):
+        self.writes.append(command)
+        return self.ascii
+
+
+class OperationResource(FakeResource):
+    """前 busy_polls 次状态查询报告操作进行中，之后按 esr 报告完成 (或错误)"""
+
+    def __init__(self, busy_polls=0, esr=1, errors=()):
+        super().__init__()
+        self.busy_polls = busy_polls
+        self.esr = esr
+        self.errors = list(errors)
+        self.polls = 0
+
+    def query(self, command):
+        if command == "*STB?":
+            self.polls += 1
+            return "0" if self.polls <= self.busy_polls else "32"
+        if command == "*ESR?":
+            return str(self.esr)
+        if command == "SYST:ERR?" and self.errors:
+            return self.errors.pop(0)
+        return "0,No error"
+
+
+class TestOperation:
+    """操作完成通知 (*OPC + *ESE + 状态字节轮询) 测试"""
+
+    def test_begin_operation_single_message(self):
+        """测试重叠指令与 *OPC 以一条消息发出，不等待完成"""
+        vna = wired(GenericVNA)
+        vna.instrument = OperationResource(busy_polls=100)
+
+        vna.start_sweep()
+
+        assert vna.instrument.writes == ["*ESE 61;:INIT:IMM;*OPC"]
+        assert vna.instrument.polls == 0
+
+    def test_wait_polls_until_complete(self):
+        """测试轮询直到 ESB 置位"""
+        vna = wired(GenericVNA)
+        vna.instrument = OperationResource(busy_polls=3)
+
+        vna.start_sweep()
+        assert not vna.operation_complete()
+        vna.wait_operation(timeout_s=1.0)
+
+        assert vna.instrument.polls == 4
+
+    def test_error_bits_raise(self):
+        """测试事件状态寄存器报告错误时抛出 InstrumentError 并带出错误队列"""
+        vna = wired(GenericVNA)
+        vna.instrument = OperationResource(esr=0x11, errors=["-200,\"Execution error\""])
+
+        vna.start_sweep()
+        with pytest.raises(InstrumentError) as excinfo:
+            vna.wait_operation(timeout_s=1.0)
+
+        assert excinfo.value.errors == ['-200,"Execution error"']
+
+    def test_timeout(self):
+        """测试操作未完成时超时"""
+        vna = wired(GenericVNA)
+        vna.instrument = OperationResource(busy_polls=10 ** 6)
+
+        vna.start_sweep()
+        with pytest.raises(TimeoutError):
+            vna.wait_operation(timeout_s=0.05)
+
+    def test_read_stb_preferred(self):
+        """测试会话支持串行轮询时不发 *STB? 查询"""
+        vna = wired(GenericVNA)
+        vna.instrument.read_stb = lambda: 0x20
+
+        assert vna.read_status_byte() == 0x20
+
+    def test_read_stb_falls_back_to_query(self):
+        """测试串行轮询失败时改用 *STB? 查询，之后不再尝试串行轮询"""
+        vna = wired(GenericVNA)
+        polls = []
+
+        def read_stb():
+            polls.append(1)
+            raise NotImplementedError("serial poll not supported on SOCKET")
+
+        vna.instrument.read_stb = read_stb
+
+        assert vna.read_status_byte() == 32
+        assert vna.read_status_byte() == 32
+        assert len(polls) == 1
+
+    def test_begin_operation_keeps_error_queue(self):
+        """测试开始操作不清空此前指令留在错误队列中的错误"""
+        vna = wired(GenericVNA)
+        vna.instrument = OperationResource(errors=['-113,"Undefined header"'])
+
+        vna.start_sweep()
+
+        assert not any("*CLS" in w for w in vna.instrument.writes)
+        assert vna.read_errors() == ['-113,"Undefined header"']
+
+    def test_zna_measure_sequence(self):
+        """测试 ZNA 测量: 配置合并为一条消息，扫描以 *OPC 通知完成后读取数据"""
+        zna = wired(ZNA_Driver)
+
+        zna.measure_s_parameter("S21")
+
+        assert zna.instrument.writes == [
+            "CALC1:PAR:DEF 'Trc_S21', 'S21';:DISP:WIND1:TRAC1:FEED 'Trc_S21';:CALC1:FORM MLOG",
+            "*ESE 61;:INIT1:IMM;*OPC"]
+
+    def test_propsim_model_load(self):
+        """测试 PROPSIM 加载模型等待 *OPC，加载出错只记录日志"""
+        ce = wired(PROPSIM_Driver)
+        ce.instrument = OperationResource(busy_polls=2, esr=0x21, errors=["-256,\"File name not found\""])
+
+        ce.load_channel_model("urban.smu")
+
+        assert ce.instrument.writes == ["*ESE 61;:CALCulate:FILTer:FILE urban.smu;*OPC"]
+        assert ce.instrument.polls == 3
+
+
+class TestScpiMetrics:
+    """SCPI 命令统计测试"""
+
+    @pytest.fixture
+    def metrics(self, monkeypatch):
+        import drivers.base_instrument as base
+        metrics = ScpiMetrics()
+        monkeypatch.setattr(base, "scpi_metrics", metrics)
+        return metrics
+
+    def test_mnemonic(self):
+        """测试助记符去掉数字后缀与参数，批量消息按第一条非公共指令归类"""
+        assert command_mnemonic("CALC1:DATA? FDAT") == "CALC:DATA?"
+        assert command_mnemonic(":SOUR2:FREQ 3.5e9") == "SOUR:FREQ"
+        assert command_mnemonic("*ESE 61;:INIT1:IMM;*OPC") == "INIT:IMM"
+        assert command_mnemonic("*IDN?") == "*IDN?"
+
+    def test_io_recorded_per_command(self, metrics):
+        """测试实际 I/O 按助记符记录次数与字节数，影子状态跳过的写入不记录"""
+        vsg = wired(GenericVSG)
+
+        vsg.set_frequency(3.5e9)
+        vsg.set_frequency(3.5e9)
+        vsg.set_frequency(1e9)
+        vsg.query("SYST:ERR?")
+
+        rows = {r["command"]: r for r in metrics.snapshot()}
+        assert rows["FREQ"]["count"] == 2
+        assert rows["FREQ"]["bytes_out"] == len("FREQ 3500000000.0\n") + len("FREQ 1000000000.0\n")
+        assert rows["SYST:ERR?"]["bytes_in"] == len("0,No error")
+        assert sum(rows["FREQ"]["histogram"]) == 2
+        assert metrics.snapshot("TCPIP0::127.0.0.1::inst0::INSTR") == metrics.snapshot(vsg.name)
+
+    def test_errors_and_timeouts(self, metrics):
+        """测试失败的 I/O 记为错误，超时单独计数"""
+        vsg = wired(GenericVSG)
+        vsg.instrument.fail = True
+
+        with pytest.raises(TimeoutError):
+            vsg.set_power(-10)
+
+        row = metrics.snapshot()[0]
+        assert (row["command"], row["errors"], row["timeouts"]) == ("POW", 1, 1)
+
+    def test_since_mark(self, metrics):
+        """测试 since(mark) 只给出快照之后的增量"""
+        vsg = wired(GenericVSG)
+        vsg.write("OUTP ON")
+        mark = metrics.mark()
+
+        vsg.write("OUTP OFF")
+        vsg.write("POW -20")
+
+        rows = {r["command"]: r["count"] for r in metrics.since(mark)}
+        assert rows == {"OUTP": 1, "POW": 1}
+        assert metrics.since(mark, resources=["GPIB0::1::INSTR"]) == []
+
+
+class TestIdentityCache:
+    """仪表身份缓存测试"""
+
+    ADDRESS = "TCPIP0::127.0.0.1::inst0::INSTR"
+    IDN = "Rohde&Schwarz,SMW200A,1412.0000K02/101234,4.70"
+
+    @pytest.fixture
+    def resource(self, monkeypatch):
+        import drivers.base_instrument as base
+        resource = IdentifiedResource(self.IDN)
+        monkeypatch.setattr(base, "session_pool", VisaSessionPool(open_resource=lambda name: resource))
+        return resource
+
+    def test_cold_start_single_reset(self, resource, tmp_path):
+        """测试冷启动: 探测连接不复位，仪表只复位一次，结果写入缓存文件"""
+        cache = IdentityCache(str(tmp_path / "identity.json"))
+
+        driver = DriverFactory.connect_driver("vsg", self.ADDRESS, cache=cache)
+
+        assert isinstance(driver, SMW200A_Driver)
+        assert sum("*RST" in w for w in resource.writes) == 1
+        reloaded = IdentityCache(str(tmp_path / "identity.json")).get(self.ADDRESS, "vsg")
+        assert reloaded.driver_class == "SMW200A_Driver"
+        assert reloaded.opt == "K1,K2"
+
+    def test_warm_start_skips_probe(self, resource, tmp_path):
+        """测试热启动: 直接加载缓存的驱动，IDN 只查询一次"""
+        cache = IdentityCache(str(tmp_path / "identity.json"))
+        DriverFactory.connect_driver("vsg", self.ADDRESS, cache=cache)
+        resource.queries.clear()
+        resource.writes.clear()
+
+        driver = DriverFactory.connect_driver("vsg", self.ADDRESS, cache=cache)
+
+        assert isinstance(driver, SMW200A_Driver)
+        assert resource.queries.count("*IDN?") == 1
+        assert sum("*RST" in w for w in resource.writes) == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_mismatch_reselects_driver(self, resource):
+        """测试 IDN 与缓存不一致时重新选择驱动并更新缓存"""
+        cache = IdentityCache(path=None)
+        cache.store(InstrumentIdentity(self.ADDRESS, "vsg", "Generic,VSG,0,1.0", "", "GenericVSG", "Generic"))
+
+        driver = DriverFactory.connect_driver("vsg", self.ADDRESS, cache=cache)
+
+        assert isinstance(driver, SMW200A_Driver)
+        assert cache.get(self.ADDRESS, "vsg").idn == self.IDN
+        assert cache.stats()["mismatches"] == 1
+
+    def test_kind_mismatch_is_miss(self):
+        """测试类别不符的缓存项视为未命中"""
+        cache = IdentityCache(path=None)
+        cache.store(InstrumentIdentity(self.ADDRESS, "vna", self.IDN, "", "ZNA_Driver", "ZNA"))
+
+        assert cache.get(self.ADDRESS, "vsg") is None
+
+    def test_corrupt_file_ignored(self, tmp_path):
+        """测试缓存文件损坏时忽略"""
+        path = tmp_path / "identity.json"
+        path.write_text("{not json", encoding="utf-8")
+
+        assert IdentityCache(str(path)).stats()["entries"] == 0
+
+
 class TestVSG:
     """信号发生器驱动测试"""
 
@@ -257,6 +892,76 @@ class TestSpectrumAnalyzer:
         # SpectrumAnalyzer 是代理类，连接后 _driver 不为 None
         assert sa._driver is not None
 
+    def test_binary_trace(self):
+        """测试 REAL,32 二进制块直接解码为 float32 数组"""
+        fsw = wired(FSW_Driver)
+        values = np.array([-80.5, -10.0, 10.0, -120.25], dtype="<f4")  # 含 0x0A 字节
+        fsw.instrument = BlockResource(values.tobytes())
+
+        trace = fsw.get_trace_data()
+
+        assert trace.dtype == np.float32
+        np.testing.assert_array_equal(trace, values)
+        assert fsw.instrument.writes == ["FORM REAL,32;:FORM:BORD SWAP", "TRAC:DATA? TRACE1"]
+
+    def test_binary_trace_format_cached(self):
+        """测试重复读取时不再下发数据格式"""
+        fsw = wired(FSW_Driver)
+        fsw.instrument = BlockResource(np.zeros(3, dtype="<f4").tobytes())
+        fsw.get_trace_data()
+        fsw.instrument.writes.clear()
+
+        assert len(fsw.get_trace_data()) == 3
+        assert fsw.instrument.writes == ["TRAC:DATA? TRACE1"]
+
+    def test_ascii_trace_switches_format(self):
+        """测试 ASCII 读取后再次读取二进制时重新设置格式"""
+        fsw = wired(FSW_Driver)
+        fsw.instrument = BlockResource(np.ones(2, dtype="<f4").tobytes(), ascii="-1.5,-2.5")
+
+        assert fsw.get_trace_data_ascii() == [-1.5, -2.5]
+        fsw.get_trace_data()
+
+        assert fsw.instrument.writes == ["FORM ASC", "TRAC:DATA? TRACE1", "FORM REAL,32;:FORM:BORD SWAP",
+                                         "TRAC:DATA? TRACE1"]
+
+    def test_block_terminator_consumed(self):
+        """测试定长块后的换行被读走，不残留到下一次读取"""
+        fsw = wired(FSW_Driver)
+        fsw.instrument = BlockResource(b"\x0a\x0a")
+
+        assert bytes(fsw.query_block("TRAC:DATA? TRACE1")) == b"\x0a\x0a"
+        assert fsw.instrument.offset == len(fsw.instrument.raw)
+
+    def test_block_eoi_only(self):
+        """测试只以 EOI 结束的定长块不等待不存在的换行"""
+        fsw = wired(FSW_Driver)
+        values = np.array([-80.5, 10.0], dtype="<f4")
+        fsw.instrument = BlockResource(values.tobytes(), terminator=b"")
+
+        np.testing.assert_array_equal(fsw.get_trace_data(), values)
+
+    def test_indefinite_block_keeps_trailing_lf_bytes(self):
+        """测试不定长块只去掉一个结束符，数据末尾的 0x0A 字节保留"""
+        fsw = wired(FSW_Driver)
+        fsw.instrument = BlockResource(b"", raw=b"#0\x01\x0a\x0a\n")
+
+        assert bytes(fsw.query_block("TRAC:DATA? TRACE1")) == b"\x01\x0a\x0a"
+
+    def test_bad_block_returns_empty(self):
+        """测试响应不是二进制块时返回空数组"""
+        fsw = wired(FSW_Driver)
+        fsw.instrument = BlockResource(b"", raw=b"1.0,2.0\n")
+
+        assert len(fsw.get_trace_data()) == 0
+
+    def test_trace_simulation(self):
+        """测试模拟模式下返回空数组"""
+        sa = SpectrumAnalyzer("TCPIP0::127.0.0.1::inst0::INSTR", simulation_mode=True)
+        sa.connect()
+
+        assert isinstance(sa.get_trace_data(), np.ndarray)
+
 
 class TestIntegratedTester:
     """综合测试仪驱动测试"""
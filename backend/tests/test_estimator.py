@@ -0,0 +1,171 @@
+"""
+场景时长预估单元测试
+"""
+import os
+import sys
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.estimator import DEFAULT_LATENCY_S, LatencyTable, ScenarioEstimator
+from core.sequencer import MAIN_LINK_SETUP_S, PROBE_SETTLE_S
+
+
+def row(instrument, command, mean_ms, samples=10):
+    return {"instrument": instrument, "command": command, "samples": samples,
+            "total_ms": mean_ms * samples, "mean_ms": mean_ms}
+
+
+def dynamic(timeline, total_duration=10, dispatch="sequential"):
+    return {
+        "metadata": {"id": "D", "name": "动态"},
+        "config": {"type": "dynamic_scenario", "total_duration": total_duration,
+                   "dispatch": dispatch, "timeline": timeline}
+    }
+
+
+class TestLatencyTable:
+    """命令耗时表测试"""
+
+    def test_source_priority(self):
+        """测试优先使用本测试台实测值，其次所有测试台的加权平均，最后默认值"""
+        table = LatencyTable(
+            lane_rows=[row("vsg", "set_power", 20)],
+            all_rows=[row("vsg", "set_power", 20), row("vsg", "set_frequency", 10, samples=1),
+                      row("vsg", "set_frequency", 40, samples=3)]
+        )
+
+        assert table.get("vsg", "set_power") == pytest.approx(0.020)
+        assert table.get("vsg", "set_frequency") == pytest.approx(0.0325)
+        assert table.get("vsg", "enable_output") == DEFAULT_LATENCY_S
+        assert table.sources == {"lane": 1, "pooled": 1, "default": 1}
+
+
+class TestScenarioEstimator:
+    """场景预估测试"""
+
+    def test_timeline_overrun(self):
+        """测试事件耗时超过触发间隔时顺延，并计入超时阶段"""
+        table = LatencyTable([row("channel_emulator", "load_channel_model", 3000)])
+        estimator = ScenarioEstimator(table, instruments=["channel_emulator"])
+
+        estimate = estimator.estimate(dynamic([
+            {"time": 0, "target": "channel_emulator", "action": "load_channel_model", "params": {"model": "A"}},
+            {"time": 1, "target": "channel_emulator", "action": "set_velocity", "params": {"kmh": 30}},
+            {"time": 4, "target": "channel_emulator", "action": "load_channel_model", "params": {"model": "B"}},
+        ], total_duration=5))
+
+        phases = {p.name: p for p in estimate.phases}
+        assert phases["timeline"].duration_s == 5
+        assert phases["overrun"].duration_s == pytest.approx(2.0)
+        assert phases["overrun"].detail["late_events"] == 1
+        assert estimate.total_s == pytest.approx(7.0)
+
+    def test_parallel_dispatch(self):
+        """测试并行下发时同一时刻的耗时取最慢仪表"""
+        table = LatencyTable([row("vsg", "set_power", 2000), row("channel_emulator", "set_velocity", 3000)])
+        timeline = [
+            {"time": 0, "target": "vsg", "action": "set_power", "params": {"dbm": -80}},
+            {"time": 0, "target": "channel_emulator", "action": "set_velocity", "params": {"kmh": 30}},
+        ]
+
+        sequential = ScenarioEstimator(table).estimate(dynamic(timeline, total_duration=1))
+        parallel = ScenarioEstimator(table).estimate(dynamic(timeline, total_duration=1, dispatch="parallel"))
+
+        assert sequential.total_s == pytest.approx(5.0)
+        assert parallel.total_s == pytest.approx(3.0)
+
+    def test_unconfigured_instrument_skipped(self):
+        """测试未配置的仪表不计入耗时 (Sequencer 同样跳过)"""
+        table = LatencyTable([row("vsg", "set_power", 5000)])
+        estimator = ScenarioEstimator(table, instruments=[])
+
+        estimate = estimator.estimate(dynamic([
+            {"time": 0, "target": "vsg", "action": "set_power", "params": {"dbm": -80}}
+        ], total_duration=1))
+
+        assert estimate.total_s == 1
+
+    def test_sensitivity_probe_count(self):
+        """测试二分搜索的测量点数按干跑结果计算"""
+        scenario = {"config": {"type": "sensitivity", "search": {
+            "mode": "bisection", "start_power_dbm": -70, "end_power_dbm": -110,
+            "resolution_db": 1.0, "expected_dbm": -95.5
+        }}}
+        estimator = ScenarioEstimator(LatencyTable([row("vsg", "set_power", 100)]), instruments=["vsg"])
+
+        phase = estimator.estimate(scenario).phases[0]
+
+        assert 5 <= phase.detail["probes"] <= 9
+        assert phase.detail["per_probe_s"] == pytest.approx(0.1 + PROBE_SETTLE_S)
+        assert phase.duration_s == pytest.approx(phase.detail["probes"] * (0.1 + PROBE_SETTLE_S))
+
+    def test_probe_uses_measured_settling(self):
+        """测试测量点耗时使用实测的稳定等待，且不超过配置的上限"""
+        def scenario(settling_time_s):
+            return {"config": {"type": "sensitivity", "search": {
+                "mode": "bisection", "start_power_dbm": -70, "end_power_dbm": -110,
+                "settling_time_s": settling_time_s
+            }}}
+        table = LatencyTable([row("vsg", "set_power", 100), row("settling", "settle", 150)])
+        estimator = ScenarioEstimator(table, instruments=["vsg"])
+
+        assert estimator.estimate(scenario(1.0)).phases[0].detail["per_probe_s"] == pytest.approx(0.25)
+        assert estimator.estimate(scenario(0.05)).phases[0].detail["per_probe_s"] == pytest.approx(0.15)
+
+    def test_linear_costs_more_than_bisection(self):
+        """测试线性扫描的预估时长大于二分"""
+        def scenario(mode):
+            return {"config": {"type": "sensitivity", "search": {
+                "mode": mode, "start_power_dbm": -70, "end_power_dbm": -110, "step_db": 1.0
+            }}}
+        estimator = ScenarioEstimator(instruments=["vsg"])
+
+        assert estimator.estimate(scenario("linear")).total_s > estimator.estimate(scenario("bisection")).total_s
+
+    def test_blocking_sweep(self):
+        """测试阻塞扫描包含主连接建立与各频偏的测量点"""
+        scenario = {"config": {"type": "blocking", "interferer": {
+            "freq_offsets_mhz": [-15, 15, 30], "start_power_dbm": -60, "end_power_dbm": -30,
+            "mode": "bisection", "resolution_db": 1.0, "order_offsets": True
+        }}}
+        estimator = ScenarioEstimator(instruments=["vsg", "integrated_tester"])
+
+        estimate = estimator.estimate(scenario)
+
+        phases = {p.name: p for p in estimate.phases}
+        assert phases["link_setup"].duration_s == MAIN_LINK_SETUP_S
+        assert phases["sweep"].detail["offsets"] == 3
+        assert set(phases["sweep"].detail["probes_per_offset"]) == {"-15.0", "15.0", "30.0"}
+
+    def test_matrix_sums_points(self):
+        """测试参数矩阵场景按全部测试点累加"""
+        scenario = dynamic([], total_duration=2)
+        scenario["matrix"] = {"axes": [{"name": "a", "values": [1, 2, 3]}]}
+
+        estimate = ScenarioEstimator().estimate(scenario)
+
+        assert estimate.points == 3
+        assert estimate.total_s == pytest.approx(6.0)
+
+    def test_campaign_counts_session_once(self):
+        """测试批次只计一次会话建立"""
+        table = LatencyTable([row("vsg", "connect", 4000), row("channel_emulator", "connect", 6000)])
+        estimator = ScenarioEstimator(table, instruments=["vsg", "channel_emulator"])
+
+        result = estimator.estimate_campaign([("a.yaml", dynamic([], 10)), ("b.yaml", dynamic([], 20))])
+
+        assert result["session"]["duration_s"] == 6.0
+        assert result["total_s"] == pytest.approx(36.0)
+        assert [i["filename"] for i in result["items"]] == ["a.yaml", "b.yaml"]
+
+    def test_unknown_type(self):
+        """测试未知的测试类型"""
+        with pytest.raises(ValueError):
+            ScenarioEstimator().estimate({"config": {"type": "golden"}})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
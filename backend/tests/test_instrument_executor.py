@@ -0,0 +1,165 @@
+"""
+仪表 I/O 执行器单元测试
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.instrument_executor import AsyncInstrument, LatencyRecorder
+from drivers.vsg import VSG
+
+
+class RecordingProxy:
+    """记录调用线程与顺序的假代理"""
+
+    name = "Recorder"
+
+    def __init__(self):
+        self.calls = []
+
+    def slow_op(self, tag: str, delay: float = 0.05):
+        time.sleep(delay)
+        self.calls.append((tag, threading.current_thread().name))
+        return tag
+
+
+class SweepingProxy(RecordingProxy):
+    """start_sweep 后 duration 秒内 operation_complete() 返回 False 的假代理"""
+
+    def __init__(self, duration: float = 0.1):
+        super().__init__()
+        self.duration = duration
+        self.done_at = None
+        self.polls = 0
+
+    def start_sweep(self):
+        self.done_at = time.monotonic() + self.duration
+
+    def operation_complete(self) -> bool:
+        self.polls += 1
+        return time.monotonic() >= self.done_at
+
+
+class TestAsyncInstrument:
+    """异步包装器测试"""
+
+    @pytest.mark.asyncio
+    async def test_proxy_methods_are_awaitable(self):
+        """测试代理方法可直接 await"""
+        vsg = VSG("TCPIP0::127.0.0.1::inst0::INSTR", simulation_mode=True)
+        vsg.connect()
+        io = AsyncInstrument(vsg, name="vsg")
+
+        await io.set_frequency(3500e6)
+        await io.set_power(-80)
+        info = await io.get_driver_info()
+
+        assert info["driver_class"] == "SMW200A_Driver"
+        io.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_calls_are_serialized_on_one_thread(self):
+        """测试同一仪表的调用在同一工作线程上按提交顺序执行"""
+        proxy = RecordingProxy()
+        io = AsyncInstrument(proxy, name="rec")
+
+        results = await asyncio.gather(*(io.slow_op(str(i), 0.01) for i in range(5)))
+
+        assert results == ["0", "1", "2", "3", "4"]
+        assert [c[0] for c in proxy.calls] == ["0", "1", "2", "3", "4"]
+        assert len({c[1] for c in proxy.calls}) == 1
+        assert proxy.calls[0][1].startswith("io-rec")
+        io.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_event_loop_not_blocked(self):
+        """测试慢速仪表调用期间事件循环仍可运行其他任务"""
+        io = AsyncInstrument(RecordingProxy(), name="slow")
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(10):
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        await asyncio.gather(io.slow_op("a", 0.2), ticker())
+
+        assert ticks == 10
+        io.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_instruments_overlap(self):
+        """测试不同仪表的阻塞调用相互重叠"""
+        a = AsyncInstrument(RecordingProxy(), name="a")
+        b = AsyncInstrument(RecordingProxy(), name="b")
+
+        started = time.perf_counter()
+        await asyncio.gather(a.slow_op("x", 0.2), b.slow_op("y", 0.2))
+
+        assert time.perf_counter() - started < 0.35
+        a.shutdown()
+        b.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_shutdown_rejects_calls(self):
+        """测试关闭后拒绝新的调用"""
+        io = AsyncInstrument(RecordingProxy(), name="closed")
+        io.shutdown()
+
+        with pytest.raises(RuntimeError):
+            await io.slow_op("z")
+
+    @pytest.mark.asyncio
+    async def test_latency_recorded_per_command(self):
+        """测试按命令名记录工作线程上的执行耗时"""
+        recorder = LatencyRecorder()
+        io = AsyncInstrument(RecordingProxy(), name="rec", recorder=recorder)
+
+        await io.slow_op("a", 0.02)
+        await io.slow_op("b", 0.04)
+        io.submit(RecordingProxy().slow_op, "c", 0.0).result()
+
+        stats = {s["command"]: s for s in recorder.drain()}
+        assert stats["slow_op"]["samples"] == 3
+        assert stats["slow_op"]["max_ms"] >= 40
+        assert stats["slow_op"]["min_ms"] < 20
+        assert recorder.snapshot() == []
+        io.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_operation_future_overlaps_calls(self):
+        """测试 operation() 立即返回 Future，操作进行中同一仪表的其他调用照常执行"""
+        proxy = SweepingProxy(duration=0.1)
+        io = AsyncInstrument(proxy, name="vna")
+
+        sweep = await io.operation("start_sweep", timeout_s=2.0)
+        assert not sweep.done()
+        await io.slow_op("during", 0.0)
+        assert not sweep.done()
+        await sweep
+
+        assert [c[0] for c in proxy.calls] == ["during"]
+        assert 1 < proxy.polls < 20  # 轮询间隔指数退避
+        io.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_operation_timeout(self):
+        """测试操作超时时 Future 抛出 TimeoutError"""
+        io = AsyncInstrument(SweepingProxy(duration=10.0), name="vna")
+
+        sweep = await io.operation("start_sweep", timeout_s=0.05)
+        with pytest.raises(TimeoutError):
+            await sweep
+        io.shutdown()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
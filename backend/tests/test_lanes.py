@@ -0,0 +1,103 @@
+"""
+多测试台 (lane) 单元测试
+"""
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.log_manager import LogManager
+from app.state import AppState
+from core.config_loader import DEFAULT_LANE, resolve_lanes
+
+
+class TestResolveLanes:
+    """测试台配置拆分测试"""
+
+    def test_without_lanes(self):
+        """测试未定义 lanes 时只有默认测试台"""
+        config = {"system": {"name": "bench"}, "instruments": {"vsg": {"enabled": True}}}
+
+        lanes = resolve_lanes(config)
+
+        assert list(lanes) == [DEFAULT_LANE]
+        assert lanes[DEFAULT_LANE] == config
+
+    def test_lane_overrides_base(self):
+        """测试每个测试台以顶层配置为基础覆盖自己的键"""
+        config = {
+            "system": {"name": "bench"},
+            "instruments": {"vsg": {"resource": "TCPIP::A"}},
+            "dut": {"device_id": "base"},
+            "lanes": {
+                "rack_a": {"dut": {"device_id": "A1"}},
+                "rack_b": {"instruments": {"vsg": {"resource": "TCPIP::B"}}, "dut": {"device_id": "B1"}},
+            }
+        }
+
+        lanes = resolve_lanes(config)
+
+        assert list(lanes) == ["rack_a", "rack_b"]
+        assert lanes["rack_a"]["instruments"]["vsg"]["resource"] == "TCPIP::A"
+        assert lanes["rack_a"]["dut"]["device_id"] == "A1"
+        assert lanes["rack_b"]["instruments"]["vsg"]["resource"] == "TCPIP::B"
+        assert all("lanes" not in cfg and cfg["system"]["name"] == "bench" for cfg in lanes.values())
+
+
+class TestAppState:
+    """全局状态测试"""
+
+    def test_legacy_properties_use_default_lane(self):
+        """测试旧的全局属性指向默认测试台"""
+        app_state = AppState()
+        app_state.set_lane_names(["rack_a", "rack_b"])
+
+        app_state.is_running = True
+        app_state.current_run_id = 7
+
+        assert app_state.lane("rack_a").is_running is True
+        assert app_state.lane("rack_a").current_run_id == 7
+        assert app_state.lane("rack_b").is_running is False
+
+
+class TestLogManagerLanes:
+    """按测试台过滤广播测试"""
+
+    @pytest.mark.asyncio
+    async def test_broadcast_filtered_by_lane(self):
+        """测试订阅某测试台只收到该测试台的消息，未指定则收到全部"""
+        manager = LogManager()
+        queue_a = await manager.connect("rack_a")
+        queue_all = await manager.connect()
+
+        await manager.broadcast("from a", "rack_a")
+        await manager.broadcast("from b", "rack_b")
+        await manager.broadcast("global")
+
+        assert [queue_a.get_nowait() for _ in range(queue_a.qsize())] == ["from a", "global"]
+        assert queue_all.qsize() == 3
+
+        manager.disconnect(queue_a)
+        assert manager._subscriptions.keys() == {id(queue_all)}
+
+    @pytest.mark.asyncio
+    async def test_metrics_tagged_with_lane(self):
+        """测试指标消息携带测试台名称"""
+        manager = LogManager()
+        queue = await manager.connect("rack_b")
+
+        manager.sync_broadcast_metrics({"bler": 0.01}, "rack_b")
+        await asyncio.sleep(0)
+
+        message = json.loads(queue.get_nowait())
+        assert message["lane"] == "rack_b"
+        assert message["data"]["bler"] == 0.01
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
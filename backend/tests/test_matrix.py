@@ -0,0 +1,169 @@
+"""
+参数矩阵展开单元测试
+"""
+import itertools
+import os
+import sys
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.campaign import CampaignRunner
+from core.matrix import ScenarioMatrix, count_items, matrix_items
+from core.sequencer import TestSequencer
+
+
+def template(axes, total_duration=0.1):
+    return {
+        "metadata": {"id": "M", "name": "矩阵"},
+        "matrix": {"axes": axes},
+        "config": {
+            "type": "dynamic_scenario",
+            "total_duration": total_duration,
+            "channel": {"model": "x"},
+            "timeline": [
+                {"time": 0, "target": "channel_emulator", "action": "load_channel_model",
+                 "params": {"model": "${model}"}},
+                {"time": 0, "target": "channel_emulator", "action": "set_velocity",
+                 "params": {"kmh": "${speed}"}, "comment": "速度 ${speed}"},
+            ],
+            "metrics": {"interval": 0.1}
+        }
+    }
+
+
+AXES = [
+    {"name": "speed", "values": [3, 30, 120, 350], "cost_s": 0.2},
+    {"name": "band", "values": ["n41", "n78", "n79"], "cost_s": 0.5},
+    {"name": "model", "path": "config.channel.model", "values": ["UMa", "RMa", "InH"], "cost_s": 8.0},
+]
+
+
+class TestScenarioMatrix:
+    """矩阵展开测试"""
+
+    def test_cartesian_product(self):
+        """测试展开结果覆盖全部组合且无重复"""
+        matrix = ScenarioMatrix(template(AXES))
+
+        combos = [tuple(p.values.values()) for p in matrix.points()]
+
+        assert len(matrix) == 36
+        assert len(set(combos)) == 36
+
+    def test_expensive_axis_changes_least(self):
+        """测试代价最高的轴在最外层，相邻测试点只改变一个轴"""
+        matrix = ScenarioMatrix(template(AXES))
+        points = [p.values for p in matrix.points()]
+
+        model_changes = sum(a["model"] != b["model"] for a, b in zip(points, points[1:]))
+        assert model_changes == 2
+        assert all(sum(a[k] != b[k] for k in a) == 1 for a, b in zip(points, points[1:]))
+        assert matrix.reconfiguration_cost() < ScenarioMatrix(template(AXES), "declared").reconfiguration_cost()
+
+    def test_render_substitutes_values(self):
+        """测试占位符替换保留原始类型，path 写入指定位置"""
+        matrix = ScenarioMatrix(template(AXES))
+        point = matrix.point(5)
+
+        scenario = matrix.render(point)
+
+        timeline = scenario["config"]["timeline"]
+        assert timeline[0]["params"]["model"] == point.values["model"]
+        assert timeline[1]["params"]["kmh"] == point.values["speed"]
+        assert timeline[1]["comment"] == f"速度 {point.values['speed']}"
+        assert scenario["config"]["channel"]["model"] == point.values["model"]
+        assert scenario["metadata"]["id"] == "M[5]"
+        assert "matrix" not in scenario
+
+    def test_large_matrix_is_lazy(self):
+        """测试大矩阵按需展开"""
+        axes = [{"name": f"a{i}", "values": list(range(10))} for i in range(6)]
+        matrix = ScenarioMatrix(template(axes))
+
+        items = matrix_items("big.yaml", template(axes))
+        first = list(itertools.islice(items, 3))
+
+        assert len(matrix) == 10 ** 6
+        assert [item.filename for item in first] == ["big.yaml#0", "big.yaml#1", "big.yaml#2"]
+        assert matrix.point(999_999).values["a0"] == 9
+
+    @pytest.mark.parametrize("axes", [
+        [],
+        [{"name": "a", "values": []}],
+        [{"values": [1]}],
+        [{"name": "a", "values": [1]}, {"name": "a", "values": [2]}],
+    ])
+    def test_invalid_axes(self, axes):
+        """测试非法的轴定义"""
+        with pytest.raises(ValueError):
+            ScenarioMatrix(template(axes))
+
+    def test_count_items(self):
+        """测试批次条目计数 (普通场景计 1)"""
+        assert count_items([template(AXES), {"config": {"type": "sensitivity"}}]) == 37
+
+
+class RecordingProxy:
+    """记录调用的假信道模拟器"""
+
+    calls = []
+
+    def __init__(self, address, name="X", simulation_mode=False):
+        pass
+
+    def connect(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def load_channel_model(self, model: str):
+        RecordingProxy.calls.append(("load", model))
+
+    def set_velocity(self, kmh: float):
+        RecordingProxy.calls.append(("velocity", kmh))
+
+
+class TestMatrixCampaign:
+    """矩阵批次流式执行测试"""
+
+    @pytest.fixture
+    def sequencer(self, monkeypatch):
+        RecordingProxy.calls = []
+        monkeypatch.setattr("core.sequencer.INSTRUMENT_PROXIES",
+                            {"channel_emulator": (RecordingProxy, "ChanEm")})
+        return TestSequencer({"instruments": {"channel_emulator": {"address": "a"}}}, simulation_mode=True)
+
+    @pytest.mark.asyncio
+    async def test_streams_points(self, sequencer):
+        """测试矩阵测试点逐个流经同一会话"""
+        axes = [{"name": "speed", "values": [3, 30]}, {"name": "model", "values": ["A", "B"], "cost_s": 5}]
+        scenario = template(axes, total_duration=0)
+        runner = CampaignRunner(sequencer, matrix_items("m.yaml", scenario), total=4, history=2)
+
+        status = await runner.run()
+
+        assert status == "completed"
+        assert runner.counts == {"completed": 4}
+        assert len(runner.items) == 2
+        loads = [model for kind, model in RecordingProxy.calls if kind == "load"]
+        assert loads == ["A", "A", "B", "B"]
+
+    @pytest.mark.asyncio
+    async def test_stop_counts_remaining_as_skipped(self, sequencer):
+        """测试流式批次停止后，未展开的测试点计为跳过"""
+        scenario = template([{"name": "speed", "values": [1, 2, 3, 4, 5]}], total_duration=0)
+        runner = CampaignRunner(sequencer, matrix_items("m.yaml", scenario), total=5,
+                                on_item_end=lambda item: runner.stop())
+
+        status = await runner.run()
+
+        assert status == "stopped"
+        assert runner.counts == {"completed": 1, "skipped": 4}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
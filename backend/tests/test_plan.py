@@ -0,0 +1,164 @@
+"""
+场景编译单元测试
+"""
+import glob
+import os
+import sys
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.plan import ScenarioCompiler
+from drivers.channel_emulator import ChannelEmulator
+from drivers.vsg import VSG
+
+SCENARIOS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scenarios")
+
+
+def dynamic(timeline, total_duration=10):
+    return {
+        "metadata": {"id": "T", "name": "编译测试"},
+        "config": {"type": "dynamic_scenario", "total_duration": total_duration, "timeline": timeline}
+    }
+
+
+@pytest.fixture
+def compiler():
+    return ScenarioCompiler({"vsg": VSG, "channel_emulator": ChannelEmulator})
+
+
+class TestScenarioCompiler:
+    """场景编译器测试"""
+
+    def test_sorts_and_coerces(self, compiler):
+        """测试事件按时间排序，参数按注解转换类型"""
+        plan = compiler.compile(dynamic([
+            {"time": "5", "target": "vsg", "action": "enable_output", "params": {"enable": "on"}},
+            {"time": 0, "target": "vsg", "action": "set_frequency", "params": {"hz": "3500e6"}},
+            {"time": 0, "target": "channel_emulator", "action": "set_fading_profile",
+             "params": {"profile": "deep_fade", "duration_ms": 200.0}},
+        ]))
+
+        assert plan.ok
+        assert [e.time for e in plan.events] == [0.0, 0.0, 5.0]
+        assert plan.events[0].params["hz"] == 3.5e9
+        assert plan.events[1].params["duration_ms"] == 200
+        assert isinstance(plan.events[1].params["duration_ms"], int)
+        assert plan.events[2].params["enable"] is True
+        assert [len(g) for _, g in plan.groups()] == [2, 1]
+
+    def test_reports_all_errors(self, compiler):
+        """测试一次编译报告所有错误"""
+        plan = compiler.compile(dynamic([
+            {"time": 0, "target": "vsa", "action": "set_power", "params": {"dbm": -80}},
+            {"time": 1, "target": "vsg", "action": "set_powr", "params": {"dbm": -80}},
+            {"time": 2, "target": "vsg", "action": "set_power", "params": {"power": -80}},
+            {"time": 3, "target": "vsg", "action": "set_power", "params": {"dbm": "high"}},
+            {"time": "soon", "target": "vsg", "action": "rf_on"},
+            {"time": 4, "target": "vsg", "action": "_check"},
+        ]))
+
+        assert not plan.ok
+        assert [e.index for e in plan.errors] == [0, 1, 2, 3, 4, 5]
+        assert plan.events == ()
+
+    def test_event_beyond_duration_is_warning(self, compiler):
+        """测试超出场景时长的事件仅给出警告"""
+        plan = compiler.compile(dynamic([
+            {"time": 20, "target": "channel_emulator", "action": "rf_off"}
+        ], total_duration=10))
+
+        assert plan.ok
+        assert len(plan.warnings) == 1
+
+    def test_plan_is_immutable(self, compiler):
+        """测试编译结果不可修改"""
+        plan = compiler.compile(dynamic([
+            {"time": 0, "target": "vsg", "action": "set_power", "params": {"dbm": -80}}
+        ]))
+
+        with pytest.raises(TypeError):
+            plan.events[0].params["dbm"] = 0
+        with pytest.raises(AttributeError):
+            plan.events[0].time = 1.0
+
+    def test_bind_returns_prebound_call(self, compiler):
+        """测试绑定到仪表后得到无参调用"""
+        plan = compiler.compile(dynamic([
+            {"time": 0, "target": "vsg", "action": "set_power", "params": {"dbm": "-75"}}
+        ]))
+
+        class Recorder:
+            def set_power(self, dbm):
+                self.dbm = dbm
+
+        recorder = Recorder()
+        plan.events[0].bind(recorder)()
+
+        assert recorder.dbm == -75.0
+
+    def test_ramp_event(self, compiler):
+        """测试斜坡事件: 起始值参与参数校验，非数值参数或超出时长给出提示"""
+        plan = compiler.compile(dynamic([
+            {"time": 2, "target": "channel_emulator", "action": "set_velocity",
+             "ramp": {"shape": "s_curve", "from": 50, "to": 350, "duration": 10}},
+        ], total_duration=10))
+
+        assert plan.ok
+        assert plan.events[0].params["kmh"] == 50.0
+        assert plan.events[0].ramp.end_value == 350
+        assert plan.events[0].to_dict()["ramp"]["shape"] == "s_curve"
+        assert len(plan.warnings) == 1
+
+        plan = compiler.compile(dynamic([
+            {"time": 0, "target": "channel_emulator", "action": "load_channel_model",
+             "ramp": {"param": "model", "from": 0, "to": 1, "duration": 1}},
+            {"time": 0, "target": "vsg", "action": "set_power", "ramp": {"from": -80, "duration": 1}},
+        ]))
+        assert [e.index for e in plan.errors] == [0, 1]
+
+    def test_search_config_validated(self, compiler):
+        """测试灵敏度/阻塞配置错误在编译期报告"""
+        plan = compiler.compile({"config": {"type": "blocking", "interferer": {"mode": "golden"}}})
+
+        assert not plan.ok
+        assert "interferer" in plan.errors[0].message
+
+    def test_file_cache_by_hash(self, compiler, tmp_path):
+        """测试按文件哈希缓存，内容变化后重新编译"""
+        path = tmp_path / "s.yaml"
+        path.write_text("config:\n  type: dynamic_scenario\n  timeline: []\n", encoding="utf-8")
+
+        first = compiler.compile_file(str(path))
+        assert compiler.compile_file(str(path)) is first
+
+        path.write_text("config:\n  type: dynamic_scenario\n  total_duration: 5\n  timeline: []\n",
+                        encoding="utf-8")
+        second = compiler.compile_file(str(path))
+        assert second is not first
+        assert second.source_hash != first.source_hash
+
+    def test_non_mapping_scenario_reported(self, compiler, tmp_path):
+        """测试顶层或 metadata / config 不是映射时报告错误而不是抛出异常"""
+        path = tmp_path / "list.yaml"
+        path.write_text("- type: dynamic_scenario\n", encoding="utf-8")
+
+        plan = compiler.compile_file(str(path))
+        assert not plan.ok
+        assert "顶层" in plan.errors[0].message
+
+        plan = compiler.compile({"metadata": ["T"], "config": "sensitivity"})
+        assert [e.message.split()[0] for e in plan.errors] == ["metadata", "config"]
+
+    @pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(SCENARIOS_DIR, "*.yaml"))))
+    def test_bundled_scenarios_compile(self, path):
+        """测试仓库自带的场景文件全部通过编译"""
+        plan = ScenarioCompiler().compile_file(path)
+
+        assert plan.ok, [i.message for i in plan.errors]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
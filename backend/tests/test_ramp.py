@@ -0,0 +1,137 @@
+"""
+参数斜坡单元测试
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.ramp import ParameterRamp, parse_ramp
+
+
+class TestRampSpec:
+    """斜坡定义测试"""
+
+    def test_linear_and_s_curve(self):
+        """测试线性与 S 曲线的取值，S 曲线起止平缓、中点相同"""
+        linear = parse_ramp({"param": "kmh", "from": 50, "to": 350, "duration": 10}, {})
+        s_curve = parse_ramp({"param": "kmh", "shape": "s_curve", "from": 50, "to": 350, "duration": 10}, {})
+
+        assert linear.value_at(2.5) == pytest.approx(125)
+        assert s_curve.value_at(5) == pytest.approx(200)
+        assert s_curve.value_at(1) < linear.value_at(1)
+        assert s_curve.value_at(9) > linear.value_at(9)
+        assert linear.value_at(-1) == 50 and linear.value_at(20) == 350
+
+    def test_table_interpolation(self):
+        """测试表格形状分段线性插值"""
+        spec = parse_ramp({"param": "kmh", "shape": "table", "points": [[0, 350], [4, 250], [10, 100]]}, {})
+
+        assert spec.duration == 10
+        assert spec.value_at(2) == pytest.approx(300)
+        assert spec.value_at(7) == pytest.approx(175)
+
+    def test_defaults_from_params(self):
+        """测试唯一参数可省略 param，from 缺省时取 params"""
+        spec = parse_ramp({"to": 0, "duration": 2, "rate_hz": 4}, {"kmh": 120}, accepted=["kmh"])
+
+        assert spec.param == "kmh"
+        assert spec.start_value == 120
+        assert spec.planned_updates == 9
+
+    @pytest.mark.parametrize("raw", [
+        {"param": "kmh", "to": 10, "duration": 1},
+        {"param": "kmh", "from": 0, "to": 10, "duration": 0},
+        {"param": "kmh", "from": 0, "to": 10, "duration": 1, "rate_hz": 0},
+        {"param": "kmh", "shape": "sine", "from": 0, "to": 10, "duration": 1},
+        {"param": "kmh", "shape": "table", "points": [[1, 0], [2, 10]]},
+        {"param": "kmh", "shape": "table", "points": [[0, 0], [2, 10], [1, 5]]},
+        {"param": "speed", "from": 0, "to": 10, "duration": 1},
+    ])
+    def test_invalid(self, raw):
+        """测试非法斜坡定义"""
+        with pytest.raises(ValueError):
+            parse_ramp(raw, {}, accepted=["kmh"])
+
+
+class TestParameterRamp:
+    """斜坡执行测试"""
+
+    @pytest.mark.asyncio
+    async def test_updates_at_rate_and_ends_on_target(self):
+        """测试按速率下发，首值为起点、末值为终点"""
+        values = []
+
+        async def send(value):
+            values.append(value)
+
+        spec = parse_ramp({"param": "kmh", "from": 0, "to": 100, "duration": 0.2, "rate_hz": 50}, {})
+        ramp = ParameterRamp(spec, send)
+        await ramp.run()
+
+        stats = ramp.stats()
+        assert values[0] == 0 and values[-1] == 100
+        assert values == sorted(values)
+        assert stats["completed"] is True
+        assert stats["sent"] == len(values) >= 9
+        assert stats["coalesced"] == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_instrument_coalesces(self):
+        """测试仪表跟不上时合并更新，且仍以终值结束"""
+        values = []
+
+        async def send(value):
+            await asyncio.sleep(0.05)
+            values.append(value)
+
+        spec = parse_ramp({"param": "kmh", "from": 0, "to": 100, "duration": 0.3, "rate_hz": 100}, {})
+        ramp = ParameterRamp(spec, send)
+        await ramp.run()
+
+        stats = ramp.stats()
+        assert stats["coalesced"] > 0
+        assert stats["sent"] < stats["planned_updates"]
+        assert values[-1] == 100
+        assert 0 < stats["achieved_rate_hz"] < 30
+
+    @pytest.mark.asyncio
+    async def test_stop_before_end(self):
+        """测试中止后不再下发，统计标记为未完成"""
+        values = []
+
+        async def send(value):
+            values.append(value)
+
+        spec = parse_ramp({"param": "kmh", "from": 0, "to": 100, "duration": 5, "rate_hz": 10}, {})
+        ramp = ParameterRamp(spec, send)
+        task = asyncio.create_task(ramp.run())
+        await asyncio.sleep(0.15)
+        ramp.stop()
+        await task
+
+        assert ramp.stats()["completed"] is False
+        assert len(values) <= 3
+
+    @pytest.mark.asyncio
+    async def test_integer_param_skips_unchanged(self):
+        """测试整数参数取整，取值不变时不重复下发"""
+        values = []
+
+        async def send(value):
+            values.append(value)
+
+        spec = parse_ramp({"param": "n", "from": 0, "to": 2, "duration": 0.2, "rate_hz": 50}, {}, integer=True)
+        ramp = ParameterRamp(spec, send)
+        await ramp.run()
+
+        assert values == [0, 1, 2]
+        assert ramp.stats()["unchanged"] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
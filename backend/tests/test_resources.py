@@ -0,0 +1,137 @@
+"""
+测试台资源管理单元测试
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.resources import BenchResourceManager, LeaseCancelled, bench_resources
+
+
+class TestBenchResources:
+    """测试台资源列表测试"""
+
+    def test_addresses_and_dut(self):
+        """测试按仪表地址与 DUT 生成资源列表，重复地址只计一次"""
+        config = {
+            "instruments": {
+                "vsg": {"address": "TCPIP::10.0.0.1::INSTR"},
+                "sa": {"address": "TCPIP::10.0.0.1::INSTR"},
+                "vna": {"name": "no address"},
+            },
+            "dut": {"device_id": "R58M"}
+        }
+
+        assert bench_resources(config) == ["TCPIP::10.0.0.1::INSTR", "dut:R58M"]
+        assert bench_resources({}) == []
+
+
+class TestBenchResourceManager:
+    """仪表租约测试"""
+
+    def test_exclusive_grant(self):
+        """测试同一资源同时只授予一个租约，不相交的请求互不影响"""
+        resources = BenchResourceManager()
+
+        a = resources.request("lane_a", ["vsg", "ce"])
+        b = resources.request("lane_b", ["vsg"])
+        c = resources.request("lane_c", ["sa"])
+
+        assert a.granted and c.granted
+        assert not b.granted
+        assert resources.holder_of("vsg") is a
+        assert resources.blockers(b) == ["lane_a"]
+
+        resources.release(a)
+        assert b.granted
+        assert resources.holder_of("ce") is None
+
+    def test_priority_then_fifo(self):
+        """测试高优先级先得，同优先级先到先得"""
+        resources = BenchResourceManager()
+        for holder, priority in [("holder", 0), ("low", 0), ("high", 5), ("low2", 0)]:
+            resources.request(holder, ["vsg"], priority=priority)
+
+        order = []
+        while resources.holder_of("vsg"):
+            lease = resources.holder_of("vsg")
+            order.append(lease.holder)
+            resources.release(lease)
+
+        assert order == ["holder", "high", "low", "low2"]
+
+    def test_queued_request_reserves_resources(self):
+        """测试排队中的大请求预留资源，后来的小请求不能插队"""
+        resources = BenchResourceManager()
+        holder = resources.request("holder", ["vsg"])
+        big = resources.request("big", ["vsg", "ce"])
+        small = resources.request("small", ["ce"])
+        other = resources.request("other", ["sa"])
+
+        assert not big.granted
+        assert not small.granted
+        assert other.granted
+
+        resources.release(holder)
+        assert big.granted
+        assert not small.granted
+
+    @pytest.mark.asyncio
+    async def test_wait_until_released(self):
+        """测试等待方在资源归还后获得租约"""
+        resources = BenchResourceManager()
+        holder = await resources.acquire("holder", ["vsg"])
+
+        waiter = asyncio.create_task(resources.acquire("waiter", ["vsg"]))
+        await asyncio.sleep(0)
+        assert [lease.holder for lease in resources.queued()] == ["waiter"]
+
+        resources.release(holder)
+        lease = await asyncio.wait_for(waiter, 1.0)
+        assert lease.granted
+        assert resources.to_dict()["leases"][0]["holder"] == "waiter"
+
+    @pytest.mark.asyncio
+    async def test_timeout_withdraws_request(self):
+        """测试等待超时后撤销请求，不再阻挡后来者"""
+        resources = BenchResourceManager()
+        holder = await resources.acquire("holder", ["vsg", "ce"])
+
+        with pytest.raises(asyncio.TimeoutError):
+            await resources.acquire("impatient", ["vsg", "ce"], timeout=0.01)
+
+        assert resources.queued() == []
+        resources.release(holder)
+        assert resources.leases() == []
+
+    @pytest.mark.asyncio
+    async def test_release_queued_cancels_waiter(self):
+        """测试撤销排队中的请求时等待方收到 LeaseCancelled"""
+        resources = BenchResourceManager()
+        await resources.acquire("holder", ["vsg"])
+        lease = resources.request("waiter", ["vsg"])
+        waiter = asyncio.create_task(resources.wait(lease))
+        await asyncio.sleep(0)
+
+        resources.release(lease)
+
+        with pytest.raises(LeaseCancelled):
+            await waiter
+
+    def test_try_acquire_does_not_queue(self):
+        """测试 try_acquire 拿不到时不排队"""
+        resources = BenchResourceManager()
+        resources.request("holder", ["vsg"])
+
+        assert resources.try_acquire("status", ["vsg"]) is None
+        assert resources.queued() == []
+        assert resources.try_acquire("status", ["sa"]).granted
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
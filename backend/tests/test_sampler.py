@@ -0,0 +1,93 @@
+"""
+指标采样器单元测试
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.sampler import MetricSampler, SampleSource
+
+
+def source(name: str, delay: float = 0.0, value: float = 1.0):
+    async def read():
+        await asyncio.sleep(delay)
+        return {name: value}
+    return SampleSource(name, read)
+
+
+class TestMetricSampler:
+    """采样器测试"""
+
+    @pytest.mark.asyncio
+    async def test_samples_on_absolute_grid(self):
+        """测试采样时刻对齐绝对网格且不漂移"""
+        samples = []
+        sampler = MetricSampler(0.05, [source("a"), source("b", value=2.0)], samples.append)
+
+        await sampler.run(0.5)
+
+        assert len(samples) == 11
+        assert [s["sample_index"] for s in samples] == list(range(11))
+        assert samples[0]["a"] == 1.0 and samples[0]["b"] == 2.0
+        assert all(s["jitter_ms"] < 20 for s in samples)
+        assert abs(samples[-1]["elapsed_time"] - 0.5) < 0.02
+
+    @pytest.mark.asyncio
+    async def test_sources_read_concurrently(self):
+        """测试多个目标并发读取，采集延迟取决于最慢的目标"""
+        samples = []
+        sampler = MetricSampler(0.2, [source("a", 0.05), source("b", 0.05)], samples.append)
+
+        await sampler.run(0.0)
+
+        assert len(samples) == 1
+        assert 45 <= samples[0]["acquisition_latency_ms"] < 90
+
+    @pytest.mark.asyncio
+    async def test_skip_on_overrun(self):
+        """测试采集超时时跳过过期时刻而不是积压补采"""
+        samples = []
+        sampler = MetricSampler(0.05, [source("slow", 0.12)], samples.append)
+
+        await sampler.run(0.5)
+
+        indices = [s["sample_index"] for s in samples]
+        assert indices[:2] == [0, 3]
+        assert sampler.skipped > 0
+        assert sampler.samples + sampler.skipped <= 11
+
+    @pytest.mark.asyncio
+    async def test_failed_source_counted(self):
+        """测试单个目标读取失败不影响其他目标"""
+        async def broken():
+            raise ConnectionError("timeout")
+
+        samples = []
+        sampler = MetricSampler(0.05, [source("a"), SampleSource("bad", broken)], samples.append)
+
+        await sampler.run(0.1)
+
+        assert sampler.errors == len(samples) == 3
+        assert all("a" in s and "bad" not in s for s in samples)
+
+    @pytest.mark.asyncio
+    async def test_stop_wakes_sampler(self):
+        """测试 stop() 立即结束采样"""
+        sampler = MetricSampler(0.05, [source("a")], lambda s: None)
+        task = asyncio.create_task(sampler.run(10.0))
+
+        await asyncio.sleep(0.12)
+        sampler.stop()
+        await asyncio.wait_for(task, timeout=0.1)
+
+        assert 2 <= sampler.samples <= 4
+        assert sampler.stats()["achieved_rate_hz"] > 15
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
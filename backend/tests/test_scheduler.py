@@ -0,0 +1,88 @@
+"""
+时间轴调度器单元测试
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.scheduler import TimelineScheduler
+
+
+class TestTimelineScheduler:
+    """截止时间调度测试"""
+
+    @pytest.mark.asyncio
+    async def test_events_fire_in_deadline_order(self):
+        """测试事件按截止时间及入队顺序触发"""
+        fired = []
+        scheduler = TimelineScheduler()
+        scheduler.schedule_at(0.05, lambda: fired.append("b"), label="b")
+        scheduler.schedule_at(0.0, lambda: fired.append("a"), label="a")
+        scheduler.schedule_at(0.05, lambda: fired.append("c"), label="c")
+
+        await scheduler.run(0.1)
+
+        assert fired == ["a", "b", "c"]
+        assert [r.label for r in scheduler.records] == ["a", "b", "c"]
+
+    @pytest.mark.asyncio
+    async def test_event_at_duration_fires(self):
+        """测试截止时间等于场景时长的事件仍会触发"""
+        fired = []
+        scheduler = TimelineScheduler()
+        scheduler.schedule_at(0.05, lambda: fired.append("end"))
+
+        await scheduler.run(0.05)
+
+        assert fired == ["end"]
+
+    @pytest.mark.asyncio
+    async def test_fire_jitter_is_small(self):
+        """测试实际触发时间紧贴计划时间 (远小于旧的 100ms Tick)"""
+        scheduler = TimelineScheduler()
+        for i in range(5):
+            scheduler.schedule_at(0.02 * i, lambda: None)
+
+        await scheduler.run(0.1)
+
+        stats = scheduler.jitter_stats()
+        assert stats["count"] == 5
+        assert 0 <= stats["max_ms"] < 20
+
+    @pytest.mark.asyncio
+    async def test_periodic_does_not_drift(self):
+        """测试周期任务按绝对截止时间排布，慢回调不会累积误差"""
+        async def slow():
+            await asyncio.sleep(0.015)
+
+        scheduler = TimelineScheduler()
+        scheduler.schedule_periodic(0.02, slow, kind="metrics")
+
+        await scheduler.run(0.2)
+
+        planned = [round(r.planned_time, 6) for r in scheduler.records]
+        assert planned == [round(0.02 * (i + 1), 6) for i in range(len(planned))]
+        assert len(planned) == 10
+
+    @pytest.mark.asyncio
+    async def test_stop_wakes_immediately(self):
+        """测试 stop() 立即唤醒长时间等待"""
+        scheduler = TimelineScheduler()
+        scheduler.schedule_at(10.0, lambda: None)
+
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, scheduler.stop)
+        started = loop.time()
+        await scheduler.run(30.0)
+
+        assert loop.time() - started < 1.0
+        assert scheduler.records == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,224 @@
+"""
+灵敏度搜索引擎单元测试
+"""
+import os
+import sys
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.search import (
+    BisectionSearch,
+    BlockingSweep,
+    CoarseToFineSearch,
+    ConfidenceSearch,
+    LinearSearch,
+    WarmStartSearch,
+    create_blocking_sweep,
+    create_sensitivity_search,
+    sensitivity_search_config,
+)
+
+
+def step_link(threshold_dbm: float):
+    """功率低于阈值时 BLER 超标的理想链路"""
+    return lambda p: 0.0 if p >= threshold_dbm else 0.2
+
+
+def run_search(search, link):
+    while True:
+        power = search.next_power()
+        if power is None:
+            return search.result()
+        search.report(power, link(power))
+
+
+class TestSearchEngines:
+    """搜索引擎收敛测试"""
+
+    @pytest.mark.parametrize("search", [
+        LinearSearch(-70, -115, 0.05, 0.5),
+        BisectionSearch(-70, -115, 0.05, 0.5),
+        CoarseToFineSearch(-70, -115, 0.05, 0.5, 4.0),
+        ConfidenceSearch(-70, -115, 0.05, 0.5),
+    ])
+    def test_all_modes_find_same_crossing(self, search):
+        """测试所有模式定位到相同的交叉点"""
+        result = run_search(search, step_link(-101.3))
+
+        assert result.converged
+        assert result.sensitivity_dbm == -101.0
+        assert result.first_fail_dbm == -101.5
+
+    def test_bisection_is_logarithmic(self):
+        """测试二分搜索的测量次数为 O(log N)"""
+        linear = run_search(LinearSearch(-70, -115, 0.05, 0.5), step_link(-101.3))
+        bisect = run_search(BisectionSearch(-70, -115, 0.05, 0.5), step_link(-101.3))
+
+        assert len(linear.probes) == 64
+        assert len(bisect.probes) <= 2 + 7
+        assert bisect.probes[0].phase == "start"
+        assert bisect.probes[1].phase == "end"
+
+    def test_start_power_already_failing(self):
+        """测试起始功率即失败时立即结束"""
+        result = run_search(BisectionSearch(-70, -115, 0.05, 0.5), step_link(-60))
+
+        assert result.sensitivity_dbm is None
+        assert result.first_fail_dbm == -70
+        assert len(result.probes) == 1
+
+    def test_end_power_still_passing(self):
+        """测试终止功率仍通过时报告灵敏度低于范围"""
+        result = run_search(CoarseToFineSearch(-70, -115, 0.05, 0.5, 4.0), step_link(-130))
+
+        assert result.sensitivity_dbm == -115
+        assert result.first_fail_dbm is None
+        assert not result.converged
+
+    def test_confidence_repeats_noisy_point(self):
+        """测试置信模式在读数跨越目标时重复测量"""
+        readings = iter([0.0, 0.0, 0.04, 0.07, 0.06, 0.05, 0.08, 0.2, 0.2])
+        search = ConfidenceSearch(-70, -71, 0.05, 1.0, min_samples=2, max_samples=5)
+
+        result = run_search(search, lambda p: next(readings))
+
+        undecided = [p for p in result.probes if not p.decided]
+        assert len(undecided) >= 2
+        assert result.sensitivity_dbm == -70.0
+        assert result.first_fail_dbm == -71.0
+
+    def test_replay_restores_state(self):
+        """测试回放已完成的测量后继续搜索，结果与不中断时一致"""
+        link = step_link(-101.3)
+        full = run_search(BisectionSearch(-70, -115, 0.05, 0.5), link)
+
+        resumed = BisectionSearch(-70, -115, 0.05, 0.5)
+        readings = [[p.power_dbm, p.bler] for p in full.probes[:4]]
+        assert resumed.replay(readings) == 4
+        result = run_search(resumed, link)
+
+        assert result.to_dict() == full.to_dict()
+
+    def test_replay_stops_on_mismatch(self):
+        """测试读数与待测功率不符时停止回放"""
+        search = BisectionSearch(-70, -115, 0.05, 0.5)
+
+        assert search.replay([[-70, 0.0], [-80, 0.0]]) == 1
+
+    def test_factory_modes(self):
+        """测试工厂按配置创建引擎"""
+        cfg = {"start_power": -70, "end_power": -115, "step": 0.5, "target_bler": 0.05}
+
+        assert create_sensitivity_search(cfg).mode == "bisection"
+        assert create_sensitivity_search({**cfg, "mode": "linear"}).mode == "linear"
+        with pytest.raises(ValueError):
+            create_sensitivity_search({**cfg, "mode": "unknown"})
+
+    def test_scenario_confidence_z(self):
+        """测试场景 config.search 中的 confidence_z 传递到 ConfidenceSearch"""
+        search_cfg = {"mode": "confidence", "start_power_dbm": -70, "end_power_dbm": -115,
+                      "resolution_db": 0.5, "target_bler": 0.05, "confidence_z": 2.58}
+
+        search = create_sensitivity_search(sensitivity_search_config(search_cfg))
+
+        assert isinstance(search, ConfidenceSearch)
+        assert search.z == 2.58
+        del search_cfg["confidence_z"]
+        assert create_sensitivity_search(sensitivity_search_config(search_cfg)).z == 1.96
+
+
+def blocking_link(threshold_dbm: float):
+    """干扰功率高于门限时 BLER 超标的理想链路"""
+    return lambda p: 0.0 if p <= threshold_dbm else 0.2
+
+
+class TestWarmStartSearch:
+    """热启动二分搜索测试"""
+
+    @pytest.mark.parametrize("seed", [None, -40.0, -38.0, -55.0, -31.0])
+    def test_any_seed_finds_crossing(self, seed):
+        """测试任意初始猜测都能定位到相同的失效点"""
+        search = WarmStartSearch(-60, -30, 0.05, 1.0, seed_power=seed)
+
+        result = run_search(search, blocking_link(-38.5))
+
+        assert result.converged
+        assert result.sensitivity_dbm == -39.0
+        assert result.first_fail_dbm == -38.0
+
+    def test_accurate_seed_saves_measurements(self):
+        """测试准确的初始猜测显著减少测量次数"""
+        cold = run_search(WarmStartSearch(-60, -30, 0.05, 0.5), blocking_link(-38.2))
+        warm = run_search(WarmStartSearch(-60, -30, 0.05, 0.5, seed_power=-38.5), blocking_link(-38.2))
+
+        assert warm.sensitivity_dbm == cold.sensitivity_dbm == -38.5
+        assert len(warm.probes) <= 3 < len(cold.probes)
+        assert warm.probes[0].phase == "seed"
+        assert warm.probes[1].phase == "gallop"
+
+    def test_seed_outside_range_never_fails(self):
+        """测试整个范围均通过时报告未收敛"""
+        result = run_search(WarmStartSearch(-60, -30, 0.05, 1.0, seed_power=-45), blocking_link(0))
+
+        assert result.sensitivity_dbm == -30
+        assert result.first_fail_dbm is None
+        assert not result.converged
+
+
+class TestBlockingSweep:
+    """多频偏阻塞扫描测试"""
+
+    def run_sweep(self, sweep, thresholds):
+        for offset in sweep.ordered_offsets():
+            search = sweep.create_search(offset)
+            run_search(search, blocking_link(thresholds[offset]))
+            sweep.record(offset, search)
+        return sweep.to_dict()
+
+    def test_orders_by_absolute_offset(self):
+        """测试按 |频偏| 排序"""
+        sweep = BlockingSweep([-20, -15, 15, 20], -60, -30, 0.05, order_offsets=True)
+
+        assert sweep.ordered_offsets() == [-15, 15, -20, 20]
+
+    def test_seeds_from_nearest_measured_offset(self):
+        """测试从 |频偏| 最接近的已测频偏取初始猜测"""
+        thresholds = {-20.0: -36.2, -15.0: -40.3, 15.0: -40.1, 20.0: -36.4}
+        sweep = create_blocking_sweep({
+            "freq_offsets_mhz": [-20, -15, 15, 20], "start_power_dbm": -60,
+            "end_power_dbm": -30, "mode": "bisection", "resolution_db": 0.5,
+            "order_offsets": True
+        }, 0.05)
+
+        table = {t["offset_mhz"]: t for t in self.run_sweep(sweep, thresholds)["thresholds"]}
+
+        assert table[15.0]["seeded_from_mhz"] == -15.0
+        assert table[-20.0]["seeded_from_mhz"] == -15.0
+        assert table[20.0]["seeded_from_mhz"] == -20.0
+        assert [table[o]["threshold_dbm"] for o in (-20.0, -15.0, 15.0, 20.0)] == [-36.5, -40.5, -40.5, -36.5]
+
+    def test_bisection_beats_linear(self):
+        """测试热启动二分的总测量次数少于逐点爬坡"""
+        thresholds = {-20.0: -36.2, -15.0: -40.3, 15.0: -40.1, 20.0: -36.4}
+        offsets = [-20, -15, 15, 20]
+        linear = self.run_sweep(BlockingSweep(offsets, -60, -30, 0.05, step_db=0.5), thresholds)
+        bisect = self.run_sweep(
+            BlockingSweep(offsets, -60, -30, 0.05, mode="bisection", step_db=0.5, order_offsets=True),
+            thresholds
+        )
+
+        assert ([t["threshold_dbm"] for t in linear["thresholds"]]
+                == [t["threshold_dbm"] for t in bisect["thresholds"]])
+        assert bisect["measurements"] * 3 < linear["measurements"]
+
+    def test_unknown_mode(self):
+        """测试未知模式报错"""
+        with pytest.raises(ValueError):
+            BlockingSweep([15], -60, -30, 0.05, mode="golden")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
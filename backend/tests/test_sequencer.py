@@ -1,8 +1,12 @@
 """
 Sequencer 模块单元测试
 """
+import asyncio
+import json
 import os
 import sys
+import threading
+import time
 
 import pytest
 
@@ -10,6 +14,7 @@ import pytest
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.sequencer import TestSequencer
+from drivers.common.generic_ce import GenericChannelEmulator
 
 
 class TestSequencerInit:
@@ -101,6 +106,49 @@ class TestSequencerInstruments:
         sequencer.initialize_instruments()
 
         assert "vsg" in sequencer.instruments
+        assert sequencer.init_report[0].success is True
+
+    def test_initialize_concurrently_with_timeouts(self, monkeypatch):
+        """测试仪表并发连接，超时与异常分别记为失败"""
+        class SlowProxy:
+            delays = {"A": 0.2, "B": 0.2, "HANG": 1.0}
+
+            def __init__(self, address, name="X", simulation_mode=False):
+                self.name = name
+
+            def connect(self):
+                if self.name == "BROKEN":
+                    raise ConnectionError("no route")
+                time.sleep(self.delays[self.name])
+
+            def disconnect(self):
+                pass
+
+        monkeypatch.setattr("core.sequencer.INSTRUMENT_PROXIES", {
+            "vsg": (SlowProxy, "A"),
+            "vna": (SlowProxy, "B"),
+            "channel_emulator": (SlowProxy, "HANG"),
+            "integrated_tester": (SlowProxy, "BROKEN"),
+        })
+        config = {"instruments": {
+            "vsg": {"address": "a"},
+            "vna": {"address": "b"},
+            "channel_emulator": {"address": "c", "connect_timeout_s": 0.1},
+            "integrated_tester": {"address": "d"},
+        }}
+        sequencer = TestSequencer(config, simulation_mode=True)
+
+        started = time.perf_counter()
+        results = {r.key: r for r in sequencer.initialize_instruments()}
+
+        # 总耗时取决于最慢的成功仪表，而不是各仪表耗时之和
+        assert time.perf_counter() - started < 0.35
+        assert set(sequencer.instruments) == {"vsg", "vna"}
+        assert results["vsg"].success and results["vsg"].elapsed_s >= 0.2
+        assert not results["channel_emulator"].success
+        assert "超时" in results["channel_emulator"].error
+        assert results["integrated_tester"].error == "no route"
+        sequencer.cleanup()
 
 
 class TestSequencerExecution:
@@ -136,6 +184,149 @@ class TestSequencerExecution:
         assert "throughput_mbps" in metrics_collected[0]
         assert "bler" in metrics_collected[0]
 
+    @pytest.mark.asyncio
+    async def test_sensitivity_search_records_probes(self):
+        """测试灵敏度搜索记录全部测量点并定位交叉点"""
+        sequencer = TestSequencer({"instruments": {}}, simulation_mode=True)
+
+        await sequencer.run_sensitivity_test({
+            "mode": "bisection", "start_power": -90, "end_power": -110,
+            "step": 0.5, "target_bler": 0.05
+        })
+
+        result = sequencer.results["sensitivity"]
+        assert result["converged"] is True
+        assert result["sensitivity_dbm"] == -100.5
+        assert result["measurements"] == len(result["probes"]) <= 8
+
+    @pytest.mark.asyncio
+    async def test_sensitivity_settles_before_upper_bound(self):
+        """测试读数稳定后即进入下一测量点，settling_time_s 仅为上限"""
+        sequencer = TestSequencer({"instruments": {}}, simulation_mode=True)
+
+        await sequencer.run_sensitivity_test({
+            "mode": "bisection", "start_power": -90, "end_power": -110,
+            "step": 0.5, "target_bler": 0.05, "settling_time_s": 2.0,
+            "settling": {"interval_s": 0.01}
+        })
+
+        settling = sequencer.results["sensitivity"]["settling"]
+        assert settling["steps"] == sequencer.results["sensitivity"]["measurements"]
+        assert settling["timeouts"] == 0
+        assert settling["max_ms"] < 500
+        recorded = {(r["instrument"], r["command"]): r for r in sequencer.latency.snapshot()}
+        assert recorded[("settling", "settle")]["samples"] == settling["steps"]
+
+    @pytest.mark.asyncio
+    async def test_blocking_bisection_threshold_table(self):
+        """测试阻塞二分模式输出每个频偏的门限表，并以已测频偏热启动"""
+        sequencer = TestSequencer({"instruments": {}}, simulation_mode=True)
+
+        await sequencer._run_blocking_test({
+            "main_signal": {"freq_hz": 3500e6},
+            "interferer": {
+                "freq_offsets_mhz": [20, 15], "start_power_dbm": -45, "end_power_dbm": -30,
+                "mode": "bisection", "resolution_db": 1.0, "order_offsets": True
+            },
+            "limit": {"max_bler": 0.05}
+        })
+
+        blocking = sequencer.results["blocking"]
+        table = {t["offset_mhz"]: t for t in blocking["thresholds"]}
+        assert table[15.0]["threshold_dbm"] == -39.0
+        assert table[20.0]["threshold_dbm"] == -37.0
+        assert table[15.0]["seeded_from_mhz"] is None
+        assert table[20.0]["seeded_from_mhz"] == 15.0
+        assert table[20.0]["probes"][0]["phase"] == "seed"
+
+    @pytest.mark.asyncio
+    async def test_sensitivity_resume_from_checkpoint(self):
+        """测试灵敏度搜索中断后从检查点继续，只补测剩余的测量点"""
+        test_case = {"mode": "bisection", "start_power": -90, "end_power": -110,
+                     "step": 0.5, "target_bler": 0.05}
+        checkpoints = []
+        first = TestSequencer({"instruments": {}}, simulation_mode=True)
+
+        def interrupt(checkpoint):
+            checkpoints.append(checkpoint)
+            if checkpoint["point_index"] == 3:
+                first.stop()
+
+        first.checkpoint_callback = interrupt
+        await first.run_sensitivity_test(test_case)
+        assert first.results["sensitivity"]["converged"] is False
+
+        measured = []
+        second = TestSequencer({"instruments": {}}, simulation_mode=True,
+                               metrics_callback=measured.append)
+        second.resume_state = checkpoints[-1]
+        await second.run_sensitivity_test(test_case)
+
+        result = second.results["sensitivity"]
+        assert result["converged"] is True
+        assert result["sensitivity_dbm"] == -100.5
+        assert len(measured) == result["measurements"] - 3
+
+    @pytest.mark.asyncio
+    async def test_sensitivity_elapsed_time_advances(self):
+        """测试灵敏度搜索的已用时间随测量推进，恢复后从检查点的已用时间续计"""
+        test_case = {"mode": "bisection", "start_power": -90, "end_power": -110,
+                     "step": 0.5, "target_bler": 0.05, "settling": {"interval_s": 0.01}}
+        checkpoints = []
+        first = TestSequencer({"instruments": {}}, simulation_mode=True)
+
+        def interrupt(checkpoint):
+            checkpoints.append(checkpoint)
+            if checkpoint["point_index"] == 3:
+                first.stop()
+
+        first.checkpoint_callback = interrupt
+        await first.run_sensitivity_test(test_case)
+        elapsed = [c["elapsed_time"] for c in checkpoints]
+        assert elapsed[0] > 0
+        assert elapsed == sorted(elapsed) and elapsed[-1] > elapsed[0]
+
+        resumed = []
+        second = TestSequencer({"instruments": {}}, simulation_mode=True)
+        second.checkpoint_callback = resumed.append
+        second.resume_state = checkpoints[-1]
+        await second.run_sensitivity_test(test_case)
+        assert resumed[0]["elapsed_time"] > elapsed[-1]
+
+    @pytest.mark.asyncio
+    async def test_blocking_resume_skips_finished_offsets(self):
+        """测试阻塞扫描从检查点恢复时跳过已完成的频偏"""
+        scenario = {
+            "main_signal": {"freq_hz": 3500e6},
+            "interferer": {
+                "freq_offsets_mhz": [15, 20], "start_power_dbm": -45, "end_power_dbm": -30,
+                "mode": "bisection", "resolution_db": 1.0
+            },
+            "limit": {"max_bler": 0.05}
+        }
+        checkpoints = []
+        first = TestSequencer({"instruments": {}}, simulation_mode=True)
+
+        def interrupt(checkpoint):
+            checkpoints.append(checkpoint)
+            if checkpoint.get("offset") == 20.0:
+                first.stop()
+
+        first.checkpoint_callback = interrupt
+        await first._run_blocking_test(scenario)
+
+        measured = []
+        second = TestSequencer({"instruments": {}}, simulation_mode=True,
+                               metrics_callback=measured.append)
+        second.resume_state = checkpoints[-1]
+        await second._run_blocking_test(scenario)
+
+        table = {t["offset_mhz"]: t for t in second.results["blocking"]["thresholds"]}
+        assert table[15.0]["threshold_dbm"] == -39.0
+        assert table[20.0]["threshold_dbm"] == -37.0
+        assert {m["freq_offset_mhz"] for m in measured} == {20}
+        assert len(measured) == table[20.0]["measurements"] - 1
+
     @pytest.mark.asyncio
     async def test_stop_signal(self):
         """测试停止信号"""
@@ -170,7 +361,7 @@ class TestSequencerDynamicScenario:
             "name": "Test Dynamic",
             "total_duration": 2,  # 2秒快速测试
             "timeline": [
-                {"time": 0, "target": "vsg", "action": "set_power", "params": {"power": -80}}
+                {"time": 0, "target": "vsg", "action": "set_power", "params": {"dbm": -80}}
             ],
             "metrics": {"interval": 0.5}
         }
@@ -180,6 +371,329 @@ class TestSequencerDynamicScenario:
         # 2秒内应该至少收集到几个指标点
         assert len(metrics_collected) >= 2
 
+    @pytest.mark.asyncio
+    async def test_sampler_polls_targets_without_blocking_events(self):
+        """测试采样器轮询综测仪与 DUT，慢速事件期间仍保持采样速率"""
+        samples = []
+        config = {"instruments": {
+            "integrated_tester": {"address": "TCPIP0::127.0.0.1::inst0::INSTR"}
+        }}
+        sequencer = TestSequencer(config, simulation_mode=True, metrics_callback=samples.append)
+        await sequencer.initialize_instruments_async()
+        sequencer.initialize_dut()
+        sequencer.instruments["channel_emulator"] = SlowInstrument(0.5, [], "ce")
+
+        await sequencer.run_dynamic_scenario({
+            "total_duration": 1.0,
+            "timeline": [{"time": 0.1, "target": "channel_emulator", "action": "set_velocity",
+                          "params": {"kmh": 350}}],
+            "metrics": {"interval": 0.1, "targets": ["integrated_tester", "dut"]}
+        })
+        sequencer.cleanup()
+
+        assert len(samples) >= 10
+        assert {"throughput_mbps", "bler", "rsrp_dbm", "sinr_db", "acquisition_latency_ms"} <= set(samples[0])
+        assert "dut_rsrp" in samples[0]
+        assert sequencer.results["sampling"]["skipped"] == 0
+        assert sequencer.results["sampling"]["achieved_rate_hz"] > 9
+
+    @pytest.mark.asyncio
+    async def test_invalid_timeline_rejected_before_run(self):
+        """测试时间轴中的动作/参数错误在执行前报告，不触发任何事件"""
+        calls = []
+        sequencer = TestSequencer({"instruments": {}}, simulation_mode=True)
+        sequencer.instruments = {"channel_emulator": SlowInstrument(0.0, calls, "ce")}
+
+        with pytest.raises(ValueError):
+            await sequencer.run_dynamic_scenario({
+                "total_duration": 5,
+                "timeline": [
+                    {"time": 0, "target": "channel_emulator", "action": "set_velocity", "params": {"kmh": 50}},
+                    {"time": 4, "target": "channel_emulator", "action": "set_velocty", "params": {"kmh": 0}},
+                ]
+            })
+
+        assert calls == []
+        assert sequencer.event_results == []
+
+    @pytest.mark.asyncio
+    async def test_dynamic_scenario_records_fire_times(self):
+        """测试时间轴事件记录计划与实际触发时间"""
+        config = {"instruments": {}}
+        sequencer = TestSequencer(config, simulation_mode=True)
+
+        scenario_config = {
+            "name": "Test Timeline",
+            "total_duration": 0.3,
+            "timeline": [
+                {"time": 0.1, "target": "channel_emulator", "action": "set_velocity", "params": {"kmh": 50}},
+                {"time": 0.2, "target": "channel_emulator", "action": "set_velocity", "params": {"kmh": 350}}
+            ]
+        }
+
+        await sequencer.run_dynamic_scenario(scenario_config)
+
+        events = [r for r in sequencer.timeline_records if r["kind"] == "event"]
+        assert [e["planned_time"] for e in events] == [0.1, 0.2]
+        assert all(e["jitter_ms"] >= 0 for e in events)
+        timeline = sequencer.results["timeline"]
+        assert timeline["records"] == sequencer.timeline_records
+        assert timeline["jitter"]["count"] == 2
+        json.dumps(sequencer.results)
+
+
+    @pytest.mark.asyncio
+    async def test_ramp_runs_without_blocking_timeline(self):
+        """测试斜坡在后台逐点下发，不推迟后续事件，并报告实际更新速率"""
+        calls = []
+        sequencer = TestSequencer({"instruments": {}}, simulation_mode=True)
+        sequencer.instruments = {
+            "channel_emulator": SlowInstrument(0.0, calls, "ce"),
+            "vsg": SlowInstrument(0.0, calls, "vsg"),
+        }
+
+        await sequencer.run_dynamic_scenario({
+            "total_duration": 0.5,
+            "timeline": [
+                {"time": 0, "target": "channel_emulator", "action": "set_velocity",
+                 "ramp": {"from": 50, "to": 350, "duration": 0.3, "rate_hz": 20}},
+                {"time": 0.1, "target": "vsg", "action": "set_power", "params": {"dbm": -80}},
+            ]
+        })
+
+        velocities = [v for name, v in calls if name == "ce"]
+        assert velocities[0] == 50 and velocities[-1] == 350
+        assert len(velocities) >= 5
+        ramp = sequencer.results["ramps"][0]
+        assert ramp["completed"] is True
+        assert ramp["sent"] == len(velocities)
+        assert ramp["achieved_rate_hz"] > 10
+        vsg = next(r for r in sequencer.event_results if r["target"] == "vsg")
+        assert vsg["completion_latency_ms"] < 100
+
+    @pytest.mark.asyncio
+    async def test_ramp_truncated_at_scenario_end(self):
+        """测试场景结束时中止未完成的斜坡"""
+        calls = []
+        sequencer = TestSequencer({"instruments": {}}, simulation_mode=True)
+        sequencer.instruments = {"channel_emulator": SlowInstrument(0.0, calls, "ce")}
+
+        await sequencer.run_dynamic_scenario({
+            "total_duration": 0.2,
+            "timeline": [{"time": 0, "target": "channel_emulator", "action": "set_velocity",
+                          "ramp": {"from": 0, "to": 100, "duration": 5, "rate_hz": 20}}]
+        })
+
+        assert sequencer.results["ramps"][0]["completed"] is False
+        assert max(v for _, v in calls) < 20
+
+
+class SlowInstrument:
+    """模拟阻塞式 VISA 调用的仪表"""
+
+    def __init__(self, delay: float, calls: list, name: str):
+        self.delay = delay
+        self.calls = calls
+        self.name = name
+
+    def set_velocity(self, kmh: float):
+        time.sleep(self.delay)
+        self.calls.append((self.name, kmh))
+
+    def set_power(self, dbm: float):
+        time.sleep(self.delay)
+        self.calls.append((self.name, dbm))
+
+
+class TestSequencerParallelDispatch:
+    """同一时刻事件并行下发测试"""
+
+    @pytest.mark.asyncio
+    async def test_parallel_dispatch_across_instruments(self):
+        """测试不同仪表的同刻事件并发执行，同一仪表的事件保持顺序"""
+        calls = []
+        sequencer = TestSequencer({"instruments": {}}, simulation_mode=True)
+        sequencer.instruments = {
+            "channel_emulator": SlowInstrument(0.2, calls, "ce"),
+            "vsg": SlowInstrument(0.2, calls, "vsg"),
+        }
+
+        scenario_config = {
+            "name": "Parallel",
+            "total_duration": 0.5,
+            "dispatch": "parallel",
+            "timeline": [
+                {"time": 0, "target": "channel_emulator", "action": "set_velocity", "params": {"kmh": 50}},
+                {"time": 0, "target": "channel_emulator", "action": "set_velocity", "params": {"kmh": 120}},
+                {"time": 0, "target": "vsg", "action": "set_power", "params": {"dbm": -80}},
+            ]
+        }
+
+        await sequencer.run_dynamic_scenario(scenario_config)
+
+        assert [c for c in calls if c[0] == "ce"] == [("ce", 50), ("ce", 120)]
+        results = {(r["target"], r["action"]): r for r in sequencer.event_results}
+        assert len(sequencer.event_results) == 3
+        assert all(r["ok"] for r in sequencer.event_results)
+        # VSG 事件不再排在两个信道模拟器事件之后
+        assert results[("vsg", "set_power")]["completion_latency_ms"] < 350
+        assert max(r["completion_latency_ms"] for r in sequencer.event_results) >= 400
+        assert sequencer.results["events"] == sequencer.event_results
+
+
+class RfInstrument:
+    """记录射频开关的仪表，load_channel_model 模拟长时间阻塞的命令"""
+
+    def __init__(self, calls: list, name: str, load_s: float = 0.0):
+        self.calls = calls
+        self.name = name
+        self.load_s = load_s
+
+    def load_channel_model(self, model: str):
+        time.sleep(self.load_s)
+        self.calls.append((self.name, "load", model))
+
+    def enable_output(self, enable: bool):
+        self.calls.append((self.name, "output", enable))
+
+    def rf_off(self):
+        self.calls.append((self.name, "rf_off"))
+
+    def disconnect(self):
+        self.calls.append((self.name, "disconnect", threading.current_thread().name))
+
+
+class BusyResource:
+    """状态字节始终报告操作进行中的资源 (模拟加载很久的信道模型)，记录写入"""
+
+    def __init__(self):
+        self.writes = []
+
+    def write(self, command):
+        self.writes.append(command)
+
+    def query(self, command):
+        return "0" if command == "*STB?" else "0,No error"
+
+
+class TestSequencerStop:
+    """停止与收尾协议测试"""
+
+    @pytest.mark.asyncio
+    async def test_stop_cancels_long_command_and_turns_rf_off(self):
+        """测试停止时取消正在等待的长命令，先关射频再断开，并记录停止到射频关闭的延迟"""
+        calls = []
+        sequencer = TestSequencer({"instruments": {}, "safety": {"max_stop_latency_s": 2.0}},
+                                  simulation_mode=True)
+        sequencer.instruments = {
+            "channel_emulator": RfInstrument(calls, "ce", load_s=0.3),
+            "vsg": RfInstrument(calls, "vsg"),
+        }
+        sequencer.current_scenario = {"config": {
+            "type": "dynamic_scenario", "total_duration": 30,
+            "timeline": [{"time": 0, "target": "channel_emulator", "action": "load_channel_model",
+                          "params": {"model": "HST.scn"}}]
+        }}
+
+        task = asyncio.create_task(sequencer.run())
+        await asyncio.sleep(0.1)
+        started = time.perf_counter()
+        sequencer.stop()
+        await asyncio.wait_for(task, 2.0)
+
+        assert time.perf_counter() - started < 1.0
+        assert ("vsg", "output", False) in calls
+        # 信道模拟器的 rf_off 排在正在执行的加载命令之后，断开在射频关闭之后
+        disconnect = next(c for c in calls if c[:2] == ("ce", "disconnect"))
+        assert calls.index(("ce", "load", "HST.scn")) < calls.index(("ce", "rf_off")) < calls.index(disconnect)
+        # 断开在该仪表自己的 I/O 线程上执行
+        assert disconnect[2].startswith("io-channel_emulator")
+        report = sequencer.shutdown_report
+        assert report["errors"] == {}
+        assert 100 < report["stop_to_rf_off_ms"] < 1000
+        assert report["within_bound"] is True
+        assert sequencer.results["shutdown"] == report
+        assert sequencer.rf_off_event.is_set()
+
+    @pytest.mark.asyncio
+    async def test_stop_aborts_model_load_wait(self):
+        """测试停止时中止正在等待的模型加载，关闭射频不排在 MODEL_LOAD_TIMEOUT_S 之后"""
+        ce = GenericChannelEmulator("TCPIP0::127.0.0.1::inst0::INSTR", simulation_mode=True)
+        ce.simulation_mode = False
+        resource = ce.instrument = BusyResource()
+        ce._connected = True
+        sequencer = TestSequencer({"instruments": {}}, simulation_mode=True)
+        sequencer.instruments = {"channel_emulator": ce}
+        sequencer.current_scenario = {"config": {
+            "type": "dynamic_scenario", "total_duration": 30,
+            "timeline": [{"time": 0, "target": "channel_emulator", "action": "load_channel_model",
+                          "params": {"model": "HST"}}]
+        }}
+
+        task = asyncio.create_task(sequencer.run())
+        await asyncio.sleep(0.2)
+        sequencer.stop()
+        await asyncio.wait_for(task, 2.0)
+
+        assert "OUTP:STAT OFF" in resource.writes
+        assert sequencer.shutdown_report["errors"] == {}
+        assert sequencer.shutdown_report["stop_to_rf_off_ms"] < 1000
+
+    @pytest.mark.asyncio
+    async def test_cancel_during_connect_shuts_down(self, monkeypatch):
+        """测试连接期间被取消仍执行收尾协议"""
+        sequencer = TestSequencer({"instruments": {}}, simulation_mode=True)
+        shutdowns = []
+
+        async def hang():
+            await asyncio.sleep(30)
+
+        async def shutdown():
+            shutdowns.append(True)
+
+        monkeypatch.setattr(sequencer, "initialize_instruments_async", hang)
+        monkeypatch.setattr(sequencer, "shutdown", shutdown)
+        task = asyncio.create_task(sequencer.run())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert shutdowns == [True]
+
+    @pytest.mark.asyncio
+    async def test_stop_during_settling_returns_promptly(self):
+        """测试稳定等待期间停止立即返回"""
+        sequencer = TestSequencer({"instruments": {}}, simulation_mode=True)
+        sequencer.current_scenario = {"config": {"type": "sensitivity", "search": {
+            "mode": "linear", "start_power_dbm": -90, "end_power_dbm": -110, "step_db": 1,
+            "settling_time_s": 5.0, "settling": {"window": 1000}
+        }}}
+
+        task = asyncio.create_task(sequencer.run())
+        await asyncio.sleep(0.2)
+        started = time.perf_counter()
+        sequencer.stop()
+        await asyncio.wait_for(task, 2.0)
+
+        assert time.perf_counter() - started < 0.5
+        assert sequencer.shutdown_report["stop_to_rf_off_ms"] < 500
+
+    @pytest.mark.asyncio
+    async def test_normal_completion_still_turns_rf_off(self):
+        """测试正常结束同样执行收尾协议，但不记录停止延迟"""
+        calls = []
+        sequencer = TestSequencer({"instruments": {}}, simulation_mode=True)
+        sequencer.instruments = {"vsg": RfInstrument(calls, "vsg")}
+        sequencer.current_scenario = {"config": {"type": "dynamic_scenario", "total_duration": 0.1, "timeline": []}}
+
+        await sequencer.run()
+
+        assert len(calls) == 2
+        assert calls[0] == ("vsg", "output", False)
+        assert calls[1][:2] == ("vsg", "disconnect")
+        assert "stop_to_rf_off_ms" not in sequencer.shutdown_report
+
 
 class TestSequencerCleanup:
     """清理功能测试"""
@@ -0,0 +1,121 @@
+"""
+稳定检测单元测试
+"""
+import os
+import sys
+
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.settling import SettlingDetector, create_settling_detector
+
+
+def reader(values):
+    """依次返回给定的 BLER 读数，读完后重复最后一个"""
+    calls = []
+
+    async def read():
+        calls.append(len(calls))
+        return {"bler": values[min(len(calls) - 1, len(values) - 1)], "throughput_mbps": 100.0}
+    return read, calls
+
+
+class TestSettlingDetector:
+    """读数收敛检测测试"""
+
+    @pytest.mark.asyncio
+    async def test_stable_readings_return_early(self):
+        """测试读数稳定后立即返回，远早于等待上限"""
+        detector = SettlingDetector(max_wait_s=2.0, window=3, interval_s=0.01)
+        read, calls = reader([0.02])
+
+        result = await detector.wait(read)
+
+        assert result.settled is True
+        assert result.samples == len(calls) == 3
+        assert result.elapsed_s < 0.5
+        assert result.reading["bler"] == 0.02
+
+    @pytest.mark.asyncio
+    async def test_transient_then_stable(self):
+        """测试功率步进后的瞬态读数不计入稳定窗口"""
+        detector = SettlingDetector(max_wait_s=2.0, window=3, interval_s=0.01)
+        read, _ = reader([0.5, 0.2, 0.05, 0.031, 0.03, 0.03])
+
+        result = await detector.wait(read)
+
+        assert result.settled is True
+        assert result.samples == 6
+        assert result.reading["bler"] == 0.03
+
+    @pytest.mark.asyncio
+    async def test_noisy_readings_time_out(self):
+        """测试读数持续波动时以等待上限返回最后一次读数"""
+        detector = SettlingDetector(max_wait_s=0.1, window=3, interval_s=0.01)
+        read, calls = reader([0.1 * (i % 2) for i in range(100)])
+
+        result = await detector.wait(read)
+
+        assert result.settled is False
+        assert 0.1 <= result.elapsed_s < 0.3
+        assert result.reading == {"bler": 0.1 * ((len(calls) - 1) % 2), "throughput_mbps": 100.0}
+        assert detector.stats()["timeouts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_zero_max_wait_reads_once(self):
+        """测试等待上限为 0 时只读一次"""
+        detector = SettlingDetector(max_wait_s=0)
+        read, calls = reader([0.5, 0.0])
+
+        result = await detector.wait(read)
+
+        assert result.settled is True
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_min_wait_respected(self):
+        """测试最短等待时间内即使读数稳定也继续采样"""
+        detector = SettlingDetector(max_wait_s=1.0, window=2, interval_s=0.01, min_wait_s=0.05)
+        read, _ = reader([0.0])
+
+        result = await detector.wait(read)
+
+        assert result.settled is True
+        assert result.elapsed_s >= 0.05
+
+    @pytest.mark.asyncio
+    async def test_stats(self):
+        """测试统计每次等待的耗时"""
+        detector = SettlingDetector(max_wait_s=1.0, window=1, interval_s=0.01)
+        for _ in range(4):
+            read, _ = reader([0.0])
+            await detector.wait(read)
+
+        stats = detector.stats()
+        assert stats["steps"] == 4
+        assert stats["timeouts"] == 0
+        assert stats["max_ms"] < 100
+
+    def test_factory_reads_scenario_config(self):
+        """测试按场景配置创建检测器，未配置上限时使用默认值"""
+        detector = create_settling_detector(
+            {"settling_time_s": 1.5, "settling": {"metric": "throughput_mbps", "window": 4, "rel_tol": 0.01}},
+            default_max_s=0.5)
+
+        assert detector.max_wait_s == 1.5
+        assert detector.metric == "throughput_mbps"
+        assert detector.window == 4
+        assert create_settling_detector({}, default_max_s=0.5).max_wait_s == 0.5
+
+    def test_invalid_config(self):
+        """测试非法参数"""
+        with pytest.raises(ValueError):
+            create_settling_detector({"settling_time_s": -1}, default_max_s=0.5)
+        with pytest.raises(ValueError):
+            create_settling_detector({"settling": {"window": 0}}, default_max_s=0.5)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])